@@ -3,6 +3,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django import forms
 from tinymce.widgets import TinyMCE
+from products.admin_mixins import NormalizedSearchMixin
 from .models import BlogPost, BlogCategory, BlogComment
 
 @admin.register(BlogCategory)
@@ -109,11 +110,12 @@ class BlogPostAdminForm(forms.ModelForm):
         return instance
 
 @admin.register(BlogPost)
-class BlogPostAdmin(admin.ModelAdmin):
+class BlogPostAdmin(NormalizedSearchMixin, admin.ModelAdmin):
     form = BlogPostAdminForm
     list_display = ['title', 'author', 'category', 'status', 'is_featured', 'display_locations_display', 'view_count', 'created_at', 'published_at']
     list_filter = ['status', 'is_featured', 'category', 'author', 'created_at']
     search_fields = ['title', 'excerpt', 'content']
+    normalized_search_fields = ['search_title', 'search_text']
     prepopulated_fields = {'slug': ('title',)}
     readonly_fields = ['view_count', 'created_at', 'updated_at', 'published_at']
     raw_id_fields = ['author']
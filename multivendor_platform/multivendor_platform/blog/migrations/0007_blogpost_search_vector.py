@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:11
+# Adds the full-text search column used by products/search.py. The GIN index and the
+# initial vectors only exist on PostgreSQL; other databases use the in-memory backend.
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS blog_blogpost_search_vector_gin "
+        "ON blog_blogpost USING gin (search_vector);"
+    )
+    schema_editor.execute(
+        "UPDATE blog_blogpost SET search_vector = "
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(excerpt, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(content, '')), 'C');"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS blog_blogpost_search_vector_gin;")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_add_display_locations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
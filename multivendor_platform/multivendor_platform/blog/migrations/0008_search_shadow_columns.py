@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:16
+# Adds the normalized search columns and backfills them. On PostgreSQL the search
+# vectors are rebuilt from the new columns.
+
+from django.db import migrations, models
+
+from products.normalization import refresh_search_columns
+
+
+def backfill_search_columns(apps, schema_editor):
+    BlogPost = apps.get_model('blog', 'BlogPost')
+    refresh_search_columns(BlogPost.objects.all(), {'search_title': ('title',), 'search_text': ('excerpt', 'content')})
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "UPDATE blog_blogpost SET search_vector = "
+            "setweight(to_tsvector('simple', search_title), 'A') || "
+            "setweight(to_tsvector('simple', search_text), 'B');"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_blogpost_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='search_title',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_columns, migrations.RunPython.noop),
+    ]
@@ -2,8 +2,10 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.contrib.postgres.search import SearchVectorField
 from django.utils.text import slugify
 from products.models import Category as ProductCategory, Subcategory
+from products.normalization import apply_search_columns
 
 User = get_user_model()
 
@@ -98,6 +100,14 @@ class BlogPost(models.Model):
     # SEO fields
     meta_title = models.CharField(max_length=200, blank=True, null=True)
     meta_description = models.CharField(max_length=300, blank=True, null=True)
+
+    # Normalized shadow columns (products/normalization.py), filled on save
+    search_title = models.TextField(blank=True, default='', editable=False)
+    search_text = models.TextField(blank=True, default='', editable=False)
+    SEARCH_COLUMNS = {'search_title': ('title',), 'search_text': ('excerpt', 'content')}
+
+    # Weighted tsvector over the shadow columns, maintained by products/search.py (PostgreSQL only)
+    search_vector = SearchVectorField(null=True, editable=False)
     
     class Meta:
         ordering = ['-created_at']
@@ -119,6 +129,7 @@ class BlogPost(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        apply_search_columns(self, kwargs)
         
         # Set published_at when status changes to published
         if self.status == 'published' and not self.published_at:
@@ -1,6 +1,7 @@
 # blog/serializers.py
 from rest_framework import serializers
 from .models import BlogPost, BlogCategory, BlogComment
+from products.media_manifest import file_exists
 from products.utils import build_absolute_uri
 
 class BlogCategorySerializer(serializers.ModelSerializer):
@@ -151,8 +152,7 @@ class BlogPostListSerializer(serializers.ModelSerializer):
             return None
         
         try:
-            storage = image_field.storage
-            if not storage.exists(image_field.name):
+            if not file_exists(image_field):
                 return None
             
             request = self.context.get('request')
@@ -220,8 +220,7 @@ class BlogPostDetailSerializer(serializers.ModelSerializer):
             return None
         
         try:
-            storage = image_field.storage
-            if not storage.exists(image_field.name):
+            if not file_exists(image_field):
                 return None
             
             request = self.context.get('request')
@@ -4,7 +4,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView
 from django.urls import reverse_lazy
-from django.db.models import Q, Count, Prefetch
+from django.db.models import Q, Count, F, Prefetch
 from django.utils import timezone
 from django.conf import settings
 
@@ -23,6 +23,8 @@ from .serializers import (
     BlogCategorySerializer, BlogCommentSerializer, BlogCommentCreateSerializer
 )
 from .permissions import IsAuthorOrReadOnly
+from products.cache import SCOPE_TAXONOMY
+from products.conditional import annotate_relation_versions, conditional_response, latest, make_etag, version_parts
 
 class BlogPagination(PageNumberPagination):
     page_size = 12
@@ -177,43 +179,67 @@ class BlogPostViewSet(viewsets.ModelViewSet):
         """
         serializer.save(author=self.request.user)
     
+    # Relations BlogPostDetailSerializer renders: (model, foreign key, version field)
+    detail_version_relations = {
+        'comments': (BlogComment, 'post', 'updated_at'),
+        'subcategory_links': (BlogPost.linked_subcategories.through, 'blogpost', 'pk'),
+    }
+
     def retrieve(self, request, *args, **kwargs):
         """
         Retrieve a blog post and increment view count
         Optimized with select_related and prefetch_related
-        """
-        # Get optimized queryset
-        queryset = BlogPost.objects.select_related(
-            'author',
-            'category',
-            'category__linked_product_category'
-        ).prefetch_related(
-            'linked_subcategories',
-            Prefetch(
-                'comments',
-                queryset=BlogComment.objects.filter(is_approved=True).select_related('author').prefetch_related(
-                    Prefetch(
-                        'replies',
-                        queryset=BlogComment.objects.filter(is_approved=True).select_related('author').order_by('created_at')
+        Answers with ETag / Last-Modified (see products/conditional.py). view_count is
+        left out of the validators, otherwise no revalidation would ever match.
+        """
+        versions = get_object_or_404(
+            annotate_relation_versions(BlogPost.objects.order_by(), self.detail_version_relations).values(
+                'pk', 'status', 'updated_at', 'published_at', 'category__updated_at',
+                'author__username', 'author__first_name', 'author__last_name', 'author__email',
+                *(f'{name}_{part}' for name in self.detail_version_relations for part in ('count', 'updated')),
+            ),
+            slug=kwargs['slug'],
+        )
+
+        # Only increment view count for published posts; revalidated views count too
+        if versions['status'] == 'published':
+            BlogPost.objects.filter(pk=versions['pk']).update(view_count=F('view_count') + 1)
+
+        def build():
+            # Get optimized queryset
+            queryset = BlogPost.objects.select_related(
+                'author',
+                'category',
+                'category__linked_product_category'
+            ).prefetch_related(
+                'linked_subcategories',
+                Prefetch(
+                    'comments',
+                    queryset=BlogComment.objects.filter(is_approved=True).select_related('author').prefetch_related(
+                        Prefetch(
+                            'replies',
+                            queryset=BlogComment.objects.filter(is_approved=True).select_related('author').order_by('created_at')
+                        )
                     )
                 )
+            ).annotate(
+                comment_count=Count(
+                    'comments',
+                    filter=Q(comments__is_approved=True),
+                    distinct=True
+                )
             )
-        ).annotate(
-            comment_count=Count(
-                'comments',
-                filter=Q(comments__is_approved=True),
-                distinct=True
-            )
+            instance = queryset.get(pk=versions['pk'])
+            serializer = self.get_serializer(instance)
+            return Response(serializer.data)
+
+        # Linked subcategory names come from the taxonomy
+        return conditional_response(
+            request,
+            build,
+            etag=make_etag(*version_parts(versions, (SCOPE_TAXONOMY,))),
+            last_modified=latest(versions['updated_at'], versions['category__updated_at'], versions['comments_updated']),
         )
-        
-        instance = queryset.get(slug=kwargs['slug'])
-        
-        # Only increment view count for published posts
-        if instance.status == 'published':
-            instance.increment_view_count()
-        
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def featured(self, request):
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from .models import (
     SupplierEngagement,
+    VendorRanking,
     Badge,
     EarnedBadge,
     PointsHistory,
@@ -20,6 +21,14 @@ class SupplierEngagementAdmin(admin.ModelAdmin):
     readonly_fields = ('updated_at',)
 
 
+@admin.register(VendorRanking)
+class VendorRankingAdmin(admin.ModelAdmin):
+    list_display = ('vendor', 'tier', 'is_premium', 'total_points', 'reputation_score', 'updated_at')
+    list_filter = ('tier', 'is_premium')
+    search_fields = ('vendor__username', 'vendor__vendor_profile__store_name')
+    readonly_fields = ('total_points', 'reputation_score', 'tier', 'tier_rank', 'is_premium', 'premium_order', 'updated_at')
+
+
 @admin.register(Badge)
 class BadgeAdmin(admin.ModelAdmin):
     list_display = ('title', 'tier', 'category', 'is_active')
@@ -0,0 +1,42 @@
+# gamification/management/commands/backfill_vendor_rankings.py
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db.models import Q
+
+from gamification.services import refresh_vendor_ranking
+
+
+class Command(BaseCommand):
+    help = 'Create or refresh VendorRanking rows for every vendor (product owners, vendor profiles, verified users)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many vendors would be processed without writing rankings',
+        )
+
+    def handle(self, *args, **options):
+        vendor_ids = (
+            User.objects.filter(
+                Q(products__isnull=False)
+                | Q(vendor_profile__isnull=False)
+                | Q(profile__is_verified=True)
+            )
+            .values_list('id', flat=True)
+            .distinct()
+            .order_by('id')
+        )
+        total = vendor_ids.count()
+        self.stdout.write(f'Found {total} vendor(s) to rank')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No rankings will be written'))
+            return
+
+        written = 0
+        for user_id in vendor_ids.iterator(chunk_size=500):
+            if refresh_vendor_ranking(user_id) is not None:
+                written += 1
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Refreshed {written} vendor ranking(s)'))
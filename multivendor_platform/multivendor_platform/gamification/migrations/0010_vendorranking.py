@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('gamification', '0009_rename_gamificatio_reason_57b697_idx_gamificatio_reason_548214_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_points', models.PositiveIntegerField(default=0)),
+                ('reputation_score', models.FloatField(default=0.0)),
+                ('tier', models.CharField(default='inactive', max_length=20)),
+                ('tier_rank', models.PositiveSmallIntegerField(default=4)),
+                ('is_premium', models.BooleanField(default=False)),
+                ('premium_order', models.PositiveSmallIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('vendor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='vendor_ranking', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['premium_order', 'tier_rank', '-reputation_score', '-total_points'], name='gamif_vendor_rank_sort_idx')],
+            },
+        ),
+    ]
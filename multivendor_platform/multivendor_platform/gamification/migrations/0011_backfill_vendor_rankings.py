@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:40
+# Creates the VendorRanking rows of existing vendors, as backfill_vendor_rankings
+# does, so the marketplace ordering is right as soon as the table exists. Rankings
+# already written by the signals are left alone.
+
+from django.db import migrations
+
+# Frozen copies of VendorRanking.TIER_RANKS and GamificationService.calculate_tier
+TIER_RANKS = {'diamond': 0, 'gold': 1, 'silver': 2, 'bronze': 3, 'inactive': 4}
+
+
+def calculate_tier(points, reputation):
+    if points >= 1000 and reputation >= 80:
+        return 'diamond'
+    if points >= 500 and reputation >= 60:
+        return 'gold'
+    if points >= 200:
+        return 'silver'
+    if points >= 50:
+        return 'bronze'
+    return 'inactive'
+
+
+def backfill_vendor_rankings(apps, schema_editor):
+    SupplierEngagement = apps.get_model('gamification', 'SupplierEngagement')
+    UserProfile = apps.get_model('users', 'UserProfile')
+    VendorRanking = apps.get_model('gamification', 'VendorRanking')
+
+    standings = {
+        user_id: (points, reputation)
+        for user_id, points, reputation in SupplierEngagement.objects.values_list(
+            'vendor_profile__user_id', 'total_points', 'reputation_score'
+        ).iterator()
+    }
+    premium = set(UserProfile.objects.filter(is_verified=True).values_list('user_id', flat=True))
+    existing = set(VendorRanking.objects.values_list('vendor_id', flat=True))
+
+    rankings = []
+    for user_id in sorted((set(standings) | premium) - existing):
+        points, reputation = standings.get(user_id, (0, 0.0))
+        tier = calculate_tier(points, reputation)
+        is_premium = user_id in premium
+        rankings.append(VendorRanking(
+            vendor_id=user_id,
+            total_points=points,
+            reputation_score=reputation,
+            tier=tier,
+            tier_rank=TIER_RANKS[tier],
+            is_premium=is_premium,
+            premium_order=0 if is_premium else 1,
+        ))
+    VendorRanking.objects.bulk_create(rankings, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0010_vendorranking'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_vendor_rankings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:52
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0011_backfill_vendor_rankings'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='vendorranking',
+            name='gamif_vendor_rank_sort_idx',
+        ),
+    ]
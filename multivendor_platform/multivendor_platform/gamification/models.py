@@ -30,6 +30,37 @@ class SupplierEngagement(models.Model):
         return f"Engagement for {self.vendor_profile.store_name}"
 
 
+class VendorRanking(models.Model):
+    """
+    Persisted marketplace ranking per vendor.
+    Maintained from SupplierEngagement and UserProfile.is_verified changes so the
+    product listing can sort on stored columns instead of per-request Case/When.
+    """
+    TIER_RANKS = {
+        'diamond': 0,
+        'gold': 1,
+        'silver': 2,
+        'bronze': 3,
+        'inactive': 4,
+    }
+
+    vendor = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='vendor_ranking'
+    )
+    total_points = models.PositiveIntegerField(default=0)
+    reputation_score = models.FloatField(default=0.0)
+    tier = models.CharField(max_length=20, default='inactive')
+    tier_rank = models.PositiveSmallIntegerField(default=4)
+    is_premium = models.BooleanField(default=False)
+    premium_order = models.PositiveSmallIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Ranking for {self.vendor.username} ({self.tier})"
+
+
 class Badge(models.Model):
     TIER_CHOICES = (
         ('bronze', 'Bronze'),
@@ -9,7 +9,7 @@ from django.utils import timezone
 from users.models import VendorProfile
 from products.models import Product
 from orders.models import Order
-from .models import Badge, EarnedBadge, Invitation, PointsHistory, SupplierEngagement
+from .models import Badge, EarnedBadge, Invitation, PointsHistory, SupplierEngagement, VendorRanking
 
 
 @dataclass
@@ -1077,4 +1077,42 @@ def flag_review_velocity_if_needed(review_obj, reviewer, vendor_profile) -> bool
     return False
 
 
-__all__ = ['GamificationService', '_get_vendor_profile']
+def refresh_vendor_ranking(user_id: int) -> VendorRanking | None:
+    """
+    Recompute the persisted VendorRanking for a vendor user.
+    The tier comes from GamificationService.calculate_tier so listing order and
+    dashboard tiers never disagree. Users with default standing and no existing
+    ranking row are skipped to keep the table limited to real vendors.
+    """
+    from users.models import UserProfile
+
+    engagement = (
+        SupplierEngagement.objects.filter(vendor_profile__user_id=user_id)
+        .only('total_points', 'reputation_score')
+        .first()
+    )
+    points = engagement.total_points if engagement else 0
+    reputation = engagement.reputation_score if engagement else 0.0
+    is_premium = bool(
+        UserProfile.objects.filter(user_id=user_id)
+        .values_list('is_verified', flat=True)
+        .first()
+    )
+    tier = GamificationService(None).calculate_tier(points, reputation)
+
+    values = {
+        'total_points': points,
+        'reputation_score': reputation,
+        'tier': tier,
+        'tier_rank': VendorRanking.TIER_RANKS[tier],
+        'is_premium': is_premium,
+        'premium_order': 0 if is_premium else 1,
+    }
+    if engagement is None and not is_premium:
+        if not VendorRanking.objects.filter(vendor_id=user_id).exists():
+            return None
+    ranking, _ = VendorRanking.objects.update_or_create(vendor_id=user_id, defaults=values)
+    return ranking
+
+
+__all__ = ['GamificationService', '_get_vendor_profile', 'refresh_vendor_ranking']
@@ -1,7 +1,8 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from users.models import SupplierComment, ProductReview
-from gamification.services import flag_review_velocity_if_needed, _get_vendor_profile
+from users.models import SupplierComment, ProductReview, UserProfile
+from gamification.models import SupplierEngagement
+from gamification.services import flag_review_velocity_if_needed, _get_vendor_profile, refresh_vendor_ranking
 
 
 @receiver(post_save, sender=SupplierComment)
@@ -23,3 +24,16 @@ def flag_product_review(sender, instance, created, **kwargs):
     if vendor_profile and reviewer:
         flag_review_velocity_if_needed(instance, reviewer, vendor_profile)
 
+
+
+@receiver(post_save, sender=SupplierEngagement)
+def sync_ranking_from_engagement(sender, instance, **kwargs):
+    refresh_vendor_ranking(instance.vendor_profile.user_id)
+
+
+@receiver(post_save, sender=UserProfile)
+def sync_ranking_from_profile(sender, instance, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'is_verified' not in update_fields:
+        return
+    refresh_vendor_ranking(instance.user_id)
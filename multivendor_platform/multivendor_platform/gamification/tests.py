@@ -5,7 +5,7 @@ from rest_framework import status
 from django.utils import timezone
 
 from users.models import UserProfile, VendorProfile
-from .models import Invitation, SupplierEngagement, PointsHistory
+from .models import Invitation, SupplierEngagement, PointsHistory, VendorRanking
 from .services import GamificationService
 
 
@@ -317,3 +317,93 @@ class InvitationPointsTest(TestCase):
         self.assertEqual(history.points, 100)
         self.assertEqual(history.metadata.get('invitation_id'), invitation.id)
 
+
+
+class VendorRankingSyncTest(TestCase):
+    """Test that VendorRanking follows engagement and verification changes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='09123456711', password='testpass123')
+        self.profile = UserProfile.objects.create(user=self.user, role='seller')
+        self.vendor = VendorProfile.objects.get(user=self.user)
+
+    def test_engagement_save_updates_tier(self):
+        engagement = SupplierEngagement.objects.create(
+            vendor_profile=self.vendor,
+            total_points=600,
+            reputation_score=65,
+        )
+        ranking = VendorRanking.objects.get(vendor=self.user)
+        self.assertEqual(ranking.tier, 'gold')
+        self.assertEqual(ranking.tier_rank, 1)
+
+        engagement.total_points = 1200
+        engagement.reputation_score = 90
+        engagement.save()
+        ranking.refresh_from_db()
+        self.assertEqual(ranking.tier, GamificationService(self.vendor).calculate_tier(1200, 90))
+        self.assertEqual(ranking.tier_rank, 0)
+
+    def test_verification_sets_premium_order(self):
+        SupplierEngagement.objects.create(vendor_profile=self.vendor, total_points=10)
+        self.profile.is_verified = True
+        self.profile.save(update_fields=['is_verified'])
+        ranking = VendorRanking.objects.get(vendor=self.user)
+        self.assertTrue(ranking.is_premium)
+        self.assertEqual(ranking.premium_order, 0)
+
+    def test_listing_orders_by_persisted_ranking(self):
+        from products.models import Category, Product
+
+        category = Category.objects.create(name='Ranking Category')
+        other = User.objects.create_user(username='09123456712', password='testpass123')
+        other_profile = UserProfile.objects.create(user=other, role='seller')
+        SupplierEngagement.objects.create(vendor_profile=self.vendor, total_points=300)
+        SupplierEngagement.objects.create(
+            vendor_profile=VendorProfile.objects.get(user=other),
+            total_points=20,
+        )
+        other_profile.is_verified = True
+        other_profile.save()
+
+        for vendor, name in ((self.user, 'Silver vendor product'), (other, 'Premium vendor product')):
+            Product.objects.create(
+                vendor=vendor,
+                name=name,
+                description='Ranking test product',
+                price=1000,
+                primary_category=category,
+                approval_status=Product.APPROVAL_STATUS_APPROVED,
+            )
+
+        response = APIClient().get('/api/products/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([item['name'] for item in results], ['Premium vendor product', 'Silver vendor product'])
+        self.assertEqual(results[1]['vendor_tier'], 'silver')
+
+    def test_admin_verify_action_refreshes_ranking(self):
+        SupplierEngagement.objects.create(vendor_profile=self.vendor, total_points=10)
+        admin_user = User.objects.create_superuser(username='rankadmin', password='testpass123', email='r@example.com')
+        self.client.force_login(admin_user)
+        response = self.client.post('/admin/users/userprofile/', {
+            'action': 'verify_users',
+            '_selected_action': [self.profile.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        ranking = VendorRanking.objects.get(vendor=self.user)
+        self.assertTrue(ranking.is_premium)
+        self.assertEqual(ranking.premium_order, 0)
+
+    def test_migration_backfills_missing_rankings(self):
+        from importlib import import_module
+        from django.apps import apps
+
+        migration = import_module('gamification.migrations.0011_backfill_vendor_rankings')
+        SupplierEngagement.objects.create(vendor_profile=self.vendor, total_points=250)
+        UserProfile.objects.filter(pk=self.profile.pk).update(is_verified=True)
+        VendorRanking.objects.all().delete()
+
+        migration.backfill_vendor_rankings(apps, None)
+        ranking = VendorRanking.objects.get(vendor=self.user)
+        self.assertEqual((ranking.tier, ranking.tier_rank, ranking.premium_order), ('silver', 2, 0))
@@ -21,6 +21,16 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'multivendor_platform.settings')
 # is populated before importing code that may import ORM models.
 django_asgi_app = get_asgi_application()
 
+# Load the in-memory catalog indexes and media manifest off the request path
+from products.cache import warm_process_indexes
+
+warm_process_indexes()
+
+# Write buffered product views periodically and at exit (products/view_counts.py)
+from products.view_counts import start_flusher
+
+start_flusher()
+
 from chat.routing import websocket_urlpatterns
 
 # Custom WebSocket origin validator that allows both frontend and backend domains
@@ -0,0 +1,336 @@
+# multivendor_platform/instrumentation.py
+"""
+Sampled per-request instrumentation with a Prometheus text export.
+
+InstrumentationMiddleware selects a share of requests (INSTRUMENTATION_SAMPLE_RATE,
+0 disables it) and for those records wall time, query count and database time (via
+a connection execute wrapper), plus whatever code reports while the request runs:
+
+    with timed('serializer'):       # accumulated seconds per section name
+        ...
+    count('response_cache_hit')     # event counter
+
+Outside a sampled request `timed()` and `count()` cost one context variable lookup,
+so they are safe on per-row paths. Finished requests are added to per-view counters
+that each process flushes to the Django cache every METRICS_FLUSH_SECONDS, so
+/internal/metrics reports totals across all workers. All values describe sampled
+requests only; divide by the exported sample rate to estimate full traffic.
+"""
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from contextlib import ExitStack, nullcontext
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+
+METRIC_PREFIX = 'multivendor_'
+SERIES_INDEX_KEY = 'metrics:series'
+SERIES_VALUE_KEY = 'metrics:value:{digest}'
+
+# Upper bounds (seconds) of the request duration histogram
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# name -> (type, help); '_seconds' samples are stored as integer microseconds
+METRIC_FAMILIES = {
+    'requests_total': ('counter', 'Sampled requests by view and status class.'),
+    'request_duration_seconds': ('histogram', 'Wall time of sampled requests.'),
+    'db_queries_total': ('counter', 'Database queries run by sampled requests.'),
+    'db_duration_seconds_total': ('counter', 'Database time of sampled requests.'),
+    'section_duration_seconds_total': ('counter', 'Time spent in timed() sections, e.g. serializer.'),
+    'events_total': ('counter', 'count() events, e.g. response cache hits and misses.'),
+}
+
+_NOOP = nullcontext()
+_current = ContextVar('request_metrics', default=None)
+
+
+class _Section:
+    __slots__ = ('metrics', 'name', 'started')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.metrics.open_sections.add(self.name)
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        self.metrics.open_sections.discard(self.name)
+        self.metrics.sections[self.name] = self.metrics.sections.get(self.name, 0.0) + elapsed
+
+
+class RequestMetrics:
+    """Measurements of one sampled request."""
+    __slots__ = ('queries', 'db_time', 'sections', 'events', 'open_sections')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.sections = {}
+        self.events = {}
+        self.open_sections = set()
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+
+def timed(name):
+    """
+    Context manager adding its wall time to section `name` of the current request.
+    Nested sections with the same name are counted once (the outermost).
+    """
+    metrics = _current.get()
+    if metrics is None or name in metrics.open_sections:
+        return _NOOP
+    return _Section(metrics, name)
+
+
+def count(event, amount=1):
+    """Add to event counter `event` of the current request."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.events[event] = metrics.events.get(event, 0) + amount
+
+
+class TimedSerializerMixin:
+    """Serializer mixin recording to_representation() time as the 'serializer' section."""
+
+    def to_representation(self, instance):
+        with timed('serializer'):
+            return super().to_representation(instance)
+
+
+# ----------------------------------------------------------------------
+# Aggregation
+# ----------------------------------------------------------------------
+
+def _microseconds(seconds):
+    return int(round(seconds * 1_000_000))
+
+
+class MetricsRegistry:
+    """
+    Per-process counters keyed by (sample name, labels), flushed by increment to the
+    shared cache. Values are integers; '_seconds' samples hold microseconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._flushed_at = time.monotonic()
+
+    def _add(self, pending, sample, labels, value):
+        series = (sample, tuple(sorted(labels.items())))
+        pending[series] = pending.get(series, 0) + value
+
+    def record(self, view, status_code, metrics, duration):
+        labels = {'view': view}
+        pending = {}
+        self._add(pending, 'requests_total', {**labels, 'status': f'{status_code // 100}xx'}, 1)
+        bucket = next((str(bound) for bound in DURATION_BUCKETS if duration <= bound), '+Inf')
+        self._add(pending, 'request_duration_seconds_bucket', {**labels, 'le': bucket}, 1)
+        self._add(pending, 'request_duration_seconds_sum', labels, _microseconds(duration))
+        self._add(pending, 'request_duration_seconds_count', labels, 1)
+        self._add(pending, 'db_queries_total', labels, metrics.queries)
+        self._add(pending, 'db_duration_seconds_total', labels, _microseconds(metrics.db_time))
+        for section, seconds in metrics.sections.items():
+            self._add(pending, 'section_duration_seconds_total', {**labels, 'section': section}, _microseconds(seconds))
+        for event, amount in metrics.events.items():
+            self._add(pending, 'events_total', {**labels, 'event': event}, amount)
+
+        with self._lock:
+            for series, value in pending.items():
+                self._pending[series] = self._pending.get(series, 0) + value
+            due = time.monotonic() - self._flushed_at >= getattr(settings, 'METRICS_FLUSH_SECONDS', 10)
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed_at = time.monotonic()
+        if not pending:
+            return
+        known = cache.get(SERIES_INDEX_KEY) or []
+        known_set = {tuple(entry) for entry in known}
+        added = []
+        for series, value in pending.items():
+            encoded = _encode_series(series)
+            key = SERIES_VALUE_KEY.format(digest=hashlib.md5(encoded.encode('utf-8')).hexdigest())
+            if not cache.add(key, value, timeout=None):
+                try:
+                    cache.incr(key, value)
+                except ValueError:
+                    cache.set(key, value, timeout=None)
+            if (encoded, key) not in known_set:
+                added.append((encoded, key))
+        if added:
+            cache.set(SERIES_INDEX_KEY, known + added, timeout=None)
+
+    def snapshot(self):
+        """{(sample, labels): value} across all processes, after flushing this one."""
+        self.flush()
+        index = cache.get(SERIES_INDEX_KEY) or []
+        values = cache.get_many([key for _encoded, key in index])
+        return {
+            _decode_series(encoded): values[key]
+            for encoded, key in index
+            if key in values
+        }
+
+
+def _encode_series(series):
+    sample, labels = series
+    return json.dumps([sample, labels])
+
+
+def _decode_series(encoded):
+    sample, labels = json.loads(encoded)
+    return sample, tuple(tuple(pair) for pair in labels)
+
+
+registry = MetricsRegistry()
+
+
+# ----------------------------------------------------------------------
+# Prometheus text format
+# ----------------------------------------------------------------------
+
+def _family_of(sample):
+    for suffix in ('_bucket', '_sum', '_count'):
+        if sample.endswith(suffix) and sample[:-len(suffix)] in METRIC_FAMILIES:
+            return sample[:-len(suffix)]
+    return sample
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(sample, value):
+    if '_seconds' in sample and not sample.endswith(('_bucket', '_count')):
+        return repr(value / 1_000_000)
+    return str(value)
+
+
+def _cumulate_buckets(samples):
+    """Turn per-bucket histogram counts into Prometheus' cumulative `le` buckets."""
+    bounds = [str(bound) for bound in DURATION_BUCKETS] + ['+Inf']
+    per_view = {}
+    for (sample, labels), value in samples.items():
+        if sample.endswith('_bucket'):
+            label_map = dict(labels)
+            le = label_map.pop('le')
+            per_view.setdefault((sample, tuple(sorted(label_map.items()))), {})[le] = value
+    cumulative = {}
+    for (sample, labels), counts in per_view.items():
+        running = 0
+        for bound in bounds:
+            running += counts.get(bound, 0)
+            cumulative[(sample, labels + (('le', bound),))] = running
+    return cumulative
+
+
+def _sample_order(entry):
+    # Histogram buckets go in increasing `le` order, +Inf last
+    sample, labels, _value = entry
+    le = dict(labels).get('le')
+    return sample, tuple(pair for pair in labels if pair[0] != 'le'), float(le) if le is not None else 0.0
+
+
+def render_prometheus():
+    samples = registry.snapshot()
+    samples = {
+        **{key: value for key, value in samples.items() if not key[0].endswith('_bucket')},
+        **_cumulate_buckets(samples),
+    }
+    by_family = {}
+    for (sample, labels), value in samples.items():
+        by_family.setdefault(_family_of(sample), []).append((sample, labels, value))
+
+    lines = []
+    sample_rate = float(getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 0) or 0)
+    lines.append(f'# HELP {METRIC_PREFIX}instrumentation_sample_rate Share of requests that are instrumented.')
+    lines.append(f'# TYPE {METRIC_PREFIX}instrumentation_sample_rate gauge')
+    lines.append(f'{METRIC_PREFIX}instrumentation_sample_rate {sample_rate!r}')
+    for family in sorted(by_family):
+        metric_type, help_text = METRIC_FAMILIES.get(family, ('untyped', ''))
+        lines.append(f'# HELP {METRIC_PREFIX}{family} {help_text}')
+        lines.append(f'# TYPE {METRIC_PREFIX}{family} {metric_type}')
+        for sample, labels, value in sorted(by_family[family], key=_sample_order):
+            lines.append(f'{METRIC_PREFIX}{sample}{_format_labels(labels)} {_format_value(sample, value)}')
+    return '\n'.join(lines) + '\n'
+
+
+# ----------------------------------------------------------------------
+# Django integration
+# ----------------------------------------------------------------------
+
+def _view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    return (match.view_name or match.url_name or 'unnamed') if match else 'unresolved'
+
+
+class InstrumentationMiddleware:
+    """
+    Measures a sample of requests. Place it near the top of MIDDLEWARE so that
+    queries made by the other middlewares are included.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 0)
+        if not rate or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(metrics.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        registry.record(_view_label(request), response.status_code, metrics, time.perf_counter() - started)
+        return response
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Requires `Authorization: Bearer <METRICS_TOKEN>`
+    when a token is configured, otherwise a staff session.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        # Constant-time, so response timing does not reveal how much of a guess matched
+        provided = request.headers.get('Authorization', '').encode()
+        allowed = hmac.compare_digest(provided, f'Bearer {token}'.encode())
+    else:
+        allowed = getattr(request.user, 'is_staff', False)
+    if not allowed:
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # Must be at the top for CORS
+    'multivendor_platform.instrumentation.InstrumentationMiddleware',  # Sampled request metrics (/internal/metrics)
     'pages.middleware.RedirectMiddleware',  # Handle manual redirects from admin
     'multivendor_platform.robots_middleware.BackendRobotsNoIndexMiddleware',  # Block indexing on backend domains
     'django.middleware.security.SecurityMiddleware',
@@ -581,6 +582,77 @@ else:
         }
     }
 
+# Versioned response cache for anonymous catalog endpoints (products/cache.py)
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', '300'))
+
+# Sampled request instrumentation (multivendor_platform/instrumentation.py):
+# share of requests measured (0 disables), and the bearer token /internal/metrics
+# requires (without one, only staff sessions may read it)
+INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get('INSTRUMENTATION_SAMPLE_RATE', '0'))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_FLUSH_SECONDS = int(os.environ.get('METRICS_FLUSH_SECONDS', '10'))
+
+# Responsive image variants (products/image_variants.py): target widths in pixels,
+# worker threads, and whether uploads are processed in the background
+IMAGE_VARIANT_WIDTHS = tuple(
+    int(width) for width in os.environ.get('IMAGE_VARIANT_WIDTHS', '320,640,1024').split(',') if width.strip()
+)
+IMAGE_VARIANT_WORKERS = int(os.environ.get('IMAGE_VARIANT_WORKERS', '2'))
+IMAGE_VARIANTS_ASYNC = os.environ.get('IMAGE_VARIANTS_ASYNC', 'True') == 'True'
+
+# Background gallery uploads (products/image_uploads.py): where uploads are spooled
+# (empty uses the system temp directory), verification processes, background switch,
+# seconds after which a job still pending or processing counts as abandoned
+IMAGE_UPLOAD_SPOOL_DIR = os.environ.get('IMAGE_UPLOAD_SPOOL_DIR', '')
+IMAGE_UPLOAD_PROCESSES = int(os.environ.get('IMAGE_UPLOAD_PROCESSES', '2'))
+IMAGE_UPLOADS_ASYNC = os.environ.get('IMAGE_UPLOADS_ASYNC', 'True') == 'True'
+IMAGE_UPLOAD_STALE_AFTER = int(os.environ.get('IMAGE_UPLOAD_STALE_AFTER', '1800'))
+
+# Bulk product import (products/importing.py): rows per bulk write and checkpoint,
+# where admin uploads are spooled (empty uses the system temp directory), background switch
+PRODUCT_IMPORT_CHUNK_SIZE = int(os.environ.get('PRODUCT_IMPORT_CHUNK_SIZE', '1000'))
+PRODUCT_IMPORT_SPOOL_DIR = os.environ.get('PRODUCT_IMPORT_SPOOL_DIR', '')
+PRODUCT_IMPORTS_ASYNC = os.environ.get('PRODUCT_IMPORTS_ASYNC', 'True') == 'True'
+
+# Streaming catalog export (products/exporting.py): rows fetched per server-side cursor round trip
+PRODUCT_EXPORT_CHUNK_SIZE = int(os.environ.get('PRODUCT_EXPORT_CHUNK_SIZE', '2000'))
+
+# Pre-generated sitemaps (products/sitemap_files.py): URLs per shard file (at most
+# 50000), minimum seconds between refreshes triggered by /sitemap.xml, background switch
+SITEMAP_SHARD_SIZE = int(os.environ.get('SITEMAP_SHARD_SIZE', '50000'))
+SITEMAP_REFRESH_INTERVAL = int(os.environ.get('SITEMAP_REFRESH_INTERVAL', '300'))
+SITEMAPS_ASYNC = os.environ.get('SITEMAPS_ASYNC', 'True') == 'True'
+
+# Slug -> primary key resolution (products/slugs.py): per-process LRU size and
+# seconds a mapping stays in the shared cache
+SLUG_RESOLVER_MAX_ENTRIES = int(os.environ.get('SLUG_RESOLVER_MAX_ENTRIES', '10000'))
+SLUG_RESOLVER_TIMEOUT = int(os.environ.get('SLUG_RESOLVER_TIMEOUT', '86400'))
+
+# Label filters (products/label_index.py): products matched by a label filter above
+# which they are sent as one array/JSON parameter instead of an id__in list
+LABEL_INDEX_MAX_INLINE_IDS = int(os.environ.get('LABEL_INDEX_MAX_INLINE_IDS', '500'))
+
+# Related products (products/related.py, build_related_products): neighbours kept per
+# product, products sharing a feature above which it only rescores candidates, and
+# products computed and written per block
+RELATED_PRODUCTS_TOP_K = int(os.environ.get('RELATED_PRODUCTS_TOP_K', '12'))
+RELATED_PRODUCTS_MAX_POSTING = int(os.environ.get('RELATED_PRODUCTS_MAX_POSTING', '5000'))
+RELATED_PRODUCTS_BLOCK_SIZE = int(os.environ.get('RELATED_PRODUCTS_BLOCK_SIZE', '1000'))
+
+# Buffered product view counting (products/view_counts.py): seconds between a
+# process's flushes to ProductViewStat, rows per upsert statement, the days of the
+# per-day series on the seller dashboard, and where counts a process could not write
+# at exit are spooled for flush_product_views (required for spooling; must be a
+# volume shared with the container running that command, not a container's /tmp)
+PRODUCT_VIEW_FLUSH_INTERVAL = int(os.environ.get('PRODUCT_VIEW_FLUSH_INTERVAL', '60'))
+PRODUCT_VIEW_FLUSH_BATCH = int(os.environ.get('PRODUCT_VIEW_FLUSH_BATCH', '500'))
+PRODUCT_VIEW_SERIES_DAYS = int(os.environ.get('PRODUCT_VIEW_SERIES_DAYS', '30'))
+PRODUCT_VIEW_SPOOL_DIR = os.environ.get('PRODUCT_VIEW_SPOOL_DIR', '')
+
+# Full-text search backend for global_search (products/search.py):
+# 'postgres' (tsvector + GIN) or 'memory' (in-process BM25); empty picks by database vendor
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', '')
+
 # Zibal Payment Gateway Settings
 ZIBAL_MERCHANT = os.environ.get('ZIBAL_MERCHANT', 'zibal')  # Use 'zibal' for test mode
 ZIBAL_API_BASE = 'https://gateway.zibal.ir'
@@ -12,6 +12,8 @@ from io import BytesIO
 from django.core.files.uploadedfile import InMemoryUploadedFile
 import sys
 
+from products.image_variants import schedule as schedule_image_variants
+
 
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -96,6 +98,7 @@ def tinymce_image_upload(request):
         
         # Save file (either optimized or original)
         file_path = default_storage.save(unique_filename, file_to_save)
+        schedule_image_variants(file_path)
         
         # Get full URL
         if hasattr(settings, 'MEDIA_URL'):
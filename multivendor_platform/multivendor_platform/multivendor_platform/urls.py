@@ -6,7 +6,6 @@ from pathlib import Path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.contrib.sitemaps.views import sitemap
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import redirect
 from django.urls import include, path, re_path
@@ -14,6 +13,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.views.generic import View
 from django.views.static import serve as static_serve
+from multivendor_platform.instrumentation import metrics_view
 from multivendor_platform.tinymce_views import tinymce_image_upload
 from pages.views import short_link_redirect
 
@@ -26,7 +26,7 @@ from users.sitemaps import SupplierSitemap
 from . import admin_ordering  # noqa: F401
 
 # Import the new dashboard views
-from products.views import HomeView, VendorDashboardView, ProductCreateView
+from products.views import HomeView, VendorDashboardView, ProductCreateView, sitemap_index_view, sitemap_file_view
 
 # Define sitemaps dictionary
 sitemaps = {
@@ -265,11 +265,15 @@ urlpatterns = [
     # Health check endpoint
     path('health/', health_check, name='health'),
     
+    # Prometheus scrape endpoint for sampled request metrics
+    path('internal/metrics', metrics_view, name='internal-metrics'),
+    
     # Robots.txt - placed early to ensure it's matched before catch-all routes
     path('robots.txt', robots_txt, name='robots_txt'),
     
     # Sitemap
-    path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
+    path('sitemap.xml', sitemap_index_view, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
+    path('sitemaps/<str:file_name>', sitemap_file_view, name='sitemap-file'),
     
     # Favicon handler
     path('favicon.ico', favicon_view, name='favicon'),
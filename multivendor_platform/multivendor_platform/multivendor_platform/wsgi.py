@@ -14,3 +14,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'multivendor_platform.settings')
 
 application = get_wsgi_application()
+
+# Load the in-memory catalog indexes and media manifest off the request path
+from products.cache import warm_process_indexes
+
+warm_process_indexes()
+
+# Write buffered product views periodically and at exit (products/view_counts.py)
+from products.view_counts import start_flusher
+
+start_flusher()
@@ -23,6 +23,7 @@ class RedirectMiddleware:
         '/media/',
         '/robots.txt',
         '/sitemap.xml',
+        '/sitemaps/',
         '/health/',
         '/tinymce/',
         '/favicon.ico',
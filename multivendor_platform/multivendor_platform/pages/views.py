@@ -3,6 +3,7 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from products.conditional import conditional_response, make_etag, version_parts
 from .models import AboutPage, ContactPage, ShortLink, ShortLinkClick
 from .serializers import AboutPageSerializer, ContactPageSerializer
 
@@ -17,16 +18,23 @@ class AboutPageViewSet(viewsets.ReadOnlyModelViewSet):
         """
         Get the current About Us page.
         Returns the single AboutPage instance (only one should exist).
+        Revalidations with a matching ETag / Last-Modified get a 304.
         """
         try:
-            about_page = AboutPage.objects.first()
-            if not about_page:
+            versions = AboutPage.objects.values('pk', 'updated_at').first()
+            if not versions:
                 return Response(
                     {'detail': 'صفحه درباره ما هنوز ایجاد نشده است'},
                     status=status.HTTP_404_NOT_FOUND
                 )
-            serializer = self.get_serializer(about_page)
-            return Response(serializer.data)
+
+            def build():
+                serializer = self.get_serializer(AboutPage.objects.get(pk=versions['pk']))
+                return Response(serializer.data)
+
+            return conditional_response(
+                request, build, etag=make_etag(*version_parts(versions)), last_modified=versions['updated_at']
+            )
         except Exception as e:
             return Response(
                 {'detail': 'خطا در دریافت صفحه درباره ما'},
@@ -44,16 +52,23 @@ class ContactPageViewSet(viewsets.ReadOnlyModelViewSet):
         """
         Get the current Contact Us page.
         Returns the single ContactPage instance (only one should exist).
+        Revalidations with a matching ETag / Last-Modified get a 304.
         """
         try:
-            contact_page = ContactPage.objects.first()
-            if not contact_page:
+            versions = ContactPage.objects.values('pk', 'updated_at').first()
+            if not versions:
                 return Response(
                     {'detail': 'صفحه تماس با ما هنوز ایجاد نشده است'},
                     status=status.HTTP_404_NOT_FOUND
                 )
-            serializer = self.get_serializer(contact_page)
-            return Response(serializer.data)
+
+            def build():
+                serializer = self.get_serializer(ContactPage.objects.get(pk=versions['pk']))
+                return Response(serializer.data)
+
+            return conditional_response(
+                request, build, etag=make_etag(*version_parts(versions)), last_modified=versions['updated_at']
+            )
         except Exception as e:
             return Response(
                 {'detail': 'خطا در دریافت صفحه تماس با ما'},
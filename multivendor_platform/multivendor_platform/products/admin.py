@@ -12,6 +12,8 @@ from django.contrib import messages
 from django.utils import timezone
 from django.contrib.admin.widgets import FilteredSelectMultiple
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import PermissionDenied
 from django.db.models import Q, Case, When, Value, IntegerField
 from tinymce.widgets import TinyMCE
 from .models import (
@@ -20,6 +22,7 @@ from .models import (
     Subcategory,
     Product,
     ProductImage,
+    ProductImageUpload,
     ProductComment,
     ProductFeature,
     Label,
@@ -29,6 +32,13 @@ from .models import (
     ProductUploadRequest,
 )
 from .admin_filters import SubcategorySearchFilter, CategorySearchFilter
+from .admin_mixins import NormalizedSearchMixin
+from .cache import bump_generation, SCOPE_LABELS
+from .label_counts import recount_label_products
+from .image_uploads import MAX_IMAGES_PER_PRODUCT, enqueue as enqueue_image_upload, reserved_image_count
+from .importing import format_for, spool as spool_import, spooled_imports, submit as submit_import
+
+User = get_user_model()
 
 # Custom widget for multiple file uploads
 class MultipleFileInput(forms.ClearableFileInput):
@@ -125,12 +135,12 @@ class ProductAdminForm(forms.ModelForm):
         if not files:
             return []
             
-        # Check if adding these files would exceed the limit
+        # Check if adding these files would exceed the limit (queued uploads included)
         existing_count = 0
         if self.instance and self.instance.pk:
-            existing_count = self.instance.images.count()
+            existing_count = reserved_image_count(self.instance)
         
-        if existing_count + len(files) > 20:
+        if existing_count + len(files) > MAX_IMAGES_PER_PRODUCT:
             raise forms.ValidationError(f"Maximum 20 images allowed. You have {existing_count} existing images and trying to add {len(files)} more.")
         
         # Validate file types
@@ -144,28 +154,12 @@ class ProductAdminForm(forms.ModelForm):
         instance = super().save(commit=commit)
         
         if commit:
-            # Handle multiple images from form data
+            # Hand multiple images to the background upload job (products/image_uploads.py)
             multiple_images = self.cleaned_data.get('multiple_images', [])
             if multiple_images:
                 if not isinstance(multiple_images, list):
                     multiple_images = [multiple_images]
-                    
-                existing_count = instance.images.count()
-                has_primary = instance.images.filter(is_primary=True).exists()
-                
-                for i, file in enumerate(multiple_images):
-                    if file:  # Make sure file exists
-                        # Only set as primary if no existing images and this is the first new image
-                        is_primary = (existing_count == 0 and i == 0 and not has_primary)
-                        
-                        # Create ProductImage instance
-                        product_image = ProductImage(
-                            product=instance,
-                            image=file,
-                            is_primary=is_primary,
-                            sort_order=existing_count + i
-                        )
-                        product_image.save()
+                enqueue_image_upload(instance, multiple_images)
         
         return instance
 
@@ -220,11 +214,14 @@ class LabelGroupAdmin(admin.ModelAdmin):
     @admin.action(description='Activate selected label groups')
     def activate_groups(self, request, queryset):
         updated = queryset.update(is_active=True)
+        # update() sends no post_save, which would drop the cached label group lists
+        bump_generation(SCOPE_LABELS)
         self.message_user(request, f'{updated} group(s) activated.')
 
     @admin.action(description='Deactivate selected label groups')
     def deactivate_groups(self, request, queryset):
         updated = queryset.update(is_active=False)
+        bump_generation(SCOPE_LABELS)
         self.message_user(request, f'{updated} group(s) deactivated.')
 
 class LabelAdminForm(forms.ModelForm):
@@ -311,18 +308,21 @@ class LabelAdmin(admin.ModelAdmin):
 
     @admin.action(description='Refresh product counts for selected labels')
     def refresh_counts(self, request, queryset):
-        for label in queryset:
-            label.update_product_count()
-        self.message_user(request, f'Refreshed counts for {queryset.count()} label(s).')
+        corrected = recount_label_products(queryset)
+        self.message_user(request, f'Refreshed counts for {queryset.count()} label(s); {corrected} corrected.')
 
     @admin.action(description='Mark selected labels as SEO pages')
     def mark_as_seo(self, request, queryset):
-        updated = queryset.update(is_seo_page=True)
+        # update() sends no post_save: stamp updated_at for the SEO content ETag and
+        # drop the cached label responses here
+        updated = queryset.update(is_seo_page=True, updated_at=timezone.now())
+        bump_generation(SCOPE_LABELS)
         self.message_user(request, f'{updated} label(s) marked as SEO pages.')
 
     @admin.action(description='Unmark selected labels as SEO pages')
     def unmark_seo(self, request, queryset):
-        updated = queryset.update(is_seo_page=False)
+        updated = queryset.update(is_seo_page=False, updated_at=timezone.now())
+        bump_generation(SCOPE_LABELS)
         self.message_user(request, f'{updated} label(s) removed from SEO pages.')
 
 class LabelComboSeoPageForm(forms.ModelForm):
@@ -739,11 +739,12 @@ class SubcategoryAdminForm(forms.ModelForm):
         fields = '__all__'
 
 @admin.register(Subcategory)
-class SubcategoryAdmin(admin.ModelAdmin):
+class SubcategoryAdmin(NormalizedSearchMixin, admin.ModelAdmin):
     form = SubcategoryAdminForm
     list_display = ['name', 'slug', 'get_departments', 'get_categories', 'is_active', 'sort_order', 'created_at']
     list_filter = ['is_active', ('categories', CategorySearchFilter), 'created_at']
     search_fields = ['name', 'slug', 'description']
+    normalized_search_fields = ['search_name']
     search_help_text = 'Search by subcategory name, slug, or description only'
     prepopulated_fields = {'slug': ('name',)}
     filter_horizontal = ['categories']
@@ -840,6 +841,25 @@ class ProductCommentInline(admin.TabularInline):
     readonly_fields = ['author', 'created_at']
     can_delete = True
 
+class ProductImageUploadInline(admin.TabularInline):
+    """Read-only progress of background image uploads (products/image_uploads.py)"""
+    model = ProductImageUpload
+    extra = 0
+    max_num = 0
+    can_delete = False
+    fields = ['status', 'progress', 'rejected', 'error_summary', 'created_by', 'created_at', 'finished_at']
+    readonly_fields = fields
+    verbose_name = 'Image upload'
+    verbose_name_plural = 'Image uploads'
+
+    def progress(self, obj):
+        return f'{obj.processed + obj.rejected}/{obj.total}'
+    progress.short_description = 'Handled'
+
+    def error_summary(self, obj):
+        return '; '.join(f"{error['name']}: {error['error']}" for error in obj.errors) or '-'
+    error_summary.short_description = 'Errors'
+
 class ProductFeatureInline(admin.TabularInline):
     """Inline for managing product key features"""
     model = ProductFeature
@@ -869,9 +889,26 @@ class ProductFeatureInline(admin.TabularInline):
             field.widget.attrs['placeholder'] = 'مثال: 100 کیلوگرم، 50x30x20 سانتی‌متر، 5 اسب بخار'
         return field
 
+class ProductImportForm(forms.Form):
+    """Catalog file for the bulk importer (see products/importing.py)"""
+    file = forms.FileField(help_text='CSV with a header row, or JSONL (one product object per line)')
+    vendor = forms.ModelChoiceField(
+        queryset=User.objects.order_by('username'),
+        required=False,
+        help_text='Vendor of new products whose row has no vendor column',
+    )
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if not upload.name.lower().endswith(('.csv', '.jsonl', '.ndjson')):
+            raise forms.ValidationError('Upload a .csv or .jsonl file.')
+        return upload
+
+
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(NormalizedSearchMixin, admin.ModelAdmin):
     form = ProductAdminForm
+    change_list_template = 'admin/products/product/change_list.html'
     list_display = ['name', 'slug', 'vendor', 'supplier', 'primary_category', 'get_subcategories', 'get_labels', 'price', 'stock', 'image_count', 'comment_count', 'approval_status_badge', 'is_active', 'created_at']
     list_filter = ['approval_status', 'is_active', 'primary_category', ('subcategories', SubcategorySearchFilter), 'labels', 'availability_status', 'condition', 'origin', 'created_at', 'updated_at']
     search_fields = [
@@ -882,11 +919,12 @@ class ProductAdmin(admin.ModelAdmin):
         'primary_category__name', 'primary_category__slug',
         'labels__name', 'labels__slug'
     ]
+    normalized_search_fields = ['search_name', 'search_text', 'subcategories__search_name']
     search_help_text = 'Search by product name, slug, description, vendor, supplier, subcategory, category, or label'
     prepopulated_fields = {'slug': ('name',)}
     filter_horizontal = ['subcategories', 'labels']
     autocomplete_fields = ['subcategories', 'labels', 'primary_category', 'supplier']
-    inlines = [ProductImageInline, ProductFeatureInline, ProductCommentInline]
+    inlines = [ProductImageInline, ProductImageUploadInline, ProductFeatureInline, ProductCommentInline]
     actions = ['make_active', 'make_inactive', 'approve_products', 'reject_products', 'delete_selected']  # Enable bulk actions with delete
 
     def get_queryset(self, request):
@@ -966,13 +1004,13 @@ class ProductAdmin(admin.ModelAdmin):
         try:
             count = obj.images.count()
             if count > 0:
-                primary_img = obj.primary_image
-                if primary_img:
+                primary_url = obj.primary_image_url
+                if primary_url:
                     try:
                         return format_html(
                             '<span style="color: green;">{}/20</span> <br>'
                             '<img src="{}" style="max-width: 50px; max-height: 50px; border-radius: 4px;" />',
-                            count, primary_img.url
+                            count, primary_url
                         )
                     except:
                         # If image URL fails, just show count
@@ -986,7 +1024,7 @@ class ProductAdmin(admin.ModelAdmin):
         """Count comments with error handling"""
         try:
             count = obj.comments.count()
-            approved = obj.comments.filter(is_approved=True).count()
+            approved = obj.approved_comment_count
             return format_html(
                 '<span style="color: {};">{} ({} approved)</span>',
                 'green' if approved > 0 else 'gray',
@@ -1034,13 +1072,13 @@ class ProductAdmin(admin.ModelAdmin):
     # Bulk actions
     def make_active(self, request, queryset):
         """Mark selected products as active"""
-        updated = queryset.update(is_active=True)
+        updated = Product.set_active(queryset, True)
         self.message_user(request, f'{updated} product(s) marked as active.')
     make_active.short_description = "✅ Mark as Active"
     
     def make_inactive(self, request, queryset):
         """Mark selected products as inactive"""
-        updated = queryset.update(is_active=False)
+        updated = Product.set_active(queryset, False)
         self.message_user(request, f'{updated} product(s) marked as inactive.')
     make_inactive.short_description = "❌ Mark as Inactive"
     
@@ -1065,6 +1103,36 @@ class ProductAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         """Explicitly allow delete permission"""
         return True
+
+    def get_urls(self):
+        """Add the bulk import page"""
+        urls = super().get_urls()
+        custom_urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='products_product_import'),
+        ]
+        return custom_urls + urls
+
+    def import_view(self, request):
+        """Upload a CSV/JSONL catalog; it is imported in the background with checkpoints"""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = ProductImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            path_on_disk = spool_import(form.cleaned_data['file'])
+            submit_import(path_on_disk, vendor=form.cleaned_data['vendor'])
+            self.message_user(
+                request,
+                f'{form.cleaned_data["file"].name} queued for import ({format_for(path_on_disk).upper()}).',
+            )
+            return redirect('admin:products_product_import')
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Import products',
+            'form': form,
+            'imports': spooled_imports()[:20],
+            'opts': self.model._meta,
+        }
+        return render(request, 'admin/products/product_import.html', context)
     
     def save_model(self, request, obj, form, change):
         """Override save_model to handle multiple images and is_active/approval_status"""
@@ -1083,35 +1151,18 @@ class ProductAdmin(admin.ModelAdmin):
                     f'این محصول {feature_count} ویژگی دارد. لطفاً تعداد را به ۱۰ یا کمتر کاهش دهید.'
                 )
         
-        # Handle multiple images upload
+        # Hand multiple images to the background upload job; progress shows in the
+        # "Image uploads" section of the product
         if hasattr(request, 'FILES'):
             files = request.FILES.getlist('multiple_images')
             if files:
-                existing_count = obj.images.count()
-                has_primary = obj.images.filter(is_primary=True).exists()
-                
-                for i, file in enumerate(files):
-                    if file and file.size > 0:  # Make sure file exists and has content
-                        try:
-                            # Only set as primary if no existing images and this is the first new image
-                            is_primary = (existing_count == 0 and i == 0 and not has_primary)
-                            
-                            # Create ProductImage instance
-                            product_image = ProductImage(
-                                product=obj,
-                                image=file,
-                                is_primary=is_primary,
-                                sort_order=existing_count + i
-                            )
-                            product_image.save()
-                        except (OSError, IOError, PermissionError) as e:
-                            error_msg = f"خطا در ذخیره تصویر: {str(e)}. لطفاً از وجود پوشه media و دسترسی‌های نوشتن اطمینان حاصل کنید."
-                            messages.error(request, error_msg)
-                            raise
-                        except Exception as e:
-                            error_msg = f"خطا در ذخیره تصویر: {str(e)}"
-                            messages.error(request, error_msg)
-                            raise
+                try:
+                    job = enqueue_image_upload(obj, files, user=request.user)
+                except OSError as e:
+                    messages.error(request, f"خطا در ذخیره تصویر: {str(e)}")
+                    raise
+                if job is not None:
+                    messages.info(request, f'{job.total} image(s) queued for processing.')
     
     class Media:
         js = ('admin/js/fix_action_button.js', 'admin/js/price_formatter.js', 'admin/js/tinymce_image_picker.js',)
@@ -1146,16 +1197,32 @@ class ProductCommentAdmin(admin.ModelAdmin):
     actions = ['approve_comments', 'disapprove_comments']
     
     def approve_comments(self, request, queryset):
-        queryset.update(is_approved=True)
-        self.message_user(request, f'{queryset.count()} comments approved.')
+        approved = ProductComment.set_approval(queryset, True)
+        self.message_user(request, f'{approved} comments approved.')
     approve_comments.short_description = 'Approve selected comments'
     
     def disapprove_comments(self, request, queryset):
-        queryset.update(is_approved=False)
-        self.message_user(request, f'{queryset.count()} comments disapproved.')
+        disapproved = ProductComment.set_approval(queryset, False)
+        self.message_user(request, f'{disapproved} comments disapproved.')
     disapprove_comments.short_description = 'Disapprove selected comments'
 
 
+@admin.register(ProductImageUpload)
+class ProductImageUploadAdmin(admin.ModelAdmin):
+    list_display = ['id', 'product', 'status', 'progress', 'rejected', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['product__name']
+    readonly_fields = ['product', 'created_by', 'status', 'total', 'processed', 'rejected', 'errors', 'created_at', 'finished_at']
+    exclude = ['files']
+
+    def progress(self, obj):
+        return f'{obj.processed + obj.rejected}/{obj.total}'
+    progress.short_description = 'Handled'
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(CategoryRequest)
 class CategoryRequestAdmin(admin.ModelAdmin):
     list_display = ['id', 'requested_name', 'supplier', 'product_link', 'status_display', 'reviewed_by', 'created_at', 'reviewed_at']
@@ -0,0 +1,25 @@
+# products/admin_mixins.py
+from django.db.models import Q
+
+from .normalization import analyze
+
+
+class NormalizedSearchMixin:
+    """
+    ModelAdmin mixin that also matches the analyzed search term against normalized
+    shadow columns, so ي/ی, ك/ک, half-space and digit variants find the same rows.
+    List `normalized_search_fields` next to the usual `search_fields`.
+    """
+    normalized_search_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        analyzed = analyze(search_term)
+        if not analyzed or not self.normalized_search_fields:
+            return results, may_have_duplicates
+        condition = Q()
+        for field in self.normalized_search_fields:
+            condition |= Q(**{f'{field}__icontains': analyzed})
+        # Fields across a to-many relation can match one row several times
+        spans_relations = any('__' in field for field in self.normalized_search_fields)
+        return results | queryset.filter(condition), may_have_duplicates or spans_relations
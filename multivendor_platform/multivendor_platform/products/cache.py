@@ -0,0 +1,277 @@
+# products/cache.py
+"""
+Versioned response cache for anonymous catalog endpoints.
+
+Each cached response is keyed on the view, the normalized query string and the
+current generation of every data scope the view depends on. Signal handlers in
+products/signals.py bump a scope's generation when its data changes, so old
+entries are simply never read again and expire on their own TTL.
+Works with any Django cache backend (LocMemCache in development, Redis in production).
+
+The same generation counters keep per-process in-memory indexes (label index,
+in-memory search, typeahead) coherent across workers; see SharedVersionedIndex.
+"""
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.response import Response
+
+from multivendor_platform.instrumentation import count
+
+logger = logging.getLogger(__name__)
+
+# Data scopes a cached response can depend on
+SCOPE_PRODUCTS = 'products'
+SCOPE_LABELS = 'labels'
+SCOPE_TAXONOMY = 'taxonomy'
+SCOPE_VENDORS = 'vendors'
+
+GENERATION_KEY = 'respcache:gen:{scope}'
+STATS_KEY = 'respcache:stats:{view}:{outcome}'
+STATS_INDEX_KEY = 'respcache:stats:views'
+
+
+def _new_generation():
+    # Time based so a generation lost to cache eviction never reuses an old value
+    return time.time_ns()
+
+
+def get_generations(scopes):
+    """Return {scope: generation}, initializing missing counters."""
+    keys = {scope: GENERATION_KEY.format(scope=scope) for scope in scopes}
+    found = cache.get_many(list(keys.values()))
+    generations = {}
+    for scope, key in keys.items():
+        value = found.get(key)
+        if value is None:
+            cache.add(key, _new_generation(), timeout=None)
+            value = cache.get(key)
+        generations[scope] = value
+    return generations
+
+
+def bump_generation(*scopes):
+    """Invalidate every cached response that depends on any of `scopes`."""
+    for scope in scopes:
+        key = GENERATION_KEY.format(scope=scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_generation(), timeout=None)
+
+
+def _count(view_key, outcome):
+    key = STATS_KEY.format(view=view_key, outcome=outcome)
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+    views = cache.get(STATS_INDEX_KEY) or []
+    if view_key not in views:
+        cache.set(STATS_INDEX_KEY, views + [view_key], timeout=None)
+
+
+def get_cache_stats():
+    """Hit/miss counters per cached view."""
+    stats = {}
+    for view_key in cache.get(STATS_INDEX_KEY) or []:
+        hits = cache.get(STATS_KEY.format(view=view_key, outcome='hit')) or 0
+        misses = cache.get(STATS_KEY.format(view=view_key, outcome='miss')) or 0
+        stats[view_key] = {'hits': hits, 'misses': misses}
+    return stats
+
+
+def normalize_query_params(query_params):
+    """Stable representation of a QueryDict: sorted keys and values, blanks dropped."""
+    items = []
+    for key in sorted(query_params.keys()):
+        values = sorted(value for value in query_params.getlist(key) if value != '')
+        if values:
+            items.append((key, values))
+    return items
+
+
+def build_cache_key(view_key, request, generations):
+    params = normalize_query_params(request.query_params)
+    generation_part = ','.join(f'{scope}={generations[scope]}' for scope in sorted(generations))
+    raw = f'{request.get_host()}|{request.path}|{params}|{generation_part}'
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'respcache:{view_key}:{digest}'
+
+
+class AnonymousResponseCacheMixin:
+    """
+    ViewSet mixin that caches anonymous GET responses for `response_cache_actions`.
+    Set `response_cache_scopes` to the data scopes the payload is built from.
+    """
+    response_cache_scopes = ()
+    response_cache_actions = ('list', 'retrieve')
+
+    def _response_cache_key(self, request):
+        if request.method != 'GET' or request.user.is_authenticated:
+            return None
+        if self.action not in self.response_cache_actions:
+            return None
+        generations = get_generations(self.response_cache_scopes)
+        return build_cache_key(self._response_cache_view_key(), request, generations)
+
+    def _response_cache_view_key(self):
+        return f'{self.basename}-{self.action}'
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        cache_key = self._response_cache_key(request)
+        if cache_key is None:
+            return handler(request, *args, **kwargs)
+
+        view_key = self._response_cache_view_key()
+        cached = cache.get(cache_key)
+        if cached is not None:
+            _count(view_key, 'hit')
+            count('response_cache_hit')
+            response = Response(cached)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _count(view_key, 'miss')
+        count('response_cache_miss')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+            cache.set(cache_key, response.data, timeout=timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(super().retrieve, request, *args, **kwargs)
+
+
+class SharedVersionedIndex:
+    """
+    Base for per-process in-memory indexes kept coherent across workers through the
+    generation counter of `scope`. A process rebuilds when the shared generation
+    moves or its copy is older than `max_age_seconds`; local changes are applied in
+    place and published by bumping the generation (see `_apply`). Subclasses
+    implement `_rebuild()`, which builds their data from the database and swaps it
+    in with plain attribute assignments (lookups do not take the lock).
+
+    With `background`, a stale copy keeps answering lookups while a daemon thread
+    rebuilds it, so a write in one worker does not put a full rebuild on the next
+    request of every other worker. Only the first load of a process and an explicit
+    `invalidate()` in this process rebuild synchronously; `warm()` starts the first
+    load early.
+    """
+    scope = None
+    max_age_seconds = 600
+    background = False
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None
+        self._loaded_at = 0.0
+        self._refreshing = False
+        self._refreshed = threading.Event()
+
+    def _rebuild(self):
+        raise NotImplementedError
+
+    def _shared_version(self):
+        return get_generations([self.scope])[self.scope]
+
+    def _is_current(self, version):
+        return version == self._version and time.monotonic() - self._loaded_at < self.max_age_seconds
+
+    def ensure_loaded(self):
+        version = self._shared_version()
+        if self._is_current(version):
+            return
+        if self.background:
+            if self._version is not None:
+                self._start_refresh(version)
+                return
+            if self._refreshing:
+                # A warm-up load is running; wait for it rather than loading twice
+                self._refreshed.wait()
+                if self._version is not None:
+                    return
+        with self._lock:
+            if not self._is_current(version):
+                self._rebuild()
+                self._version = version
+                self._loaded_at = time.monotonic()
+
+    def warm(self):
+        """Start loading on a background thread if this process has no copy yet."""
+        if self._version is None:
+            self._start_refresh(self._shared_version())
+
+    def _start_refresh(self, version):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            self._refreshed.clear()
+        threading.Thread(
+            target=self._refresh, args=(version,), name=f'{self.scope}-refresh', daemon=True
+        ).start()
+
+    def _refresh(self, version):
+        try:
+            self._rebuild()
+        except Exception:
+            logger.exception('Rebuilding the %s index failed; keeping the previous copy', self.scope)
+            if self._version is None:
+                # Nothing to serve yet: the next lookup loads synchronously
+                version = None
+        finally:
+            # A failed refresh of an existing copy is retried on the normal schedule; a
+            # copy built from an older generation than the shared one is refreshed again
+            with self._lock:
+                self._version, self._loaded_at = version, time.monotonic()
+                self._refreshing = False
+            self._refreshed.set()
+            connections.close_all()
+
+    def invalidate(self):
+        """Force a rebuild in every process on next use."""
+        with self._lock:
+            self._version = None
+        bump_generation(self.scope)
+
+    def _apply(self, mutate):
+        """
+        Apply a local change and publish a new shared version. When this process was
+        in sync beforehand it adopts the new version instead of rebuilding.
+        """
+        with self._lock:
+            in_sync = self._version is not None and self._version == self._shared_version()
+            if in_sync:
+                mutate()
+            bump_generation(self.scope)
+            if in_sync:
+                self._version = self._shared_version()
+
+
+def warm_process_indexes():
+    """
+    Start loading the per-process indexes on background threads. Called by the
+    ASGI/WSGI entry points, so the first requests of a server process do not pay
+    for the media scan and index builds.
+    """
+    from .label_index import label_index
+    from .media_manifest import media_manifest
+    from .search import get_search_backend
+    from .suggest import suggest_index
+
+    indexes = [media_manifest, label_index, suggest_index, get_search_backend()]
+    for index in indexes:
+        if isinstance(index, SharedVersionedIndex):
+            index.warm()
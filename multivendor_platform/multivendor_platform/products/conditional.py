@@ -0,0 +1,81 @@
+# products/conditional.py
+"""
+HTTP conditional GET for detail endpoints.
+
+The SSR frontend and browsers re-fetch detail payloads (product, blog post,
+supplier, label SEO content, about/contact pages) far more often than they change.
+These views first read a few version columns (the object's updated_at plus row
+counts and latest updated_at of the relations it renders, see
+`annotate_relation_versions`) and the cache generations of shared data it embeds,
+then hand them to `conditional_response`:
+
+- the ETag is a digest of all of them, Last-Modified the newest timestamp (it
+  cannot reflect generations, so the ETag is the authoritative validator; Django
+  ignores If-Modified-Since when If-None-Match is sent);
+- If-None-Match / If-Modified-Since that still match get a 304 before the full
+  object is loaded or serialized;
+- otherwise `build()` renders the response and the validators are attached, with
+  Cache-Control: no-cache so clients revalidate on every use.
+"""
+import hashlib
+
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .cache import get_generations
+
+
+def make_etag(*parts):
+    """Quoted ETag for a sequence of version values."""
+    return quote_etag(hashlib.md5(repr(parts).encode('utf-8')).hexdigest())
+
+
+def latest(*values):
+    """The newest of `values`, ignoring None (relations without rows)."""
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def annotate_relation_versions(queryset, relations):
+    """
+    Annotate `<name>_count` and `<name>_updated` for each `name: (model, fk field,
+    version field[, filter kwargs])` of `relations`, one correlated subquery each:
+    the row count and the greatest version field. Counts catch deletions, which the
+    latest updated_at alone would miss. For through tables without timestamps use
+    'pk' as the version field: every added row has a new greatest pk.
+    """
+    annotations = {}
+    for name, (model, field, version_field, *conditions) in relations.items():
+        related = model.objects.filter(**{field: OuterRef('pk')}, **(conditions[0] if conditions else {}))
+        related = related.order_by().values(field)
+        annotations[f'{name}_count'] = Subquery(
+            related.annotate(total=Count('pk')).values('total'), output_field=IntegerField()
+        )
+        annotations[f'{name}_updated'] = Subquery(related.annotate(newest=Max(version_field)).values('newest'))
+    return queryset.annotate(**annotations)
+
+
+def version_parts(row, scopes=()):
+    """Validator parts of a values() row plus the generations of `scopes`."""
+    generations = get_generations(scopes) if scopes else {}
+    return tuple(sorted(row.items())) + tuple(sorted(generations.items()))
+
+
+def conditional_response(request, build, etag=None, last_modified=None):
+    """
+    304 if the request's validators match `etag` / `last_modified` (an aware
+    datetime), else the response of `build()` with both validators attached.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = build()
+        if response.status_code != 200:
+            return response
+    if etag:
+        response.headers.setdefault('ETag', etag)
+    if timestamp is not None and not response.has_header('Last-Modified'):
+        response['Last-Modified'] = http_date(timestamp)
+    patch_cache_control(response, no_cache=True)
+    return response
@@ -0,0 +1,181 @@
+# products/exporting.py
+"""
+Streaming catalog export as CSV or JSONL.
+
+Exports read a values() projection through a server-side cursor
+(QuerySet.iterator(chunk_size=PRODUCT_EXPORT_CHUNK_SIZE)) and hand the rendered rows
+to a StreamingHttpResponse. No model instances or serializer output are built, so
+memory stays constant however many products are exported. Subcategory and label
+slugs are fetched for each chunk of products, one query per through table.
+
+Columns follow the importer's row format (products/importing.py), so an export can
+be edited and imported back. CSV text cells that a spreadsheet would evaluate as a
+formula (vendor-entered names, descriptions, ...) are prefixed with `'`; the importer
+strips it again. With `compress`, the stream is gzipped on the fly.
+"""
+import csv
+import json
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from .importing import CSV_ESCAPE, CSV_FORMULA_PREFIXES, FORMAT_CSV, FORMAT_JSONL, FORMATS, LIST_SEPARATOR
+
+# Export column -> values() lookup
+EXPORT_COLUMNS = {
+    'id': 'id',
+    'slug': 'slug',
+    'name': 'name',
+    'description': 'description',
+    'price': 'price',
+    'stock': 'stock',
+    'vendor': 'vendor__username',
+    'primary_category': 'primary_category__slug',
+    'approval_status': 'approval_status',
+    'is_active': 'is_active',
+    'is_marketplace_hidden': 'is_marketplace_hidden',
+    'marketplace_hide_reason': 'marketplace_hide_reason',
+    'availability_status': 'availability_status',
+    'condition': 'condition',
+    'origin': 'origin',
+    'lead_time_days': 'lead_time_days',
+    'image_alt_text': 'image_alt_text',
+    'meta_title': 'meta_title',
+    'meta_description': 'meta_description',
+    'canonical_url': 'canonical_url',
+    'schema_markup': 'schema_markup',
+    'primary_image_url': 'primary_image_url',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+RELATION_COLUMNS = {'subcategories': 'subcategory__slug', 'labels': 'label__slug'}
+COLUMNS = [*EXPORT_COLUMNS, *RELATION_COLUMNS]
+
+CONTENT_TYPES = {FORMAT_CSV: 'text/csv; charset=utf-8', FORMAT_JSONL: 'application/x-ndjson; charset=utf-8'}
+
+# Rendered rows are joined into pieces of about this size before they are sent
+BUFFER_SIZE = 64 * 1024
+
+
+def export_options(query_params):
+    """(format, compress) from ?output=csv|jsonl and ?compress=gzip; ValueError if invalid."""
+    fmt = (query_params.get('output') or FORMAT_CSV).lower()
+    if fmt not in FORMATS:
+        raise ValueError(f'output must be one of: {", ".join(FORMATS)}')
+    compress = (query_params.get('compress') or '').lower()
+    if compress not in ('', 'gzip', '1', 'true'):
+        raise ValueError('compress must be gzip')
+    return fmt, bool(compress)
+
+
+def _attach_relations(batch):
+    from .models import Product
+
+    product_ids = [row['id'] for row in batch]
+    related = {}
+    for column, lookup in RELATION_COLUMNS.items():
+        through = getattr(Product, column).through
+        slugs = {}
+        rows = through.objects.filter(product_id__in=product_ids).order_by('pk').values_list('product_id', lookup)
+        for product_id, slug in rows:
+            slugs.setdefault(product_id, []).append(slug)
+        related[column] = slugs
+    for row in batch:
+        for column in RELATION_COLUMNS:
+            row[column] = related[column].get(row['id'], [])
+    return batch
+
+
+def iter_rows(queryset, chunk_size=None):
+    """Export rows ({column: value}) of `queryset`, read through a server-side cursor."""
+    chunk_size = chunk_size or getattr(settings, 'PRODUCT_EXPORT_CHUNK_SIZE', 2000)
+    rename = {lookup: column for column, lookup in EXPORT_COLUMNS.items()}
+    batch = []
+    for values in queryset.order_by('pk').values(*EXPORT_COLUMNS.values()).iterator(chunk_size=chunk_size):
+        batch.append({rename[lookup]: value for lookup, value in values.items()})
+        if len(batch) >= chunk_size:
+            yield from _attach_relations(batch)
+            batch = []
+    if batch:
+        yield from _attach_relations(batch)
+
+
+class _Echo:
+    """File-like object for csv.writer that returns the line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def escape_csv_cell(value):
+    """Prefix text a spreadsheet would run as a formula (see importing.unescape_csv_cell)."""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES + (CSV_ESCAPE,)):
+        return CSV_ESCAPE + value
+    return value
+
+
+def _csv_lines(rows):
+    writer = csv.writer(_Echo())
+    # BOM: spreadsheet applications otherwise misread the Persian text as another encoding
+    yield '\ufeff' + writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow([
+            escape_csv_cell(
+                LIST_SEPARATOR.join(value) if isinstance(value, list)
+                else '' if value is None
+                else value.isoformat() if hasattr(value, 'isoformat')
+                else value
+            )
+            for value in (row[column] for column in COLUMNS)
+        ])
+
+
+def _jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False, cls=DjangoJSONEncoder) + '\n'
+
+
+def _buffered(lines):
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def gzip_stream(chunks):
+    """Gzip a stream of bytes chunks on the fly."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(queryset, fmt, compress=False, chunk_size=None):
+    """Bytes chunks of the export of `queryset`."""
+    rows = iter_rows(queryset, chunk_size)
+    lines = _csv_lines(rows) if fmt == FORMAT_CSV else _jsonl_lines(rows)
+    chunks = _buffered(lines)
+    return gzip_stream(chunks) if compress else chunks
+
+
+def export_response(queryset, fmt, compress=False, filename='products'):
+    """StreamingHttpResponse downloading the export of `queryset`."""
+    filename = f'{filename}.{fmt}'
+    content_type = CONTENT_TYPES[fmt]
+    if compress:
+        # A .gz download rather than Content-Encoding, so clients keep the file compressed
+        filename += '.gz'
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(export_stream(queryset, fmt, compress), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'no-store'
+    return response
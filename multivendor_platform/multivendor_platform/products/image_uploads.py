@@ -0,0 +1,273 @@
+# products/image_uploads.py
+"""
+Background processing of multi-image gallery uploads.
+
+The admin and the product API used to save every uploaded image inside the POST,
+one ProductImage.save (and its primary-flag UPDATE) per file, which timed out for
+large batches. `enqueue()` now only streams the uploads to a spool directory and
+records a ProductImageUpload job; after commit the job runs on a background thread:
+
+1. the spooled files are decoded and verified in a process pool
+   (IMAGE_UPLOAD_PROCESSES; 1 verifies in the job's own thread);
+2. valid files are copied to storage and their ProductImage rows bulk-inserted;
+3. the primary flag is set once, on the first new image if the product has none,
+   and the denormalized primary image columns are refreshed.
+
+The job's processed/rejected counters are updated as files are handled, so the
+admin shows progress. Jobs live in the process that queued them: one still pending
+or processing IMAGE_UPLOAD_STALE_AFTER seconds after it was queued was abandoned by
+a restart. It stops counting against the image limit, and `recover_stale_jobs()`
+(the `recover_image_uploads` command, run from cron) re-queues it while its spooled
+files remain and fails it otherwise. This module keeps Django model imports inside functions:
+worker processes import it to run `verify_image` without a configured Django.
+"""
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+MAX_IMAGES_PER_PRODUCT = 20
+
+
+def spool_root():
+    return getattr(settings, 'IMAGE_UPLOAD_SPOOL_DIR', '') or os.path.join(tempfile.gettempdir(), 'product-image-spool')
+
+
+def verify_image(path):
+    """Fully decode the image at `path`; returns (True, '') or (False, reason)."""
+    from PIL import Image
+
+    try:
+        with Image.open(path) as image:
+            image.verify()
+        # verify() leaves the image unusable and misses truncated pixel data
+        with Image.open(path) as image:
+            image.load()
+    except Exception as exc:
+        return False, str(exc) or exc.__class__.__name__
+    return True, ''
+
+
+def stale_cutoff():
+    """Jobs still pending or processing that were queued before this were abandoned."""
+    from django.utils import timezone
+
+    return timezone.now() - timedelta(seconds=getattr(settings, 'IMAGE_UPLOAD_STALE_AFTER', 1800))
+
+
+def reserved_image_count(product):
+    """Gallery images plus those still queued, for the per-product limit."""
+    from .models import ProductImageUpload
+
+    queued = product.image_uploads.filter(
+        status__in=(ProductImageUpload.STATUS_PENDING, ProductImageUpload.STATUS_PROCESSING),
+        queued_at__gte=stale_cutoff(),
+    ).values_list('total', 'rejected')
+    # Rows are inserted when a job finishes, so every file not rejected is still pending
+    return product.images.count() + sum(total - rejected for total, rejected in queued)
+
+
+# ----------------------------------------------------------------------
+# Queueing
+# ----------------------------------------------------------------------
+
+def enqueue(product, files, user=None):
+    """
+    Spool `files` (uploaded files) and queue them for `product`. Returns the
+    ProductImageUpload job, or None when there is nothing to upload.
+    """
+    from .models import ProductImageUpload
+
+    files = [upload for upload in files if upload and upload.size]
+    if not files:
+        return None
+    directory = os.path.join(spool_root(), uuid.uuid4().hex)
+    os.makedirs(directory, exist_ok=True)
+    spooled = []
+    for index, upload in enumerate(files):
+        path = os.path.join(directory, f'{index:02d}{os.path.splitext(upload.name)[1].lower()}')
+        with open(path, 'wb') as destination:
+            for chunk in upload.chunks():
+                destination.write(chunk)
+        spooled.append({'path': path, 'name': os.path.basename(upload.name)})
+
+    job = ProductImageUpload.objects.create(
+        product=product,
+        created_by=user if getattr(user, 'is_authenticated', False) else None,
+        total=len(spooled),
+        files=spooled,
+    )
+    transaction.on_commit(lambda: submit(job.pk))
+    return job
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-uploads')
+        return _executor
+
+
+def submit(job_id):
+    if getattr(settings, 'IMAGE_UPLOADS_ASYNC', True):
+        executor().submit(run_in_worker, job_id)
+    else:
+        run(job_id)
+
+
+def run_in_worker(job_id):
+    try:
+        return run(job_id)
+    finally:
+        # The job thread opens its own database connections
+        connections.close_all()
+
+
+# ----------------------------------------------------------------------
+# Processing
+# ----------------------------------------------------------------------
+
+def _verify_all(paths):
+    processes = getattr(settings, 'IMAGE_UPLOAD_PROCESSES', 2)
+    if processes <= 1 or len(paths) <= 1:
+        return [verify_image(path) for path in paths]
+    # spawn: forking a threaded server process can copy held locks into the child
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(processes, len(paths)), mp_context=context) as pool:
+        return list(pool.map(verify_image, paths))
+
+
+def run(job_id):
+    """Process one queued job; returns it, or None if another worker claimed it."""
+    from django.core.files import File
+    from django.utils import timezone
+
+    from .cache import bump_generation, SCOPE_PRODUCTS
+    from .image_variants import schedule as schedule_variants
+    from .media_manifest import media_manifest
+    from .models import ProductImage, ProductImageUpload
+
+    claimed = ProductImageUpload.objects.filter(pk=job_id, status=ProductImageUpload.STATUS_PENDING).update(
+        status=ProductImageUpload.STATUS_PROCESSING, processed=0, rejected=0
+    )
+    if not claimed:
+        return None
+    job = ProductImageUpload.objects.select_related('product').get(pk=job_id)
+    product = job.product
+    field = ProductImage._meta.get_field('image')
+    spool_directories = {os.path.dirname(entry['path']) for entry in job.files}
+    images, errors, stored = [], [], []
+    try:
+        results = _verify_all([entry['path'] for entry in job.files])
+        sort_order = product.images.count()
+        for entry, (valid, reason) in zip(job.files, results):
+            if valid:
+                image = ProductImage(product=product, sort_order=sort_order + len(images))
+                if entry.get('stored') and field.storage.exists(entry['stored']):
+                    # Copied by an earlier run of this job that was interrupted
+                    image.image = entry['stored']
+                else:
+                    with open(entry['path'], 'rb') as spooled:
+                        name = field.generate_filename(image, entry['name'])
+                        image.image = field.storage.save(name, File(spooled, name=entry['name']), max_length=field.max_length)
+                    entry['stored'] = image.image.name
+                stored.append(image.image.name)
+                images.append(image)
+                job.processed += 1
+            else:
+                errors.append({'name': entry['name'], 'error': reason})
+                job.rejected += 1
+            # Copied names are recorded with the progress, so recovery can reuse or delete them
+            ProductImageUpload.objects.filter(pk=job.pk).update(
+                processed=job.processed, rejected=job.rejected, files=job.files
+            )
+
+        with transaction.atomic():
+            ProductImage.objects.bulk_create(images)
+            if images and not ProductImage.objects.filter(product=product, is_primary=True).exists():
+                ProductImage.objects.filter(pk=images[0].pk).update(is_primary=True)
+            product.refresh_primary_image()
+            job.status = ProductImageUpload.STATUS_DONE
+            job.errors, job.files, job.finished_at = errors, [], timezone.now()
+            job.save(update_fields=['status', 'errors', 'files', 'finished_at'])
+            # bulk_create sends no post_save: do what the ProductImage receivers would
+            for image in images:
+                schedule_variants(image.image.name, image, 'image')
+            transaction.on_commit(lambda: bump_generation(SCOPE_PRODUCTS))
+        for image in images:
+            media_manifest.add(image.image.name)
+    except Exception as exc:
+        logger.exception('Image upload job %s failed', job_id)
+        # No rows point at the copies; do not leave them behind in storage
+        for name in stored:
+            try:
+                field.storage.delete(name)
+            except Exception:
+                logger.exception('Could not delete %s', name)
+        ProductImageUpload.objects.filter(pk=job.pk).update(
+            status=ProductImageUpload.STATUS_FAILED,
+            errors=errors + [{'name': '', 'error': str(exc)}],
+            finished_at=timezone.now(),
+        )
+    finally:
+        for directory in spool_directories:
+            shutil.rmtree(directory, ignore_errors=True)
+    return job
+
+
+# ----------------------------------------------------------------------
+# Recovery
+# ----------------------------------------------------------------------
+
+def recover_stale_jobs(dry_run=False):
+    """
+    Re-queue abandoned jobs (see `stale_cutoff`) whose spooled files are still
+    there, and fail the others, deleting what their interrupted run had already
+    copied to storage. Returns {'requeued', 'failed'} counts.
+    """
+    from django.utils import timezone
+
+    from .models import ProductImage, ProductImageUpload
+
+    active = (ProductImageUpload.STATUS_PENDING, ProductImageUpload.STATUS_PROCESSING)
+    counts = {'requeued': 0, 'failed': 0}
+    stale = ProductImageUpload.objects.filter(status__in=active, queued_at__lt=stale_cutoff())
+    for job in stale.only('pk', 'status', 'files'):
+        spooled = bool(job.files) and all(os.path.exists(entry['path']) for entry in job.files)
+        counts['requeued' if spooled else 'failed'] += 1
+        if dry_run:
+            continue
+        # Guarded on the status read, so a job that finished meanwhile is left alone
+        current = ProductImageUpload.objects.filter(pk=job.pk, status=job.status)
+        if spooled:
+            if current.update(status=ProductImageUpload.STATUS_PENDING, queued_at=timezone.now()):
+                submit(job.pk)
+        else:
+            current.update(
+                status=ProductImageUpload.STATUS_FAILED,
+                errors=[{'name': '', 'error': 'The upload was interrupted; upload the images again'}],
+                files=[],
+                finished_at=timezone.now(),
+            )
+            storage = ProductImage._meta.get_field('image').storage
+            for entry in job.files:
+                if entry.get('stored'):
+                    storage.delete(entry['stored'])
+            for directory in {os.path.dirname(entry['path']) for entry in job.files}:
+                shutil.rmtree(directory, ignore_errors=True)
+    return counts
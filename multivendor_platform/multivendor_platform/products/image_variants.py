@@ -0,0 +1,266 @@
+# products/image_variants.py
+"""
+Responsive derivatives of uploaded images.
+
+Every source image gets fixed-width variants (IMAGE_VARIANT_WIDTHS, never wider
+than the original) in WebP and a JPEG fallback, stored next to each other under a
+name derived from the source:
+
+    product_images/chair.png -> variants/product_images/chair/640w.webp
+                                variants/product_images/chair/640w.jpg
+
+Variant sets are described as {format: {width: storage name}} with string widths
+(JSON keys). ProductImage.variants and Product.primary_image_variants store them so
+serializers can render srcset attributes without touching storage; other sources
+(vendor logos and banners, taxonomy images, editor uploads) can be found by name.
+When a source cannot be processed (missing or undecodable file) those fields get
+{'failed': source name} instead, so saves do not queue it again until the file
+changes; `generate_image_variants --force` retries them.
+
+Uploads are processed after commit on a small thread pool (IMAGE_VARIANT_WORKERS):
+Pillow releases the GIL while resizing and encoding, and threads share the Django
+setup a process pool would have to repeat. With IMAGE_VARIANTS_ASYNC = False jobs
+run inline, which tests and the backfill command rely on.
+"""
+import io
+import logging
+import posixpath
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .cache import bump_generation, SCOPE_PRODUCTS
+from .media_manifest import media_manifest
+
+logger = logging.getLogger(__name__)
+
+VARIANT_ROOT = 'variants'
+DEFAULT_WIDTHS = (320, 640, 1024)
+
+# format -> (file extension, Pillow format, encoder options)
+VARIANT_FORMATS = {
+    'webp': ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_VARIANT_FILE = re.compile(r'^(\d+)w\.(\w+)$')
+
+FAILED_KEY = 'failed'
+
+
+def variant_widths():
+    return tuple(sorted(getattr(settings, 'IMAGE_VARIANT_WIDTHS', DEFAULT_WIDTHS)))
+
+
+def variant_directory(source_name):
+    return posixpath.join(VARIANT_ROOT, posixpath.splitext(source_name)[0])
+
+
+def variant_name(source_name, width, fmt):
+    return posixpath.join(variant_directory(source_name), f'{width}w.{VARIANT_FORMATS[fmt][0]}')
+
+
+def generation_failed(variants):
+    """True if `variants` is the marker of a source that could not be processed."""
+    return bool(variants) and FAILED_KEY in variants
+
+
+def variants_match(variants, source_name):
+    """True if `variants` were generated (or failed to generate) from `source_name`."""
+    if generation_failed(variants):
+        return variants[FAILED_KEY] == source_name
+    prefix = variant_directory(source_name) + '/'
+    return bool(variants) and all(
+        name.startswith(prefix) for names in variants.values() for name in names.values()
+    )
+
+
+def target_widths(source_width):
+    """Configured widths below the original, plus the original capped at the largest one."""
+    widths = variant_widths()
+    return sorted({width for width in widths if width < source_width} | {min(source_width, widths[-1])})
+
+
+# ----------------------------------------------------------------------
+# Generation
+# ----------------------------------------------------------------------
+
+def _encode(image, fmt):
+    from PIL import Image
+
+    _extension, pil_format, options = VARIANT_FORMATS[fmt]
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        if has_alpha:
+            # JPEG has no alpha channel: flatten onto white
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel('A'))
+        else:
+            image = image.convert('RGB')
+    elif fmt == 'webp' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, format=pil_format, **options)
+    return buffer.getvalue()
+
+
+def _write(storage, name, data):
+    # Names are deterministic: replace instead of letting storage pick a new one
+    if storage.exists(name):
+        storage.delete(name)
+    saved = storage.save(name, ContentFile(data))
+    if storage is media_manifest.storage:
+        media_manifest.add(saved)
+    return saved
+
+
+def existing_variants(source_name, storage=None):
+    """Variant set already in storage for `source_name` ({} if none)."""
+    storage = storage or default_storage
+    try:
+        _directories, files = storage.listdir(variant_directory(source_name))
+    except (OSError, NotImplementedError):
+        return {}
+    extensions = {extension: fmt for fmt, (extension, _pil, _options) in VARIANT_FORMATS.items()}
+    variants = {}
+    for file_name in files:
+        match = _VARIANT_FILE.match(file_name)
+        if match and match.group(2) in extensions:
+            variants.setdefault(extensions[match.group(2)], {})[match.group(1)] = posixpath.join(
+                variant_directory(source_name), file_name
+            )
+    return variants
+
+
+def generate_variants(source_name, storage=None, force=False):
+    """
+    Write the variants of `source_name` and return their set. Existing variants are
+    reused unless `force`. Raises OSError for missing or undecodable sources.
+    """
+    from PIL import Image, ImageOps
+
+    storage = storage or default_storage
+    if not force:
+        existing = existing_variants(source_name, storage)
+        if existing:
+            return existing
+
+    with storage.open(source_name, 'rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    variants = {fmt: {} for fmt in VARIANT_FORMATS}
+    source_width, source_height = image.size
+    for width in target_widths(source_width):
+        height = max(1, round(source_height * width / source_width))
+        resized = image if width == source_width else image.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt in VARIANT_FORMATS:
+            variants[fmt][str(width)] = _write(storage, variant_name(source_name, width, fmt), _encode(resized, fmt))
+    return variants
+
+
+# ----------------------------------------------------------------------
+# Jobs
+# ----------------------------------------------------------------------
+
+def _record(model_label, pk, field_name, source_name, variants):
+    """Store the variant set (or failure marker) on the rows that keep one."""
+    from .models import Product, ProductImage
+
+    model = apps.get_model(model_label) if model_label else None
+    updated = 0
+    if model is ProductImage:
+        updated = ProductImage.objects.filter(pk=pk, image=source_name).update(
+            variants=variants, updated_at=timezone.now()
+        )
+        product = Product.objects.filter(images__pk=pk).first()
+        if product is not None:
+            product.refresh_primary_image()
+    elif model is Product and field_name == 'image':
+        # The legacy image only provides the primary image while the gallery is empty
+        updated = Product.objects.filter(pk=pk, image=source_name, primary_image_ref__isnull=True).update(
+            primary_image_variants=variants
+        )
+    if updated:
+        # update() sends no signals; cached product lists would keep the empty variant set
+        bump_generation(SCOPE_PRODUCTS)
+
+
+def process(model_label, pk, field_name, source_name, force=False):
+    """Generate and record the variants of one source; returns the set (or None on failure)."""
+    try:
+        variants = generate_variants(source_name, force=force)
+    except Exception:
+        logger.exception('Could not generate image variants for %s', source_name)
+        # Recorded so that later saves of the row do not queue the source again
+        _record(model_label, pk, field_name, source_name, {FAILED_KEY: source_name})
+        return None
+    _record(model_label, pk, field_name, source_name, variants)
+    return variants
+
+
+def run_in_worker(*args, **kwargs):
+    try:
+        return process(*args, **kwargs)
+    finally:
+        # Worker threads open their own database connections
+        connections.close_all()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2), thread_name_prefix='image-variants'
+            )
+        return _executor
+
+
+def schedule(source_name, instance=None, field_name=None):
+    """Queue variant generation for `source_name` once the current transaction commits."""
+    if not source_name:
+        return
+    model_label = instance._meta.label if instance is not None else None
+    pk = instance.pk if instance is not None else None
+
+    def submit():
+        if getattr(settings, 'IMAGE_VARIANTS_ASYNC', True):
+            executor().submit(run_in_worker, model_label, pk, field_name, source_name)
+        else:
+            process(model_label, pk, field_name, source_name)
+
+    transaction.on_commit(submit)
+
+
+# ----------------------------------------------------------------------
+# Rendering
+# ----------------------------------------------------------------------
+
+def variant_urls(variants, build_url, storage=None):
+    """
+    {format: {'urls': {width: url}, 'srcset': 'url 320w, ...'}} for a stored set;
+    `build_url` turns a storage URL into what the client should load.
+    """
+    if generation_failed(variants):
+        return {}
+    storage = storage or default_storage
+    rendered = {}
+    for fmt, names in (variants or {}).items():
+        urls = {width: build_url(storage.url(name)) for width, name in sorted(names.items(), key=lambda item: int(item[0]))}
+        if urls:
+            rendered[fmt] = {'urls': urls, 'srcset': ', '.join(f'{url} {width}w' for width, url in urls.items())}
+    return rendered
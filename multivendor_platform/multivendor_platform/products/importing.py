@@ -0,0 +1,528 @@
+# products/importing.py
+"""
+Streaming bulk import of products from CSV or JSONL.
+
+The populate commands and the admin save one product at a time and then write its
+subcategories and labels with separate queries. The importer streams the file and
+works in chunks of PRODUCT_IMPORT_CHUNK_SIZE rows:
+
+1. every row is validated by ProductImportSerializer, i.e. with the field rules of
+   ProductSerializer.validate;
+2. vendors are resolved with one query per chunk; categories, subcategories and
+   labels come from slug maps loaded once per import;
+3. products are upserted by slug: new ones with one bulk_create, existing ones with
+   one bulk_update;
+4. subcategory and label links are diffed against the stored ones and written with
+   one bulk insert and at most one delete per through table.
+
+Bulk writes send no signals. Each chunk therefore does the work of Product.save()
+and the receivers in signals.py itself:
+- it sets the slug, the search shadow columns and is_active on the instances;
+- it adjusts label product counts and the label index;
+- it refreshes the search index and the response caches.
+
+Each chunk commits in its own transaction. The checkpoint file then records the
+last committed record, so an interrupted import resumes after it. Re-running a
+chunk is harmless because rows are upserted by slug.
+
+Row format (CSV header or JSON keys):
+- name, description, price and the other ProductImportSerializer fields;
+- `slug` (optional; derived from the name when missing);
+- `vendor` (a username; required for new products unless a default vendor is given);
+- `primary_category` (a category slug);
+- `subcategories` and `labels`, lists of slugs that are `|`-separated in CSV.
+
+CSV cells the exporter prefixed with `'` against spreadsheet formula injection (see
+CSV_ESCAPE) are read back without the prefix.
+
+A relation column that is absent leaves the existing links untouched. When the same
+slug appears twice in a chunk, the later row wins. Images are not imported: they go
+through the gallery upload job (products/image_uploads.py).
+"""
+import csv
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import validate_unicode_slug
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .cache import bump_generation, SCOPE_LABELS, SCOPE_PRODUCTS
+from .label_counts import add_deltas
+from .normalization import apply_search_columns
+
+logger = logging.getLogger(__name__)
+
+FORMAT_CSV = 'csv'
+FORMAT_JSONL = 'jsonl'
+FORMATS = (FORMAT_CSV, FORMAT_JSONL)
+
+LIST_SEPARATOR = '|'
+
+# Spreadsheets evaluate CSV cells starting with these; exports prefix them with
+# CSV_ESCAPE (and cells already starting with it, so the prefix can be removed again)
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+CSV_ESCAPE = "'"
+RELATION_COLUMNS = ('vendor', 'primary_category', 'subcategories', 'labels')
+MAX_RECORDED_ERRORS = 100
+CHECKPOINT_SUFFIX = '.checkpoint.json'
+
+# Key of the placeholder row yielded for unparseable JSONL lines
+ROW_ERROR = '__error__'
+
+
+class ImportRowError(Exception):
+    """A row that cannot be imported; the message is recorded with its position."""
+
+
+def format_for(file_name):
+    """Import format implied by a file name: JSONL for .jsonl/.ndjson, CSV otherwise."""
+    return FORMAT_JSONL if file_name.lower().endswith(('.jsonl', '.ndjson')) else FORMAT_CSV
+
+
+def read_rows(stream, fmt):
+    """
+    Yield (position, row) from binary `stream`. The 1-based record position is what
+    checkpoints refer to; blank JSONL lines take a position but yield nothing.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == FORMAT_CSV:
+        for position, row in enumerate(csv.DictReader(text), 1):
+            yield position, {column: unescape_csv_cell(value) for column, value in row.items()}
+        return
+    for position, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            row = {ROW_ERROR: f'invalid JSON: {exc}'}
+        yield position, row
+
+
+def unescape_csv_cell(value):
+    """Undo the formula escaping of exported CSV cells."""
+    if isinstance(value, str) and value.startswith(CSV_ESCAPE) and value[1:].startswith(
+        CSV_FORMULA_PREFIXES + (CSV_ESCAPE,)
+    ):
+        return value[1:]
+    return value
+
+
+def _slug_list(value):
+    if value in (None, ''):
+        return []
+    if isinstance(value, str):
+        value = value.split(LIST_SEPARATOR)
+    return [str(slug).strip() for slug in value if str(slug).strip()]
+
+
+def _error_text(detail):
+    """Flatten DRF error details into 'field: message' text."""
+    if isinstance(detail, dict):
+        return '; '.join(f'{field}: {_error_text(errors)}' for field, errors in detail.items())
+    if isinstance(detail, (list, tuple)):
+        return ' '.join(_error_text(error) for error in detail)
+    return str(detail)
+
+
+# ----------------------------------------------------------------------
+# Checkpoints
+# ----------------------------------------------------------------------
+
+def checkpoint_path_for(source_path):
+    return source_path + CHECKPOINT_SUFFIX
+
+
+def read_checkpoint(path):
+    """Saved import state ({'position', 'created', ...}), or None."""
+    try:
+        with open(path, encoding='utf-8') as checkpoint:
+            return json.load(checkpoint)
+    except (OSError, ValueError):
+        return None
+
+
+def write_checkpoint(path, state):
+    # Write then rename, so a crash never leaves a truncated checkpoint
+    temporary = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as checkpoint:
+        json.dump(state, checkpoint, ensure_ascii=False)
+    os.replace(temporary, path)
+
+
+# ----------------------------------------------------------------------
+# Importer
+# ----------------------------------------------------------------------
+
+class ProductImporter:
+    """
+    Chunked upsert of product rows. `vendor` is the default vendor (a user) for rows
+    without one; `checkpoint_path` enables checkpoints and, with `resume`, continues
+    after the recorded position.
+    """
+
+    def __init__(self, vendor=None, chunk_size=None, checkpoint_path=None, resume=False, dry_run=False):
+        from .serializers import ProductImportSerializer
+
+        self.default_vendor_id = vendor.pk if vendor is not None else None
+        self.chunk_size = chunk_size or getattr(settings, 'PRODUCT_IMPORT_CHUNK_SIZE', 1000)
+        self.checkpoint_path = checkpoint_path
+        self.dry_run = dry_run
+        self.state = {'position': 0, 'created': 0, 'updated': 0, 'rejected': 0, 'errors': [], 'finished': False}
+        if resume and checkpoint_path:
+            self.state.update(read_checkpoint(checkpoint_path) or {})
+            self.state['finished'] = False
+        self.serializer = ProductImportSerializer()
+        self.import_fields = list(self.serializer.Meta.fields)
+        self._slug_maps = None
+
+    # Driving -------------------------------------------------------------
+    def run(self, rows):
+        """Import `rows` ((position, row) pairs); returns the final state."""
+        start = self.state['position']
+        chunk = []
+        for position, row in rows:
+            if position <= start:
+                continue
+            chunk.append((position, row))
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk)
+        self.state['finished'] = True
+        if not self.dry_run:
+            from .suggest import suggest_index
+
+            # One rebuild instead of a typeahead update per imported product
+            suggest_index.invalidate()
+            self._save_checkpoint()
+        return self.state
+
+    def _save_checkpoint(self):
+        if self.checkpoint_path and not self.dry_run:
+            write_checkpoint(self.checkpoint_path, self.state)
+
+    def _reject(self, position, message):
+        self.state['rejected'] += 1
+        if len(self.state['errors']) < MAX_RECORDED_ERRORS:
+            self.state['errors'].append({'position': position, 'error': message})
+
+    # Validation ----------------------------------------------------------
+    def slug_maps(self):
+        """{relation column: {slug: pk}} for the taxonomy, loaded once per import."""
+        from .models import Category, Label, Subcategory
+
+        if self._slug_maps is None:
+            self._slug_maps = {
+                'primary_category': dict(Category.objects.values_list('slug', 'pk')),
+                'subcategories': dict(Subcategory.objects.values_list('slug', 'pk')),
+                'labels': dict(Label.objects.values_list('slug', 'pk')),
+            }
+        return self._slug_maps
+
+    def parse_row(self, row):
+        """(slug, validated field data, raw relation values) of one row."""
+        from rest_framework.exceptions import ValidationError
+
+        from .models import Product
+
+        if not isinstance(row, dict):
+            raise ImportRowError('row is not an object')
+        if ROW_ERROR in row:
+            raise ImportRowError(row[ROW_ERROR])
+        fields = {field: row[field] for field in self.import_fields if row.get(field) not in (None, '')}
+        try:
+            data = self.serializer.run_validation(fields)
+        except ValidationError as exc:
+            raise ImportRowError(_error_text(exc.detail))
+
+        slug = str(row.get('slug') or '').strip()
+        if slug:
+            try:
+                validate_unicode_slug(slug)
+            except DjangoValidationError:
+                raise ImportRowError(f'slug: "{slug}" is not a valid slug')
+        else:
+            # Product.save() uses slugify(name), which is empty for Persian names
+            slug = slugify(data['name']) or slugify(data['name'], allow_unicode=True)
+        if len(slug) > Product._meta.get_field('slug').max_length:
+            raise ImportRowError('slug: too long')
+        relations = {column: row[column] for column in RELATION_COLUMNS if column in row}
+        return slug, data, relations
+
+    def resolve_relations(self, relations, vendor_ids):
+        """Relation columns as ids: vendor_id, primary_category_id, subcategory/label id sets."""
+        slug_maps = self.slug_maps()
+        resolved = {}
+        if relations.get('vendor') not in (None, ''):
+            username = str(relations['vendor']).strip()
+            if username not in vendor_ids:
+                raise ImportRowError(f'vendor: unknown user "{username}"')
+            resolved['vendor_id'] = vendor_ids[username]
+        if 'primary_category' in relations:
+            slug = str(relations['primary_category'] or '').strip()
+            if slug and slug not in slug_maps['primary_category']:
+                raise ImportRowError(f'primary_category: unknown category "{slug}"')
+            resolved['primary_category_id'] = slug_maps['primary_category'][slug] if slug else None
+        for column in ('subcategories', 'labels'):
+            if column in relations:
+                slugs = _slug_list(relations[column])
+                unknown = [slug for slug in slugs if slug not in slug_maps[column]]
+                if unknown:
+                    raise ImportRowError(f'{column}: unknown slug(s) {", ".join(unknown)}')
+                resolved[column] = {slug_maps[column][slug] for slug in slugs}
+        return resolved
+
+    @staticmethod
+    def is_active(product):
+        # Product.save(): only approved products with a category are public
+        from .models import Product
+
+        return product.approval_status == Product.APPROVAL_STATUS_APPROVED and product.primary_category_id is not None
+
+    # Writing -------------------------------------------------------------
+    def import_chunk(self, chunk):
+        from django.contrib.auth import get_user_model
+
+        from .models import Product
+
+        parsed = []
+        for position, row in chunk:
+            try:
+                parsed.append((position, *self.parse_row(row)))
+            except ImportRowError as exc:
+                self._reject(position, str(exc))
+
+        usernames = {
+            str(relations['vendor']).strip() for _position, _slug, _data, relations in parsed
+            if relations.get('vendor') not in (None, '')
+        }
+        vendor_ids = dict(get_user_model().objects.filter(username__in=usernames).values_list('username', 'pk')) if usernames else {}
+
+        rows = {}
+        for position, slug, data, relations in parsed:
+            try:
+                rows[slug] = (position, data, self.resolve_relations(relations, vendor_ids))
+            except ImportRowError as exc:
+                self._reject(position, str(exc))
+
+        loaded_fields = ['slug', 'vendor', 'primary_category', 'is_active', *self.import_fields]
+        existing = {product.slug: product for product in Product.objects.filter(slug__in=rows).only(*loaded_fields)}
+        now = timezone.now()
+        created, updated, previous = [], [], {}
+        subcategory_sets, label_sets = {}, {}
+        for slug, (position, data, resolved) in rows.items():
+            product = existing.get(slug)
+            if product is None:
+                vendor_id = resolved.get('vendor_id', self.default_vendor_id)
+                if vendor_id is None:
+                    self._reject(position, 'vendor: required for new products')
+                    continue
+                product = Product(slug=slug, vendor_id=vendor_id)
+                created.append(product)
+            else:
+                # Rows without a vendor column import as the default vendor, if one was given
+                owner_id = resolved.get('vendor_id', self.default_vendor_id)
+                if owner_id is not None and owner_id != product.vendor_id:
+                    self._reject(position, f'slug: "{slug}" belongs to another vendor')
+                    continue
+                previous[product.pk] = product.is_active
+                updated.append(product)
+            for field, value in data.items():
+                setattr(product, field, value)
+            if 'primary_category_id' in resolved:
+                product.primary_category_id = resolved['primary_category_id']
+            apply_search_columns(product)
+            product.is_active = self.is_active(product)
+            product.updated_at = now
+            if 'subcategories' in resolved:
+                subcategory_sets[slug] = resolved['subcategories']
+            if 'labels' in resolved:
+                label_sets[slug] = resolved['labels']
+
+        if not self.dry_run and (created or updated):
+            with transaction.atomic():
+                self._write(created, updated, previous, subcategory_sets, label_sets)
+        self.state['created'] += len(created)
+        self.state['updated'] += len(updated)
+        self.state['position'] = chunk[-1][0]
+        self._save_checkpoint()
+
+    def _write(self, created, updated, previous, subcategory_sets, label_sets):
+        from .label_index import label_index
+        from .models import Product
+        from .search import DOCUMENT_TYPES, get_search_backend
+
+        Product.objects.bulk_create(created, batch_size=self.chunk_size)
+        if any(product.pk is None for product in created):
+            # Backends that cannot return ids from a bulk insert
+            ids = dict(Product.objects.filter(slug__in=[product.slug for product in created]).values_list('slug', 'pk'))
+            for product in created:
+                product.pk = ids[product.slug]
+        update_fields = [*self.import_fields, 'primary_category', 'is_active', *Product.SEARCH_COLUMNS, 'updated_at']
+        Product.objects.bulk_update(updated, update_fields, batch_size=self.chunk_size)
+
+        products = created + updated
+        ids_by_slug = {product.slug: product.pk for product in products}
+        self._write_links(
+            Product.subcategories.through, 'subcategory_id',
+            self._links(Product.subcategories.through, 'subcategory_id', [ids_by_slug[slug] for slug in subcategory_sets]),
+            {ids_by_slug[slug]: ids for slug, ids in subcategory_sets.items()},
+        )
+        # Every updated product's labels: an activity change moves their counts too
+        label_links = self._links(Product.labels.through, 'label_id', list(previous))
+        desired_labels = {ids_by_slug[slug]: ids for slug, ids in label_sets.items()}
+        added, removed = self._write_links(Product.labels.through, 'label_id', label_links, desired_labels)
+
+        deltas = {}
+        for product in products:
+            old_labels = set(label_links.get(product.pk, ()))
+            if previous.get(product.pk):
+                for label_id in old_labels:
+                    deltas[label_id] = deltas.get(label_id, 0) - 1
+            if product.is_active:
+                for label_id in desired_labels.get(product.pk, old_labels):
+                    deltas[label_id] = deltas.get(label_id, 0) + 1
+        add_deltas(deltas)
+
+        product_ids = [product.pk for product in products]
+        scopes = (SCOPE_PRODUCTS, SCOPE_LABELS) if added or removed else (SCOPE_PRODUCTS,)
+
+        def publish():
+            if added:
+                label_index.add_pairs([(label_id, product_id) for product_id, label_id in added])
+            if removed:
+                label_index.remove_pairs([(label_id, product_id) for product_id, label_id in removed])
+            get_search_backend().index_many(DOCUMENT_TYPES['product'], product_ids)
+            bump_generation(*scopes)
+
+        bump_generation(*scopes)
+        transaction.on_commit(publish)
+
+    @staticmethod
+    def _links(through, column, product_ids):
+        """{product_id: {related id: through row pk}} for `product_ids`."""
+        links = {}
+        if product_ids:
+            rows = through.objects.filter(product_id__in=product_ids).values_list('pk', 'product_id', column)
+            for pk, product_id, related_id in rows:
+                links.setdefault(product_id, {})[related_id] = pk
+        return links
+
+    def _write_links(self, through, column, links, desired):
+        """
+        Make the links of every product in `desired` ({product_id: id set}) exactly
+        that set; returns the (product_id, related id) pairs added and removed.
+        """
+        stale, added, removed = [], [], []
+        for product_id, wanted in desired.items():
+            current = links.get(product_id, {})
+            for related_id, pk in current.items():
+                if related_id not in wanted:
+                    stale.append(pk)
+                    removed.append((product_id, related_id))
+            added.extend((product_id, related_id) for related_id in wanted if related_id not in current)
+        if stale:
+            through.objects.filter(pk__in=stale).delete()
+        if added:
+            through.objects.bulk_create(
+                [through(product_id=product_id, **{column: related_id}) for product_id, related_id in added],
+                batch_size=self.chunk_size,
+                ignore_conflicts=True,
+            )
+        return added, removed
+
+
+def import_file(path, fmt=None, vendor=None, chunk_size=None, resume=True, dry_run=False):
+    """Import the file at `path`, checkpointing next to it; returns the final state."""
+    importer = ProductImporter(
+        vendor=vendor,
+        chunk_size=chunk_size,
+        checkpoint_path=checkpoint_path_for(path),
+        resume=resume,
+        dry_run=dry_run,
+    )
+    with open(path, 'rb') as stream:
+        return importer.run(read_rows(stream, fmt or format_for(path)))
+
+
+# ----------------------------------------------------------------------
+# Admin uploads
+# ----------------------------------------------------------------------
+
+def spool_root():
+    return getattr(settings, 'PRODUCT_IMPORT_SPOOL_DIR', '') or os.path.join(tempfile.gettempdir(), 'product-import-spool')
+
+
+def spool(upload):
+    """Stream an uploaded file to the spool directory; returns its path."""
+    directory = spool_root()
+    os.makedirs(directory, exist_ok=True)
+    base_name = os.path.basename(upload.name)
+    path = os.path.join(directory, f'{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}-{base_name}')
+    with open(path, 'wb') as destination:
+        for chunk in upload.chunks():
+            destination.write(chunk)
+    return path
+
+
+def spooled_imports():
+    """(file name, checkpoint state or None) of spooled imports, newest first."""
+    try:
+        names = sorted(os.listdir(spool_root()), reverse=True)
+    except OSError:
+        return []
+    return [
+        (name, read_checkpoint(checkpoint_path_for(os.path.join(spool_root(), name))))
+        for name in names if not name.endswith(CHECKPOINT_SUFFIX) and not name.endswith('.tmp')
+    ]
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='product-imports')
+        return _executor
+
+
+def run_in_worker(path, vendor_id=None):
+    from django.contrib.auth import get_user_model
+
+    try:
+        vendor = get_user_model().objects.filter(pk=vendor_id).first() if vendor_id else None
+        return import_file(path, vendor=vendor)
+    except Exception:
+        logger.exception('Product import %s failed', path)
+        return None
+    finally:
+        # The import thread opens its own database connections
+        connections.close_all()
+
+
+def submit(path, vendor=None):
+    """Run the import of a spooled file after commit, in the background unless PRODUCT_IMPORTS_ASYNC is off."""
+    vendor_id = vendor.pk if vendor is not None else None
+
+    def start():
+        if getattr(settings, 'PRODUCT_IMPORTS_ASYNC', True):
+            executor().submit(run_in_worker, path, vendor_id)
+        else:
+            import_file(path, vendor=vendor)
+
+    transaction.on_commit(start)
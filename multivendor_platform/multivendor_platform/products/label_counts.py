@@ -0,0 +1,128 @@
+# products/label_counts.py
+"""
+Incremental maintenance of Label.product_count (active products per label).
+
+Receivers in signals.py translate Product.labels changes, Product is_active
+transitions and product deletions into per-label deltas. Deltas are buffered per
+transaction (per savepoint, so a rolled-back savepoint takes its deltas with it)
+and written once it commits, with one UPDATE per distinct delta value: assigning a
+label to a thousand products inside one atomic block is a single statement.
+Outside a transaction the buffer is flushed immediately.
+
+`recount_label_products()` recomputes the counts set-based, one UPDATE with a
+grouped subquery, for drift from raw SQL or queryset updates.
+"""
+import threading
+import weakref
+
+from django.db import connection, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .cache import bump_generation, SCOPE_LABELS
+
+_local = threading.local()
+
+
+def _flush(deltas):
+    from .models import Label
+
+    by_delta = {}
+    for label_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(label_id)
+    for delta, label_ids in by_delta.items():
+        Label.objects.filter(pk__in=label_ids).update(product_count=Greatest(F('product_count') + delta, 0))
+    if by_delta:
+        bump_generation(SCOPE_LABELS)
+
+
+class _Buffer:
+    """Deltas of one savepoint, flushed as its on_commit callback."""
+
+    def __init__(self, key):
+        self.key = key
+        self.deltas = {}
+
+    def __call__(self):
+        buffers = _buffers()
+        ref = buffers.get(self.key)
+        if ref is not None and ref() is self:
+            del buffers[self.key]
+        _flush(self.deltas)
+
+
+def _buffers():
+    buffers = getattr(_local, 'buffers', None)
+    if buffers is None:
+        buffers = _local.buffers = {}
+    return buffers
+
+
+def _pending_buffer():
+    """
+    Delta buffer of the innermost open savepoint, registering its on_commit flush.
+    Only the on_commit queue holds the buffer strongly: when a rollback discards the
+    callback, the weak reference kept here dies with it and the next delta starts a
+    new buffer instead of adding to one that will never be flushed.
+    """
+    key = tuple(connection.savepoint_ids)
+    buffers = _buffers()
+    ref = buffers.get(key)
+    buffer = ref() if ref is not None else None
+    if buffer is None:
+        buffer = _Buffer(key)
+        buffers[key] = weakref.ref(buffer)
+        transaction.on_commit(buffer)
+    return buffer.deltas
+
+
+def add_deltas(deltas):
+    """Queue {label_id: delta} for the current transaction."""
+    deltas = {label_id: delta for label_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    if not connection.in_atomic_block:
+        _flush(deltas)
+        return
+    pending = _pending_buffer()
+    for label_id, delta in deltas.items():
+        pending[label_id] = pending.get(label_id, 0) + delta
+
+
+def add_for_products(product_ids, sign):
+    """Queue `sign` for every label of `product_ids` (activation, deactivation, deletion)."""
+    from .models import Product
+
+    if not product_ids:
+        return
+    rows = (
+        Product.labels.through.objects.filter(product_id__in=product_ids)
+        .order_by()
+        .values('label_id')
+        .annotate(count=Count('pk'))
+    )
+    add_deltas({row['label_id']: sign * row['count'] for row in rows})
+
+
+def recount_label_products(labels, dry_run=False):
+    """
+    Set every label in `labels` to its number of active products with one grouped
+    UPDATE. Returns how many labels had drifted. Works with historical models.
+    """
+    through = labels.model.products.through
+    actual = Coalesce(
+        Subquery(
+            through.objects.filter(label_id=OuterRef('pk'), product__is_active=True)
+            .order_by()
+            .values('label_id')
+            .annotate(count=Count('pk'))
+            .values('count'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+    drifted = labels.annotate(actual=actual).exclude(product_count=F('actual')).count()
+    if drifted and not dry_run:
+        labels.update(product_count=actual)
+    return drifted
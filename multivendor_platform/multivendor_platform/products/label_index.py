@@ -0,0 +1,154 @@
+# products/label_index.py
+"""
+In-process inverted index from label to product IDs.
+
+Each label keeps a sorted integer array (posting list) of the products carrying it,
+so an AND filter over N labels is a single set intersection instead of N joins
+through the Product.labels table. The index is loaded lazily from the through table,
+kept current incrementally from Product.labels m2m_changed events (see signals.py),
+and rebuilt on a background thread, while the previous copy keeps answering, when
+another process reports a change through the shared 'label_index' generation
+counter in products/cache.py. A periodic rebuild bounds drift from writes that
+bypass signals (raw SQL, rolled-back transactions).
+
+`filter_queryset()` passes the intersection to SQL as `id__in` while it has at
+most LABEL_INDEX_MAX_INLINE_IDS products. A larger one would put one bind parameter
+per product into the statement (SQLite caps their number), so it is sent as a
+single parameter instead: an array unnested on PostgreSQL, a JSON list read with
+json_each on SQLite.
+"""
+import json
+from array import array
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+from .cache import SharedVersionedIndex
+
+SCOPE_LABEL_INDEX = 'label_index'
+
+
+def id_list_subquery(vendor, ids):
+    """A subquery yielding `ids` from one bind parameter (the plain list where unsupported)."""
+    if vendor == 'postgresql':
+        return RawSQL('SELECT unnest(%s::bigint[])', (list(ids),))
+    if vendor == 'sqlite':
+        return RawSQL('SELECT value FROM json_each(%s)', (json.dumps(list(ids)),))
+    return list(ids)
+
+
+class LabelIndex(SharedVersionedIndex):
+    scope = SCOPE_LABEL_INDEX
+    background = True
+
+    def __init__(self):
+        super().__init__()
+        self._postings = {}
+        self._slug_to_id = {}
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def _rebuild(self):
+        from .models import Label, Product
+
+        postings = {}
+        rows = (
+            Product.labels.through.objects
+            .order_by('label_id', 'product_id')
+            .values_list('label_id', 'product_id')
+            .iterator(chunk_size=5000)
+        )
+        for label_id, product_id in rows:
+            posting = postings.get(label_id)
+            if posting is None:
+                posting = postings[label_id] = array('q')
+            posting.append(product_id)
+        self._postings = postings
+        self._slug_to_id = dict(Label.objects.values_list('slug', 'id'))
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def label_ids_for_slugs(self, slugs):
+        """Map slugs to label IDs; unknown slugs map to None."""
+        self.ensure_loaded()
+        return [self._slug_to_id.get(slug) for slug in slugs]
+
+    def product_ids_for_labels(self, label_ids):
+        """IDs of products that carry every label in `label_ids` (AND semantics)."""
+        self.ensure_loaded()
+        label_ids = list(label_ids)
+        if not label_ids or None in label_ids:
+            return set()
+        postings = [self._postings.get(label_id, ()) for label_id in label_ids]
+        postings.sort(key=len)
+        return set(postings[0]).intersection(*postings[1:])
+
+    def product_ids_for_slugs(self, slugs):
+        return self.product_ids_for_labels(self.label_ids_for_slugs(slugs))
+
+    def filter_queryset(self, queryset, label_ids):
+        """Narrow a Product `queryset` to products carrying every label in `label_ids`."""
+        label_ids = list(label_ids)
+        product_ids = self.product_ids_for_labels(label_ids)
+        if not product_ids:
+            return queryset.none()
+        if len(product_ids) <= getattr(settings, 'LABEL_INDEX_MAX_INLINE_IDS', 500):
+            return queryset.filter(id__in=product_ids)
+        return queryset.filter(id__in=id_list_subquery(connections[queryset.db].vendor, sorted(product_ids)))
+
+    def filter_queryset_by_slugs(self, queryset, slugs):
+        return self.filter_queryset(queryset, self.label_ids_for_slugs(slugs))
+
+    # ------------------------------------------------------------------
+    # Incremental maintenance
+    # ------------------------------------------------------------------
+    def add_pairs(self, pairs):
+        def mutate():
+            for label_id, product_id in pairs:
+                posting = self._postings.setdefault(label_id, array('q'))
+                position = bisect_left(posting, product_id)
+                if position == len(posting) or posting[position] != product_id:
+                    insort(posting, product_id)
+        self._apply(mutate)
+
+    def remove_pairs(self, pairs):
+        def mutate():
+            for label_id, product_id in pairs:
+                posting = self._postings.get(label_id)
+                if not posting:
+                    continue
+                position = bisect_left(posting, product_id)
+                if position < len(posting) and posting[position] == product_id:
+                    del posting[position]
+        self._apply(mutate)
+
+    def remove_product(self, product_id):
+        def mutate():
+            for posting in self._postings.values():
+                position = bisect_left(posting, product_id)
+                if position < len(posting) and posting[position] == product_id:
+                    del posting[position]
+        self._apply(mutate)
+
+    def set_label_slug(self, label_id, slug):
+        def mutate():
+            for known_slug, known_id in list(self._slug_to_id.items()):
+                if known_id == label_id:
+                    del self._slug_to_id[known_slug]
+            self._slug_to_id[slug] = label_id
+        self._apply(mutate)
+
+    def remove_label(self, label_id):
+        def mutate():
+            self._postings.pop(label_id, None)
+            for known_slug, known_id in list(self._slug_to_id.items()):
+                if known_id == label_id:
+                    del self._slug_to_id[known_slug]
+        self._apply(mutate)
+
+
+label_index = LabelIndex()
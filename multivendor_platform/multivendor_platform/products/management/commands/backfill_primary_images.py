@@ -0,0 +1,39 @@
+# products/management/commands/backfill_primary_images.py
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized primary image columns (reference, URL, dimensions) of every product'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count products whose columns are out of date without writing',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Products read per database round trip (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        products = Product.objects.only('pk', 'image', *Product.PRIMARY_IMAGE_COLUMNS).order_by('pk')
+        checked = stale = 0
+        for product in products.iterator(chunk_size=options['chunk_size']):
+            checked += 1
+            if options['dry_run']:
+                values = product._primary_image_values()
+                if any(getattr(product, column) != value for column, value in values.items()):
+                    stale += 1
+            elif product.refresh_primary_image():
+                stale += 1
+
+        if options['dry_run']:
+            self.stdout.write(f'{stale} of {checked} product(s) have out-of-date primary image columns')
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No columns were written'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ Updated {stale} of {checked} product(s)'))
@@ -0,0 +1,72 @@
+# products/management/commands/benchmark_normalization.py
+import random
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from products.normalization import analyze, normalize, tokenize
+from products.management.commands.refresh_search_columns import SEARCH_COLUMN_MODELS
+
+SAMPLE_WORDS = (
+    'پمپ‌های', 'صنعتي', 'كارخانه', 'دستگاه', 'بسته‌بندی', 'ماشين', 'آلات', 'فولادی',
+    'قیمت', 'ارزان‌ترین', 'تولید', 'كننده', '۱۲۳۴', '٥٦', 'مُحَمَّد', 'steel', 'Pump', '<b>تخفیف</b>',
+)
+
+
+class Command(BaseCommand):
+    help = 'Microbenchmark: normalize, tokenize and analyze every searchable text in the catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Timed passes over the corpus; the best pass is reported (default: 3)',
+        )
+        parser.add_argument(
+            '--synthetic',
+            type=int,
+            default=0,
+            help='Benchmark N generated Persian documents instead of the database catalog',
+        )
+
+    def load_catalog(self):
+        texts = []
+        for model_path in SEARCH_COLUMN_MODELS:
+            model = apps.get_model(model_path)
+            sources = sorted({source for fields in model.SEARCH_COLUMNS.values() for source in fields})
+            for row in model.objects.values_list(*sources).iterator(chunk_size=2000):
+                texts.extend(value for value in row if value)
+        return texts
+
+    def synthetic_corpus(self, count):
+        rng = random.Random(42)
+        return [' '.join(rng.choices(SAMPLE_WORDS, k=rng.randint(5, 200))) for _ in range(count)]
+
+    def time_pass(self, function, texts, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for text in texts:
+                function(text)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def handle(self, *args, **options):
+        texts = self.synthetic_corpus(options['synthetic']) if options['synthetic'] else self.load_catalog()
+        if not texts:
+            self.stdout.write(self.style.WARNING('No text to benchmark; use --synthetic N'))
+            return
+
+        total_chars = sum(len(text) for text in texts)
+        self.stdout.write(f'Corpus: {len(texts)} text(s), {total_chars / 1_000_000:.2f}M characters')
+        repeat = max(options['repeat'], 1)
+        for name, function in (('normalize', normalize), ('tokenize', tokenize), ('analyze', analyze)):
+            elapsed = self.time_pass(function, texts, repeat)
+            rate = total_chars / elapsed / 1_000_000 if elapsed else float('inf')
+            self.stdout.write(
+                f'  {name:<10} {elapsed * 1000:9.1f} ms   {len(texts) / elapsed if elapsed else 0:12.0f} texts/s   {rate:7.2f}M chars/s'
+            )
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark complete'))
@@ -0,0 +1,34 @@
+# products/management/commands/build_related_products.py
+from django.core.management.base import BaseCommand
+
+from products.related import build
+
+
+class Command(BaseCommand):
+    help = 'Precompute related products from label/taxonomy/vendor/price similarity'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every product instead of only those affected by feature changes',
+        )
+        parser.add_argument(
+            '--block-size',
+            type=int,
+            help='Products computed and written per block (default: RELATED_PRODUCTS_BLOCK_SIZE)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the products that would be recomputed without writing',
+        )
+
+    def handle(self, *args, **options):
+        counts = build(full=options['full'], dry_run=options['dry_run'], block_size=options['block_size'])
+        summary = f'{counts["updated"]} of {counts["products"]} product(s)'
+        if options['dry_run']:
+            self.stdout.write(f'{summary} would be recomputed, {counts["removed"]} removed')
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No related products were written'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ {summary} recomputed, {counts["removed"]} removed'))
@@ -4,6 +4,7 @@
 import re
 from django.core.management.base import BaseCommand
 from products.models import Category, Subcategory, Department, Product
+from products.media_manifest import media_manifest, file_exists
 from django.conf import settings
 import os
 
@@ -28,6 +29,9 @@ class Command(BaseCommand):
         clear_missing = options['clear']
         
         self.stdout.write(self.style.SUCCESS('Checking for missing image files...\n'))
+
+        # One storage scan up front instead of a stat per record
+        media_manifest.rebuild()
         
         # Check Categories
         self.stdout.write(self.style.WARNING('=== Categories ==='))
@@ -71,7 +75,7 @@ class Command(BaseCommand):
         for record in records_with_images:
             image_field = getattr(record, 'image', None)
             if image_field:
-                if not image_field.storage.exists(image_field.name):
+                if not file_exists(image_field):
                     self.stdout.write(
                         self.style.ERROR(
                             f'  ❌ {model_name} "{record.name}" (ID: {record.id}) - '
@@ -116,24 +120,22 @@ class Command(BaseCommand):
                 # Check if it's a broken reference (like imgi_ files or static/ paths that don't exist)
                 if 'imgi_' in img_src or '/static/imgi_' in img_src:
                     # Check if file exists
-                    file_exists = False
+                    found = False
                     
                     # Try different paths
                     if img_src.startswith('/'):
                         # Absolute path
                         if img_src.startswith('/static/'):
                             static_path = os.path.join(settings.STATIC_ROOT, img_src.replace('/static/', ''))
-                            file_exists = os.path.exists(static_path)
+                            found = os.path.exists(static_path)
                         elif img_src.startswith('/media/'):
-                            media_path = os.path.join(settings.MEDIA_ROOT, img_src.replace('/media/', ''))
-                            file_exists = os.path.exists(media_path)
+                            found = media_manifest.exists(img_src.replace('/media/', '', 1))
                     else:
                         # Relative path - try static and media
                         static_path = os.path.join(settings.STATIC_ROOT, img_src)
-                        media_path = os.path.join(settings.MEDIA_ROOT, img_src)
-                        file_exists = os.path.exists(static_path) or os.path.exists(media_path)
+                        found = os.path.exists(static_path) or media_manifest.exists(img_src)
                     
-                    if not file_exists:
+                    if not found:
                         broken_images.append(img_src)
             
             if broken_images:
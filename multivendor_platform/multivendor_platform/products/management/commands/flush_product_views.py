@@ -0,0 +1,32 @@
+# products/management/commands/flush_product_views.py
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from products.view_counts import flush_spooled
+
+
+class Command(BaseCommand):
+    help = (
+        'Write product view counts that server processes spooled at exit because the '
+        'database was unavailable (run from cron, e.g. every 5 minutes)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the spooled rows without writing or removing them',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            counts = flush_spooled(dry_run=options['dry_run'])
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc))
+
+        summary = f"{counts['rows']} row(s) from {counts['files']} spool file(s)"
+        if options['dry_run']:
+            self.stdout.write(f'{summary} would be written')
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No view counts were written'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ {summary} written'))
@@ -0,0 +1,91 @@
+# products/management/commands/generate_image_variants.py
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from products.image_variants import run_in_worker, process
+from products.models import Category, Department, Product, ProductImage, Subcategory
+from users.models import VendorProfile
+
+EDITOR_UPLOAD_ROOT = 'tinymce'
+
+
+class Command(BaseCommand):
+    help = 'Generate responsive WebP/JPEG variants for existing product, vendor, taxonomy and editor images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the images that would be processed without writing',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate variants that already exist',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+            help='Worker threads (1 processes images in this thread)',
+        )
+
+    def collect_jobs(self, force):
+        """(model label, pk, field name, source name) for every image to process."""
+        gallery = ProductImage.objects.exclude(image='')
+        if not force:
+            gallery = gallery.filter(variants={})
+        for pk, name in gallery.values_list('pk', 'image').iterator():
+            yield ProductImage._meta.label, pk, 'image', name
+
+        legacy = Product.objects.exclude(image='').exclude(image=None).filter(primary_image_ref__isnull=True)
+        if not force:
+            legacy = legacy.filter(primary_image_variants={})
+        for pk, name in legacy.values_list('pk', 'image').iterator():
+            yield Product._meta.label, pk, 'image', name
+
+        sources = ((Department, 'image'), (Category, 'image'), (Subcategory, 'image'),
+                   (VendorProfile, 'logo'), (VendorProfile, 'banner_image'))
+        for model, field_name in sources:
+            rows = model.objects.exclude(**{field_name: ''}).exclude(**{field_name: None})
+            for pk, name in rows.values_list('pk', field_name).iterator():
+                yield model._meta.label, pk, field_name, name
+
+        for name in self.editor_uploads():
+            yield None, None, None, name
+
+    def editor_uploads(self):
+        pending = [EDITOR_UPLOAD_ROOT]
+        while pending:
+            directory = pending.pop()
+            try:
+                directories, files = default_storage.listdir(directory)
+            except (OSError, NotImplementedError):
+                continue
+            pending.extend(posixpath.join(directory, name) for name in directories)
+            for name in files:
+                yield posixpath.join(directory, name)
+
+    def handle(self, *args, **options):
+        jobs = list(self.collect_jobs(options['force']))
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(jobs)} image(s) would be processed')
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No variants were written'))
+            return
+
+        force = options['force']
+        if options['workers'] <= 1:
+            results = [process(*job, force=force) for job in jobs]
+        else:
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                results = list(pool.map(lambda job: run_in_worker(*job, force=force), jobs))
+
+        failed = sum(1 for result in results if result is None)
+        self.stdout.write(self.style.SUCCESS(f'✓ Processed {len(jobs) - failed} of {len(jobs)} image(s)'))
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{failed} image(s) could not be read; see the log for details'))
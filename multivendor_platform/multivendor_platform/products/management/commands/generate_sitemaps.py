@@ -0,0 +1,43 @@
+# products/management/commands/generate_sitemaps.py
+from django.core.management.base import BaseCommand, CommandError
+
+from products.sitemap_files import generate
+
+
+class Command(BaseCommand):
+    help = 'Write the sitemap index and gzipped shard files to storage, rewriting only changed shards'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url',
+            help='Absolute site URL for the sitemap locations (default: SITE_URL)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rewrite every shard, changed or not',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the shards that would be written without writing',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            counts = generate(root_url=options['base_url'], force=options['force'], dry_run=options['dry_run'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if counts is None:
+            raise CommandError('Sitemap generation is already running')
+
+        if options['dry_run']:
+            self.stdout.write(
+                f'{counts["written"]} shard(s) would be written, {counts["removed"]} removed, '
+                f'{counts["unchanged"]} unchanged'
+            )
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No sitemap files were written'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ {counts["written"]} shard(s) written, {counts["removed"]} removed, {counts["unchanged"]} unchanged'
+            ))
@@ -0,0 +1,76 @@
+# products/management/commands/import_products.py
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importing import FORMATS, checkpoint_path_for, format_for, import_file
+
+
+class Command(BaseCommand):
+    help = 'Stream products from a CSV or JSONL file into the catalog with chunked bulk upserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with header) or JSONL file')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='File format (default: from the file extension)',
+        )
+        parser.add_argument(
+            '--vendor',
+            help='Username of the vendor for new products whose row has no vendor',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Rows per bulk write and checkpoint (default: PRODUCT_IMPORT_CHUNK_SIZE)',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Continue after the last checkpoint of a previous run',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate and count rows without writing',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+
+        vendor = None
+        if options['vendor']:
+            vendor = get_user_model().objects.filter(username=options['vendor']).first()
+            if vendor is None:
+                raise CommandError(f'Unknown vendor: {options["vendor"]}')
+
+        if options['resume'] and not os.path.exists(checkpoint_path_for(path)):
+            self.stdout.write(self.style.WARNING('No checkpoint found - starting from the first row'))
+
+        state = import_file(
+            path,
+            fmt=options['format'] or format_for(path),
+            vendor=vendor,
+            chunk_size=options['chunk_size'],
+            resume=options['resume'],
+            dry_run=options['dry_run'],
+        )
+
+        for error in state['errors']:
+            self.stdout.write(f'Row {error["position"]}: {error["error"]}')
+        if options['dry_run']:
+            self.stdout.write(
+                f'{state["created"]} product(s) would be created, {state["updated"]} updated, '
+                f'{state["rejected"]} row(s) rejected'
+            )
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No products were written'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Created {state["created"]}, updated {state["updated"]} product(s); '
+                f'{state["rejected"]} row(s) rejected'
+            ))
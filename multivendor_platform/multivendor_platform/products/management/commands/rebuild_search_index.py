@@ -0,0 +1,35 @@
+# products/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+
+from products.search import DOCUMENT_TYPES, get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index used by global_search (tsvector columns or the in-memory index)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--type',
+            choices=sorted(DOCUMENT_TYPES),
+            help='Only rebuild one document type',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show which backend and document types would be rebuilt without writing',
+        )
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        names = [options['type']] if options['type'] else sorted(DOCUMENT_TYPES)
+        self.stdout.write(f'Search backend: {backend.__class__.__name__}')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No index will be rebuilt'))
+            for name in names:
+                self.stdout.write(f'  Would rebuild: {name}')
+            return
+
+        for name in names:
+            count = backend.rebuild(DOCUMENT_TYPES[name])
+            self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt {name} index ({count} document(s))'))
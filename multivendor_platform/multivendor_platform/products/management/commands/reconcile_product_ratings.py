@@ -0,0 +1,35 @@
+# products/management/commands/reconcile_product_ratings.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from products.models import Product, ProductComment
+from products.ratings import reconcile_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored approved comment count and rating total of every product from its comments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count products whose aggregates have drifted without writing',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Products read and written per database round trip (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            stale = reconcile_rating_aggregates(
+                Product, ProductComment, dry_run=options['dry_run'], chunk_size=options['chunk_size']
+            )
+
+        if options['dry_run']:
+            self.stdout.write(f'{stale} product(s) have drifted rating aggregates')
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No columns were written'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ Corrected {stale} product(s)'))
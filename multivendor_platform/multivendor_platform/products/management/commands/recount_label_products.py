@@ -0,0 +1,25 @@
+# products/management/commands/recount_label_products.py
+from django.core.management.base import BaseCommand
+
+from products.label_counts import recount_label_products
+from products.models import Label
+
+
+class Command(BaseCommand):
+    help = 'Recompute Label.product_count (active products per label) with one grouped UPDATE'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count labels whose product count has drifted without writing',
+        )
+
+    def handle(self, *args, **options):
+        drifted = recount_label_products(Label.objects.all(), dry_run=options['dry_run'])
+
+        if options['dry_run']:
+            self.stdout.write(f'{drifted} label(s) have a drifted product count')
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No counts were written'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ Corrected {drifted} label(s)'))
@@ -0,0 +1,28 @@
+# products/management/commands/recover_image_uploads.py
+from django.core.management.base import BaseCommand
+
+from products.image_uploads import recover_stale_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-queue gallery upload jobs abandoned by a worker restart while their spooled '
+        'files remain, and fail the others (run from cron, e.g. every 15 minutes)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be re-queued or failed without changing anything',
+        )
+
+    def handle(self, *args, **options):
+        counts = recover_stale_jobs(dry_run=options['dry_run'])
+
+        summary = f"{counts['requeued']} job(s) re-queued, {counts['failed']} failed"
+        if options['dry_run']:
+            self.stdout.write(summary)
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No jobs were changed'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ {summary}'))
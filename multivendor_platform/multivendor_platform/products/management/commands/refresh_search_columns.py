@@ -0,0 +1,39 @@
+# products/management/commands/refresh_search_columns.py
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from products.normalization import refresh_search_columns
+
+# Models with normalized shadow columns (see SEARCH_COLUMNS on each model)
+SEARCH_COLUMN_MODELS = ('products.Product', 'products.Subcategory', 'blog.BlogPost', 'users.VendorProfile')
+
+
+class Command(BaseCommand):
+    help = 'Recompute the normalized search_* shadow columns, e.g. after changing products/normalization.py'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many rows each model has without writing',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Rows per bulk update (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        for model_path in SEARCH_COLUMN_MODELS:
+            model = apps.get_model(model_path)
+            if options['dry_run']:
+                self.stdout.write(f'{model_path}: {model.objects.count()} row(s), columns {", ".join(model.SEARCH_COLUMNS)}')
+                continue
+            changed = refresh_search_columns(model.objects.all(), model.SEARCH_COLUMNS, chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f'✓ {model_path}: updated {changed} row(s)'))
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No columns were written'))
+        else:
+            self.stdout.write('Run rebuild_search_index to refresh the full-text index from the new columns')
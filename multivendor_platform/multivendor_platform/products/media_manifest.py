@@ -0,0 +1,134 @@
+# products/media_manifest.py
+"""
+Per-process manifest of the files present in default storage.
+
+Serializers used to call `storage.exists(name)` for every image they rendered: a
+stat per row on the filesystem backend, a HEAD request on remote ones. The manifest
+answers the same question from a set of known file names instead:
+
+- the storage tree is scanned on a background thread when the server process
+  starts (`warm_process_indexes()` in products/cache.py, called from asgi.py and
+  wsgi.py) or, failing that, on the first lookup; until that scan lands, lookups
+  ask the storage backend as before;
+- afterwards the tree is rescanned on a background thread whenever the copy is
+  older than `max_age_seconds` or another process bumped the shared
+  'media_manifest' generation (`invalidate()`), while lookups keep using the
+  previous set;
+- saved file fields are added as they are uploaded (see signals.py), and a name
+  the scan did not list is checked against storage once, then remembered until
+  the next scan.
+
+A file deleted outside Django is reported as existing until the next scan, which
+is acceptable for display purposes; code that must be exact (deletion guards)
+should keep asking the storage backend.
+"""
+import posixpath
+import time
+
+from django.core.files.storage import default_storage
+
+from .cache import SharedVersionedIndex
+
+SCOPE_MEDIA_MANIFEST = 'media_manifest'
+
+
+class MediaManifest(SharedVersionedIndex):
+    scope = SCOPE_MEDIA_MANIFEST
+    max_age_seconds = 900
+    # Lookups run per serialized row, so the shared generation is read at most this often
+    check_interval_seconds = 5
+    background = True
+
+    def __init__(self, storage=None):
+        super().__init__()
+        self._storage = storage
+        self._names = frozenset()
+        self._added = set()
+        self._missing = set()
+        self._checked_at = float('-inf')
+
+    @property
+    def storage(self):
+        return self._storage or default_storage
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def scan(self):
+        """Every file name in storage, relative to its root."""
+        names = set()
+        pending = ['']
+        while pending:
+            directory = pending.pop()
+            try:
+                directories, files = self.storage.listdir(directory)
+            except (OSError, NotImplementedError):
+                continue
+            pending.extend(posixpath.join(directory, name) for name in directories)
+            names.update(posixpath.join(directory, name) for name in files)
+        return frozenset(names)
+
+    def _rebuild(self):
+        self._install(self.scan())
+
+    def _install(self, names):
+        # Added names are dropped too: the scan saw every upload that finished before it
+        self._names, self._added, self._missing = names, set(), set()
+
+    def ensure_loaded(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval_seconds:
+            return
+        self._checked_at = now
+        if self._version is None:
+            # Never scan inside a request: lookups ask storage until the first scan lands
+            self.warm()
+            return
+        super().ensure_loaded()
+
+    def rebuild(self):
+        """Rescan synchronously in this process (management commands, tests)."""
+        with self._lock:
+            version = self._shared_version()
+            self._rebuild()
+            self._version, self._loaded_at = version, time.monotonic()
+            self._checked_at = time.monotonic()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def exists(self, name):
+        if not name:
+            return False
+        self.ensure_loaded()
+        if name in self._missing:
+            return False
+        if name in self._names or name in self._added:
+            return True
+        found = self.storage.exists(name)
+        (self._added if found else self._missing).add(name)
+        return found
+
+    # ------------------------------------------------------------------
+    # Incremental maintenance
+    # ------------------------------------------------------------------
+    def add(self, name):
+        """Record a file that was just written (no effect before the first scan)."""
+        if name and self._version is not None:
+            self._added.add(name)
+            self._missing.discard(name)
+
+
+media_manifest = MediaManifest()
+
+
+def file_exists(field_file):
+    """
+    Manifest-backed replacement for `field_file.storage.exists(field_file.name)`.
+    Files on storages other than the default one are still checked directly.
+    """
+    if not field_file:
+        return False
+    if field_file.storage is not media_manifest.storage:
+        return field_file.storage.exists(field_file.name)
+    return media_manifest.exists(field_file.name)
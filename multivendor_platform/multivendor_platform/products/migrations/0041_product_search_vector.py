@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:11
+# Adds the full-text search column used by products/search.py. The GIN index and the
+# initial vectors only exist on PostgreSQL; other databases use the in-memory backend.
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS products_product_search_vector_gin "
+        "ON products_product USING gin (search_vector);"
+    )
+    schema_editor.execute(
+        "UPDATE products_product SET search_vector = "
+        "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B');"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS products_product_search_vector_gin;")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0040_productuploadrequest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:16
+# Adds the normalized search columns and backfills them. On PostgreSQL the search
+# vectors are rebuilt from the new columns.
+
+from django.db import migrations, models
+
+from products.normalization import refresh_search_columns
+
+
+def backfill_search_columns(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Subcategory = apps.get_model('products', 'Subcategory')
+    refresh_search_columns(Product.objects.all(), {'search_name': ('name',), 'search_text': ('description',)})
+    refresh_search_columns(Subcategory.objects.all(), {'search_name': ('name',)})
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "UPDATE products_product SET search_vector = "
+            "setweight(to_tsvector('simple', search_name), 'A') || "
+            "setweight(to_tsvector('simple', search_text), 'B');"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0041_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_name',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='subcategory',
+            name='search_name',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:35
+# Denormalized primary image columns; existing rows are filled by
+# `manage.py backfill_primary_images`, which needs the media files for dimensions.
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0042_search_shadow_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='primary_image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='primary_image_ref',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.productimage'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='primary_image_url',
+            field=models.CharField(blank=True, default='', editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='primary_image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:49
+# Stored approved comment count and rating total per product, backfilled from the
+# comments table with one grouped query.
+
+from django.db import migrations, models
+
+from products.ratings import reconcile_rating_aggregates
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    reconcile_rating_aggregates(apps.get_model('products', 'Product'), apps.get_model('products', 'ProductComment'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0043_product_primary_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='approved_comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:05
+# Label.product_count is maintained incrementally from here on, so start from an
+# exact count.
+
+from django.db import migrations
+
+from products.label_counts import recount_label_products
+
+
+def recount(apps, schema_editor):
+    recount_label_products(apps.get_model('products', 'Label').objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0044_product_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:58
+# Variant metadata for responsive images; existing media is processed by
+# `manage.py generate_image_variants`.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0045_recount_label_products'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='primary_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0047_product_image_upload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedProductSet',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='related_set', serialize=False, to='products.product')),
+                ('related_ids', models.JSONField(blank=True, default=list)),
+                ('scores', models.JSONField(blank=True, default=list)),
+                ('fingerprint', models.CharField(max_length=32)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
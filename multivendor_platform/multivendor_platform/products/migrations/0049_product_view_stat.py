@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0048_related_product_set'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductViewStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_stats', to='products.product')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('product', 'date')},
+            },
+        ),
+    ]
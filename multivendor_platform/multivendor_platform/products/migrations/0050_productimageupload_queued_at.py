@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:19
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0049_product_view_stat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimageupload',
+            name='queued_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,15 +1,21 @@
 # products/models.py
 import os
 from typing import Optional
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.utils.text import slugify
 from django.utils import timezone
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from .normalization import apply_search_columns
+from .cache import bump_generation, SCOPE_PRODUCTS
+from .ratings import apply_rating_deltas, comment_contribution
+from .image_variants import variants_match
+from .slugs import StoredSlugMixin
 
 User = get_user_model()
 
-class Department(models.Model):
+class Department(StoredSlugMixin, models.Model):
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=120, unique=True, blank=True)
     description = models.TextField(blank=True, null=True)
@@ -37,7 +43,7 @@ class Department(models.Model):
     def __str__(self):
         return self.name
 
-class Category(models.Model):
+class Category(StoredSlugMixin, models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(max_length=120, unique=True, blank=True)
     description = models.TextField(blank=True, null=True)
@@ -67,7 +73,7 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
-class Subcategory(models.Model):
+class Subcategory(StoredSlugMixin, models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(max_length=120, unique=True, blank=True)
     description = models.TextField(blank=True, null=True)
@@ -83,6 +89,10 @@ class Subcategory(models.Model):
     sort_order = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    # Normalized shadow column (products/normalization.py), filled on save
+    search_name = models.TextField(blank=True, default='', editable=False)
+    SEARCH_COLUMNS = {'search_name': ('name',)}
     
     class Meta:
         ordering = ['sort_order', 'name']
@@ -91,13 +101,18 @@ class Subcategory(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        apply_search_columns(self, kwargs)
         super().save(*args, **kwargs)
     
     def __str__(self):
         return self.name
     
     def get_departments(self):
-        """Get all departments through categories"""
+        """Get all departments through categories (from the in-memory taxonomy graph when loaded)"""
+        from .taxonomy import taxonomy_graph
+
+        if self.pk is not None and taxonomy_graph.subcategory(self.pk) is not None:
+            return taxonomy_graph.departments_for_subcategory(self.pk)
         departments = set()
         for category in self.categories.all():
             departments.update(category.departments.all())
@@ -160,7 +175,7 @@ class ProductUploadRequest(models.Model):
     def __str__(self):
         return f"Product Upload Request - {self.supplier.name} ({self.get_status_display()})"
 
-class Product(models.Model):
+class Product(StoredSlugMixin, models.Model):
     APPROVAL_STATUS_PENDING = 'pending'
     APPROVAL_STATUS_APPROVED = 'approved'
     APPROVAL_STATUS_REJECTED = 'rejected'
@@ -248,7 +263,36 @@ class Product(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    
+
+    # Normalized shadow columns (products/normalization.py), filled on save
+    search_name = models.TextField(blank=True, default='', editable=False)
+    search_text = models.TextField(blank=True, default='', editable=False)
+    SEARCH_COLUMNS = {'search_name': ('name',), 'search_text': ('description',)}
+
+    # Weighted tsvector over the shadow columns, maintained by products/search.py (PostgreSQL only)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # Denormalized primary image (see refresh_primary_image), kept current by ProductImage
+    # save/delete so list cards never query the gallery
+    primary_image_ref = models.ForeignKey(
+        'ProductImage', on_delete=models.SET_NULL, null=True, blank=True, related_name='+', editable=False
+    )
+    primary_image_url = models.CharField(max_length=500, blank=True, default='', editable=False)
+    primary_image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    primary_image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    # Responsive variants of the primary image (products/image_variants.py)
+    primary_image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    PRIMARY_IMAGE_COLUMNS = (
+        'primary_image_ref_id', 'primary_image_url', 'primary_image_width', 'primary_image_height',
+        'primary_image_variants',
+    )
+
+    # Approved comment aggregates (products/ratings.py), moved only by F() deltas from
+    # ProductComment save/delete/approval changes
+    approved_comment_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    RATING_COLUMNS = ('approved_comment_count', 'rating_sum')
+
     # NOTE: labels field is defined after Label model is created (see below)
     
     class Meta:
@@ -257,6 +301,7 @@ class Product(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        apply_search_columns(self, kwargs)
         
         # Enforce admin approval before activation
         if self.approval_status != self.APPROVAL_STATUS_APPROVED:
@@ -276,87 +321,168 @@ class Product(models.Model):
             else:
                 # Has proper category, can be active
                 self.is_active = True
-        
+
+        # A full save writes every column, so bring the primary image columns up to date
+        # first; a stale instance would otherwise overwrite what ProductImage stored
+        if kwargs.get('update_fields') is None:
+            for column, value in self._primary_image_values().items():
+                setattr(self, column, value)
+
         super().save(*args, **kwargs)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # A full save leaves the rating aggregates out of its UPDATE, so a stale copy
+        # cannot undo a concurrent comment approval. Inserts (new or deleted rows) still
+        # write them, and update_fields naming them is honoured.
+        if update_fields is None:
+            values = [value for value in values if value[0].name not in self.RATING_COLUMNS]
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+    def _primary_image_values(self):
+        """
+        Primary image columns: the first gallery image in ProductImage ordering (the
+        flagged primary, else by sort order), falling back to the legacy `image` field.
+        Dimensions are only re-read from storage when the image changed.
+        """
+        gallery_image = ProductImage.objects.filter(product_id=self.pk).first() if self.pk else None
+        source = gallery_image.image if gallery_image else self.image
+        values = {
+            'primary_image_ref_id': gallery_image.pk if gallery_image else None,
+            'primary_image_url': '',
+            'primary_image_width': None,
+            'primary_image_height': None,
+            'primary_image_variants': {},
+        }
+        if not source:
+            return values
+        try:
+            values['primary_image_url'] = source.url
+        except ValueError:
+            return values
+        if gallery_image:
+            values['primary_image_variants'] = gallery_image.variants
+        elif values['primary_image_url'] == self.primary_image_url:
+            # Legacy image variants are written by the variant job (image_variants._record)
+            values['primary_image_variants'] = self.primary_image_variants
+        if values['primary_image_url'] == self.primary_image_url and self.primary_image_width is not None:
+            values['primary_image_width'] = self.primary_image_width
+            values['primary_image_height'] = self.primary_image_height
+            return values
+        try:
+            values['primary_image_width'], values['primary_image_height'] = source.width, source.height
+        except (OSError, ValueError, TypeError):
+            # Missing or unreadable file: keep the URL, leave the dimensions unknown
+            pass
+        return values
+
+    def refresh_primary_image(self):
+        """Recompute the denormalized primary image columns; returns True if they changed."""
+        values = self._primary_image_values()
+        if all(getattr(self, column) == value for column, value in values.items()):
+            return False
+        Product.objects.filter(pk=self.pk).update(**values)
+        for column, value in values.items():
+            setattr(self, column, value)
+        return True
     
     def __str__(self):
         return self.name
     
+    def _primary_subcategory_id(self):
+        """
+        ID of the first subcategory in display order. Uses the prefetched subcategories
+        when available (one query otherwise); ordering comes from the taxonomy graph.
+        """
+        from .taxonomy import taxonomy_graph
+
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('subcategories')
+        if prefetched is not None:
+            subcategory_ids = [subcategory.pk for subcategory in prefetched]
+        else:
+            subcategory_ids = list(self.subcategories.values_list('pk', flat=True))
+        return taxonomy_graph.primary_subcategory_id(subcategory_ids)
+
     @property
     def get_full_category_path(self):
         """Returns the full category path: Department > Category > Subcategory"""
-        subcategories = self.subcategories.all()
-        if not subcategories.exists():
+        from .taxonomy import taxonomy_graph
+
+        subcategory_id = self._primary_subcategory_id()
+        if subcategory_id is None:
             return "No Category"
-        
-        subcategory = subcategories.first()
-        categories = subcategory.categories.all()
-        departments = subcategory.get_departments()  # Get departments through categories
-        
-        path_parts = []
-        if departments:
-            path_parts.append(departments[0].name)
-        if categories.exists():
-            path_parts.append(categories.first().name)
-        path_parts.append(subcategory.name)
-        
-        return ' > '.join(path_parts)
+        return taxonomy_graph.category_path(subcategory_id)
     
     @property
     def get_breadcrumb_hierarchy(self):
         """Returns structured breadcrumb data: Department > Category > Subcategory > Product"""
-        subcategories = self.subcategories.all()
-        if not subcategories.exists():
+        from .taxonomy import taxonomy_graph
+
+        subcategory_id = self._primary_subcategory_id()
+        if subcategory_id is None:
             return []
-        
-        subcategory = subcategories.first()
-        categories = subcategory.categories.all()
-        departments = subcategory.get_departments()  # Get departments through categories
-        
-        breadcrumb = []
-        
-        # Add department if exists
-        if departments:
-            dept = departments[0]
-            breadcrumb.append({
-                'type': 'department',
-                'name': dept.name,
-                'slug': dept.slug
-            })
-        
-        # Add category if exists
-        if categories.exists():
-            cat = categories.first()
-            breadcrumb.append({
-                'type': 'category',
-                'name': cat.name,
-                'slug': cat.slug
-            })
-        
-        # Add subcategory
-        breadcrumb.append({
-            'type': 'subcategory',
-            'name': subcategory.name,
-            'slug': subcategory.slug
-        })
-        
-        return breadcrumb
+        return taxonomy_graph.breadcrumb(subcategory_id)
     
     @property
     def primary_subcategory(self):
-        """Returns the primary subcategory for this product"""
-        return self.subcategories.first() if self.subcategories.exists() else None
+        """
+        Returns the primary subcategory for this product. The instance comes from the
+        taxonomy graph with its categories and departments already loaded.
+        """
+        from .taxonomy import taxonomy_graph
+
+        subcategory_id = self._primary_subcategory_id()
+        return taxonomy_graph.subcategory(subcategory_id) if subcategory_id is not None else None
     
     @property
     def primary_image(self):
         """Returns the primary image or the first image if no primary is set"""
-        primary = self.images.filter(is_primary=True).first()
-        if primary:
-            return primary.image
-        first_image = self.images.first()
-        if first_image:
-            return first_image.image
+        if self.primary_image_ref_id:
+            return self.primary_image_ref.image
         return self.image  # Fallback to old image field
+
+    @classmethod
+    def set_active(cls, queryset, active):
+        """
+        Bulk activate or deactivate `queryset` with one UPDATE, moving the label product
+        counts of the products that actually change. Returns that number.
+        """
+        from .label_counts import add_for_products
+
+        with transaction.atomic():
+            pks = list(queryset.filter(is_active=not active).values_list('pk', flat=True))
+            updated = cls.objects.filter(pk__in=pks).update(is_active=active, updated_at=timezone.now())
+            add_for_products(pks, 1 if active else -1)
+            if updated:
+                # update() sends no post_save, so drop cached listings here
+                bump_generation(SCOPE_PRODUCTS)
+                transaction.on_commit(lambda: cls._publish_activity(pks))
+        return updated
+
+    @classmethod
+    def _publish_activity(cls, pks):
+        """Search and typeahead updates that post_save would have made for `pks`."""
+        from .search import DOCUMENT_TYPES, get_search_backend
+        from .suggest import suggest_index, KIND_PRODUCT
+
+        bump_generation(SCOPE_PRODUCTS)
+        get_search_backend().index_many(DOCUMENT_TYPES['product'], pks)
+        visible = list(
+            cls.objects.filter(
+                pk__in=pks,
+                approval_status=cls.APPROVAL_STATUS_APPROVED,
+                is_active=True,
+                is_marketplace_hidden=False,
+            ).values_list('pk', 'name', 'slug')
+        )
+        shown = {pk for pk, _name, _slug in visible}
+        suggest_index.update_many(KIND_PRODUCT, visible, [pk for pk in pks if pk not in shown])
+
+    @property
+    def average_rating(self):
+        """Mean rating of approved comments, rounded to one decimal; 0 without any."""
+        if not self.approved_comment_count:
+            return 0
+        return round(self.rating_sum / self.approved_comment_count, 1)
     
     @property
     def all_images(self):
@@ -386,6 +512,9 @@ class ProductImage(models.Model):
     alt_text = models.CharField(max_length=125, blank=True, null=True, help_text="Alt text for this image (for SEO and accessibility)")
     is_primary = models.BooleanField(default=False)
     sort_order = models.PositiveIntegerField(default=0)
+    # {format: {width: storage name}} or a failure marker, filled in the background
+    # (products/image_variants.py)
+    variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -403,14 +532,87 @@ class ProductImage(models.Model):
             upload_path = os.path.join(settings.MEDIA_ROOT, 'product_images')
             os.makedirs(upload_path, mode=0o755, exist_ok=True)
         
+        # Variants of a replaced file no longer apply; the post_save job regenerates them
+        if self.variants and not variants_match(self.variants, self.image.name):
+            self.variants = {}
+
         # If this image is being set as primary, unset all other primary images for this product
         if self.is_primary:
             ProductImage.objects.filter(product=self.product, is_primary=True).update(is_primary=False)
         super().save(*args, **kwargs)
+        self.product.refresh_primary_image()
     
     def __str__(self):
         return f"{self.product.name} - Image {self.id}"
 
+class ProductImageUpload(models.Model):
+    """
+    A batch of gallery images handed to the background upload job
+    (products/image_uploads.py); its counters are the progress shown in the admin.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='image_uploads')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    rejected = models.PositiveIntegerField(default=0)
+    # Spooled files as [{'path': ..., 'name': ...}] until the job has run
+    files = models.JSONField(default=list, blank=True)
+    errors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last (re)queued; a job still pending or processing long after this was abandoned
+    # by its worker (see image_uploads.recover_stale_jobs)
+    queued_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.product.name} - {self.processed}/{self.total} images ({self.status})'
+
+class RelatedProductSet(models.Model):
+    """
+    Precomputed similar products of one product (products/related.py): the ids of
+    its top neighbours, best first, with their similarity scores and the
+    fingerprint of the features they were computed from.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='related_set')
+    related_ids = models.JSONField(default=list, blank=True)
+    scores = models.JSONField(default=list, blank=True)
+    fingerprint = models.CharField(max_length=32)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.product_id} - {len(self.related_ids)} related products'
+
+class ProductViewStat(models.Model):
+    """
+    Detail page views of one product on one day, written in bulk by the buffered
+    view counter (products/view_counts.py).
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='view_stats')
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('product', 'date')
+        ordering = ['-date']
+
+    def __str__(self):
+        return f'{self.product_id} - {self.date}: {self.views} views'
+
 class ProductComment(models.Model):
     """
     Comments on products
@@ -432,6 +634,55 @@ class ProductComment(models.Model):
     def __str__(self):
         return f'Comment by {self.author.username} on {self.product.name}'
 
+    def save(self, *args, **kwargs):
+        # Keep Product.approved_comment_count / rating_sum in step: take back what the
+        # stored row contributed and add what the saved one does
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = (
+                    ProductComment.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list('product_id', 'is_approved', 'rating')
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            deltas = {}
+            if previous is not None:
+                product_id, is_approved, rating = previous
+                count, total = comment_contribution(is_approved, rating)
+                deltas[product_id] = (-count, -total)
+            count, total = comment_contribution(self.is_approved, self.rating)
+            old_count, old_total = deltas.get(self.product_id, (0, 0))
+            deltas[self.product_id] = (old_count + count, old_total + total)
+            apply_rating_deltas(Product, deltas)
+
+    @classmethod
+    def set_approval(cls, queryset, approved):
+        """
+        Approve or unapprove every comment in `queryset`, adjusting the product rating
+        aggregates by the comments whose state actually changed. Returns that number.
+        """
+        with transaction.atomic():
+            pks = list(
+                queryset.filter(is_approved=not approved).select_for_update().values_list('pk', flat=True)
+            )
+            changing = cls.objects.filter(pk__in=pks).order_by()
+            rows = list(
+                changing.values('product_id').annotate(count=models.Count('pk'), total=models.Sum('rating'))
+            )
+            # update() skips auto_now; the detail ETag follows comments' updated_at
+            updated = changing.update(is_approved=approved, updated_at=timezone.now())
+            sign = 1 if approved else -1
+            apply_rating_deltas(Product, {
+                row['product_id']: (sign * row['count'], sign * row['total']) for row in rows
+            })
+            if updated:
+                # update() sends no post_save, so drop cached listings here
+                bump_generation(SCOPE_PRODUCTS)
+                transaction.on_commit(lambda: bump_generation(SCOPE_PRODUCTS))
+        return updated
+
 class LabelGroup(models.Model):
     """Group for organizing labels (e.g., Industry, Size, Status)"""
     name = models.CharField(max_length=120, unique=True)
@@ -655,12 +906,11 @@ class LabelComboSeoPage(models.Model):
         if not label_ids:
             return Product.objects.none()
         
-        # Get products that have ALL the labels
-        products = Product.objects.filter(is_active=True, is_marketplace_hidden=False)
-        for label_id in label_ids:
-            products = products.filter(labels__id=label_id)
-        
-        return products.distinct()
+        # Get products that have ALL the labels (one intersection in the label index)
+        from .label_index import label_index
+        return label_index.filter_queryset(
+            Product.objects.filter(is_active=True, is_marketplace_hidden=False), label_ids
+        )
 
 
 # Add labels field to Product model after Label is defined
@@ -671,6 +921,13 @@ Product.add_to_class(
 
 def get_promotional_labels(self):
     """Get promotional labels for badge display (limit 2)"""
+    prefetched = getattr(self, '_prefetched_objects_cache', {}).get('labels')
+    if prefetched is not None:
+        # Reuse the prefetched labels (already in display_order, name order)
+        return [
+            label for label in prefetched
+            if label.is_promotional and label.is_active
+        ][:2]
     return self.labels.filter(
         is_promotional=True,
         is_active=True
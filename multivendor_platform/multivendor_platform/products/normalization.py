@@ -0,0 +1,134 @@
+# products/normalization.py
+"""
+Persian-aware text normalization for search and matching.
+
+Catalog text mixes Arabic and Persian code points for the same letter (ي/ی, ك/ک),
+optional diacritics, tatweel, ZWNJ half-spaces and three digit sets, so a plain
+`icontains` misses obvious matches. `analyze()` maps any spelling variant to one
+canonical form:
+
+    normalize  -> character level: unify letters and digits, drop diacritics,
+                  tatweel and zero-width characters, lowercase, collapse spaces
+    tokenize   -> word tokens of the normalized text (HTML tags removed)
+    stem       -> light suffix stripping (plural ها/های, comparative تر/ترین, ی)
+
+The analyzed form is stored in the `search_*` shadow columns of Product, BlogPost,
+Subcategory and VendorProfile on save, and search input is run through the same
+pipeline before it is compared against them.
+"""
+import re
+
+from django.utils.html import strip_tags
+
+_CHARACTER_MAP = {
+    # Arabic letter forms -> Persian
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی',
+    'ك': 'ک',
+    'ة': 'ه', 'ۀ': 'ه',
+    'أ': 'ا', 'إ': 'ا', 'ٱ': 'ا',
+    'ؤ': 'و',
+    # Persian (U+06F0..) and Arabic-Indic (U+0660..) digits -> ASCII
+    **{chr(0x06F0 + digit): str(digit) for digit in range(10)},
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+    # Arabic punctuation -> ASCII equivalents
+    '،': ',', '؛': ';', '؟': '?', '٪': '%',
+}
+
+# Removed outright: harakat, superscript alef, tatweel and zero-width characters.
+# ZWNJ is removed rather than turned into a space so that "کتاب‌ها" and "کتابها" match.
+_DELETED_CHARACTERS = (
+    [chr(code) for code in range(0x064B, 0x0660)]
+    + ['\u0670', '\u0640', '\u200b', '\u200c', '\u200d', '\u200e', '\u200f', '\ufeff']
+)
+
+_TRANSLATION = str.maketrans({
+    **_CHARACTER_MAP,
+    **{character: None for character in _DELETED_CHARACTERS},
+})
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Longest first; only one suffix is stripped and the stem must keep MIN_STEM_LENGTH letters
+STEM_SUFFIXES = ('هایی', 'ترین', 'های', 'ها', 'تر', 'ی')
+MIN_STEM_LENGTH = 3
+
+
+def normalize(text):
+    """Character-level normalization; returns '' for empty input."""
+    if not text:
+        return ''
+    return _WHITESPACE_RE.sub(' ', text.translate(_TRANSLATION).lower()).strip()
+
+
+def tokenize(text):
+    """Normalized word tokens of `text`; HTML tags are stripped first."""
+    if not text:
+        return []
+    if '<' in text:
+        text = strip_tags(text)
+    return _WORD_RE.findall(normalize(text))
+
+
+def _is_persian(token):
+    return '\u0600' <= token[0] <= '\u06ff'
+
+
+def stem(token):
+    """Strip one common Persian inflectional suffix; other scripts are returned unchanged."""
+    if not token or not _is_persian(token):
+        return token
+    for suffix in STEM_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+            return token[:-len(suffix)]
+    return token
+
+
+def analyze(*texts):
+    """Space-joined stemmed tokens of all `texts`: the value stored in search columns."""
+    return ' '.join(stem(token) for text in texts for token in tokenize(text))
+
+
+def apply_search_columns(instance, save_kwargs=None):
+    """
+    Fill the shadow columns declared in `instance.SEARCH_COLUMNS`
+    ({column: (source field, ...)}) from their sources. Called from save(); when the
+    save is limited with update_fields, affected shadow columns are added to it.
+    """
+    update_fields = (save_kwargs or {}).get('update_fields')
+    touched = []
+    for column, sources in instance.SEARCH_COLUMNS.items():
+        if update_fields is not None and not set(sources) & set(update_fields):
+            continue
+        setattr(instance, column, analyze(*(getattr(instance, source) for source in sources)))
+        touched.append(column)
+    if update_fields is not None and touched:
+        save_kwargs['update_fields'] = list(update_fields) + [c for c in touched if c not in update_fields]
+
+
+def refresh_search_columns(queryset, columns, chunk_size=500):
+    """
+    Recompute shadow `columns` ({column: (source field, ...)}) for every row of
+    `queryset` with bulk updates; returns the number of rows changed. Works with
+    historical models, so migrations can use it for the initial backfill.
+    """
+    sources = sorted({source for fields in columns.values() for source in fields})
+    model = queryset.model
+    changed = 0
+    batch = []
+    for row in queryset.order_by('pk').values('pk', *sources, *columns).iterator(chunk_size=chunk_size):
+        values = {
+            column: analyze(*(row[source] for source in fields))
+            for column, fields in columns.items()
+        }
+        if all(row[column] == value for column, value in values.items()):
+            continue
+        batch.append(model(pk=row['pk'], **values))
+        if len(batch) >= chunk_size:
+            model.objects.bulk_update(batch, list(columns))
+            changed += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, list(columns))
+        changed += len(batch)
+    return changed
@@ -0,0 +1,61 @@
+# products/ratings.py
+"""
+Denormalized rating aggregates on Product.
+
+`Product.approved_comment_count` and `Product.rating_sum` hold the number and the
+rating total of approved comments (replies included, as the detail page has always
+counted them). They are kept current with F() deltas from ProductComment.save,
+ProductComment.set_approval and the post_delete receiver in signals.py;
+`reconcile_rating_aggregates()` recomputes them from the comments table for drift
+from raw SQL or plain queryset updates.
+"""
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from django.db.models.functions import Cast
+
+
+def comment_contribution(is_approved, rating):
+    """(count, rating total) one comment adds to its product's aggregates."""
+    return (1, rating) if is_approved else (0, 0)
+
+
+def apply_rating_deltas(product_model, deltas):
+    """Add {product_id: (count delta, rating delta)} to the stored aggregates."""
+    for product_id, (count, total) in deltas.items():
+        if count or total:
+            product_model.objects.filter(pk=product_id).update(
+                approved_comment_count=F('approved_comment_count') + count,
+                rating_sum=F('rating_sum') + total,
+            )
+
+
+def rating_average_expression():
+    """Average rating as a query expression (0 without approved comments), for sorting."""
+    return Case(
+        When(approved_comment_count__gt=0, then=Cast('rating_sum', FloatField()) / F('approved_comment_count')),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def reconcile_rating_aggregates(product_model, comment_model, dry_run=False, chunk_size=500):
+    """
+    Recompute the aggregates of every product with one grouped query; returns the
+    number of products that were (or, with dry_run, would be) corrected. Works with
+    historical models, so migrations can use it for the initial backfill.
+    """
+    actual = {
+        row['product_id']: (row['count'], row['total'])
+        for row in comment_model.objects.filter(is_approved=True)
+        .order_by()
+        .values('product_id')
+        .annotate(count=Count('pk'), total=Sum('rating'))
+    }
+    stale = []
+    rows = product_model.objects.order_by('pk').values_list('pk', 'approved_comment_count', 'rating_sum')
+    for pk, count, total in rows.iterator(chunk_size=chunk_size):
+        expected = actual.get(pk, (0, 0))
+        if (count, total) != expected:
+            stale.append(product_model(pk=pk, approved_comment_count=expected[0], rating_sum=expected[1]))
+    if stale and not dry_run:
+        product_model.objects.bulk_update(stale, ['approved_comment_count', 'rating_sum'], batch_size=chunk_size)
+    return len(stale)
@@ -0,0 +1,268 @@
+# products/related.py
+"""
+Precomputed related-product recommendations.
+
+`build()` describes every marketplace-visible product by a sparse set of weighted
+features:
+
+    label, subcategory, primary category, vendor, price bucket (powers of two)
+
+and stores each product's top RELATED_PRODUCTS_TOP_K neighbours by cosine
+similarity in RelatedProductSet, one row per product. The products form a sparse
+CSR matrix X (SciPy) with L2-normalised rows, so the similarities of a block of
+RELATED_PRODUCTS_BLOCK_SIZE products to all others are one sparse product
+X[block] @ X.T, and each row's neighbours come out of `numpy.argpartition`.
+Features shared by more than RELATED_PRODUCTS_MAX_POSTING products (a large
+vendor, a common price bucket) are left out of that product and only added to the
+score of candidates found through other features; with them the product would
+compare almost every pair. Blocks are written as they are computed.
+
+Without `full`, only these products are recomputed:
+- products whose feature fingerprint changed or that have no row yet;
+- products whose stored neighbours include a changed or removed product;
+- products for which a changed product now scores above their weakest neighbour.
+Similarity is symmetric, so the last group comes out of the changed products' own
+scores. The result matches a full rebuild unless a feature's posting list crossed
+RELATED_PRODUCTS_MAX_POSTING, which changes the candidates of unchanged products;
+run with `full` now and then.
+
+ProductViewSet.related serves the rows; `build_related_products` runs the job,
+incrementally from cron with a full rebuild weekly:
+
+    30 3 * * *  cd /app && python manage.py build_related_products
+    30 4 * * 0  cd /app && python manage.py build_related_products --full
+"""
+import hashlib
+import math
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+from django.db import transaction
+
+from .cache import bump_generation, SCOPE_PRODUCTS
+
+FEATURE_WEIGHTS = {
+    'label': 1.0,
+    'subcategory': 2.0,
+    'category': 1.0,
+    'vendor': 0.5,
+    'price': 0.5,
+}
+
+
+def top_k():
+    return getattr(settings, 'RELATED_PRODUCTS_TOP_K', 12)
+
+
+def price_bucket(price):
+    if price is None or price <= 0:
+        return None
+    return math.floor(math.log2(price))
+
+
+class FeatureMatrix:
+    """Sparse product x feature matrix; `freeze()` turns it into SciPy matrices."""
+
+    def __init__(self):
+        self.feature_ids = {}
+        self.weights = []
+        self.rows = {}
+        self.fingerprints = {}
+
+    def _feature(self, kind, value):
+        key = (kind, value)
+        feature = self.feature_ids.get(key)
+        if feature is None:
+            feature = self.feature_ids[key] = len(self.weights)
+            self.weights.append(FEATURE_WEIGHTS[kind])
+        return feature
+
+    def add(self, product_id, features):
+        """`features`: iterable of (kind, value)."""
+        keys = sorted(set(features))
+        self.rows[product_id] = [self._feature(kind, value) for kind, value in keys]
+        self.fingerprints[product_id] = hashlib.md5(repr(keys).encode('utf-8')).hexdigest()
+
+    def freeze(self, max_posting):
+        """
+        Build the normalised matrices, split into features with at most `max_posting`
+        products (`common`) and the capped rest (`capped`). Row i is product ids[i].
+        """
+        self.ids = np.array(sorted(self.rows), dtype=np.int64)
+        self.positions = {product_id: position for position, product_id in enumerate(self.ids.tolist())}
+        lengths = [len(self.rows[product_id]) for product_id in self.ids.tolist()]
+        indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = np.fromiter(
+            (feature for product_id in self.ids.tolist() for feature in self.rows[product_id]),
+            dtype=np.int64, count=int(indptr[-1]),
+        )
+        weights = np.asarray(self.weights, dtype=np.float64)
+        data = weights[indices]
+        norms = np.sqrt(np.add.reduceat(data ** 2, indptr[:-1])) if len(data) else np.zeros(0)
+        data /= np.repeat(norms, lengths)
+        matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(self.ids), len(weights)))
+
+        capped = np.bincount(indices, minlength=len(weights)) > max_posting
+        self.common = matrix @ sparse.diags((~capped).astype(np.float64))
+        self.common.eliminate_zeros()
+        self.capped = matrix @ sparse.diags(capped.astype(np.float64))
+        self.capped.eliminate_zeros()
+        self.common_t = self.common.T.tocsr()
+
+    def block_scores(self, positions):
+        """
+        CSR matrix of cosine similarities of the products at `positions` (rows) to
+        every product sharing an uncapped feature with them (columns).
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        scores = (self.common[positions] @ self.common_t).tocoo()
+        # A product is not its own neighbour
+        keep = positions[scores.row] != scores.col
+        row, col, data = scores.row[keep], scores.col[keep], scores.data[keep]
+        if self.capped.nnz and len(data):
+            # Capped features add to candidates found through the other features only
+            data = data + np.asarray(self.capped[positions[row]].multiply(self.capped[col]).sum(axis=1)).ravel()
+        return sparse.csr_matrix((data, (row, col)), shape=scores.shape)
+
+
+def load_matrix():
+    """FeatureMatrix of the marketplace-visible products."""
+    from .models import Product
+
+    visible = Product.objects.filter(
+        approval_status=Product.APPROVAL_STATUS_APPROVED, is_active=True, is_marketplace_hidden=False
+    )
+    features = defaultdict(list)
+    for product_id, category_id, vendor_id, price in visible.values_list(
+        'pk', 'primary_category_id', 'vendor_id', 'price'
+    ).iterator(chunk_size=5000):
+        row = features[product_id]
+        row.append(('vendor', vendor_id))
+        if category_id is not None:
+            row.append(('category', category_id))
+        bucket = price_bucket(price)
+        if bucket is not None:
+            row.append(('price', bucket))
+    for kind, through, column in (
+        ('label', Product.labels.through, 'label_id'),
+        ('subcategory', Product.subcategories.through, 'subcategory_id'),
+    ):
+        links = through.objects.filter(product__in=visible).values_list('product_id', column)
+        for product_id, value in links.iterator(chunk_size=5000):
+            features[product_id].append((kind, value))
+
+    matrix = FeatureMatrix()
+    for product_id, row in features.items():
+        matrix.add(product_id, row)
+    return matrix
+
+
+def neighbours(matrix, scores, row, limit):
+    """(top `limit` [(other, score)] best first, other ids, scores) of one row of block scores."""
+    begin, end = scores.indptr[row], scores.indptr[row + 1]
+    others = matrix.ids[scores.indices[begin:end]]
+    values = scores.data[begin:end]
+    chosen = np.arange(len(values))
+    if len(values) > limit:
+        # Keep everything tied with the limit-th score so ties resolve like a sort
+        threshold = values[np.argpartition(values, -limit)[-limit]]
+        chosen = np.flatnonzero(values >= threshold)
+    # Ties go to the older product, so results do not depend on storage order
+    order = chosen[np.lexsort((others[chosen], -values[chosen]))][:limit]
+    best = list(zip(others[order].tolist(), values[order].tolist()))
+    return best, others, values
+
+
+def _write(rows, dry_run):
+    from .models import RelatedProductSet
+
+    if dry_run or not rows:
+        return
+    RelatedProductSet.objects.bulk_create(
+        [
+            RelatedProductSet(
+                product_id=product_id,
+                related_ids=[other for other, _score in best],
+                scores=[round(score, 4) for _other, score in best],
+                fingerprint=fingerprint,
+            )
+            for product_id, best, fingerprint in rows
+        ],
+        update_conflicts=True,
+        unique_fields=['product'],
+        update_fields=['related_ids', 'scores', 'fingerprint', 'computed_at'],
+    )
+
+
+def build(full=False, dry_run=False, block_size=None):
+    """
+    Recompute related products; returns {'products', 'updated', 'removed'} counts
+    (what would change, with `dry_run`).
+    """
+    from .models import RelatedProductSet
+
+    limit = top_k()
+    max_posting = getattr(settings, 'RELATED_PRODUCTS_MAX_POSTING', 5000)
+    block_size = block_size or getattr(settings, 'RELATED_PRODUCTS_BLOCK_SIZE', 1000)
+    matrix = load_matrix()
+    matrix.freeze(max_posting)
+
+    stored = {
+        product_id: (fingerprint, related_ids, scores)
+        for product_id, fingerprint, related_ids, scores in RelatedProductSet.objects.values_list(
+            'product_id', 'fingerprint', 'related_ids', 'scores'
+        ).iterator(chunk_size=5000)
+    }
+    removed = [product_id for product_id in stored if product_id not in matrix.rows]
+    if full:
+        changed = set(matrix.rows)
+    else:
+        changed = {
+            product_id for product_id, fingerprint in matrix.fingerprints.items()
+            if stored.get(product_id, (None,))[0] != fingerprint
+        }
+    gone = changed | set(removed)
+    # Unchanged products whose stored neighbours changed or disappeared
+    dirty = {
+        product_id for product_id, (_fingerprint, related_ids, _scores) in stored.items()
+        if product_id in matrix.rows and product_id not in changed and gone.intersection(related_ids)
+    }
+
+    # Score a changed product must reach to enter each stored list (-inf: list not full)
+    weakest = np.full(len(matrix.ids), np.inf)
+    for product_id, (_fingerprint, _related_ids, scores) in stored.items():
+        position = matrix.positions.get(product_id)
+        if position is not None and product_id not in changed:
+            weakest[position] = scores[-1] if len(scores) >= limit else -np.inf
+
+    def recompute(product_ids):
+        for start in range(0, len(product_ids), block_size):
+            block = product_ids[start:start + block_size]
+            scores = matrix.block_scores([matrix.positions[product_id] for product_id in block])
+            rows = []
+            for row, product_id in enumerate(block):
+                best, others, values = neighbours(matrix, scores, row, limit)
+                rows.append((product_id, best, matrix.fingerprints[product_id]))
+                if full or product_id not in changed:
+                    continue
+                # Lists the changed product now enters
+                columns = scores.indices[scores.indptr[row]:scores.indptr[row + 1]]
+                entered = others[values >= weakest[columns]]
+                dirty.update(entered.tolist())
+            with transaction.atomic():
+                _write(rows, dry_run)
+        return len(product_ids)
+
+    # Changed products first: their scores show which other lists need recomputing
+    updated = recompute(sorted(changed))
+    updated += recompute(sorted(dirty))
+
+    if removed and not dry_run:
+        RelatedProductSet.objects.filter(product_id__in=removed).delete()
+    if (updated or removed) and not dry_run:
+        # ProductViewSet caches the `related` action under the products scope
+        bump_generation(SCOPE_PRODUCTS)
+    return {'products': len(matrix.rows), 'updated': updated, 'removed': len(removed)}
@@ -0,0 +1,471 @@
+# products/search.py
+"""
+Full-text search backends used by global_search.
+
+Two interchangeable backends index the same document types (marketplace products and
+published blog posts) and return (pk, relevance) candidates:
+
+- PostgresSearchBackend keeps a weighted tsvector column per document up to date on
+  save (see signals.py) and queries it through a GIN index with ts_rank_cd.
+- InMemorySearchBackend is a pure-Python inverted index with BM25 scoring, used on
+  SQLite dev setups. It is loaded lazily, updated incrementally on save/delete and
+  rebuilt in the background when another process bumps the shared 'search_index' generation
+  (SharedVersionedIndex in products/cache.py).
+
+Both backends index the normalized `search_*` shadow columns and run queries through
+the same analyzer (products/normalization.py), so Persian spelling variants match.
+global_search blends relevance with the persisted vendor ranking and attaches
+highlighted snippets built by `highlight()`.
+"""
+import math
+import re
+from bisect import bisect_left
+from html import escape
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import strip_tags
+
+from .cache import SharedVersionedIndex
+from .normalization import analyze
+
+SCOPE_SEARCH_INDEX = 'search_index'
+
+# Words as they appear in stored text; ZWNJ is part of a word for highlighting
+WORD_RE = re.compile(r'[\w\u200c]+', re.UNICODE)
+
+
+def tokenize(text):
+    """Analyzed (normalized, stemmed) tokens of `text`."""
+    return analyze(text).split()
+
+
+# ----------------------------------------------------------------------
+# Document types
+# ----------------------------------------------------------------------
+
+class SearchDocumentType:
+    """
+    Describes one searchable model: its weighted shadow columns (A is the strongest
+    weight, as in PostgreSQL) and the filter that makes a row publicly searchable.
+    """
+
+    def __init__(self, name, model_path, fields, visible_filter):
+        self.name = name
+        self.model_path = model_path
+        self.fields = fields
+        self.visible_filter = visible_filter
+
+    @property
+    def model(self):
+        from django.apps import apps
+        return apps.get_model(self.model_path)
+
+    def visible_queryset(self):
+        return self.model.objects.filter(self.visible_filter())
+
+    def is_visible(self, instance):
+        return self.visible_queryset().filter(pk=instance.pk).exists()
+
+
+def _visible_products():
+    from .models import Product
+    return Q(approval_status=Product.APPROVAL_STATUS_APPROVED, is_active=True, is_marketplace_hidden=False)
+
+
+def _published_posts():
+    return Q(status='published')
+
+
+DOCUMENT_TYPES = {
+    'product': SearchDocumentType(
+        'product', 'products.Product',
+        fields=(('search_name', 'A'), ('search_text', 'B')),
+        visible_filter=_visible_products,
+    ),
+    'blog': SearchDocumentType(
+        'blog', 'blog.BlogPost',
+        fields=(('search_title', 'A'), ('search_text', 'B')),
+        visible_filter=_published_posts,
+    ),
+}
+
+FIELD_WEIGHTS = {'A': 3.0, 'B': 1.5, 'C': 1.0}
+
+
+def document_type_for(instance):
+    model_path = f'{instance._meta.app_label}.{instance._meta.object_name}'
+    for document_type in DOCUMENT_TYPES.values():
+        if document_type.model_path == model_path:
+            return document_type
+    return None
+
+
+# ----------------------------------------------------------------------
+# PostgreSQL backend
+# ----------------------------------------------------------------------
+
+class PostgresSearchBackend:
+    """tsvector column + GIN index, ranked with cover density normalized by length."""
+    config = 'simple'
+    # ts_rank_cd normalization: divide by 1 + log(document length), BM25-like saturation
+    rank_normalization = 1
+
+    def vector_expression(self, document_type):
+        from django.contrib.postgres.search import SearchVector
+
+        vector = None
+        for field, weight in document_type.fields:
+            part = SearchVector(field, weight=weight, config=self.config)
+            vector = part if vector is None else vector + part
+        return vector
+
+    @staticmethod
+    def build_tsquery(tokens):
+        """AND of all tokens, the last one as a prefix so partial words match while typing."""
+        if not tokens:
+            return ''
+        terms = list(tokens[:-1]) + [f'{tokens[-1]}:*']
+        return ' & '.join(terms)
+
+    def search(self, document_type, query, limit):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        from django.db.models import F, Value
+
+        raw = self.build_tsquery(tokenize(query))
+        if not raw:
+            return []
+        ts_query = SearchQuery(raw, search_type='raw', config=self.config)
+        rows = (
+            document_type.visible_queryset()
+            .filter(search_vector=ts_query)
+            .annotate(relevance=SearchRank(
+                F('search_vector'), ts_query,
+                cover_density=True,
+                normalization=Value(self.rank_normalization),
+            ))
+            .order_by('-relevance', '-pk')
+            .values_list('pk', 'relevance')[:limit]
+        )
+        return list(rows)
+
+    def index(self, document_type, instance):
+        document_type.model.objects.filter(pk=instance.pk).update(
+            search_vector=self.vector_expression(document_type)
+        )
+
+    def index_many(self, document_type, pks):
+        document_type.model.objects.filter(pk__in=pks).update(
+            search_vector=self.vector_expression(document_type)
+        )
+
+    def remove(self, document_type, pk):
+        # The vector lives on the row itself and goes away with it
+        pass
+
+    def rebuild(self, document_type):
+        return document_type.model.objects.update(search_vector=self.vector_expression(document_type))
+
+
+# ----------------------------------------------------------------------
+# In-memory backend
+# ----------------------------------------------------------------------
+
+class _MemoryIndex:
+    """Inverted index for one document type."""
+
+    def __init__(self):
+        self.postings = {}       # term -> set(doc_id)
+        self.documents = {}      # doc_id -> {term: weighted term frequency}
+        self.lengths = {}        # doc_id -> weighted length
+        self.total_length = 0.0
+        self._sorted_terms = None
+
+    def add(self, doc_id, frequencies):
+        self.discard(doc_id)
+        if not frequencies:
+            return
+        self.documents[doc_id] = frequencies
+        length = sum(frequencies.values())
+        self.lengths[doc_id] = length
+        self.total_length += length
+        for term in frequencies:
+            if term not in self.postings:
+                self.postings[term] = set()
+                self._sorted_terms = None
+            self.postings[term].add(doc_id)
+
+    def discard(self, doc_id):
+        frequencies = self.documents.pop(doc_id, None)
+        if frequencies is None:
+            return
+        self.total_length -= self.lengths.pop(doc_id)
+        for term in frequencies:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.discard(doc_id)
+                if not posting:
+                    del self.postings[term]
+                    self._sorted_terms = None
+
+    def expand_prefix(self, prefix):
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self.postings)
+        terms = self._sorted_terms
+        position = bisect_left(terms, prefix)
+        matches = []
+        while position < len(terms) and terms[position].startswith(prefix):
+            matches.append(terms[position])
+            position += 1
+        return matches
+
+
+class InMemorySearchBackend(SharedVersionedIndex):
+    """Pure-Python inverted index with BM25 scoring for setups without PostgreSQL."""
+    scope = SCOPE_SEARCH_INDEX
+    background = True
+    k1 = 1.2
+    b = 0.75
+    max_prefix_expansions = 50
+
+    def __init__(self):
+        super().__init__()
+        self._indexes = {}
+
+    # Loading -------------------------------------------------------------
+    @staticmethod
+    def document_frequencies(document_type, values):
+        frequencies = {}
+        for field, weight in document_type.fields:
+            field_weight = FIELD_WEIGHTS[weight]
+            # Shadow columns already hold analyzed tokens
+            for token in (values.get(field) or '').split():
+                frequencies[token] = frequencies.get(token, 0.0) + field_weight
+        return frequencies
+
+    def _build(self, document_type):
+        index = _MemoryIndex()
+        field_names = [field for field, _weight in document_type.fields]
+        rows = document_type.visible_queryset().values('pk', *field_names).iterator(chunk_size=1000)
+        for row in rows:
+            index.add(row['pk'], self.document_frequencies(document_type, row))
+        return index
+
+    def _rebuild(self):
+        self._indexes = {name: self._build(document_type) for name, document_type in DOCUMENT_TYPES.items()}
+
+    # Backend API ---------------------------------------------------------
+    def search(self, document_type, query, limit):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        self.ensure_loaded()
+        index = self._indexes.get(document_type.name)
+        if index is None or not index.documents:
+            return []
+
+        # Each query token matches itself; the last one also matches as a prefix
+        token_terms = [[token] for token in tokens[:-1]]
+        token_terms.append(index.expand_prefix(tokens[-1])[:self.max_prefix_expansions])
+
+        candidates = None
+        for terms in token_terms:
+            matched = set()
+            for term in terms:
+                matched |= index.postings.get(term, set())
+            candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                return []
+
+        document_count = len(index.documents)
+        average_length = index.total_length / document_count
+        idf = {}
+        for terms in token_terms:
+            for term in terms:
+                if term in index.postings and term not in idf:
+                    df = len(index.postings[term])
+                    idf[term] = math.log(1 + (document_count - df + 0.5) / (df + 0.5))
+
+        scored = []
+        for doc_id in candidates:
+            frequencies = index.documents[doc_id]
+            norm = self.k1 * (1 - self.b + self.b * index.lengths[doc_id] / average_length)
+            score = 0.0
+            for terms in token_terms:
+                best = 0.0
+                for term in terms:
+                    tf = frequencies.get(term)
+                    if tf:
+                        best = max(best, idf[term] * tf * (self.k1 + 1) / (tf + norm))
+                score += best
+            scored.append((doc_id, score))
+        scored.sort(key=lambda item: (-item[1], -item[0]))
+        return scored[:limit]
+
+    def index(self, document_type, instance):
+        if document_type.is_visible(instance):
+            values = {field: getattr(instance, field) for field, _weight in document_type.fields}
+            frequencies = self.document_frequencies(document_type, values)
+        else:
+            frequencies = None
+
+        def mutate():
+            index = self._indexes.setdefault(document_type.name, _MemoryIndex())
+            if frequencies:
+                index.add(instance.pk, frequencies)
+            else:
+                index.discard(instance.pk)
+        self._apply(mutate)
+
+    def index_many(self, document_type, pks):
+        """Re-index `pks` with one query (bulk writes send no post_save)."""
+        pks = set(pks)
+        field_names = [field for field, _weight in document_type.fields]
+        rows = document_type.visible_queryset().filter(pk__in=pks).values('pk', *field_names)
+        frequencies = {row['pk']: self.document_frequencies(document_type, row) for row in rows}
+
+        def mutate():
+            index = self._indexes.setdefault(document_type.name, _MemoryIndex())
+            for pk in pks:
+                if frequencies.get(pk):
+                    index.add(pk, frequencies[pk])
+                else:
+                    index.discard(pk)
+        self._apply(mutate)
+
+    def remove(self, document_type, pk):
+        def mutate():
+            index = self._indexes.get(document_type.name)
+            if index is not None:
+                index.discard(pk)
+        self._apply(mutate)
+
+    def rebuild(self, document_type):
+        self.invalidate()
+        return document_type.visible_queryset().count()
+
+
+# ----------------------------------------------------------------------
+# Backend selection
+# ----------------------------------------------------------------------
+
+_backends = {}
+
+
+def get_search_backend():
+    """
+    Backend named by settings.SEARCH_BACKEND ('postgres' or 'memory'); by default
+    PostgreSQL databases use the tsvector backend and everything else the in-memory one.
+    """
+    name = getattr(settings, 'SEARCH_BACKEND', '') or (
+        'postgres' if connection.vendor == 'postgresql' else 'memory'
+    )
+    if name not in _backends:
+        backend_class = PostgresSearchBackend if name == 'postgres' else InMemorySearchBackend
+        _backends[name] = backend_class()
+    return _backends[name]
+
+
+def search_documents(type_name, query, limit):
+    """[(pk, relevance), ...] best first for the given document type."""
+    return get_search_backend().search(DOCUMENT_TYPES[type_name], query, limit)
+
+
+# ----------------------------------------------------------------------
+# Ranking and highlighting
+# ----------------------------------------------------------------------
+
+# Share of the blended score that comes from the vendor ranking (the rest is relevance)
+VENDOR_RANKING_WEIGHT = 0.3
+
+
+def vendor_ranking_signal(product):
+    """0..1 from the annotated vendor ranking: tier and premium status count equally."""
+    tier_part = (4 - min(max(product.tier_rank, 0), 4)) / 4
+    premium_part = 1.0 if product.premium_order == 0 else 0.0
+    return (tier_part + premium_part) / 2
+
+
+def blend_product_ranking(products, relevance):
+    """
+    Order annotated products by relevance (normalized to the best hit) blended with
+    vendor standing, falling back to reputation, points and recency on ties.
+    """
+    best = max(relevance.values(), default=0) or 1
+
+    def sort_key(product):
+        score = (
+            (1 - VENDOR_RANKING_WEIGHT) * relevance.get(product.pk, 0) / best
+            + VENDOR_RANKING_WEIGHT * vendor_ranking_signal(product)
+        )
+        return (
+            -score,
+            -product.vendor_reputation_score,
+            -product.vendor_total_points,
+            -product.created_at.timestamp(),
+        )
+
+    return sorted(products, key=sort_key)
+
+
+def _word_matcher(query):
+    """Predicate on a raw word: its analyzed form equals a query token (prefix for the last)."""
+    tokens = tokenize(query)
+    if not tokens:
+        return None
+    exact = set(tokens[:-1])
+    prefix = tokens[-1]
+
+    def matches(word):
+        analyzed = tokenize(word)
+        return bool(analyzed) and (analyzed[0] in exact or analyzed[0].startswith(prefix))
+    return matches
+
+
+def highlight_matches(text, query):
+    """Whether any query token occurs in `text` (used to pick the snippet field)."""
+    matches = _word_matcher(query)
+    return bool(matches and text and any(matches(word) for word in WORD_RE.findall(strip_tags(text))))
+
+
+def highlight(text, query, max_length=160, tag='mark'):
+    """
+    Plain-text snippet of `text` around the first query match, HTML-escaped, with
+    matching words wrapped in <mark>. Words are compared in analyzed form, so
+    spelling variants and inflections are highlighted too.
+    """
+    plain = ' '.join(strip_tags(text or '').split())
+    if not plain:
+        return ''
+    matches = _word_matcher(query)
+    if matches is None:
+        return escape(plain[:max_length])
+
+    hits = [word for word in WORD_RE.finditer(plain) if matches(word.group(0))]
+    start = 0
+    if hits and hits[0].start() > max_length // 3:
+        start = plain.rfind(' ', 0, hits[0].start() - max_length // 3) + 1
+    end = min(len(plain), start + max_length)
+    if end < len(plain):
+        space = plain.rfind(' ', start, end)
+        if space > start:
+            end = space
+
+    parts = []
+    position = start
+    for hit in hits:
+        if hit.start() < start:
+            continue
+        if hit.end() > end:
+            break
+        parts.append(escape(plain[position:hit.start()]))
+        parts.append(f'<{tag}>{escape(hit.group(0))}</{tag}>')
+        position = hit.end()
+    parts.append(escape(plain[position:end]))
+    snippet = ''.join(parts)
+    if start > 0:
+        snippet = '…' + snippet
+    if end < len(plain):
+        snippet = snippet + '…'
+    return snippet
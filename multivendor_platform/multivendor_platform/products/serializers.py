@@ -1,6 +1,5 @@
 # products/serializers.py
 from rest_framework import serializers
-from django.db import connection
 from .models import (
     Product,
     Category,
@@ -17,9 +16,10 @@ from .models import (
 )
 from gamification.models import EarnedBadge
 from gamification.services import GamificationService
-from .utils import build_absolute_uri, log_debug
-import json
-import time
+from multivendor_platform.instrumentation import TimedSerializerMixin
+from .media_manifest import file_exists
+from .utils import build_absolute_uri
+from .image_variants import variant_urls
 
 class SubcategoryField(serializers.Field):
     """
@@ -86,8 +86,7 @@ class DepartmentSerializer(serializers.ModelSerializer):
         if not image_field:
             return None
         
-        storage = image_field.storage
-        if not storage.exists(image_field.name):
+        if not file_exists(image_field):
             return None
         
         request = self.context.get('request')
@@ -99,8 +98,7 @@ class DepartmentSerializer(serializers.ModelSerializer):
         if not og_image_field:
             return None
         
-        storage = og_image_field.storage
-        if not storage.exists(og_image_field.name):
+        if not file_exists(og_image_field):
             return None
         
         request = self.context.get('request')
@@ -123,8 +121,7 @@ class CategorySerializer(serializers.ModelSerializer):
         if not image_field:
             return None
         
-        storage = image_field.storage
-        if not storage.exists(image_field.name):
+        if not file_exists(image_field):
             return None
         
         request = self.context.get('request')
@@ -136,8 +133,7 @@ class CategorySerializer(serializers.ModelSerializer):
         if not og_image_field:
             return None
         
-        storage = og_image_field.storage
-        if not storage.exists(og_image_field.name):
+        if not file_exists(og_image_field):
             return None
         
         request = self.context.get('request')
@@ -161,8 +157,7 @@ class SubcategorySerializer(serializers.ModelSerializer):
         if not image_field:
             return None
         
-        storage = image_field.storage
-        if not storage.exists(image_field.name):
+        if not file_exists(image_field):
             return None
         
         request = self.context.get('request')
@@ -174,8 +169,7 @@ class SubcategorySerializer(serializers.ModelSerializer):
         if not og_image_field:
             return None
         
-        storage = og_image_field.storage
-        if not storage.exists(og_image_field.name):
+        if not file_exists(og_image_field):
             return None
         
         request = self.context.get('request')
@@ -201,20 +195,25 @@ class ProductFeatureSerializer(serializers.ModelSerializer):
 
 class ProductImageSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField(read_only=True)
+    variants = serializers.SerializerMethodField(read_only=True)
     
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'image_url', 'is_primary', 'sort_order', 'created_at', 'updated_at']
+        fields = ['id', 'image', 'image_url', 'variants', 'is_primary', 'sort_order', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
     
+    def get_variants(self, obj):
+        """Responsive variants as {format: {'urls': {width: url}, 'srcset': ...}}; {} until generated"""
+        request = self.context.get('request')
+        return variant_urls(obj.variants, lambda url: build_absolute_uri(request, url))
+    
     def get_image_url(self, obj):
         """Return the full URL of the image"""
         image_field = getattr(obj, 'image', None)
         if not image_field:
             return None
         
-        storage = image_field.storage
-        if not storage.exists(image_field.name):
+        if not file_exists(image_field):
             return None
         
         request = self.context.get('request')
@@ -251,8 +250,7 @@ class LabelSerializer(serializers.ModelSerializer):
         if not og_image_field:
             return None
         
-        storage = og_image_field.storage
-        if not storage.exists(og_image_field.name):
+        if not file_exists(og_image_field):
             return None
         
         request = self.context.get('request')
@@ -271,11 +269,15 @@ class LabelGroupSerializer(serializers.ModelSerializer):
         ]
 
     def _filter_labels(self, obj):
+        # LabelGroupViewSet resolves every group's labels in one query
+        labels_by_group = self.context.get('labels_by_group')
+        if labels_by_group is not None:
+            return labels_by_group.get(obj.pk, [])
         subcategory_id = self.context.get('subcategory_id')
-        return obj.get_labels_for_subcategory(subcategory_id)
+        return list(obj.get_labels_for_subcategory(subcategory_id))
 
     def get_label_count(self, obj):
-        return self._filter_labels(obj).count()
+        return len(self._filter_labels(obj))
 
     def get_labels(self, obj):
         return LabelMinimalSerializer(
@@ -492,7 +494,7 @@ class ProductUploadRequestCreateSerializer(serializers.ModelSerializer):
         validated_data['supplier'] = supplier
         return super().create(validated_data)
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     vendor_name = serializers.SerializerMethodField()
     vendor_badges = serializers.SerializerMethodField()
     vendor_tier = serializers.SerializerMethodField()
@@ -507,11 +509,14 @@ class ProductSerializer(serializers.ModelSerializer):
     breadcrumb_hierarchy = serializers.SerializerMethodField(read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
     primary_image = serializers.SerializerMethodField(read_only=True)
+    primary_image_variants = serializers.SerializerMethodField(read_only=True)
     og_image_url = serializers.SerializerMethodField(read_only=True)
     labels = LabelMinimalSerializer(many=True, read_only=True)
     promotional_labels = serializers.SerializerMethodField()
     category_request = serializers.SerializerMethodField(read_only=True)
     features = ProductFeatureSerializer(many=True, read_only=True)
+    comment_count = serializers.ReadOnlyField(source='approved_comment_count')
+    average_rating = serializers.ReadOnlyField()
     # Override subcategories field - view will handle conversion, so we skip validation
     subcategories = SubcategoryField(write_only=True, required=False)
     
@@ -521,10 +526,11 @@ class ProductSerializer(serializers.ModelSerializer):
             'id', 'vendor', 'vendor_name', 'subcategories', 'subcategory_name', 'subcategory_details',
             'primary_category', 'category_name', 'category_slug',
             'name', 'slug', 'description', 'price', 'stock', 'image', 'images', 'primary_image',
+            'primary_image_width', 'primary_image_height', 'primary_image_variants',
             'image_alt_text', 'og_image', 'og_image_url', 'meta_title', 'meta_description',
             'canonical_url', 'schema_markup', 'is_active', 'approval_status', 'is_marketplace_hidden', 'marketplace_hide_reason', 'category_path', 'breadcrumb_hierarchy',
             'labels', 'promotional_labels', 'category_request', 'availability_status', 'condition',
-            'origin', 'lead_time_days', 'features',
+            'origin', 'lead_time_days', 'features', 'comment_count', 'average_rating',
             'vendor_badges', 'vendor_tier', 'vendor_reputation_score', 'vendor_total_points', 'vendor_is_premium',
             'created_at', 'updated_at'
         ]
@@ -592,11 +598,6 @@ class ProductSerializer(serializers.ModelSerializer):
         return full_name or obj.vendor.username
 
     def get_vendor_badges(self, obj):
-        # #region agent log
-        initial_queries = len(connection.queries)
-        start_time = time.time()
-        # #endregion agent log
-        
         vendor = getattr(obj, 'vendor', None)
         if not vendor:
             return []
@@ -625,24 +626,6 @@ class ProductSerializer(serializers.ModelSerializer):
             for eb in badges
         ]
         
-        # #region agent log
-        queries_used = len(connection.queries) - initial_queries
-        elapsed = time.time() - start_time
-        log_debug(
-            'debug-session',
-            'post-fix',
-            'C',
-            'products/serializers.py:get_vendor_badges',
-            'Vendor badges queried',
-            {
-                'product_id': obj.id,
-                'queries_count': queries_used,
-                'time_ms': round(elapsed * 1000, 2),
-                'used_prefetch': hasattr(vendor_profile, 'earned_badges')
-            }
-        )
-        # #endregion agent log
-        
         return result
 
     def get_vendor_name(self, obj):
@@ -707,65 +690,16 @@ class ProductSerializer(serializers.ModelSerializer):
         return category.slug if category else None
     
     def get_primary_image(self, obj):
-        """Return the URL of the primary image"""
-        import json
-        import time
-        log_path = '/media/jalal/New Volume/project/mulitvendor_platform/.cursor/debug.log'
-        
-        # #region agent log
-        try:
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json.dumps({'location': 'products/serializers.py:591', 'message': 'ProductSerializer.get_primary_image entry', 'data': {'productId': obj.id, 'productName': obj.name}, 'timestamp': int(time.time() * 1000), 'sessionId': 'debug-session', 'runId': 'run1', 'hypothesisId': 'A'}) + '\n')
-        except: pass
-        # #endregion
-        
-        primary_img = obj.primary_image
-        
-        # #region agent log
-        try:
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json.dumps({'location': 'products/serializers.py:595', 'message': 'ProductSerializer.get_primary_image property accessed', 'data': {'hasPrimaryImg': bool(primary_img), 'primaryImgType': type(primary_img).__name__ if primary_img else None, 'hasUrl': hasattr(primary_img, 'url') if primary_img else False}, 'timestamp': int(time.time() * 1000), 'sessionId': 'debug-session', 'runId': 'run1', 'hypothesisId': 'C'}) + '\n')
-        except: pass
-        # #endregion
-        
-        if primary_img:
-            try:
-                relative_url = primary_img.url if hasattr(primary_img, 'url') else None
-                # #region agent log
-                try:
-                    with open(log_path, 'a', encoding='utf-8') as f:
-                        f.write(json.dumps({'location': 'products/serializers.py:600', 'message': 'ProductSerializer.get_primary_image relative_url', 'data': {'relativeUrl': relative_url, 'hasRequest': 'request' in self.context}, 'timestamp': int(time.time() * 1000), 'sessionId': 'debug-session', 'runId': 'run1', 'hypothesisId': 'B'}) + '\n')
-                except: pass
-                # #endregion
-                
-                request = self.context.get('request')
-                absolute_url = build_absolute_uri(request, relative_url)
-                
-                # #region agent log
-                try:
-                    with open(log_path, 'a', encoding='utf-8') as f:
-                        f.write(json.dumps({'location': 'products/serializers.py:607', 'message': 'ProductSerializer.get_primary_image absolute_url', 'data': {'absoluteUrl': absolute_url, 'urlLength': len(absolute_url) if absolute_url else 0}, 'timestamp': int(time.time() * 1000), 'sessionId': 'debug-session', 'runId': 'run1', 'hypothesisId': 'B'}) + '\n')
-                except: pass
-                # #endregion
-                
-                return absolute_url
-            except Exception as e:
-                # #region agent log
-                try:
-                    with open(log_path, 'a', encoding='utf-8') as f:
-                        f.write(json.dumps({'location': 'products/serializers.py:612', 'message': 'ProductSerializer.get_primary_image error', 'data': {'error': str(e), 'errorType': type(e).__name__}, 'timestamp': int(time.time() * 1000), 'sessionId': 'debug-session', 'runId': 'run1', 'hypothesisId': 'D'}) + '\n')
-                except: pass
-                # #endregion
-                return None
-        
-        # #region agent log
-        try:
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json.dumps({'location': 'products/serializers.py:618', 'message': 'ProductSerializer.get_primary_image returning None', 'data': {}, 'timestamp': int(time.time() * 1000), 'sessionId': 'debug-session', 'runId': 'run1', 'hypothesisId': 'A'}) + '\n')
-        except: pass
-        # #endregion
-        
-        return None
+        """Return the URL of the primary image (denormalized on Product, no gallery query)"""
+        if not obj.primary_image_url:
+            return None
+        request = self.context.get('request')
+        return build_absolute_uri(request, obj.primary_image_url)
+    
+    def get_primary_image_variants(self, obj):
+        """Responsive variants of the primary image, same shape as ProductImageSerializer.variants"""
+        request = self.context.get('request')
+        return variant_urls(obj.primary_image_variants, lambda url: build_absolute_uri(request, url))
     
     def get_og_image_url(self, obj):
         """Return the full URL of the Open Graph image"""
@@ -773,42 +707,19 @@ class ProductSerializer(serializers.ModelSerializer):
         if not og_image_field:
             return None
         
-        storage = og_image_field.storage
-        if not storage.exists(og_image_field.name):
+        if not file_exists(og_image_field):
             return None
         
         request = self.context.get('request')
         return build_absolute_uri(request, og_image_field.url)
 
     def get_promotional_labels(self, obj):
-        # #region agent log
-        initial_queries = len(connection.queries)
-        start_time = time.time()
-        # #endregion agent log
-        
         result = LabelMinimalSerializer(
             obj.get_promotional_labels(),
             many=True,
             context=self.context
         ).data
         
-        # #region agent log
-        queries_used = len(connection.queries) - initial_queries
-        elapsed = time.time() - start_time
-        log_debug(
-            'debug-session',
-            'post-fix',
-            'D',
-            'products/serializers.py:get_promotional_labels',
-            'Promotional labels queried',
-            {
-                'product_id': obj.id,
-                'queries_count': queries_used,
-                'time_ms': round(elapsed * 1000, 2)
-            }
-        )
-        # #endregion agent log
-        
         return result
     
     def get_category_request(self, obj):
@@ -1000,6 +911,30 @@ class ProductSerializer(serializers.ModelSerializer):
         
         return value
 
+class ProductImportSerializer(serializers.ModelSerializer):
+    """
+    Row validation for the bulk importer (products/importing.py): the field rules of
+    ProductSerializer without its relations, which the importer resolves in bulk.
+    One instance validates every row through run_validation().
+    """
+
+    class Meta:
+        model = Product
+        fields = [
+            'name', 'description', 'price', 'stock', 'image_alt_text',
+            'meta_title', 'meta_description', 'canonical_url', 'schema_markup',
+            'approval_status', 'is_marketplace_hidden', 'marketplace_hide_reason',
+            'availability_status', 'condition', 'origin', 'lead_time_days',
+        ]
+        extra_kwargs = ProductSerializer.Meta.extra_kwargs
+
+    validate = ProductSerializer.validate
+    validate_name = ProductSerializer.validate_name
+    validate_description = ProductSerializer.validate_description
+    validate_price = ProductSerializer.validate_price
+    validate_stock = ProductSerializer.validate_stock
+
+
 class ProductCommentSerializer(serializers.ModelSerializer):
     """
     Serializer for product comments
@@ -1046,7 +981,7 @@ class ProductCommentCreateSerializer(serializers.ModelSerializer):
         validated_data['author'] = self.context['request'].user
         return super().create(validated_data)
 
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductDetailSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Detailed serializer for individual products including comments
     """
@@ -1064,10 +999,11 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     breadcrumb_hierarchy = serializers.SerializerMethodField(read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
     primary_image = serializers.SerializerMethodField(read_only=True)
+    primary_image_variants = serializers.SerializerMethodField(read_only=True)
     og_image_url = serializers.SerializerMethodField(read_only=True)
     comments = ProductCommentSerializer(many=True, read_only=True)
-    comment_count = serializers.SerializerMethodField()
-    average_rating = serializers.SerializerMethodField()
+    comment_count = serializers.ReadOnlyField(source='approved_comment_count')
+    average_rating = serializers.ReadOnlyField()
     labels = LabelMinimalSerializer(many=True, read_only=True)
     promotional_labels = serializers.SerializerMethodField()
     features = ProductFeatureSerializer(many=True, read_only=True)
@@ -1078,6 +1014,7 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             'id', 'vendor', 'vendor_name', 'subcategories', 'subcategory_name', 'subcategory_details',
             'primary_category', 'category_name', 'category_slug',
             'name', 'slug', 'description', 'price', 'stock', 'image', 'images', 'primary_image',
+            'primary_image_width', 'primary_image_height', 'primary_image_variants',
             'image_alt_text', 'og_image', 'og_image_url', 'meta_title', 'meta_description',
             'canonical_url', 'schema_markup', 'is_active', 'approval_status', 'is_marketplace_hidden', 'marketplace_hide_reason', 'category_path', 'breadcrumb_hierarchy',
             'comments', 'comment_count', 'average_rating',
@@ -1100,11 +1037,6 @@ class ProductDetailSerializer(serializers.ModelSerializer):
         return full_name or obj.vendor.username
 
     def get_vendor_badges(self, obj):
-        # #region agent log
-        initial_queries = len(connection.queries)
-        start_time = time.time()
-        # #endregion agent log
-        
         vendor = getattr(obj, 'vendor', None)
         if not vendor:
             return []
@@ -1133,24 +1065,6 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             for eb in badges
         ]
         
-        # #region agent log
-        queries_used = len(connection.queries) - initial_queries
-        elapsed = time.time() - start_time
-        log_debug(
-            'debug-session',
-            'post-fix',
-            'C',
-            'products/serializers.py:ProductDetailSerializer:get_vendor_badges',
-            'Vendor badges queried',
-            {
-                'product_id': obj.id,
-                'queries_count': queries_used,
-                'time_ms': round(elapsed * 1000, 2),
-                'used_prefetch': hasattr(vendor_profile, 'earned_badges')
-            }
-        )
-        # #endregion agent log
-        
         return result
 
     def _get_engagement_payload(self, obj):
@@ -1196,65 +1110,16 @@ class ProductDetailSerializer(serializers.ModelSerializer):
         return bool(payload['is_premium'])
 
     def get_primary_image(self, obj):
-        """Return the URL of the primary image"""
-        import json
-        import time
-        log_path = '/media/jalal/New Volume/project/mulitvendor_platform/.cursor/debug.log'
-        
-        # #region agent log
-        try:
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json.dumps({'location': 'products/serializers.py:1019', 'message': 'ProductDetailSerializer.get_primary_image entry', 'data': {'productId': obj.id, 'productName': obj.name}, 'timestamp': int(time.time() * 1000), 'sessionId': 'debug-session', 'runId': 'run1', 'hypothesisId': 'A'}) + '\n')
-        except: pass
-        # #endregion
-        
-        primary_img = obj.primary_image
-        
-        # #region agent log
-        try:
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json.dumps({'location': 'products/serializers.py:1023', 'message': 'ProductDetailSerializer.get_primary_image property accessed', 'data': {'hasPrimaryImg': bool(primary_img), 'primaryImgType': type(primary_img).__name__ if primary_img else None, 'hasUrl': hasattr(primary_img, 'url') if primary_img else False}, 'timestamp': int(time.time() * 1000), 'sessionId': 'debug-session', 'runId': 'run1', 'hypothesisId': 'C'}) + '\n')
-        except: pass
-        # #endregion
-        
-        if primary_img:
-            try:
-                relative_url = primary_img.url if hasattr(primary_img, 'url') else None
-                # #region agent log
-                try:
-                    with open(log_path, 'a', encoding='utf-8') as f:
-                        f.write(json.dumps({'location': 'products/serializers.py:1028', 'message': 'ProductDetailSerializer.get_primary_image relative_url', 'data': {'relativeUrl': relative_url, 'hasRequest': 'request' in self.context}, 'timestamp': int(time.time() * 1000), 'sessionId': 'debug-session', 'runId': 'run1', 'hypothesisId': 'B'}) + '\n')
-                except: pass
-                # #endregion
-                
-                request = self.context.get('request')
-                absolute_url = build_absolute_uri(request, relative_url)
-                
-                # #region agent log
-                try:
-                    with open(log_path, 'a', encoding='utf-8') as f:
-                        f.write(json.dumps({'location': 'products/serializers.py:1035', 'message': 'ProductDetailSerializer.get_primary_image absolute_url', 'data': {'absoluteUrl': absolute_url, 'urlLength': len(absolute_url) if absolute_url else 0}, 'timestamp': int(time.time() * 1000), 'sessionId': 'debug-session', 'runId': 'run1', 'hypothesisId': 'B'}) + '\n')
-                except: pass
-                # #endregion
-                
-                return absolute_url
-            except Exception as e:
-                # #region agent log
-                try:
-                    with open(log_path, 'a', encoding='utf-8') as f:
-                        f.write(json.dumps({'location': 'products/serializers.py:1042', 'message': 'ProductDetailSerializer.get_primary_image error', 'data': {'error': str(e), 'errorType': type(e).__name__}, 'timestamp': int(time.time() * 1000), 'sessionId': 'debug-session', 'runId': 'run1', 'hypothesisId': 'D'}) + '\n')
-                except: pass
-                # #endregion
-                return None
-        
-        # #region agent log
-        try:
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json.dumps({'location': 'products/serializers.py:1048', 'message': 'ProductDetailSerializer.get_primary_image returning None', 'data': {}, 'timestamp': int(time.time() * 1000), 'sessionId': 'debug-session', 'runId': 'run1', 'hypothesisId': 'A'}) + '\n')
-        except: pass
-        # #endregion
-        
-        return None
+        """Return the URL of the primary image (denormalized on Product, no gallery query)"""
+        if not obj.primary_image_url:
+            return None
+        request = self.context.get('request')
+        return build_absolute_uri(request, obj.primary_image_url)
+    
+    def get_primary_image_variants(self, obj):
+        """Responsive variants of the primary image, same shape as ProductImageSerializer.variants"""
+        request = self.context.get('request')
+        return variant_urls(obj.primary_image_variants, lambda url: build_absolute_uri(request, url))
     
     def get_og_image_url(self, obj):
         """Return the full URL of the Open Graph image"""
@@ -1262,38 +1127,15 @@ class ProductDetailSerializer(serializers.ModelSerializer):
         if not og_image_field:
             return None
         
-        storage = og_image_field.storage
-        if not storage.exists(og_image_field.name):
+        if not file_exists(og_image_field):
             return None
         
         request = self.context.get('request')
         return build_absolute_uri(request, og_image_field.url)
 
     def get_promotional_labels(self, obj):
-        # #region agent log
-        initial_queries = len(connection.queries)
-        start_time = time.time()
-        # #endregion agent log
-        
         result = LabelMinimalSerializer(obj.get_promotional_labels(), many=True, context=self.context).data
         
-        # #region agent log
-        queries_used = len(connection.queries) - initial_queries
-        elapsed = time.time() - start_time
-        log_debug(
-            'debug-session',
-            'post-fix',
-            'D',
-            'products/serializers.py:ProductDetailSerializer:get_promotional_labels',
-            'Promotional labels queried',
-            {
-                'product_id': obj.id,
-                'queries_count': queries_used,
-                'time_ms': round(elapsed * 1000, 2)
-            }
-        )
-        # #endregion agent log
-        
         return result
     
     def to_representation(self, instance):
@@ -1307,81 +1149,4 @@ class ProductDetailSerializer(serializers.ModelSerializer):
         is_staff = bool(user and getattr(user, 'is_staff', False))
         if not (is_owner or is_staff):
             data.pop('marketplace_hide_reason', None)
-        return data
-    
-    def get_comment_count(self, obj):
-        """Get count of approved comments"""
-        # #region agent log
-        initial_queries = len(connection.queries)
-        start_time = time.time()
-        # #endregion agent log
-        
-        # Use prefetched comments if available
-        if hasattr(obj, 'comments'):
-            approved_comments = [c for c in obj.comments.all() if c.is_approved]
-            result = len(approved_comments)
-        else:
-            result = obj.comments.filter(is_approved=True).count()
-        
-        # #region agent log
-        queries_used = len(connection.queries) - initial_queries
-        elapsed = time.time() - start_time
-        log_debug(
-            'debug-session',
-            'post-fix',
-            'E',
-            'products/serializers.py:get_comment_count',
-            'Comment count queried',
-            {
-                'product_id': obj.id,
-                'queries_count': queries_used,
-                'time_ms': round(elapsed * 1000, 2),
-                'used_prefetch': hasattr(obj, 'comments')
-            }
-        )
-        # #endregion agent log
-        
-        return result
-    
-    def get_average_rating(self, obj):
-        """Get average rating from approved comments"""
-        # #region agent log
-        initial_queries = len(connection.queries)
-        start_time = time.time()
-        # #endregion agent log
-        
-        # Use prefetched comments if available
-        if hasattr(obj, 'comments'):
-            approved_comments = [c for c in obj.comments.all() if c.is_approved]
-            if approved_comments:
-                total = sum([comment.rating for comment in approved_comments])
-                result = round(total / len(approved_comments), 1)
-            else:
-                result = 0
-        else:
-            approved_comments = obj.comments.filter(is_approved=True)
-            if approved_comments.exists():
-                total = sum([comment.rating for comment in approved_comments])
-                result = round(total / approved_comments.count(), 1)
-            else:
-                result = 0
-        
-        # #region agent log
-        queries_used = len(connection.queries) - initial_queries
-        elapsed = time.time() - start_time
-        log_debug(
-            'debug-session',
-            'post-fix',
-            'E',
-            'products/serializers.py:get_average_rating',
-            'Average rating queried',
-            {
-                'product_id': obj.id,
-                'queries_count': queries_used,
-                'time_ms': round(elapsed * 1000, 2),
-                'used_prefetch': hasattr(obj, 'comments')
-            }
-        )
-        # #endregion agent log
-        
-        return result
\ No newline at end of file
+        return data
\ No newline at end of file
@@ -1,10 +1,28 @@
 # products/signals.py
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models import FileField, QuerySet
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.models import User
-from .models import ProductUploadRequest
-from users.models import UserActivity
+from .models import (
+    ProductUploadRequest,
+    Product,
+    ProductImage,
+    ProductFeature,
+    ProductComment,
+    Label,
+    LabelGroup,
+    Category,
+    Subcategory,
+    Department,
+)
+from .cache import bump_generation, SCOPE_PRODUCTS, SCOPE_LABELS, SCOPE_TAXONOMY, SCOPE_VENDORS
+from .sitemap_files import SCOPE_BLOG_SITEMAP, SCOPE_SUPPLIER_SITEMAP
+from .slugs import SCOPE_CATEGORY_SLUGS, SCOPE_DEPARTMENT_SLUGS, SCOPE_PRODUCT_SLUGS, SCOPE_SUBCATEGORY_SLUGS
+from users.models import UserActivity, VendorProfile
+from blog.models import BlogPost
+from gamification.models import SupplierEngagement, VendorRanking
 
 
 @receiver(post_save, sender=ProductUploadRequest)
@@ -28,3 +46,350 @@ def log_product_upload_request(sender, instance, created, **kwargs):
             object_id=instance.id
         )
 
+
+
+# --- Response cache invalidation (see products/cache.py) ---
+
+CACHE_SCOPES_BY_MODEL = {
+    Product: (SCOPE_PRODUCTS,),
+    ProductImage: (SCOPE_PRODUCTS,),
+    ProductFeature: (SCOPE_PRODUCTS,),
+    ProductComment: (SCOPE_PRODUCTS,),
+    Label: (SCOPE_LABELS, SCOPE_PRODUCTS),
+    LabelGroup: (SCOPE_LABELS,),
+    Category: (SCOPE_TAXONOMY, SCOPE_PRODUCTS),
+    Subcategory: (SCOPE_TAXONOMY, SCOPE_PRODUCTS),
+    Department: (SCOPE_TAXONOMY, SCOPE_PRODUCTS),
+    SupplierEngagement: (SCOPE_VENDORS,),
+    VendorRanking: (SCOPE_VENDORS,),
+}
+
+CACHE_SCOPES_BY_THROUGH = {
+    Product.labels.through: (SCOPE_PRODUCTS, SCOPE_LABELS),
+    Product.subcategories.through: (SCOPE_PRODUCTS,),
+    Label.subcategories.through: (SCOPE_LABELS,),
+    Label.categories.through: (SCOPE_LABELS,),
+    Label.departments.through: (SCOPE_LABELS,),
+    LabelGroup.subcategories.through: (SCOPE_LABELS,),
+    Category.departments.through: (SCOPE_TAXONOMY, SCOPE_PRODUCTS),
+    Subcategory.categories.through: (SCOPE_TAXONOMY, SCOPE_PRODUCTS),
+}
+
+
+def _bump_after_commit(scopes):
+    # Bump now and again once the write is visible, so a concurrent request that
+    # cached pre-commit data under the intermediate generation is discarded too
+    bump_generation(*scopes)
+    transaction.on_commit(lambda: bump_generation(*scopes))
+
+
+def invalidate_response_cache(sender, **kwargs):
+    _bump_after_commit(CACHE_SCOPES_BY_MODEL[sender])
+
+
+def invalidate_response_cache_m2m(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _bump_after_commit(CACHE_SCOPES_BY_THROUGH[sender])
+
+
+for _model in CACHE_SCOPES_BY_MODEL:
+    post_save.connect(invalidate_response_cache, sender=_model, dispatch_uid=f'respcache_save_{_model.__name__}')
+    post_delete.connect(invalidate_response_cache, sender=_model, dispatch_uid=f'respcache_delete_{_model.__name__}')
+
+for _through in CACHE_SCOPES_BY_THROUGH:
+    m2m_changed.connect(invalidate_response_cache_m2m, sender=_through, dispatch_uid=f'respcache_m2m_{_through.__name__}')
+
+
+# --- Label inverted index maintenance (see products/label_index.py) ---
+# Applied once the write commits: other processes rebuild from the database when
+# they see the shared generation move, so it must not move before the rows exist.
+
+@receiver(m2m_changed, sender=Product.labels.through)
+def sync_label_index_on_labels_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    from .label_index import label_index
+
+    if action in ('post_add', 'post_remove') and pk_set:
+        if reverse:
+            pairs = [(instance.pk, product_id) for product_id in pk_set]
+        else:
+            pairs = [(label_id, instance.pk) for label_id in pk_set]
+        apply = label_index.add_pairs if action == 'post_add' else label_index.remove_pairs
+        transaction.on_commit(lambda: apply(pairs))
+    elif action == 'post_clear':
+        transaction.on_commit(label_index.invalidate)
+
+
+@receiver(post_delete, sender=Product)
+def sync_label_index_on_product_delete(sender, instance, **kwargs):
+    from .label_index import label_index
+
+    product_id = instance.pk
+    transaction.on_commit(lambda: label_index.remove_product(product_id))
+
+
+@receiver(post_save, sender=Label)
+def sync_label_index_on_label_save(sender, instance, update_fields=None, **kwargs):
+    from .label_index import label_index
+
+    if update_fields is not None and 'slug' not in update_fields:
+        return
+    label_id, slug = instance.pk, instance.slug
+    transaction.on_commit(lambda: label_index.set_label_slug(label_id, slug))
+
+
+@receiver(post_delete, sender=Label)
+def sync_label_index_on_label_delete(sender, instance, **kwargs):
+    from .label_index import label_index
+
+    label_id = instance.pk
+    transaction.on_commit(lambda: label_index.remove_label(label_id))
+
+
+# --- Label.product_count maintenance (see products/label_counts.py) ---
+
+@receiver(m2m_changed, sender=Product.labels.through)
+def sync_label_counts_on_labels_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    from .label_counts import add_deltas, add_for_products
+
+    if action == 'post_add' and pk_set:
+        # post_add only lists links that were actually created
+        if reverse:
+            add_deltas({instance.pk: Product.objects.filter(pk__in=pk_set, is_active=True).count()})
+        elif instance.is_active:
+            add_deltas({label_id: 1 for label_id in pk_set})
+    elif action == 'pre_remove' and pk_set:
+        # pre_remove lists what was asked for, so look up the links that exist
+        if reverse:
+            removed = sender.objects.filter(label_id=instance.pk, product_id__in=pk_set, product__is_active=True)
+            add_deltas({instance.pk: -removed.count()})
+        elif instance.is_active:
+            removed = sender.objects.filter(product_id=instance.pk, label_id__in=pk_set)
+            add_deltas({label_id: -1 for label_id in removed.values_list('label_id', flat=True)})
+    elif action == 'pre_clear':
+        if reverse:
+            removed = sender.objects.filter(label_id=instance.pk, product__is_active=True)
+            add_deltas({instance.pk: -removed.count()})
+        elif instance.is_active:
+            add_for_products([instance.pk], -1)
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_activity(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding or (update_fields is not None and 'is_active' not in update_fields):
+        return
+    instance._label_count_was_active = (
+        Product.objects.filter(pk=instance.pk).values_list('is_active', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Product)
+def sync_label_counts_on_product_save(sender, instance, **kwargs):
+    from .label_counts import add_for_products
+
+    was_active = instance.__dict__.pop('_label_count_was_active', None)
+    if was_active is not None and was_active != instance.is_active:
+        add_for_products([instance.pk], 1 if instance.is_active else -1)
+
+
+@receiver(pre_delete, sender=Product)
+def sync_label_counts_on_product_delete(sender, instance, **kwargs):
+    from .label_counts import add_for_products
+
+    # The through rows go with the product without an m2m_changed signal
+    if instance.is_active:
+        add_for_products([instance.pk], -1)
+
+
+# --- Full-text search index maintenance (see products/search.py) ---
+# After commit: the vector UPDATE stays out of the caller's transaction, and neither
+# backend publishes a row that may still roll back.
+
+def sync_search_index_on_save(sender, instance, **kwargs):
+    from .search import document_type_for, get_search_backend
+
+    document_type = document_type_for(instance)
+    transaction.on_commit(lambda: get_search_backend().index(document_type, instance))
+
+
+def sync_search_index_on_delete(sender, instance, **kwargs):
+    from .search import document_type_for, get_search_backend
+
+    document_type, pk = document_type_for(instance), instance.pk
+    transaction.on_commit(lambda: get_search_backend().remove(document_type, pk))
+
+
+for _model in (Product, BlogPost):
+    post_save.connect(sync_search_index_on_save, sender=_model, dispatch_uid=f'search_save_{_model.__name__}')
+    post_delete.connect(sync_search_index_on_delete, sender=_model, dispatch_uid=f'search_delete_{_model.__name__}')
+
+
+# --- Typeahead index maintenance (see products/suggest.py) ---
+
+def _suggest_entry(instance):
+    """(kind, name, slug, visible) of a suggestible instance."""
+    from .suggest import KIND_PRODUCT, KIND_SUBCATEGORY, KIND_LABEL, KIND_SUPPLIER
+
+    if isinstance(instance, Product):
+        visible = (
+            instance.approval_status == Product.APPROVAL_STATUS_APPROVED
+            and instance.is_active
+            and not instance.is_marketplace_hidden
+        )
+        return KIND_PRODUCT, instance.name, instance.slug, visible
+    if isinstance(instance, Subcategory):
+        return KIND_SUBCATEGORY, instance.name, instance.slug, instance.is_active
+    if isinstance(instance, Label):
+        return KIND_LABEL, instance.name, instance.slug, instance.is_active
+    return KIND_SUPPLIER, instance.store_name, None, instance.is_approved
+
+
+def sync_suggest_index_on_save(sender, instance, **kwargs):
+    from .suggest import suggest_index
+
+    # After commit, like the label and search indexes: the shared generation must
+    # not move before the row is visible to the processes that rebuild from it
+    kind, name, slug, visible = _suggest_entry(instance)
+    pk = instance.pk
+    if visible:
+        transaction.on_commit(lambda: suggest_index.upsert(kind, pk, name, slug))
+    else:
+        transaction.on_commit(lambda: suggest_index.remove(kind, pk))
+
+
+def sync_suggest_index_on_delete(sender, instance, **kwargs):
+    from .suggest import suggest_index
+
+    kind, _name, _slug, _visible = _suggest_entry(instance)
+    pk = instance.pk
+    transaction.on_commit(lambda: suggest_index.remove(kind, pk))
+
+
+for _model in (Product, Subcategory, Label, VendorProfile):
+    post_save.connect(sync_suggest_index_on_save, sender=_model, dispatch_uid=f'suggest_save_{_model.__name__}')
+    post_delete.connect(sync_suggest_index_on_delete, sender=_model, dispatch_uid=f'suggest_delete_{_model.__name__}')
+
+
+# --- Denormalized primary image maintenance (see Product.refresh_primary_image) ---
+
+@receiver(post_delete, sender=ProductImage)
+def refresh_primary_image_on_image_delete(sender, instance, origin=None, **kwargs):
+    # Cascades from deleting the product itself have nothing left to update
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is Product:
+        return
+    product = Product.objects.filter(pk=instance.product_id).first()
+    if product is not None:
+        product.refresh_primary_image()
+
+
+# --- Rating aggregate maintenance (see products/ratings.py) ---
+
+@receiver(post_delete, sender=ProductComment)
+def subtract_rating_on_comment_delete(sender, instance, origin=None, **kwargs):
+    from .ratings import apply_rating_deltas, comment_contribution
+
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is Product or not instance.is_approved:
+        return
+    count, total = comment_contribution(instance.is_approved, instance.rating)
+    apply_rating_deltas(Product, {instance.product_id: (-count, -total)})
+
+
+# --- Media manifest maintenance (see products/media_manifest.py) ---
+
+def record_uploaded_files(sender, instance, **kwargs):
+    from .media_manifest import media_manifest
+
+    for field in sender._meta.concrete_fields:
+        if isinstance(field, FileField):
+            media_manifest.add(getattr(instance, field.attname).name)
+
+
+for _model in (Department, Category, Subcategory, Product, ProductImage, Label, BlogPost):
+    post_save.connect(record_uploaded_files, sender=_model, dispatch_uid=f'media_manifest_save_{_model.__name__}')
+
+
+# --- Responsive image variants (see products/image_variants.py) ---
+
+VARIANT_SOURCE_FIELDS = {
+    Department: ('image',),
+    Category: ('image',),
+    Subcategory: ('image',),
+    VendorProfile: ('logo', 'banner_image'),
+}
+
+
+def schedule_image_variants(sender, instance, update_fields=None, **kwargs):
+    from .image_variants import schedule
+
+    for field_name in VARIANT_SOURCE_FIELDS[sender]:
+        if update_fields is None or field_name in update_fields:
+            schedule(getattr(instance, field_name).name, instance, field_name)
+
+
+for _model in VARIANT_SOURCE_FIELDS:
+    post_save.connect(schedule_image_variants, sender=_model, dispatch_uid=f'image_variants_save_{_model.__name__}')
+
+
+@receiver(post_save, sender=ProductImage)
+def schedule_product_image_variants(sender, instance, **kwargs):
+    from .image_variants import schedule
+
+    # ProductImage.save clears the set when the file changes
+    if instance.image and not instance.variants:
+        schedule(instance.image.name, instance, 'image')
+
+
+@receiver(post_save, sender=Product)
+def schedule_legacy_image_variants(sender, instance, **kwargs):
+    from .image_variants import schedule
+
+    if instance.image and instance.primary_image_ref_id is None and not instance.primary_image_variants:
+        schedule(instance.image.name, instance, 'image')
+
+
+# --- Pre-generated sitemap files (see products/sitemap_files.py) ---
+
+SITEMAP_SCOPES_BY_MODEL = {
+    BlogPost: SCOPE_BLOG_SITEMAP,
+    VendorProfile: SCOPE_SUPPLIER_SITEMAP,
+}
+
+
+def mark_sitemap_changed(sender, **kwargs):
+    # Products and taxonomy already move the response cache scopes the sitemaps watch
+    bump_generation(SITEMAP_SCOPES_BY_MODEL[sender])
+
+
+for _model in SITEMAP_SCOPES_BY_MODEL:
+    post_save.connect(mark_sitemap_changed, sender=_model, dispatch_uid=f'sitemap_save_{_model.__name__}')
+    post_delete.connect(mark_sitemap_changed, sender=_model, dispatch_uid=f'sitemap_delete_{_model.__name__}')
+
+
+# --- Slug resolution cache (see products/slugs.py) ---
+
+SLUG_SCOPES_BY_MODEL = {
+    Product: SCOPE_PRODUCT_SLUGS,
+    Category: SCOPE_CATEGORY_SLUGS,
+    Subcategory: SCOPE_SUBCATEGORY_SLUGS,
+    Department: SCOPE_DEPARTMENT_SLUGS,
+}
+
+
+def invalidate_slugs_on_save(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'slug' not in update_fields:
+        return
+    # The slug as loaded (StoredSlugMixin.from_db); unknown when it was deferred
+    stored = instance.__dict__.get('_stored_slug')
+    if not created and (stored is None or stored != instance.slug):
+        _bump_after_commit((SLUG_SCOPES_BY_MODEL[sender],))
+    instance._stored_slug = instance.slug
+
+
+def invalidate_slugs_on_delete(sender, **kwargs):
+    _bump_after_commit((SLUG_SCOPES_BY_MODEL[sender],))
+
+
+for _model in SLUG_SCOPES_BY_MODEL:
+    post_save.connect(invalidate_slugs_on_save, sender=_model, dispatch_uid=f'slugs_save_{_model.__name__}')
+    post_delete.connect(invalidate_slugs_on_delete, sender=_model, dispatch_uid=f'slugs_delete_{_model.__name__}')
@@ -0,0 +1,325 @@
+# products/sitemap_files.py
+"""
+Pre-generated sitemap files.
+
+Rendering the sitemap classes on every crawl of /sitemap.xml scans every catalog
+table per hit. Instead, `generate()` writes the sitemaps to storage:
+
+    sitemaps/sitemap.xml              sitemap index, one <sitemap> per shard
+    sitemaps/products-0.xml.gz        gzipped shards of at most SITEMAP_SHARD_SIZE URLs
+    sitemaps/manifest.json            shard fingerprints, used by the next run
+
+A section's rows are sharded by primary key range (shard = pk // SITEMAP_SHARD_SIZE),
+so a row always lands in the same shard. Each run computes one grouped
+fingerprint query per section: row count, latest updated_at and pk sum per shard.
+Only shards whose fingerprint changed are rewritten, and shards that became empty
+are deleted.
+
+sitemap_index_view and sitemap_file_view (products/views.py) serve the files with
+Last-Modified. When the data scopes a section depends on have moved since the last
+run, the index view schedules a refresh in the background; `generate_sitemaps`
+does the same from cron.
+"""
+import gzip
+import json
+import logging
+import os
+import posixpath
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.db.models import Count, F, Max, QuerySet, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .cache import get_generations, SCOPE_PRODUCTS, SCOPE_TAXONOMY
+
+logger = logging.getLogger(__name__)
+
+SITEMAP_ROOT = 'sitemaps'
+INDEX_NAME = posixpath.join(SITEMAP_ROOT, 'sitemap.xml')
+MANIFEST_NAME = posixpath.join(SITEMAP_ROOT, 'manifest.json')
+DEFAULT_SHARD_SIZE = 50000  # The sitemaps.org limit per file
+
+# Generations bumped by signals.py for sections no response cache scope covers
+SCOPE_BLOG_SITEMAP = 'sitemap_blog'
+SCOPE_SUPPLIER_SITEMAP = 'sitemap_suppliers'
+
+
+def sections():
+    """{section name: (Sitemap class, data scopes that invalidate it)}"""
+    from blog.sitemaps import BlogSitemap
+    from users.sitemaps import SupplierSitemap
+
+    from .sitemaps import CategorySitemap, DepartmentSitemap, ProductSitemap, StaticViewSitemap, SubcategorySitemap
+
+    return {
+        'products': (ProductSitemap, (SCOPE_PRODUCTS,)),
+        'departments': (DepartmentSitemap, (SCOPE_TAXONOMY,)),
+        'categories': (CategorySitemap, (SCOPE_TAXONOMY,)),
+        'subcategories': (SubcategorySitemap, (SCOPE_TAXONOMY,)),
+        'blog': (BlogSitemap, (SCOPE_BLOG_SITEMAP,)),
+        'suppliers': (SupplierSitemap, (SCOPE_SUPPLIER_SITEMAP,)),
+        'static': (StaticViewSitemap, ()),
+    }
+
+
+def shard_size():
+    return getattr(settings, 'SITEMAP_SHARD_SIZE', DEFAULT_SHARD_SIZE)
+
+
+def shard_name(section, shard):
+    return posixpath.join(SITEMAP_ROOT, f'{section}-{shard}.xml.gz')
+
+
+def base_url():
+    return (getattr(settings, 'SITE_URL', '') or '').rstrip('/')
+
+
+def read_manifest(storage=None):
+    storage = storage or default_storage
+    try:
+        with storage.open(MANIFEST_NAME, 'rb') as manifest:
+            return json.loads(manifest.read().decode('utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def _replace(storage, name, content):
+    """Store `content` under exactly `name` (the manifest and index list fixed names)."""
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        path = None
+    if path is not None:
+        # Local storage: write a temporary file next to the target and rename it over,
+        # so readers never see a missing or partial file
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, prefix='.tmp-', delete=False) as handle:
+            for chunk in content.chunks():
+                handle.write(chunk)
+        os.chmod(handle.name, getattr(settings, 'FILE_UPLOAD_PERMISSIONS', None) or 0o644)
+        os.replace(handle.name, path)
+        return
+    if storage.exists(name):
+        storage.delete(name)
+    saved = storage.save(name, content)
+    if saved != name:
+        # Another process stored `name` between the delete and the save, from the
+        # same data; drop the copy under the name storage picked instead
+        storage.delete(saved)
+
+
+def _scopes():
+    return sorted({scope for _sitemap, scopes in sections().values() for scope in scopes})
+
+
+def is_stale(manifest):
+    """True if the data behind any section changed since `manifest` was written."""
+    if manifest is None:
+        return True
+    return manifest.get('generations') != {scope: str(value) for scope, value in get_generations(_scopes()).items()}
+
+
+# ----------------------------------------------------------------------
+# Generation
+# ----------------------------------------------------------------------
+
+def _value(sitemap, name, item):
+    value = getattr(sitemap, name, None)
+    return value(item) if callable(value) else value
+
+
+def _lastmod_text(value):
+    return value.isoformat() if value is not None else None
+
+
+def shard_fingerprints(sitemap):
+    """{shard: [row count, latest lastmod, pk sum]} of a sitemap's items."""
+    items = sitemap.items()
+    if not isinstance(items, QuerySet):
+        # Fixed lists (static pages) form a single shard identified by their content
+        return {0: [len(items), None, json.dumps([_value(sitemap, 'location', item) for item in items])]}
+    rows = (
+        items.order_by()
+        .annotate(shard=F('pk') / shard_size())
+        .values('shard')
+        .annotate(count=Count('pk'), lastmod=Max('updated_at'), pk_sum=Sum('pk'))
+    )
+    return {row['shard']: [row['count'], _lastmod_text(row['lastmod']), row['pk_sum']] for row in rows}
+
+
+def _shard_items(sitemap, shard):
+    items = sitemap.items()
+    if not isinstance(items, QuerySet):
+        return iter(items)
+    size = shard_size()
+    return items.filter(pk__gte=shard * size, pk__lt=(shard + 1) * size).iterator(chunk_size=2000)
+
+
+def _url_entry(sitemap, item, root_url):
+    parts = [f'<url><loc>{escape(root_url + _value(sitemap, "location", item))}</loc>']
+    lastmod = _value(sitemap, 'lastmod', item)
+    if lastmod is not None:
+        parts.append(f'<lastmod>{lastmod.isoformat()}</lastmod>')
+    changefreq = _value(sitemap, 'changefreq', item)
+    if changefreq:
+        parts.append(f'<changefreq>{changefreq}</changefreq>')
+    priority = _value(sitemap, 'priority', item)
+    if priority is not None:
+        parts.append(f'<priority>{priority:.1f}</priority>')
+    parts.append('</url>\n')
+    return ''.join(parts)
+
+
+def write_shard(storage, sitemap, shard, name, root_url):
+    """Render one shard into a gzipped temporary file and store it under `name`."""
+    with tempfile.TemporaryFile() as spooled:
+        # mtime=0: identical content gives identical bytes
+        with gzip.GzipFile(fileobj=spooled, mode='wb', mtime=0) as compressed:
+            compressed.write(
+                b'<?xml version="1.0" encoding="UTF-8"?>\n'
+                b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+            )
+            for item in _shard_items(sitemap, shard):
+                compressed.write(_url_entry(sitemap, item, root_url).encode('utf-8'))
+            compressed.write(b'</urlset>\n')
+        spooled.seek(0)
+        _replace(storage, name, File(spooled, name=posixpath.basename(name)))
+
+
+def write_index(storage, manifest, root_url):
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for section in manifest['sections'].values():
+        for shard in sorted(section, key=int):
+            entry = section[shard]
+            lines.append(f'<sitemap><loc>{escape(root_url + "/" + entry["file"])}</loc>')
+            lastmod = entry['fingerprint'][1] or manifest['generated_at']
+            lines.append(f'<lastmod>{lastmod}</lastmod></sitemap>')
+    lines.append('</sitemapindex>\n')
+    _replace(storage, INDEX_NAME, ContentFile('\n'.join(lines).encode('utf-8')))
+
+
+_generate_lock = threading.Lock()
+# Workers share the storage, so a run also holds this cache key (expires if a run dies)
+GENERATE_LOCK_KEY = 'sitemaps:generate'
+GENERATE_LOCK_TIMEOUT = 3600
+
+
+def generate(root_url=None, force=False, dry_run=False, storage=None):
+    """
+    Bring the stored sitemap files up to date; returns {'written', 'removed',
+    'unchanged'} shard counts (what would change, with `dry_run`), or None if a run
+    is already in progress in any process. URLs are absolute, under `root_url`
+    (default SITE_URL).
+    """
+    storage = storage or default_storage
+    root_url = (root_url or base_url()).rstrip('/')
+    if not root_url:
+        raise ValueError('Sitemaps need an absolute site URL: set SITE_URL')
+    if not _generate_lock.acquire(blocking=False):
+        return None
+    if not cache.add(GENERATE_LOCK_KEY, True, timeout=GENERATE_LOCK_TIMEOUT):
+        _generate_lock.release()
+        return None
+    try:
+        # Read the generations first: a change during the run leaves the manifest stale
+        generations = {scope: str(value) for scope, value in get_generations(_scopes()).items()}
+        previous = read_manifest(storage) or {}
+        if previous.get('base_url') != root_url:
+            force = True
+        previous_sections = previous.get('sections', {})
+        manifest = {'base_url': root_url, 'generations': generations, 'sections': {}}
+        counts = {'written': 0, 'removed': 0, 'unchanged': 0}
+
+        for section, (sitemap_class, _section_scopes) in sections().items():
+            sitemap = sitemap_class()
+            old_shards = previous_sections.get(section, {})
+            new_shards = {}
+            for shard, fingerprint in sorted(shard_fingerprints(sitemap).items()):
+                name = shard_name(section, shard)
+                entry = {'file': name, 'fingerprint': fingerprint}
+                old = old_shards.get(str(shard))
+                if force or old != entry or not storage.exists(name):
+                    if not dry_run:
+                        write_shard(storage, sitemap, shard, name, root_url)
+                    counts['written'] += 1
+                else:
+                    counts['unchanged'] += 1
+                new_shards[str(shard)] = entry
+            for shard, old in old_shards.items():
+                if shard not in new_shards:
+                    if not dry_run:
+                        storage.delete(old['file'])
+                    counts['removed'] += 1
+            manifest['sections'][section] = new_shards
+
+        if dry_run:
+            return counts
+        manifest['generated_at'] = timezone.now().isoformat()
+        write_index(storage, manifest, root_url)
+        _replace(storage, MANIFEST_NAME, ContentFile(json.dumps(manifest).encode('utf-8')))
+        return counts
+    finally:
+        cache.delete(GENERATE_LOCK_KEY)
+        _generate_lock.release()
+
+
+# ----------------------------------------------------------------------
+# Background refresh
+# ----------------------------------------------------------------------
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sitemaps')
+        return _executor
+
+
+def run_in_worker():
+    try:
+        return generate()
+    except Exception:
+        logger.exception('Sitemap generation failed')
+        return None
+    finally:
+        # The worker thread opens its own database connections
+        connections.close_all()
+
+
+def refresh_if_stale(manifest):
+    """
+    Schedule a regeneration when the data changed since `manifest`, at most once per
+    SITEMAP_REFRESH_INTERVAL seconds; returns True if one was scheduled.
+    """
+    if not base_url() or _generate_lock.locked():
+        return False
+    if manifest is not None:
+        generated_at = parse_datetime(manifest.get('generated_at') or '')
+        interval = getattr(settings, 'SITEMAP_REFRESH_INTERVAL', 300)
+        if generated_at and (timezone.now() - generated_at).total_seconds() < interval:
+            return False
+    if not is_stale(manifest):
+        return False
+    if getattr(settings, 'SITEMAPS_ASYNC', True):
+        executor().submit(run_in_worker)
+    else:
+        generate()
+    return True
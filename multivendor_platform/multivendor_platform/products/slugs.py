@@ -0,0 +1,110 @@
+# products/slugs.py
+"""
+Slug -> primary key resolution for detail lookups.
+
+Product detail and the ?slug= filters of the taxonomy endpoints used to filter the
+full annotated querysets by slug. They now resolve the slug to a primary key first
+and run the expensive queryset with a pk predicate only.
+
+Each SlugResolver answers from a bounded per-process LRU (SLUG_RESOLVER_MAX_ENTRIES),
+then from the shared Django cache (SLUG_RESOLVER_TIMEOUT), then with a single
+indexed `values_list('pk')` query. Unknown slugs are not cached, so new rows
+resolve at once. Entries are keyed on the generation of the resolver's scope,
+which signals.py bumps when a row's slug changes or a row is deleted; every process
+drops its LRU when it sees a new generation.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import get_generations
+
+SCOPE_PRODUCT_SLUGS = 'slugs_products'
+SCOPE_CATEGORY_SLUGS = 'slugs_categories'
+SCOPE_SUBCATEGORY_SLUGS = 'slugs_subcategories'
+SCOPE_DEPARTMENT_SLUGS = 'slugs_departments'
+
+CACHE_KEY = 'slugpk:{scope}:{generation}:{digest}'
+
+
+class SlugResolver:
+    """Resolve slugs of `model` ('app_label.Model') to primary keys."""
+
+    def __init__(self, model, scope):
+        self.model = model
+        self.scope = scope
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generation = None
+
+    def _local(self, generation, slug):
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+                self._generation = generation
+                return None
+            pk = self._entries.get(slug)
+            if pk is not None:
+                self._entries.move_to_end(slug)
+            return pk
+
+    def _remember(self, generation, slug, pk):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[slug] = pk
+            self._entries.move_to_end(slug)
+            while len(self._entries) > getattr(settings, 'SLUG_RESOLVER_MAX_ENTRIES', 10000):
+                self._entries.popitem(last=False)
+
+    def _lookup(self, slug):
+        model = apps.get_model(self.model)
+        return model._default_manager.filter(slug=slug).values_list('pk', flat=True).first()
+
+    def resolve(self, slug, lookup=None):
+        """
+        Primary key of the row with `slug`, or None if there is none. On a miss the
+        callable `lookup(slug)` (default: a pk query on the model) finds it, so a
+        caller that has to query the row anyway can do both in one query.
+        """
+        if not slug:
+            return None
+        generation = get_generations([self.scope])[self.scope]
+        pk = self._local(generation, slug)
+        if pk is not None:
+            return pk
+
+        digest = hashlib.md5(slug.encode('utf-8')).hexdigest()
+        key = CACHE_KEY.format(scope=self.scope, generation=generation, digest=digest)
+        pk = cache.get(key)
+        if pk is None:
+            pk = (lookup or self._lookup)(slug)
+            if pk is None:
+                return None
+            cache.set(key, pk, timeout=getattr(settings, 'SLUG_RESOLVER_TIMEOUT', 86400))
+        self._remember(generation, slug, pk)
+        return pk
+
+
+class StoredSlugMixin:
+    """
+    Model mixin that remembers the slug as loaded, so signals.py can tell that a save
+    renamed the row without reading it back first.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'slug' in field_names:
+            instance._stored_slug = values[field_names.index('slug')]
+        return instance
+
+
+product_slugs = SlugResolver('products.Product', SCOPE_PRODUCT_SLUGS)
+category_slugs = SlugResolver('products.Category', SCOPE_CATEGORY_SLUGS)
+subcategory_slugs = SlugResolver('products.Subcategory', SCOPE_SUBCATEGORY_SLUGS)
+department_slugs = SlugResolver('products.Department', SCOPE_DEPARTMENT_SLUGS)
@@ -0,0 +1,193 @@
+# products/suggest.py
+"""
+In-memory typeahead index behind /api/search/suggest/.
+
+Holds one small entry per visible product, active subcategory, active label and
+approved supplier, keyed by normalized words (products/normalization.py, without
+stemming so partial words keep matching while the user types):
+
+- a sorted (word, key) list answers "every query word is a prefix of some word
+  of the name" with one bisect per query word;
+- a trigram map provides a fuzzy fallback for typos when prefixes find too little.
+
+Entries carry their response payload, so a lookup never touches the ORM. The index
+is rebuilt per process in the background on shared-generation changes
+(SharedVersionedIndex) and kept current incrementally from model signals (see
+signals.py).
+"""
+import heapq
+from bisect import bisect_left, insort
+
+from .cache import SharedVersionedIndex
+from .normalization import tokenize
+
+SCOPE_SUGGEST_INDEX = 'suggest_index'
+
+KIND_PRODUCT = 'product'
+KIND_SUBCATEGORY = 'subcategory'
+KIND_LABEL = 'label'
+KIND_SUPPLIER = 'supplier'
+
+# Taxonomy suggestions first: they narrow the catalog the most per click
+KIND_ORDER = {KIND_SUBCATEGORY: 0, KIND_LABEL: 1, KIND_SUPPLIER: 2, KIND_PRODUCT: 3}
+
+MIN_TRIGRAM_SIMILARITY = 0.3
+
+
+def _trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SuggestIndex(SharedVersionedIndex):
+    scope = SCOPE_SUGGEST_INDEX
+    background = True
+
+    def __init__(self):
+        super().__init__()
+        self._entries = {}     # (kind, pk) -> (payload, normalized name, trigram count, words)
+        self._words = []       # sorted [(word, key)]
+        self._trigrams = {}    # trigram -> set(keys)
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _sources():
+        """(kind, queryset of (pk, name, slug)) for everything that can be suggested."""
+        from django.db.models import Value, CharField
+        from users.models import VendorProfile
+        from .models import Product, Subcategory, Label
+
+        return (
+            (KIND_PRODUCT, Product.objects.filter(
+                approval_status=Product.APPROVAL_STATUS_APPROVED,
+                is_active=True,
+                is_marketplace_hidden=False,
+            ).values_list('pk', 'name', 'slug')),
+            (KIND_SUBCATEGORY, Subcategory.objects.filter(is_active=True).values_list('pk', 'name', 'slug')),
+            (KIND_LABEL, Label.objects.filter(is_active=True).values_list('pk', 'name', 'slug')),
+            (KIND_SUPPLIER, VendorProfile.objects.filter(is_approved=True).annotate(
+                no_slug=Value(None, output_field=CharField())
+            ).values_list('pk', 'store_name', 'no_slug')),
+        )
+
+    def _rebuild(self):
+        # Built off to the side and swapped in, since lookups do not take the lock
+        entries, trigrams, words = {}, {}, []
+        for kind, rows in self._sources():
+            for pk, name, slug in rows.iterator(chunk_size=2000):
+                words.extend(self._add_entry(entries, trigrams, kind, pk, name, slug))
+        words.sort()
+        self._entries, self._trigrams, self._words = entries, trigrams, words
+
+    @staticmethod
+    def _add_entry(entries, trigrams, kind, pk, name, slug):
+        """Store the entry and trigrams; returns its (word, key) pairs for the caller to place."""
+        key = (kind, pk)
+        normalized = ' '.join(tokenize(name))
+        words = sorted(set(normalized.split()))
+        grams = _trigrams(normalized)
+        payload = {'type': kind, 'id': pk, 'name': name, 'slug': slug}
+        entries[key] = (payload, normalized, len(grams), words)
+        for gram in grams:
+            trigrams.setdefault(gram, set()).add(key)
+        return [(word, key) for word in words]
+
+    def _remove_entry(self, key, word_list):
+        """Drop the entry and trigrams, and its words from `word_list`."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        _payload, normalized, _count, words = entry
+        for word in words:
+            position = bisect_left(word_list, (word, key))
+            if position < len(word_list) and word_list[position] == (word, key):
+                del word_list[position]
+        for gram in _trigrams(normalized):
+            keys = self._trigrams.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._trigrams[gram]
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def _prefix_keys(self, token):
+        keys = set()
+        words = self._words
+        position = bisect_left(words, (token,))
+        while position < len(words) and words[position][0].startswith(token):
+            keys.add(words[position][1])
+            position += 1
+        return keys
+
+    def _fuzzy_keys(self, entries, normalized_query, exclude):
+        query_grams = _trigrams(normalized_query)
+        shared = {}
+        for gram in query_grams:
+            for key in tuple(self._trigrams.get(gram, ())):
+                if key not in exclude and key in entries:
+                    shared[key] = shared.get(key, 0) + 1
+        scored = {}
+        for key, common in shared.items():
+            similarity = common / (len(query_grams) + entries[key][2] - common)
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                scored[key] = similarity
+        return scored
+
+    def suggest(self, query, limit=10):
+        """Up to `limit` payload dicts, best first."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        self.ensure_loaded()
+        entries = self._entries
+        normalized_query = ' '.join(tokens)
+
+        keys = None
+        for token in tokens:
+            matched = self._prefix_keys(token)
+            keys = matched if keys is None else keys & matched
+            if not keys:
+                break
+        # A concurrent update may have dropped an entry after its words were read
+        keys = {key for key in keys or () if key in entries}
+
+        def prefix_rank(key):
+            normalized = entries[key][1]
+            return (not normalized.startswith(normalized_query), KIND_ORDER[key[0]], len(normalized), normalized)
+
+        best = heapq.nsmallest(limit, keys, key=prefix_rank)
+        if len(best) < limit and len(normalized_query) >= 3:
+            fuzzy = self._fuzzy_keys(entries, normalized_query, exclude=keys)
+            best += heapq.nsmallest(limit - len(best), fuzzy, key=lambda key: (-fuzzy[key], KIND_ORDER[key[0]]))
+        return [entries[key][0] for key in best]
+
+    # ------------------------------------------------------------------
+    # Incremental maintenance
+    # ------------------------------------------------------------------
+    def upsert(self, kind, pk, name, slug=None):
+        self.update_many(kind, [(pk, name, slug)], ())
+
+    def update_many(self, kind, upserts, removals):
+        """Upsert [(pk, name, slug)] and remove [pk] of `kind` as one change."""
+        def mutate():
+            # Lookups walk the word list without the lock: change a copy and swap it in
+            words = list(self._words)
+            for pk in removals:
+                self._remove_entry((kind, pk), words)
+            for pk, name, slug in upserts:
+                key = (kind, pk)
+                self._remove_entry(key, words)
+                for pair in self._add_entry(self._entries, self._trigrams, kind, pk, name, slug):
+                    insort(words, pair)
+            self._words = words
+        self._apply(mutate)
+
+    def remove(self, kind, pk):
+        self.update_many(kind, (), [pk])
+
+
+suggest_index = SuggestIndex()
@@ -0,0 +1,162 @@
+# products/taxonomy.py
+"""
+Process-wide Department ↔ Category ↔ Subcategory graph.
+
+The whole taxonomy is small, so every process loads it once (a handful of queries)
+and answers breadcrumb, category path and department lookups from dictionaries.
+Subcategory instances in the graph carry their categories and departments as
+prefetched relations, so serializers can walk them without touching the database.
+
+The graph follows the 'taxonomy' generation counter that products/signals.py
+already bumps on every taxonomy save, delete and through-table change, so it is
+simply rebuilt on next use; there is no incremental maintenance.
+"""
+import json
+
+from django.db.models import Prefetch
+
+from .cache import SharedVersionedIndex, SCOPE_TAXONOMY
+
+
+def _order_key(node):
+    # Same as the models' Meta.ordering
+    return (node.sort_order, node.name)
+
+
+class TaxonomyGraph(SharedVersionedIndex):
+    scope = SCOPE_TAXONOMY
+
+    def __init__(self):
+        super().__init__()
+        self._departments = {}
+        self._categories = {}
+        self._subcategories = {}
+        self._subcategory_departments = {}
+        self._tree_json = None
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def _rebuild(self):
+        from .models import Department, Category, Subcategory
+
+        departments = {department.pk: department for department in Department.objects.all()}
+        categories = {
+            category.pk: category
+            for category in Category.objects.prefetch_related(
+                Prefetch('departments', queryset=Department.objects.all())
+            )
+        }
+        subcategories = {
+            subcategory.pk: subcategory
+            for subcategory in Subcategory.objects.prefetch_related(
+                Prefetch('categories', queryset=Category.objects.prefetch_related('departments'))
+            )
+        }
+
+        subcategory_departments = {}
+        for subcategory in subcategories.values():
+            seen = {}
+            for category in subcategory.categories.all():
+                for department in category.departments.all():
+                    seen.setdefault(department.pk, department)
+            subcategory_departments[subcategory.pk] = sorted(seen.values(), key=_order_key)
+
+        self._departments = departments
+        self._categories = categories
+        self._subcategories = subcategories
+        self._subcategory_departments = subcategory_departments
+        self._tree_json = None
+
+    @property
+    def version(self):
+        self.ensure_loaded()
+        return self._version
+
+    def etag(self):
+        return f'"taxonomy-{self.version}"'
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def subcategory(self, subcategory_id):
+        self.ensure_loaded()
+        return self._subcategories.get(subcategory_id)
+
+    def categories_for_subcategory(self, subcategory_id):
+        """Parent categories in display order; [] for unknown IDs."""
+        subcategory = self.subcategory(subcategory_id)
+        return list(subcategory.categories.all()) if subcategory is not None else []
+
+    def departments_for_subcategory(self, subcategory_id):
+        """Departments reached through the parent categories, in display order."""
+        self.ensure_loaded()
+        return list(self._subcategory_departments.get(subcategory_id, ()))
+
+    def primary_subcategory_id(self, subcategory_ids):
+        """The subcategory that sorts first (the one Product.subcategories.first() returns)."""
+        self.ensure_loaded()
+        known = [self._subcategories[pk] for pk in subcategory_ids if pk in self._subcategories]
+        return min(known, key=lambda node: (_order_key(node), node.pk)).pk if known else None
+
+    def breadcrumb(self, subcategory_id):
+        """[department, category, subcategory] crumbs as dicts; [] for unknown IDs."""
+        subcategory = self.subcategory(subcategory_id)
+        if subcategory is None:
+            return []
+        crumbs = []
+        departments = self.departments_for_subcategory(subcategory_id)
+        if departments:
+            crumbs.append({'type': 'department', 'name': departments[0].name, 'slug': departments[0].slug})
+        categories = self.categories_for_subcategory(subcategory_id)
+        if categories:
+            crumbs.append({'type': 'category', 'name': categories[0].name, 'slug': categories[0].slug})
+        crumbs.append({'type': 'subcategory', 'name': subcategory.name, 'slug': subcategory.slug})
+        return crumbs
+
+    def category_path(self, subcategory_id):
+        """'Department > Category > Subcategory', or None for unknown IDs."""
+        crumbs = self.breadcrumb(subcategory_id)
+        return ' > '.join(crumb['name'] for crumb in crumbs) if crumbs else None
+
+    # ------------------------------------------------------------------
+    # Whole tree
+    # ------------------------------------------------------------------
+    def tree(self):
+        """Active departments → categories → subcategories as plain dicts."""
+        self.ensure_loaded()
+        children = {}
+        for subcategory in self._subcategories.values():
+            if not subcategory.is_active:
+                continue
+            for category in subcategory.categories.all():
+                children.setdefault(category.pk, []).append(subcategory)
+
+        def node(instance, **extra):
+            return {'id': instance.pk, 'name': instance.name, 'slug': instance.slug, **extra}
+
+        tree = []
+        for department in sorted(self._departments.values(), key=_order_key):
+            if not department.is_active:
+                continue
+            categories = [
+                category for category in self._categories.values()
+                if category.is_active and department in category.departments.all()
+            ]
+            tree.append(node(department, categories=[
+                node(category, subcategories=[
+                    node(subcategory) for subcategory in sorted(children.get(category.pk, ()), key=_order_key)
+                ])
+                for category in sorted(categories, key=_order_key)
+            ]))
+        return tree
+
+    def tree_json(self):
+        """Serialized tree, memoized per version."""
+        self.ensure_loaded()
+        if self._tree_json is None:
+            self._tree_json = json.dumps({'departments': self.tree()}, ensure_ascii=False)
+        return self._tree_json
+
+
+taxonomy_graph = TaxonomyGraph()
@@ -1,7 +1,16 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from .models import Product, Category, Department, Subcategory, ProductImage
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+import io
+import os
+import shutil
+import tempfile
+import tracemalloc
+from .models import Product, Category, Department, Subcategory, ProductImage, ProductComment, Label
 from decimal import Decimal
 
 User = get_user_model()
@@ -230,3 +239,2202 @@ class ProductImageTest(TestCase):
         self.assertEqual(image.product, self.product)
         self.assertEqual(image.alt_text, 'Product image')
         self.assertEqual(image.sort_order, 1)
+
+
+class ProductCursorPaginationTest(TestCase):
+    """Test opt-in keyset pagination on the product listing"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='cursorvendor', password='testpass123')
+        self.category = Category.objects.create(name='Cursor Category')
+        self.products = [
+            Product.objects.create(
+                name=f'Cursor Product {i}',
+                description='Cursor pagination product',
+                price=1000 + i,
+                vendor=self.user,
+                primary_category=self.category,
+                approval_status=Product.APPROVAL_STATUS_APPROVED,
+            )
+            for i in range(5)
+        ]
+
+    def test_walks_all_pages_without_count(self):
+        seen = []
+        url = '/api/products/?pagination=cursor&page_size=2'
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.json())
+            seen.extend(item['id'] for item in response.json()['results'])
+            url = response.json()['next']
+            pages += 1
+        self.assertEqual(pages, 3)
+        self.assertEqual(sorted(seen), sorted(p.id for p in self.products))
+        # Newest first within the same vendor ranking
+        self.assertEqual(seen, [p.id for p in reversed(self.products)])
+
+    def test_previous_cursor_returns_prior_page(self):
+        first = self.client.get('/api/products/?pagination=cursor&page_size=2').json()
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        back = self.client.get(second['previous']).json()
+        self.assertEqual(
+            [item['id'] for item in back['results']],
+            [item['id'] for item in first['results']],
+        )
+
+    def test_approximate_count_on_request(self):
+        data = self.client.get('/api/products/?pagination=cursor&include_count=1').json()
+        self.assertEqual(data['count'], 5)
+        self.assertTrue(data['count_is_approximate'])
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get('/api/products/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_ordering_is_rejected_in_cursor_mode(self):
+        response = self.client.get('/api/products/?pagination=cursor&ordering=price')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.json())
+        self.assertEqual(self.client.get('/api/products/?ordering=price').status_code, 200)
+
+
+class ProductViewSetQueryBudgetTest(TestCase):
+    """Per-action query and memory budgets for ProductViewSet"""
+
+    # Budgets for a 10-item page; list must not grow with comments
+    LIST_QUERY_BUDGET = 6
+    DETAIL_QUERY_BUDGET = 12
+    LIST_MEMORY_BUDGET_BYTES = 8 * 1024 * 1024
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='budgetvendor', password='testpass123')
+        department = Department.objects.create(name='Budget Department')
+        self.category = Category.objects.create(name='Budget Category')
+        self.category.departments.add(department)
+        subcategory = Subcategory.objects.create(name='Budget Subcategory')
+        subcategory.categories.add(self.category)
+        label = Label.objects.create(name='Budget Label', is_promotional=True)
+        for i in range(10):
+            product = Product.objects.create(
+                name=f'Budget Product {i}',
+                description='Query budget product',
+                price=1000,
+                vendor=self.user,
+                primary_category=self.category,
+                approval_status=Product.APPROVAL_STATUS_APPROVED,
+            )
+            product.subcategories.add(subcategory)
+            product.labels.add(label)
+            for _ in range(3):
+                ProductComment.objects.create(product=product, author=self.user, content='Nice', is_approved=True)
+        self.product = product
+        # Budgets measure steady state, so load the process-wide taxonomy graph first
+        from .taxonomy import taxonomy_graph
+        taxonomy_graph.ensure_loaded()
+
+    def test_list_query_budget_skips_comments(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/products/?page_size=10')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 10)
+        self.assertLessEqual(len(ctx.captured_queries), self.LIST_QUERY_BUDGET)
+        self.assertFalse(any('products_productcomment' in q['sql'] for q in ctx.captured_queries))
+
+    def test_list_memory_budget(self):
+        tracemalloc.start()
+        try:
+            response = self.client.get('/api/products/?page_size=10')
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(peak, self.LIST_MEMORY_BUDGET_BYTES)
+
+    def test_detail_query_budget_includes_comments(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/products/slug/{self.product.slug}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['comment_count'], 3)
+        self.assertLessEqual(len(ctx.captured_queries), self.DETAIL_QUERY_BUDGET)
+
+
+class AnonymousResponseCacheTest(TestCase):
+    """Test the versioned response cache on anonymous catalog endpoints"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='cachevendor', password='testpass123')
+        self.category = Category.objects.create(name='Cache Category')
+
+    def _create_product(self, name):
+        return Product.objects.create(
+            name=name,
+            description='Cached listing product',
+            price=1000,
+            vendor=self.user,
+            primary_category=self.category,
+            approval_status=Product.APPROVAL_STATUS_APPROVED,
+        )
+
+    def test_second_request_is_served_from_cache(self):
+        self._create_product('Cached Product')
+        first = self.client.get('/api/products/?page_size=5&page=1')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get('/api/products/?page=1&page_size=5')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(second.json(), first.json())
+
+    def test_product_save_invalidates_list(self):
+        product = self._create_product('Before Rename')
+        self.client.get('/api/products/')
+        product.name = 'After Rename'
+        product.save()
+        response = self.client.get('/api/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['name'], 'After Rename')
+
+    def test_taxonomy_m2m_change_invalidates_categories(self):
+        self.client.get('/api/categories/')
+        department = Department.objects.create(name='Cache Department')
+        self.category.departments.add(department)
+        response = self.client.get('/api/categories/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_authenticated_requests_bypass_cache(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/api/categories/')
+        self.assertFalse(response.has_header('X-Cache'))
+
+    def test_stats_report_hits_and_misses(self):
+        from .cache import get_cache_stats
+        self.client.get('/api/departments/')
+        self.client.get('/api/departments/')
+        self.assertEqual(get_cache_stats()['department-list'], {'hits': 1, 'misses': 1})
+
+
+class LabelIndexTest(TestCase):
+    """Test the in-process label inverted index and the labels= filter"""
+
+    def setUp(self):
+        from .label_index import label_index
+        self.index = label_index
+        self.index.invalidate()
+        self.client = Client()
+        self.user = User.objects.create_user(username='labelvendor', password='testpass123')
+        self.category = Category.objects.create(name='Label Index Category')
+        self.red = Label.objects.create(name='Red')
+        self.large = Label.objects.create(name='Large')
+        self.steel = Label.objects.create(name='Steel')
+        self.products = []
+        for name, labels in (
+            ('Red Large Steel', [self.red, self.large, self.steel]),
+            ('Red Large', [self.red, self.large]),
+            ('Red', [self.red]),
+        ):
+            product = Product.objects.create(
+                name=name,
+                description='Label index product',
+                price=1000,
+                vendor=self.user,
+                primary_category=self.category,
+                approval_status=Product.APPROVAL_STATUS_APPROVED,
+            )
+            product.labels.set(labels)
+            self.products.append(product)
+
+    def test_intersection_of_labels(self):
+        ids = self.index.product_ids_for_labels([self.red.id, self.large.id])
+        self.assertEqual(ids, {self.products[0].id, self.products[1].id})
+        self.assertEqual(self.index.product_ids_for_slugs(['red', 'missing']), set())
+
+    def test_incremental_updates_from_m2m_changes(self):
+        from .cache import get_generations
+        self.index.ensure_loaded()
+        generation = get_generations([self.index.scope])[self.index.scope]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[2].labels.add(self.large)
+            # Nothing is published before the links are committed
+            self.assertNotIn(self.products[2].id, self.index.product_ids_for_labels([self.large.id]))
+            self.assertEqual(get_generations([self.index.scope])[self.index.scope], generation)
+        self.assertIn(self.products[2].id, self.index.product_ids_for_labels([self.large.id]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.large.products.remove(self.products[0])
+        self.assertNotIn(self.products[0].id, self.index.product_ids_for_labels([self.large.id]))
+        product_id = self.products[1].id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[1].delete()
+        self.assertNotIn(product_id, self.index.product_ids_for_labels([self.red.id]))
+
+    def test_labels_query_param_filters_with_and_semantics(self):
+        response = self.client.get('/api/products/?labels=red,large,steel')
+        self.assertEqual([item['name'] for item in response.json()['results']], ['Red Large Steel'])
+
+    def test_combo_page_uses_index(self):
+        from .models import LabelComboSeoPage
+        combo = LabelComboSeoPage.objects.create(name='Red Large', slug='red-large')
+        combo.labels.set([self.red, self.large])
+        self.assertEqual(
+            set(combo.get_filtered_products().values_list('id', flat=True)),
+            {self.products[0].id, self.products[1].id},
+        )
+
+    def test_large_intersections_are_one_parameter(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext, override_settings
+        with override_settings(LABEL_INDEX_MAX_INLINE_IDS=1):
+            queryset = self.index.filter_queryset(Product.objects.all(), [self.red.id, self.large.id])
+            with CaptureQueriesContext(connection) as queries:
+                ids = set(queryset.values_list('id', flat=True))
+        self.assertEqual(ids, {self.products[0].id, self.products[1].id})
+        self.assertNotIn('products_product_labels', queries.captured_queries[0]['sql'])
+        self.assertIn('json_each' if connection.vendor == 'sqlite' else 'unnest', queries.captured_queries[0]['sql'])
+        self.assertFalse(self.index.filter_queryset(Product.objects.all(), [self.red.id, None]).exists())
+
+
+class ProductFacetsTest(TestCase):
+    """Test the /api/products/facets/ sidebar counts"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from .label_index import label_index
+        cache.clear()
+        label_index.invalidate()
+        self.client = Client()
+        self.user = User.objects.create_user(username='facetvendor', password='testpass123')
+        self.category = Category.objects.create(name='Facet Category')
+        self.pumps = Subcategory.objects.create(name='Facet Pumps')
+        self.valves = Subcategory.objects.create(name='Facet Valves')
+        self.red = Label.objects.create(name='Facet Red')
+        self.large = Label.objects.create(name='Facet Large')
+        for name, price, availability, origin, subcategory, labels in (
+            ('Cheap Red Pump', 5_000_000, 'in_stock', 'iran', self.pumps, [self.red]),
+            ('Large Red Pump', 60_000_000, 'in_stock', 'imported', self.pumps, [self.red, self.large]),
+            ('Large Valve', 2_000_000_000, 'made_to_order', 'iran', self.valves, [self.large]),
+        ):
+            product = Product.objects.create(
+                name=name,
+                description='Facet product',
+                price=price,
+                vendor=self.user,
+                primary_category=self.category,
+                availability_status=availability,
+                origin=origin,
+                approval_status=Product.APPROVAL_STATUS_APPROVED,
+            )
+            product.subcategories.set([subcategory])
+            product.labels.set(labels)
+        Product.objects.create(
+            name='Hidden Pump',
+            description='Not approved',
+            price=1000,
+            vendor=self.user,
+            primary_category=self.category,
+        )
+
+    def test_counts_for_full_catalog(self):
+        data = self.client.get('/api/products/facets/').json()
+        self.assertEqual(data['total'], 3)
+        self.assertEqual({row['slug']: row['count'] for row in data['labels']}, {'facet-red': 2, 'facet-large': 2})
+        self.assertEqual({row['name']: row['count'] for row in data['subcategories']}, {'Facet Pumps': 2, 'Facet Valves': 1})
+        self.assertEqual({row['value']: row['count'] for row in data['availability_status']}, {'in_stock': 2, 'made_to_order': 1})
+        self.assertEqual({row['value']: row['count'] for row in data['origin']}, {'iran': 2, 'imported': 1})
+        self.assertEqual([row['count'] for row in data['price']], [1, 0, 1, 0, 0, 1])
+
+    def test_counts_follow_selection_in_constant_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get('/api/products/facets/?labels=facet-red&price_bounds=10000000').json()
+        self.assertEqual(data['total'], 2)
+        self.assertEqual({row['slug']: row['selected'] for row in data['labels']}, {'facet-red': True, 'facet-large': False})
+        self.assertEqual({row['name']: row['count'] for row in data['subcategories']}, {'Facet Pumps': 2})
+        self.assertEqual(data['price'], [
+            {'min': 0, 'max': 10_000_000, 'count': 1},
+            {'min': 10_000_000, 'max': None, 'count': 1},
+        ])
+        facet_queries = [q for q in ctx.captured_queries if 'COUNT' in q['sql'].upper()]
+        self.assertEqual(len(facet_queries), 3)
+
+    def test_invalid_price_bounds(self):
+        response = self.client.get('/api/products/facets/?price_bounds=abc')
+        self.assertEqual(response.status_code, 400)
+
+    def test_anonymous_response_is_cached_until_products_change(self):
+        first = self.client.get('/api/products/facets/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/products/facets/')['X-Cache'], 'HIT')
+        Product.objects.filter(name='Hidden Pump').get().delete()
+        self.assertEqual(self.client.get('/api/products/facets/')['X-Cache'], 'MISS')
+
+
+class GlobalSearchTest(TestCase):
+    """Test the full-text search backend behind /api/search/"""
+
+    def setUp(self):
+        from .search import get_search_backend
+        self.backend = get_search_backend()
+        self.backend.invalidate()
+        self.client = Client()
+        self.user = User.objects.create_user(username='searchvendor', password='testpass123')
+        self.category = Category.objects.create(name='Search Category')
+
+    def create_product(self, name, description, **kwargs):
+        return Product.objects.create(
+            name=name,
+            description=description,
+            price=1000,
+            vendor=kwargs.pop('vendor', self.user),
+            primary_category=self.category,
+            approval_status=kwargs.pop('approval_status', Product.APPROVAL_STATUS_APPROVED),
+            **kwargs
+        )
+
+    def search(self, query):
+        return self.client.get('/api/search/', {'q': query}).json()
+
+    def test_name_match_outranks_description_match(self):
+        self.create_product('Steel valve', '<p>Industrial pump accessory</p>')
+        self.create_product('Hydraulic pump', '<p>Heavy duty</p>')
+        data = self.search('pump')
+        self.assertEqual([item['name'] for item in data['products']], ['Hydraulic pump', 'Steel valve'])
+
+    def test_all_terms_required_and_last_term_is_prefix(self):
+        self.create_product('Centrifugal pump', 'Water transfer')
+        self.create_product('Centrifugal fan', 'Air transfer')
+        data = self.search('centrifugal pu')
+        self.assertEqual([item['name'] for item in data['products']], ['Centrifugal pump'])
+
+    def test_index_follows_visibility_changes(self):
+        product = self.create_product('Gear motor', 'Reducer')
+        self.assertEqual(len(self.search('gear')['products']), 1)
+        product.approval_status = Product.APPROVAL_STATUS_REJECTED
+        product.save()
+        self.assertEqual(self.search('gear')['products'], [])
+        product.approval_status = Product.APPROVAL_STATUS_APPROVED
+        product.save()
+        product.delete()
+        self.assertEqual(self.search('gear')['products'], [])
+
+    def test_index_changes_wait_for_commit(self):
+        from .search import InMemorySearchBackend, document_type_for
+        if not isinstance(self.backend, InMemorySearchBackend):
+            self.skipTest('The PostgreSQL backend keeps the vector on the row')
+        self.search('warmup')
+        with self.captureOnCommitCallbacks(execute=True):
+            product = self.create_product('Rotary kiln', 'Cement')
+            documents = self.backend._indexes[document_type_for(product).name].documents
+            self.assertNotIn(product.pk, documents)
+        self.assertIn(product.pk, documents)
+
+    def test_vendor_ranking_breaks_relevance_ties(self):
+        from gamification.models import VendorRanking
+        premium = User.objects.create_user(username='premiumsearch', password='testpass123')
+        self.create_product('Boiler unit', 'Steam')
+        self.create_product('Boiler unit', 'Steam', vendor=premium, slug='boiler-unit-premium')
+        VendorRanking.objects.create(vendor=premium, tier='gold', tier_rank=1, is_premium=True, premium_order=0)
+        data = self.search('boiler')
+        self.assertEqual(data['products'][0]['vendor'], premium.id)
+
+    def test_results_include_highlighted_snippets(self):
+        self.create_product('Compressor', '<p>Oil-free <b>compressor</b> for dental clinics & labs</p>')
+        item = self.search('compress')['products'][0]
+        self.assertEqual(item['highlight']['name'], '<mark>Compressor</mark>')
+        self.assertIn('<mark>compressor</mark> for dental clinics &amp; labs', item['highlight']['snippet'])
+
+    def test_highlight_windows_long_text(self):
+        from .search import highlight
+        text = 'intro ' * 100 + 'target word ' + 'outro ' * 100
+        snippet = highlight(text, 'target', max_length=60)
+        self.assertTrue(snippet.startswith('…') and snippet.endswith('…'))
+        self.assertIn('<mark>target</mark>', snippet)
+
+    def test_postgres_tsquery_builder(self):
+        from .search import PostgresSearchBackend
+        self.assertEqual(PostgresSearchBackend.build_tsquery(['steel', 'pu']), 'steel & pu:*')
+        self.assertEqual(PostgresSearchBackend.build_tsquery([]), '')
+
+
+class PersianNormalizationTest(TestCase):
+    """Test the Persian normalization pipeline and the search shadow columns"""
+
+    def setUp(self):
+        from .search import get_search_backend
+        get_search_backend().invalidate()
+        self.user = User.objects.create_user(username='persianvendor', password='testpass123', is_staff=True, is_superuser=True)
+        self.category = Category.objects.create(name='Persian Category')
+
+    def test_normalize_unifies_letters_digits_and_marks(self):
+        from .normalization import normalize
+        self.assertEqual(normalize('كيف  ۱۲٣'), 'کیف 123')
+        self.assertEqual(normalize('مُحَمَّد'), 'محمد')
+        self.assertEqual(normalize('کتاب‌ها'), 'کتابها')
+
+    def test_light_stemmer(self):
+        from .normalization import analyze, stem
+        self.assertEqual(stem('پمپها'), 'پمپ')
+        self.assertEqual(stem('بزرگترین'), 'بزرگ')
+        self.assertEqual(stem('دفتر'), 'دفتر')
+        self.assertEqual(stem('pumps'), 'pumps')
+        self.assertEqual(analyze('پمپ‌هاي <b>صنعتي</b>'), analyze('پمپهای صنعتی'))
+
+    def test_shadow_columns_filled_on_save(self):
+        subcategory = Subcategory.objects.create(name='ماشين‌آلات')
+        self.assertEqual(subcategory.search_name, 'ماشینآلات')
+        product = Product.objects.create(
+            name='پمپ آب', description='<p>صنعتي</p>', price=1000,
+            vendor=self.user, primary_category=self.category,
+        )
+        product.name = 'پمپ‌های آب'
+        product.save(update_fields=['name'])
+        product.refresh_from_db()
+        self.assertEqual(product.search_name, 'پمپ آب')
+        self.assertEqual(product.search_text, 'صنعت')
+
+    def test_global_search_matches_spelling_variants(self):
+        Product.objects.create(
+            name='پمپ‌های صنعتی', description='فشار قوي', price=1000, vendor=self.user,
+            primary_category=self.category, approval_status=Product.APPROVAL_STATUS_APPROVED,
+        )
+        data = Client().get('/api/search/', {'q': 'پمپهاي صنعتي'}).json()
+        self.assertEqual([item['name'] for item in data['products']], ['پمپ‌های صنعتی'])
+        self.assertIn('<mark>', data['products'][0]['highlight']['name'])
+
+    def test_admin_search_uses_shadow_columns(self):
+        Product.objects.create(
+            name='کیک شکلاتی', description='تازه', price=1000, vendor=self.user, primary_category=self.category,
+        )
+        from django.contrib import admin
+        from django.test import RequestFactory
+        model_admin = admin.site._registry[Product]
+        request = RequestFactory().get('/admin/products/product/', {'q': 'كيك'})
+        request.user = self.user
+        results, _ = model_admin.get_search_results(request, Product.objects.all(), 'كيك')
+        self.assertEqual([product.name for product in results], ['کیک شکلاتی'])
+
+    def test_admin_search_across_subcategories_reports_duplicates(self):
+        from django.contrib import admin
+        from django.test import RequestFactory
+        product = Product.objects.create(
+            name='Boiler', description='Steam', price=1000, vendor=self.user, primary_category=self.category,
+        )
+        product.subcategories.add(Subcategory.objects.create(name='Hot water'), Subcategory.objects.create(name='Hot oil'))
+        model_admin = admin.site._registry[Product]
+        request = RequestFactory().get('/admin/products/product/', {'q': 'hot'})
+        request.user = self.user
+        _results, may_have_duplicates = model_admin.get_search_results(request, Product.objects.all(), 'hot')
+        # The changelist then applies distinct(), so the product is listed once
+        self.assertTrue(may_have_duplicates)
+
+
+class SearchSuggestTest(TestCase):
+    """Test the in-memory typeahead index behind /api/search/suggest/"""
+
+    def setUp(self):
+        from .suggest import suggest_index
+        from users.models import VendorProfile
+        self.index = suggest_index
+        self.index.invalidate()
+        self.client = Client()
+        self.user = User.objects.create_user(username='suggestvendor', password='testpass123')
+        self.category = Category.objects.create(name='Suggest Category')
+        self.subcategory = Subcategory.objects.create(name='ماشين‌آلات صنعتي', slug='industrial-machinery')
+        self.label = Label.objects.create(name='Pump Accessories', slug='pump-accessories')
+        self.supplier = VendorProfile.objects.create(user=self.user, store_name='Pumpco Supplies', is_approved=True)
+        self.product = Product.objects.create(
+            name='Centrifugal Pump', description='Water', price=1000, vendor=self.user,
+            primary_category=self.category, approval_status=Product.APPROVAL_STATUS_APPROVED,
+        )
+
+    def suggest(self, query):
+        return self.client.get('/api/search/suggest/', {'q': query}).json()['suggestions']
+
+    def test_prefix_matches_every_kind_in_order(self):
+        self.assertEqual(
+            [(item['type'], item['name']) for item in self.suggest('pum')],
+            [('label', 'Pump Accessories'), ('supplier', 'Pumpco Supplies'), ('product', 'Centrifugal Pump')],
+        )
+        self.assertEqual([item['name'] for item in self.suggest('centrifugal pu')], ['Centrifugal Pump'])
+
+    def test_persian_variants_and_typos(self):
+        self.assertEqual([item['id'] for item in self.suggest('ماشین')], [self.subcategory.id])
+        self.assertEqual(self.suggest('صنعتی ماشینآ')[0]['slug'], 'industrial-machinery')
+        self.assertEqual(self.suggest('centrifgal')[0]['name'], 'Centrifugal Pump')
+
+    def test_incremental_updates(self):
+        self.index.ensure_loaded()
+        self.product.name = 'Booster Pump'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+            # Applied once the transaction commits
+            self.assertEqual(self.suggest('boost'), [])
+        self.assertEqual([item['name'] for item in self.suggest('boost')], ['Booster Pump'])
+        self.assertEqual(self.suggest('centrifugal'), [])
+        self.product.is_marketplace_hidden = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.assertEqual(self.suggest('boost'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.label.delete()
+        self.assertNotIn('label', [item['type'] for item in self.suggest('pump')])
+
+    def test_updates_swap_the_word_list(self):
+        self.index.ensure_loaded()
+        words = self.index._words
+        snapshot = list(words)
+        self.index.upsert('product', self.product.pk, 'Booster Pump', self.product.slug)
+        # Lookups holding the previous list keep a consistent copy
+        self.assertEqual(words, snapshot)
+        self.assertIsNot(self.index._words, words)
+
+    def test_warm_lookup_runs_no_queries(self):
+        self.suggest('pump')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/search/suggest/', {'q': 'pump', 'limit': 2})
+        self.assertEqual(len(response.json()['suggestions']), 2)
+        self.assertIn('max-age=60', response['Cache-Control'])
+
+
+class BackgroundIndexRefreshTest(TestCase):
+    """Stale per-process indexes are rebuilt off the request path"""
+
+    def test_stale_copy_answers_while_rebuilding(self):
+        import threading
+        from .cache import SharedVersionedIndex, bump_generation
+
+        release = threading.Event()
+
+        class CountingIndex(SharedVersionedIndex):
+            scope = 'test_background_index'
+            background = True
+            builds = 0
+
+            def _rebuild(self):
+                if self.builds:
+                    release.wait(5)
+                self.builds += 1
+                self.data = self.builds
+
+        index = CountingIndex()
+        index.ensure_loaded()
+        self.assertEqual(index.data, 1)
+        bump_generation(CountingIndex.scope)
+        index.ensure_loaded()
+        index.ensure_loaded()
+        # The previous copy answers until the single background rebuild finishes
+        self.assertEqual(index.data, 1)
+        release.set()
+        self.assertTrue(index._refreshed.wait(5))
+        self.assertEqual(index.data, 2)
+        index.ensure_loaded()
+        self.assertEqual(index.builds, 2)
+
+
+class TaxonomyGraphTest(TestCase):
+    """Test the in-memory taxonomy graph and /api/taxonomy/tree/"""
+
+    def setUp(self):
+        from .taxonomy import taxonomy_graph
+        self.graph = taxonomy_graph
+        self.graph.invalidate()
+        self.client = Client()
+        self.department = Department.objects.create(name='Industry', sort_order=1)
+        self.other_department = Department.objects.create(name='Agriculture', sort_order=0)
+        self.category = Category.objects.create(name='Pumps')
+        self.category.departments.add(self.department, self.other_department)
+        self.subcategory = Subcategory.objects.create(name='Water Pumps')
+        self.subcategory.categories.add(self.category)
+        self.user = User.objects.create_user(username='taxonomyvendor', password='testpass123')
+        self.product = Product.objects.create(
+            name='Taxonomy Pump', description='Pump', price=1000, vendor=self.user, primary_category=self.category,
+        )
+        self.product.subcategories.add(self.subcategory)
+
+    def test_breadcrumb_and_path_are_lookups(self):
+        product = Product.objects.prefetch_related('subcategories').get(pk=self.product.pk)
+        self.graph.ensure_loaded()
+        with self.assertNumQueries(0):
+            path = product.get_full_category_path
+            breadcrumb = product.get_breadcrumb_hierarchy
+            departments = product.primary_subcategory.get_departments()
+        self.assertEqual(path, 'Agriculture > Pumps > Water Pumps')
+        self.assertEqual([crumb['type'] for crumb in breadcrumb], ['department', 'category', 'subcategory'])
+        self.assertEqual(departments, [self.other_department, self.department])
+
+    def test_graph_follows_taxonomy_changes(self):
+        self.graph.ensure_loaded()
+        self.category.name = 'Industrial Pumps'
+        self.category.save()
+        self.assertEqual(self.product.get_full_category_path, 'Agriculture > Industrial Pumps > Water Pumps')
+        self.category.departments.remove(self.other_department)
+        self.assertEqual(self.subcategory.get_departments(), [self.department])
+
+    def test_tree_endpoint_with_etag(self):
+        response = self.client.get('/api/taxonomy/tree/')
+        self.assertEqual(response.status_code, 200)
+        tree = [
+            node for node in response.json()['departments']
+            if node['id'] in (self.department.id, self.other_department.id)
+        ]
+        self.assertEqual([node['name'] for node in tree], ['Agriculture', 'Industry'])
+        self.assertEqual(tree[1]['categories'][0]['subcategories'][0]['slug'], 'water-pumps')
+
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/taxonomy/tree/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Subcategory.objects.create(name='Oil Pumps').categories.add(self.category)
+        response = self.client.get('/api/taxonomy/tree/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class PrimaryImageDenormalizationTest(TestCase):
+    """Denormalized primary image columns on Product"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.user = User.objects.create_user(username='imagevendor', password='testpass123')
+        self.product = Product.objects.create(
+            name='Gallery Product',
+            description='Has images',
+            price=1000,
+            vendor=self.user,
+        )
+
+    def _upload(self, name, size):
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new('RGB', size).save(buffer, format='PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def _add_image(self, name, size, **kwargs):
+        return ProductImage.objects.create(product=self.product, image=self._upload(name, size), **kwargs)
+
+    def _stored(self):
+        return Product.objects.values_list(
+            'primary_image_ref_id', 'primary_image_url', 'primary_image_width', 'primary_image_height'
+        ).get(pk=self.product.pk)
+
+    def test_image_save_and_delete_keep_columns_current(self):
+        first = self._add_image('first.png', (40, 30), is_primary=True)
+        self.assertEqual(self._stored(), (first.pk, first.image.url, 40, 30))
+
+        second = self._add_image('second.png', (20, 10), is_primary=True)
+        self.assertEqual(self._stored(), (second.pk, second.image.url, 20, 10))
+
+        second.delete()
+        self.assertEqual(self._stored(), (first.pk, first.image.url, 40, 30))
+        first.delete()
+        self.assertEqual(self._stored(), (None, '', None, None))
+
+    def test_stale_instance_save_does_not_clobber_columns(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        image = self._add_image('gallery.png', (12, 8))
+        stale.name = 'Renamed Product'
+        stale.save()
+        self.assertEqual(self._stored(), (image.pk, image.image.url, 12, 8))
+
+    def test_serializer_reads_columns_without_queries(self):
+        from .serializers import ProductSerializer
+
+        image = self._add_image('card.png', (16, 16))
+        product = Product.objects.get(pk=self.product.pk)
+        serializer = ProductSerializer(context={})
+        with self.assertNumQueries(0):
+            url = serializer.get_primary_image(product)
+        self.assertTrue(url.endswith(image.image.url))
+        self.assertEqual(product.primary_image.name, image.image.name)
+
+    def test_backfill_command_repairs_columns(self):
+        image = self._add_image('backfill.png', (24, 12))
+        Product.objects.filter(pk=self.product.pk).update(
+            primary_image_ref=None, primary_image_url='', primary_image_width=None, primary_image_height=None
+        )
+        call_command('backfill_primary_images', '--dry-run', stdout=io.StringIO())
+        self.assertEqual(self._stored(), (None, '', None, None))
+        call_command('backfill_primary_images', stdout=io.StringIO())
+        self.assertEqual(self._stored(), (image.pk, image.image.url, 24, 12))
+
+
+class MediaManifestTest(TestCase):
+    """Storage existence checks served from the media manifest"""
+
+    def setUp(self):
+        from .media_manifest import media_manifest
+
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.manifest = media_manifest
+        self.manifest.rebuild()
+
+    def _write_media(self, name):
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+
+        return default_storage.save(name, ContentFile(b'data'))
+
+    def test_serializer_checks_manifest_instead_of_storage(self):
+        from unittest import mock
+        from django.core.files.storage import FileSystemStorage
+        from .serializers import CategorySerializer
+
+        category = Category.objects.create(
+            name='Pictured Category',
+            image=SimpleUploadedFile('pictured.png', b'data', content_type='image/png'),
+        )
+        missing = Category.objects.create(name='Missing Picture Category')
+        Category.objects.filter(pk=missing.pk).update(image='category_images/gone.png')
+        missing.refresh_from_db()
+
+        with mock.patch.object(FileSystemStorage, 'exists', return_value=False) as exists:
+            self.assertTrue(CategorySerializer(category).data['image_url'].endswith(category.image.url))
+            self.assertIsNone(CategorySerializer(missing).data['image_url'])
+            self.assertIsNone(CategorySerializer(missing).data['image_url'])
+        # The upload was recorded on save; only the unknown name was checked, once
+        exists.assert_called_once_with('category_images/gone.png')
+
+    def test_rescan_picks_up_files_written_outside_django(self):
+        name = self._write_media('external/report.png')
+        self.assertTrue(self.manifest.exists(name))
+        self.assertFalse(self.manifest.exists('external/later.png'))
+        later = self._write_media('external/later.png')
+        self.assertFalse(self.manifest.exists(later))
+        self.manifest.rebuild()
+        self.assertTrue(self.manifest.exists(later))
+
+    def test_first_lookup_does_not_wait_for_the_scan(self):
+        import threading
+        from unittest import mock
+        from .media_manifest import MediaManifest
+
+        name = self._write_media('external/first.png')
+        manifest = MediaManifest()
+        release = threading.Event()
+        scan = manifest.scan
+
+        def slow_scan():
+            release.wait(5)
+            return scan()
+
+        with mock.patch.object(manifest, 'scan', side_effect=slow_scan):
+            # Answered by storage while the scan runs on its thread
+            self.assertTrue(manifest.exists(name))
+            self.assertFalse(manifest.exists('external/none.png'))
+            release.set()
+            self.assertTrue(manifest._refreshed.wait(5))
+        self.assertIn(name, manifest._names)
+
+    def test_fix_missing_images_reports_from_manifest(self):
+        department = Department.objects.create(name='Broken Image Department')
+        Department.objects.filter(pk=department.pk).update(image='department_images/absent.png')
+        output = io.StringIO()
+        call_command('fix_missing_images', '--dry-run', stdout=output)
+        self.assertIn('department_images/absent.png', output.getvalue())
+
+
+class RequestInstrumentationTest(TestCase):
+    """Sampled request metrics exported at /internal/metrics"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from multivendor_platform.instrumentation import registry
+
+        registry.flush()
+        cache.clear()
+        self.client = Client()
+        user = User.objects.create_user(username='metricsvendor', password='testpass123')
+        category = Category.objects.create(name='Metrics Category')
+        Product.objects.create(
+            name='Metrics Product',
+            description='Measured',
+            price=1000,
+            vendor=user,
+            primary_category=category,
+            approval_status=Product.APPROVAL_STATUS_APPROVED,
+        )
+
+    def _scrape(self, **headers):
+        return self.client.get('/internal/metrics', **headers)
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=1.0, METRICS_TOKEN='scrape-token')
+    def test_sampled_requests_are_exported(self):
+        self.assertEqual(self.client.get('/api/products/').status_code, 200)
+        self.assertEqual(self.client.get('/api/products/').status_code, 200)
+
+        self.assertEqual(self._scrape().status_code, 403)
+        self.assertEqual(self._scrape(HTTP_AUTHORIZATION='Bearer scrape-tokem').status_code, 403)
+        response = self._scrape(HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('multivendor_requests_total{status="2xx",view="product-list"} 2', body)
+        self.assertIn('multivendor_events_total{event="response_cache_hit",view="product-list"} 1', body)
+        self.assertIn('multivendor_events_total{event="response_cache_miss",view="product-list"} 1', body)
+        self.assertIn('multivendor_request_duration_seconds_bucket{view="product-list",le="+Inf"} 2', body)
+        self.assertIn('multivendor_section_duration_seconds_total{section="serializer",view="product-list"}', body)
+        queries = [
+            line for line in body.splitlines()
+            if line.startswith('multivendor_db_queries_total{view="product-list"}')
+        ]
+        self.assertEqual(len(queries), 1)
+        self.assertGreater(int(queries[0].split()[-1]), 0)
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0, METRICS_TOKEN='scrape-token')
+    def test_disabled_instrumentation_records_nothing(self):
+        from multivendor_platform.instrumentation import timed
+
+        self.assertEqual(self.client.get('/api/products/').status_code, 200)
+        self.assertIs(timed('serializer'), timed('other'))
+        body = self._scrape(HTTP_AUTHORIZATION='Bearer scrape-token').content.decode()
+        self.assertNotIn('multivendor_requests_total', body)
+        self.assertIn('multivendor_instrumentation_sample_rate 0.0', body)
+
+
+class ProductRatingAggregatesTest(TestCase):
+    """Stored approved comment count and rating total on Product"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='ratingvendor', password='testpass123')
+        self.category = Category.objects.create(name='Rating Category')
+        self.product = self._product('Rated Product')
+        self.other = self._product('Other Product')
+
+    def _product(self, name):
+        return Product.objects.create(
+            name=name,
+            description='Rating aggregates',
+            price=1000,
+            vendor=self.user,
+            primary_category=self.category,
+            approval_status=Product.APPROVAL_STATUS_APPROVED,
+        )
+
+    def _comment(self, product, rating, approved=True):
+        return ProductComment.objects.create(
+            product=product, author=self.user, content='Review', rating=rating, is_approved=approved
+        )
+
+    def _stored(self, product):
+        return Product.objects.values_list(*Product.RATING_COLUMNS).get(pk=product.pk)
+
+    def test_save_and_delete_apply_deltas(self):
+        first = self._comment(self.product, 5)
+        pending = self._comment(self.product, 1, approved=False)
+        self.assertEqual(self._stored(self.product), (1, 5))
+
+        pending.is_approved = True
+        pending.save()
+        self.assertEqual(self._stored(self.product), (2, 6))
+
+        first.rating = 3
+        first.save()
+        self.assertEqual(self._stored(self.product), (2, 4))
+
+        # Moving a comment shifts its contribution between products
+        first.product = self.other
+        first.save()
+        self.assertEqual(self._stored(self.product), (1, 1))
+        self.assertEqual(self._stored(self.other), (1, 3))
+
+        first.delete()
+        self.assertEqual(self._stored(self.other), (0, 0))
+
+    def test_set_approval_only_counts_changed_comments(self):
+        comments = [self._comment(self.product, rating, approved=False) for rating in (4, 2)]
+        self._comment(self.product, 5)
+
+        approved = ProductComment.set_approval(ProductComment.objects.filter(product=self.product), True)
+        self.assertEqual(approved, 2)
+        self.assertEqual(self._stored(self.product), (3, 11))
+
+        ProductComment.set_approval(ProductComment.objects.filter(pk=comments[0].pk), False)
+        self.assertEqual(self._stored(self.product), (2, 7))
+
+    def test_stale_product_save_keeps_aggregates(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        self._comment(self.product, 4)
+        stale.name = 'Renamed Product'
+        stale.save()
+        self.assertEqual(self._stored(self.product), (1, 4))
+
+    def test_saving_a_deleted_product_inserts_it_again(self):
+        product = Product.objects.get(pk=self.other.pk)
+        Product.objects.filter(pk=product.pk).delete()
+        product.save()
+        self.assertTrue(Product.objects.filter(pk=product.pk).exists())
+
+    def test_reconcile_command_fixes_drift(self):
+        self._comment(self.product, 4)
+        self._comment(self.product, 3)
+        Product.objects.filter(pk=self.product.pk).update(approved_comment_count=7, rating_sum=1)
+        Product.objects.filter(pk=self.other.pk).update(approved_comment_count=1, rating_sum=5)
+
+        output = io.StringIO()
+        call_command('reconcile_product_ratings', '--dry-run', stdout=output)
+        self.assertIn('2 product(s)', output.getvalue())
+        self.assertEqual(self._stored(self.product), (7, 1))
+
+        call_command('reconcile_product_ratings', stdout=io.StringIO())
+        self.assertEqual(self._stored(self.product), (2, 7))
+        self.assertEqual(self._stored(self.other), (0, 0))
+
+    def test_listing_sorts_and_filters_by_rating(self):
+        self._comment(self.product, 4)
+        self._comment(self.product, 3)
+        self._comment(self.other, 5)
+        unrated = self._product('Unrated Product')
+
+        results = self.client.get('/api/products/?ordering=-rating_average').json()['results']
+        self.assertEqual([item['id'] for item in results], [self.other.pk, self.product.pk, unrated.pk])
+        self.assertEqual(results[1]['average_rating'], 3.5)
+        self.assertEqual(results[1]['comment_count'], 2)
+
+        results = self.client.get('/api/products/?min_rating=4').json()['results']
+        self.assertEqual([item['id'] for item in results], [self.other.pk])
+
+
+class LabelProductCountTest(TestCase):
+    """Incrementally maintained Label.product_count"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='countvendor', password='testpass123')
+        self.category = Category.objects.create(name='Count Category')
+        self.label = Label.objects.create(name='Counted Label')
+        self.other_label = Label.objects.create(name='Other Counted Label')
+        self.products = [self._product(f'Counted Product {i}') for i in range(3)]
+
+    def _product(self, name, approved=True):
+        return Product.objects.create(
+            name=name,
+            description='Label counts',
+            price=1000,
+            vendor=self.user,
+            primary_category=self.category,
+            approval_status=Product.APPROVAL_STATUS_APPROVED if approved else Product.APPROVAL_STATUS_PENDING,
+        )
+
+    def _committed(self):
+        # Counts are written when the surrounding transaction commits
+        return self.captureOnCommitCallbacks(execute=True)
+
+    def _count(self, label):
+        return Label.objects.values_list('product_count', flat=True).get(pk=label.pk)
+
+    def test_label_assignment_and_removal(self):
+        draft = self._product('Draft Product', approved=False)
+        with self._committed():
+            self.products[0].labels.add(self.label, self.other_label)
+            self.label.products.add(self.products[1], self.products[2], draft)
+        self.assertEqual((self._count(self.label), self._count(self.other_label)), (3, 1))
+
+        # Removing links that do not exist changes nothing
+        with self._committed():
+            self.products[0].labels.remove(self.label, self.other_label)
+            self.products[0].labels.remove(self.label)
+        self.assertEqual((self._count(self.label), self._count(self.other_label)), (2, 0))
+
+        with self._committed():
+            self.label.products.clear()
+        self.assertEqual(self._count(self.label), 0)
+
+    def test_activity_transitions_and_delete(self):
+        with self._committed():
+            self.label.products.add(*self.products)
+        product = self.products[0]
+
+        with self._committed():
+            product.approval_status = Product.APPROVAL_STATUS_REJECTED
+            product.save()
+        self.assertEqual(self._count(self.label), 2)
+        with self._committed():
+            product.approval_status = Product.APPROVAL_STATUS_APPROVED
+            product.save()
+        self.assertEqual(self._count(self.label), 3)
+
+        with self._committed():
+            deactivated = Product.set_active(Product.objects.filter(pk__in=[p.pk for p in self.products[:2]]), False)
+        self.assertEqual(deactivated, 2)
+        self.assertEqual(self._count(self.label), 1)
+
+        with self._committed():
+            self.products[2].delete()
+        self.assertEqual(self._count(self.label), 0)
+
+    def test_admin_bulk_action_goes_through_set_active(self):
+        from .suggest import suggest_index
+
+        with self._committed():
+            self.label.products.add(*self.products)
+        suggest_index.invalidate()
+        admin_user = User.objects.create_superuser(username='countadmin', password='testpass123', email='c@example.com')
+        self.client.force_login(admin_user)
+        url = reverse('admin-product-bulk-action')
+        ids = [product.pk for product in self.products[:2]]
+
+        with self._committed():
+            response = self.client.post(url, {'action': 'deactivate', 'product_ids': ids}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._count(self.label), 1)
+        suggested = [item['id'] for item in suggest_index.suggest('counted product') if item['type'] == 'product']
+        self.assertEqual(suggested, [self.products[2].pk])
+
+        with self._committed():
+            self.client.post(url, {'action': 'activate', 'product_ids': ids}, content_type='application/json')
+        self.assertEqual(self._count(self.label), 3)
+        suggested = [item['id'] for item in suggest_index.suggest('counted product') if item['type'] == 'product']
+        self.assertEqual(sorted(suggested), sorted(product.pk for product in self.products))
+
+    def test_bulk_assignment_is_one_update_per_transaction(self):
+        from django.db import transaction
+
+        with CaptureQueriesContext(connection) as ctx, self._committed():
+            with transaction.atomic():
+                for product in self.products:
+                    product.labels.add(self.label)
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "products_label"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self._count(self.label), 3)
+
+    def test_rolled_back_changes_are_discarded(self):
+        from django.db import transaction
+
+        with self._committed():
+            self.products[0].labels.add(self.label)
+            try:
+                with transaction.atomic():
+                    self.products[1].labels.add(self.label)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.products[2].labels.add(self.label)
+        self.assertEqual(self._count(self.label), 2)
+
+    def test_recount_command(self):
+        with self._committed():
+            self.label.products.add(*self.products)
+        Label.objects.filter(pk=self.label.pk).update(product_count=9)
+
+        output = io.StringIO()
+        call_command('recount_label_products', '--dry-run', stdout=output)
+        self.assertIn('1 label(s)', output.getvalue())
+        self.assertEqual(self._count(self.label), 9)
+
+        call_command('recount_label_products', stdout=io.StringIO())
+        self.assertEqual((self._count(self.label), self._count(self.other_label)), (3, 0))
+
+
+class ImageVariantPipelineTest(TestCase):
+    """Responsive WebP/JPEG variants of uploaded images"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=self.media_root, IMAGE_VARIANTS_ASYNC=False, IMAGE_VARIANT_WIDTHS=(100, 200)
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.user = User.objects.create_user(username='variantvendor', password='testpass123')
+        self.product = Product.objects.create(
+            name='Variant Product',
+            description='Has responsive images',
+            price=1000,
+            vendor=self.user,
+        )
+
+    def _upload(self, name, size, mode='RGBA'):
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new(mode, size).save(buffer, format='PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def test_upload_generates_variants_after_commit(self):
+        from django.core.files.storage import default_storage
+        from PIL import Image
+
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=self.product, image=self._upload('wide.png', (300, 150)))
+        image.refresh_from_db()
+        self.assertEqual(sorted(image.variants), ['jpeg', 'webp'])
+        self.assertEqual(sorted(image.variants['webp']), ['100', '200'])
+        with default_storage.open(image.variants['jpeg']['100']) as variant:
+            self.assertEqual(Image.open(variant).size, (100, 50))
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.primary_image_variants, image.variants)
+        from .serializers import ProductSerializer
+
+        data = ProductSerializer(self.product).data['primary_image_variants']
+        self.assertTrue(data['webp']['srcset'].endswith('200w'))
+        self.assertEqual(list(data['jpeg']['urls']), ['100', '200'])
+
+    def test_small_image_is_not_upscaled_and_replacement_clears_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=self.product, image=self._upload('small.png', (60, 60), 'RGB'))
+        image.refresh_from_db()
+        self.assertEqual(list(image.variants['webp']), ['60'])
+
+        image.image = self._upload('replacement.png', (120, 60), 'RGB')
+        with self.captureOnCommitCallbacks(execute=True):
+            image.save()
+        image.refresh_from_db()
+        self.assertEqual(sorted(image.variants['webp']), ['100', '120'])
+        self.assertIn('replacement', image.variants['webp']['100'])
+
+    def test_backfill_command(self):
+        image = ProductImage.objects.create(product=self.product, image=self._upload('existing.png', (150, 100)))
+        department = Department.objects.create(name='Variant Department', image=self._upload('dept.png', (150, 100)))
+        ProductImage.objects.filter(pk=image.pk).update(variants={})
+
+        output = io.StringIO()
+        call_command('generate_image_variants', '--dry-run', stdout=output)
+        self.assertIn('2 image(s) would be processed', output.getvalue())
+
+        call_command('generate_image_variants', '--workers', '1', stdout=io.StringIO())
+        image.refresh_from_db()
+        self.assertEqual(sorted(image.variants['jpeg']), ['100', '150'])
+        from .image_variants import existing_variants
+
+        self.assertEqual(sorted(existing_variants(department.image.name)['webp']), ['100', '150'])
+
+    def test_recording_variants_invalidates_cached_product_lists(self):
+        from .cache import get_generations, SCOPE_PRODUCTS
+        from .image_variants import process
+
+        image = ProductImage.objects.create(product=self.product, image=self._upload('late.png', (150, 100)))
+        before = get_generations([SCOPE_PRODUCTS])[SCOPE_PRODUCTS]
+        process('products.ProductImage', image.pk, 'image', image.image.name)
+        self.assertNotEqual(get_generations([SCOPE_PRODUCTS])[SCOPE_PRODUCTS], before)
+
+    def test_missing_legacy_source_is_recorded_and_not_queued_again(self):
+        from .serializers import ProductSerializer
+
+        self.product.image = 'product_images/missing.png'
+        with self.assertLogs('products.image_variants', 'ERROR'), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.primary_image_variants, {'failed': self.product.image.name})
+        self.assertEqual(ProductSerializer(self.product).data['primary_image_variants'], {})
+
+        self.product.name = 'Variant Product Renamed'
+        with self.assertNoLogs('products.image_variants', 'ERROR'), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+
+
+class BackgroundImageUploadTest(TestCase):
+    """Multi-image uploads handed to the background job"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.spool_root = tempfile.mkdtemp()
+        for directory in (self.media_root, self.spool_root):
+            self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=self.media_root,
+            IMAGE_UPLOAD_SPOOL_DIR=self.spool_root,
+            IMAGE_UPLOADS_ASYNC=False,
+            IMAGE_UPLOAD_PROCESSES=1,
+            IMAGE_VARIANTS_ASYNC=False,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.user = User.objects.create_user(username='uploadvendor', password='testpass123')
+        self.product = Product.objects.create(
+            name='Upload Product',
+            description='Gallery uploads',
+            price=1000,
+            vendor=self.user,
+        )
+
+    def _upload(self, name, size=(40, 30)):
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new('RGB', size).save(buffer, format='PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def test_job_inserts_valid_images_and_sets_primary_once(self):
+        from .image_uploads import enqueue, reserved_image_count
+        from .models import ProductImageUpload
+
+        files = [
+            self._upload('first.png'),
+            SimpleUploadedFile('broken.png', b'not an image', content_type='image/png'),
+            self._upload('second.png', (20, 10)),
+        ]
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            job = enqueue(self.product, files, user=self.user)
+        self.assertEqual(job.status, ProductImageUpload.STATUS_PENDING)
+        self.assertEqual(reserved_image_count(self.product), 3)
+        self.assertFalse(self.product.images.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for callback in callbacks:
+                callback()
+        job.refresh_from_db()
+        self.assertEqual(job.status, ProductImageUpload.STATUS_DONE)
+        self.assertEqual((job.processed, job.rejected, job.files), (2, 1, []))
+        self.assertEqual(job.errors[0]['name'], 'broken.png')
+        self.assertEqual(os.listdir(self.spool_root), [])
+
+        images = list(self.product.images.all())
+        self.assertEqual([image.is_primary for image in images], [True, False])
+        self.assertEqual([image.sort_order for image in images], [0, 1])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.primary_image_ref_id, images[0].pk)
+        self.assertEqual(self.product.primary_image_width, 40)
+        self.assertEqual(reserved_image_count(self.product), 2)
+
+    def test_abandoned_jobs_are_requeued_or_failed(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .image_uploads import enqueue, reserved_image_count
+        from .models import ProductImageUpload
+
+        # Queued by a worker that was restarted before running them
+        with self.captureOnCommitCallbacks(execute=False):
+            spooled = enqueue(self.product, [self._upload('kept.png')], user=self.user)
+            lost = enqueue(self.product, [self._upload('lost.png'), self._upload('lost2.png')], user=self.user)
+        shutil.rmtree(os.path.dirname(lost.files[0]['path']))
+        ProductImageUpload.objects.filter(pk=spooled.pk).update(status=ProductImageUpload.STATUS_PROCESSING)
+        self.assertEqual(reserved_image_count(self.product), 3)
+        ProductImageUpload.objects.update(queued_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(reserved_image_count(self.product), 0)
+
+        output = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('recover_image_uploads', stdout=output)
+        self.assertIn('1 job(s) re-queued, 1 failed', output.getvalue())
+        spooled.refresh_from_db()
+        lost.refresh_from_db()
+        self.assertEqual((spooled.status, spooled.processed), (ProductImageUpload.STATUS_DONE, 1))
+        self.assertEqual(lost.status, ProductImageUpload.STATUS_FAILED)
+        self.assertEqual(self.product.images.count(), 1)
+
+    def test_failed_insert_removes_copied_files(self):
+        from unittest import mock
+        from .image_uploads import enqueue
+        from .models import ProductImage, ProductImageUpload
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            job = enqueue(self.product, [self._upload('copied.png')], user=self.user)
+        with mock.patch.object(ProductImage.objects, 'bulk_create', side_effect=RuntimeError('insert failed')):
+            for callback in callbacks:
+                callback()
+        job.refresh_from_db()
+        self.assertEqual(job.status, ProductImageUpload.STATUS_FAILED)
+        copied = [name for _root, _dirs, names in os.walk(self.media_root) for name in names]
+        self.assertEqual(copied, [])
+
+    def test_verification_runs_in_worker_processes(self):
+        from .image_uploads import _verify_all
+
+        paths = []
+        for name, content in (('ok.png', self._upload('ok.png').read()), ('bad.png', b'garbage')):
+            path = os.path.join(self.spool_root, name)
+            with open(path, 'wb') as spooled:
+                spooled.write(content)
+            paths.append(path)
+        with override_settings(IMAGE_UPLOAD_PROCESSES=2):
+            results = _verify_all(paths)
+        self.assertEqual([valid for valid, _reason in results], [True, False])
+
+
+class ProductBulkImportTest(TestCase):
+    """Streaming CSV/JSONL import with bulk upserts and checkpoints"""
+
+    def setUp(self):
+        self.spool_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spool_root, ignore_errors=True)
+        overrides = override_settings(PRODUCT_IMPORT_SPOOL_DIR=self.spool_root, PRODUCT_IMPORTS_ASYNC=False)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.vendor = User.objects.create_user(username='importvendor', password='testpass123')
+        self.category = Category.objects.create(name='Pumps')
+        self.subcategory = Subcategory.objects.create(name='Water Pumps')
+        self.subcategory.categories.add(self.category)
+        self.sale = Label.objects.create(name='Sale')
+        self.new = Label.objects.create(name='New Arrival')
+
+    def _write(self, name, content):
+        path = os.path.join(self.spool_root, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(content)
+        return path
+
+    def _jsonl(self, name, rows):
+        import json
+
+        return self._write(name, ''.join(json.dumps(row) + '\n' for row in rows))
+
+    def _row(self, index, **extra):
+        return {
+            'name': f'Imported pump {index}',
+            'description': 'A centrifugal water pump for industrial use',
+            'price': 1000 + index,
+            'vendor': 'importvendor',
+            **extra,
+        }
+
+    def test_csv_rows_are_validated_and_linked(self):
+        from .importing import import_file
+
+        path = self._write('catalog.csv', (
+            'name,description,price,stock,vendor,approval_status,primary_category,subcategories,labels\n'
+            'Steel Pump,A centrifugal water pump for industrial use,2500,4,importvendor,approved,pumps,water-pumps,sale|new-arrival\n'
+            'Free Pump,A centrifugal water pump for industrial use,0,1,importvendor,approved,pumps,,\n'
+            'Odd Pump,A centrifugal water pump for industrial use,900,1,importvendor,approved,pumps,,missing-label\n'
+        ))
+        with self.captureOnCommitCallbacks(execute=True):
+            state = import_file(path)
+
+        self.assertEqual((state['created'], state['updated'], state['rejected']), (1, 0, 2))
+        self.assertEqual([error['position'] for error in state['errors']], [2, 3])
+        self.assertIn('price', state['errors'][0]['error'])
+        self.assertIn('missing-label', state['errors'][1]['error'])
+
+        product = Product.objects.get(slug='steel-pump')
+        self.assertTrue(product.is_active)
+        self.assertEqual(product.stock, 4)
+        self.assertEqual(product.primary_category, self.category)
+        self.assertTrue(product.search_name)
+        self.assertEqual(list(product.subcategories.all()), [self.subcategory])
+        self.assertEqual(set(product.labels.all()), {self.sale, self.new})
+        self.sale.refresh_from_db()
+        self.assertEqual(self.sale.product_count, 1)
+
+    def test_upsert_replaces_links_and_moves_label_counts(self):
+        from .importing import import_file
+
+        existing = Product.objects.create(
+            name='Old Pump', slug='old-pump', description='A centrifugal water pump for industrial use',
+            price=500, vendor=self.vendor, primary_category=self.category,
+            approval_status=Product.APPROVAL_STATUS_APPROVED,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            existing.labels.add(self.sale)
+        self.sale.refresh_from_db()
+        self.assertEqual(self.sale.product_count, 1)
+
+        path = self._jsonl('catalog.jsonl', [
+            self._row(0, slug='old-pump', price=750, labels=['new-arrival'], approval_status='approved'),
+            self._row(1, slug='old-pump-2', vendor='someone-else'),
+        ])
+        with self.captureOnCommitCallbacks(execute=True):
+            state = import_file(path)
+
+        self.assertEqual((state['created'], state['updated'], state['rejected']), (0, 1, 1))
+        existing.refresh_from_db()
+        self.assertEqual(existing.price, 750)
+        self.assertEqual(existing.name, 'Imported pump 0')
+        self.assertTrue(existing.is_active)
+        self.assertEqual(list(existing.labels.all()), [self.new])
+        self.sale.refresh_from_db()
+        self.new.refresh_from_db()
+        self.assertEqual((self.sale.product_count, self.new.product_count), (0, 1))
+
+    def test_default_vendor_cannot_overwrite_another_vendors_slug(self):
+        from .importing import import_file
+
+        other = User.objects.create_user(username='othervendor', password='testpass123')
+        foreign = Product.objects.create(
+            name='Imported pump 0', description='Owned elsewhere', price=500, vendor=other,
+            primary_category=self.category,
+        )
+        row = self._row(0, price=999)
+        del row['vendor']
+        # The slug comes from the name and matches the other vendor's product
+        path = self._jsonl('no-vendor.jsonl', [row])
+        with self.captureOnCommitCallbacks(execute=True):
+            state = import_file(path, vendor=self.vendor)
+
+        self.assertEqual((state['updated'], state['rejected']), (0, 1))
+        self.assertIn('belongs to another vendor', state['errors'][0]['error'])
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.price, 500)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        from .importing import import_file
+
+        def queries_for(count, name):
+            rows = [self._row(index, slug=f'{name}-{index}', subcategories=['water-pumps'], labels=['sale'])
+                    for index in range(count)]
+            path = self._jsonl(f'{name}.jsonl', rows)
+            with CaptureQueriesContext(connection) as captured:
+                with self.captureOnCommitCallbacks(execute=True):
+                    state = import_file(path, chunk_size=100)
+            self.assertEqual(state['created'], count)
+            return len(captured)
+
+        # Stay under SQLite's per-statement variable limit, which splits larger inserts
+        self.assertEqual(queries_for(3, 'small'), queries_for(20, 'large'))
+        self.assertEqual(Product.objects.filter(labels=self.sale).count(), 23)
+
+    def test_resume_continues_after_checkpoint(self):
+        from .importing import checkpoint_path_for, import_file, write_checkpoint
+
+        path = self._jsonl('catalog.jsonl', [self._row(index, slug=f'pump-{index}') for index in range(4)])
+        write_checkpoint(checkpoint_path_for(path), {
+            'position': 2, 'created': 2, 'updated': 0, 'rejected': 0, 'errors': [], 'finished': False,
+        })
+        with self.captureOnCommitCallbacks(execute=True):
+            state = import_file(path, chunk_size=2, resume=True)
+
+        self.assertEqual(state['created'], 4)
+        self.assertTrue(state['finished'])
+        self.assertEqual(
+            sorted(Product.objects.values_list('slug', flat=True)), ['pump-2', 'pump-3']
+        )
+
+    def test_dry_run_writes_nothing(self):
+        path = self._jsonl('catalog.jsonl', [self._row(0)])
+        out = io.StringIO()
+        call_command('import_products', path, '--dry-run', stdout=out)
+        self.assertIn('1 product(s) would be created', out.getvalue())
+        self.assertFalse(Product.objects.exists())
+
+    def test_admin_upload_imports_file(self):
+        admin_user = User.objects.create_superuser(username='importadmin', password='testpass123', email='a@example.com')
+        client = Client()
+        client.force_login(admin_user)
+        upload = SimpleUploadedFile(
+            'catalog.csv',
+            b'name,description,price\nAdmin Pump,A centrifugal water pump for industrial use,1200\n',
+            content_type='text/csv',
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(
+                reverse('admin:products_product_import'), {'file': upload, 'vendor': self.vendor.pk}
+            )
+        self.assertEqual(response.status_code, 302)
+        product = Product.objects.get(slug='admin-pump')
+        self.assertEqual(product.vendor, self.vendor)
+        self.assertFalse(product.is_active)
+
+        page = client.get(reverse('admin:products_product_import'))
+        self.assertContains(page, 'catalog.csv')
+
+
+class ProductCatalogExportTest(TestCase):
+    """Streaming CSV/JSONL catalog export for vendors and admins"""
+
+    def setUp(self):
+        self.vendor = User.objects.create_user(username='exportvendor', password='testpass123')
+        self.other = User.objects.create_user(username='othervendor', password='testpass123')
+        self.subcategory = Subcategory.objects.create(name='Valves')
+        self.label = Label.objects.create(name='Export Label')
+        for index in range(3):
+            product = Product.objects.create(
+                name=f'Export valve {index}', description='Industrial valve', price=100 + index, vendor=self.vendor
+            )
+            product.subcategories.add(self.subcategory)
+            product.labels.add(self.label)
+        Product.objects.create(name='Foreign valve', description='Industrial valve', price=5, vendor=self.other)
+        self.client = Client()
+
+    def _body(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_vendor_csv_export_contains_only_own_products(self):
+        import csv
+
+        self.client.force_login(self.vendor)
+        response = self.client.get(reverse('my-products-export'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('products-exportvendor.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(self._body(response).decode('utf-8-sig'))))
+        self.assertEqual([row['name'] for row in rows], [f'Export valve {index}' for index in range(3)])
+        self.assertEqual(rows[0]['subcategories'], 'valves')
+        self.assertEqual(rows[0]['labels'], 'export-label')
+        self.assertEqual(rows[0]['vendor'], 'exportvendor')
+
+    def test_csv_cells_cannot_start_formulas(self):
+        import csv
+        from .importing import FORMAT_CSV, read_rows
+
+        formula = '=HYPERLINK("http://evil.example","Click")'
+        Product.objects.filter(vendor=self.vendor, name='Export valve 0').update(description=formula)
+        Product.objects.filter(vendor=self.vendor, name='Export valve 1').update(description="'quoted")
+        self.client.force_login(self.vendor)
+        body = self._body(self.client.get(reverse('my-products-export')))
+
+        rows = list(csv.DictReader(io.StringIO(body.decode('utf-8-sig'))))
+        self.assertEqual(rows[0]['description'], "'" + formula)
+        self.assertEqual(rows[1]['description'], "''quoted")
+        imported = [row for _position, row in read_rows(io.BytesIO(body), FORMAT_CSV)]
+        self.assertEqual([row['description'] for row in imported[:2]], [formula, "'quoted"])
+
+    def test_gzipped_jsonl_export(self):
+        import gzip
+        import json
+
+        self.client.force_login(self.vendor)
+        response = self.client.get(reverse('my-products-export'), {'output': 'jsonl', 'compress': 'gzip'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('.jsonl.gz', response['Content-Disposition'])
+        rows = [json.loads(line) for line in gzip.decompress(self._body(response)).decode('utf-8').splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['labels'], ['export-label'])
+
+        invalid = self.client.get(reverse('my-products-export'), {'output': 'xml'})
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_queries_per_chunk_not_per_product(self):
+        from .exporting import export_stream
+
+        with CaptureQueriesContext(connection) as captured:
+            b''.join(export_stream(Product.objects.all(), 'csv', chunk_size=2))
+        # Two chunks, each: product rows (one cursor) plus subcategory and label slugs
+        self.assertEqual(len(captured), 1 + 2 * 2)
+
+    def test_admin_export_applies_filters_and_requires_staff(self):
+        import json
+
+        url = reverse('admin-products-export')
+        self.client.force_login(self.vendor)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        admin_user = User.objects.create_superuser(username='exportadmin', password='testpass123', email='e@example.com')
+        self.client.force_login(admin_user)
+        response = self.client.get(url, {'output': 'jsonl', 'supplier': self.other.pk})
+        rows = [json.loads(line) for line in self._body(response).decode('utf-8').splitlines()]
+        self.assertEqual([row['name'] for row in rows], ['Foreign valve'])
+
+
+class SitemapFilesTest(TestCase):
+    """Pre-generated, sharded and gzipped sitemap files"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=self.media_root,
+            SITE_URL='https://example.test',
+            SITEMAP_SHARD_SIZE=2,
+            SITEMAPS_ASYNC=False,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.vendor = User.objects.create_user(username='sitemapvendor', password='testpass123')
+        self.products = [
+            Product.objects.create(name=f'Sitemap product {index}', description='Listed', price=10, vendor=self.vendor)
+            for index in range(5)
+        ]
+        # Active and visible regardless of approval (update() skips the save() rules)
+        Product.objects.update(is_active=True)
+
+    def _shard_urls(self, name):
+        import gzip
+        from django.core.files.storage import default_storage
+
+        with default_storage.open(name, 'rb') as shard:
+            return gzip.decompress(shard.read()).decode('utf-8').count('<url>')
+
+    def test_generate_shards_by_primary_key_and_rewrites_only_changed_shards(self):
+        from django.core.files.storage import default_storage
+        from .sitemap_files import generate, shard_name
+
+        counts = generate()
+        shards = {product.pk // 2 for product in self.products}
+        self.assertEqual(counts['removed'], 0)
+        for shard in shards:
+            self.assertTrue(default_storage.exists(shard_name('products', shard)))
+        self.assertEqual(
+            sum(self._shard_urls(shard_name('products', shard)) for shard in shards), len(self.products)
+        )
+
+        again = generate()
+        self.assertEqual(again['written'], 0)
+
+        changed = self.products[-1]
+        changed.name = 'Renamed'
+        changed.save(update_fields=['name', 'updated_at'])
+        counts = generate()
+        self.assertEqual(counts['written'], 1)
+
+        Product.objects.filter(pk=changed.pk).update(is_active=False)
+        if not Product.objects.filter(is_active=True, pk__gte=changed.pk // 2 * 2, pk__lt=changed.pk // 2 * 2 + 2).exists():
+            self.assertEqual(generate()['removed'], 1)
+            self.assertFalse(default_storage.exists(shard_name('products', changed.pk // 2)))
+
+    def test_replace_keeps_fixed_names(self):
+        import os
+        from unittest import mock
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage, InMemoryStorage
+        from .sitemap_files import _replace, generate
+
+        generate()
+        self.assertEqual(
+            [name for name in os.listdir(os.path.join(self.media_root, 'sitemaps')) if name.startswith('.tmp-')], []
+        )
+        self.assertTrue(default_storage.exists('sitemaps/sitemap.xml'))
+
+        # Storage without paths: a file stored concurrently under the name wins
+        storage = InMemoryStorage()
+        storage.save('sitemaps/sitemap.xml', ContentFile(b'other worker'))
+        with mock.patch.object(storage, 'exists', return_value=False):
+            _replace(storage, 'sitemaps/sitemap.xml', ContentFile(b'this worker'))
+        self.assertEqual(storage.listdir('sitemaps')[1], ['sitemap.xml'])
+
+    def test_concurrent_run_in_another_process_is_skipped(self):
+        from django.core.cache import cache
+        from .sitemap_files import generate, GENERATE_LOCK_KEY
+
+        cache.add(GENERATE_LOCK_KEY, True)
+        self.addCleanup(cache.delete, GENERATE_LOCK_KEY)
+        self.assertIsNone(generate())
+
+    def test_views_serve_index_and_shards_with_last_modified(self):
+        from .sitemap_files import generate
+
+        client = Client()
+        live = client.get('/sitemap.xml')
+        # The first request generates the files (inline here) and serves the live sitemap
+        self.assertEqual(live.status_code, 200)
+
+        generate()
+        response = client.get('/sitemap.xml')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        index = b''.join(response.streaming_content).decode('utf-8')
+        self.assertIn('<sitemapindex', index)
+        self.assertIn('https://example.test/sitemaps/products-', index)
+
+        not_modified = client.get('/sitemap.xml', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+
+        shard = index.split('https://example.test/')[1].split('<')[0]
+        shard_response = client.get('/' + shard)
+        self.assertEqual(shard_response.status_code, 200)
+        self.assertEqual(shard_response['Content-Type'], 'application/gzip')
+        self.assertEqual(client.get('/sitemaps/../manifest.json').status_code, 404)
+
+
+class ConditionalGetTest(TestCase):
+    """ETag / Last-Modified revalidation of catalog detail endpoints"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='conditionalvendor', password='testpass123')
+        self.category = Category.objects.create(name='Conditional Category')
+        self.product = Product.objects.create(
+            name='Conditional Product',
+            description='Revalidated product',
+            price=1000,
+            vendor=self.user,
+            primary_category=self.category,
+            approval_status=Product.APPROVAL_STATUS_APPROVED,
+        )
+        self.url = f'/api/products/slug/{self.product.slug}/'
+
+    def test_product_detail_returns_304_before_serializing(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with CaptureQueriesContext(connection) as ctx:
+            revalidated = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated['ETag'], response['ETag'])
+        # Only the version query: no product, prefetch or comment queries
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        by_id = self.client.get(f'/api/products/slug/{self.product.pk}/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(by_id.status_code, 304)
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304
+        )
+        self.assertEqual(self.client.get('/api/products/slug/no-such-product/').status_code, 404)
+
+    def test_product_detail_etag_follows_related_objects(self):
+        etag = self.client.get(self.url)['ETag']
+
+        comment = ProductComment.objects.create(product=self.product, author=self.user, content='Nice', is_approved=True)
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()['comment_count'], 1)
+
+        # Deletions change the row count even though no timestamp moves
+        etag = changed['ETag']
+        comment.delete()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get(self.url)['ETag']
+        subcategory = Subcategory.objects.create(name='Conditional Subcategory')
+        self.product.subcategories.add(subcategory)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_product_detail_etag_follows_update_only_writes(self):
+        comment = ProductComment.objects.create(product=self.product, author=self.user, content='Hold', rating=4)
+        etag = self.client.get(self.url)['ETag']
+        # Approval and image variants are written with update(), not save()
+        ProductComment.set_approval(ProductComment.objects.filter(pk=comment.pk), True)
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()['comment_count'], 1)
+
+        etag = changed['ETag']
+        Product.objects.filter(pk=self.product.pk).update(primary_image_variants={'webp': {'320': 'a.webp'}})
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_label_blog_and_about_page_revalidate(self):
+        from blog.models import BlogCategory, BlogPost
+        from pages.models import AboutPage
+
+        label = Label.objects.create(name='Conditional Label', is_seo_page=True)
+        category = BlogCategory.objects.create(name='Conditional Blog Category')
+        post = BlogPost.objects.create(
+            title='Conditional Post', content='Body', author=self.user, category=category, status='published'
+        )
+        AboutPage.objects.create(title_fa='درباره ما', content_fa='متن')
+
+        for url in (f'/api/labels/seo-content/{label.slug}/', f'/api/blog/posts/{post.slug}/', '/api/pages/about/current/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304, url)
+
+        # Revalidated blog views are still counted
+        post.refresh_from_db()
+        self.assertEqual(post.view_count, 2)
+
+        etag = self.client.get(f'/api/labels/seo-content/{label.slug}/')['ETag']
+        label.seo_h1 = 'Changed'
+        label.save()
+        self.assertEqual(self.client.get(f'/api/labels/seo-content/{label.slug}/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_supplier_detail_revalidates(self):
+        from users.models import VendorProfile
+
+        supplier = VendorProfile.objects.create(user=self.user, store_name='Conditional Store', is_approved=True)
+        url = f'/api/users/suppliers/{supplier.pk}/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['product_count'], 1)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        Product.objects.create(
+            name='Second Conditional Product', description='More', price=5, vendor=self.user,
+            primary_category=self.category, approval_status=Product.APPROVAL_STATUS_APPROVED,
+        )
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+        VendorProfile.objects.filter(pk=supplier.pk).update(is_approved=False)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_supplier_detail_follows_admin_bulk_writes(self):
+        from django.contrib.admin.sites import site
+        from django.contrib.messages.storage.fallback import FallbackStorage
+        from django.test import RequestFactory
+        from users.models import SupplierComment, VendorProfile
+
+        supplier = VendorProfile.objects.create(user=self.user, store_name='Bulk Store', is_approved=True)
+        comment = SupplierComment.objects.create(supplier=supplier, user=self.user, rating=4, comment='Fine')
+        url = f'/api/users/suppliers/{supplier.pk}/'
+        etag = self.client.get(url)['ETag']
+
+        request = RequestFactory().post('/admin/')
+        request.user = User.objects.create_superuser(username='bulkadmin', password='testpass123')
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        site._registry[SupplierComment].approve_comments(request, SupplierComment.objects.filter(pk=comment.pk))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['rating_average'], 4)
+
+        etag = response['ETag']
+        Product.set_active(Product.objects.filter(pk=self.product.pk), False)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['product_count'], 0)
+
+    def test_label_seo_content_follows_admin_seo_actions(self):
+        from django.contrib.admin.sites import site
+        from django.contrib.messages.storage.fallback import FallbackStorage
+        from django.test import RequestFactory
+
+        label = Label.objects.create(name='Bulk SEO Label', is_seo_page=True)
+        url = f'/api/labels/seo-content/{label.slug}/'
+        etag = self.client.get(url)['ETag']
+
+        request = RequestFactory().post('/admin/')
+        request.user = User.objects.create_superuser(username='seoadmin', password='testpass123')
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        site._registry[Label].unmark_seo(request, Label.objects.filter(pk=label.pk))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['is_seo_page'])
+
+
+class SlugResolverTest(TestCase):
+    """Slug -> primary key resolution for product detail and taxonomy ?slug= filters"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='slugvendor', password='testpass123')
+        self.category = Category.objects.create(name='Slug Category')
+        self.product = Product.objects.create(
+            name='Slug Product',
+            description='Resolved by slug',
+            price=1000,
+            vendor=self.user,
+            primary_category=self.category,
+            approval_status=Product.APPROVAL_STATUS_APPROVED,
+        )
+
+    def test_resolve_caches_hits_but_not_misses(self):
+        from .slugs import product_slugs
+
+        self.assertEqual(product_slugs.resolve(self.product.slug), self.product.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(product_slugs.resolve(self.product.slug), self.product.pk)
+
+        self.assertIsNone(product_slugs.resolve('later-product'))
+        later = Product.objects.create(name='Later Product', description='New', price=5, vendor=self.user)
+        self.assertEqual(product_slugs.resolve('later-product'), later.pk)
+
+    def test_slug_change_and_delete_invalidate(self):
+        from .slugs import category_slugs, product_slugs
+
+        old_slug = self.product.slug
+        self.assertEqual(self.client.get(f'/api/products/slug/{old_slug}/').status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.slug = 'renamed-slug-product'
+            self.product.save()
+        self.assertIsNone(product_slugs.resolve(old_slug))
+        self.assertEqual(self.client.get(f'/api/products/slug/{old_slug}/').status_code, 404)
+        self.assertEqual(self.client.get('/api/products/slug/renamed-slug-product/').status_code, 200)
+
+        response = self.client.get('/api/categories/', {'slug': self.category.slug})
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.category.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.delete()
+        self.assertIsNone(category_slugs.resolve('slug-category'))
+        response = self.client.get('/api/categories/', {'slug': 'slug-category'})
+        self.assertEqual(response.json()['results'], [])
+
+    def test_save_compares_against_the_loaded_slug(self):
+        from .cache import get_generations
+        from .slugs import SCOPE_CATEGORY_SLUGS
+
+        category = Category.objects.get(pk=self.category.pk)
+        generation = get_generations([SCOPE_CATEGORY_SLUGS])[SCOPE_CATEGORY_SLUGS]
+        category.name = 'Slug Category Renamed'
+        with CaptureQueriesContext(connection) as ctx:
+            category.save(update_fields=['name', 'slug'])
+        self.assertFalse([query for query in ctx.captured_queries if query['sql'].startswith('SELECT')])
+        self.assertEqual(get_generations([SCOPE_CATEGORY_SLUGS])[SCOPE_CATEGORY_SLUGS], generation)
+
+        category.slug = 'slug-category-renamed'
+        category.save(update_fields=['slug'])
+        self.assertNotEqual(get_generations([SCOPE_CATEGORY_SLUGS])[SCOPE_CATEGORY_SLUGS], generation)
+
+
+class RelatedProductsTest(TestCase):
+    """Precomputed related products and the related action"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='relatedvendor', password='testpass123')
+        self.other_vendor = User.objects.create_user(username='othervendor', password='testpass123')
+        self.category = Category.objects.create(name='Related Category')
+        self.pumps = Subcategory.objects.create(name='Related Pumps')
+        self.valves = Subcategory.objects.create(name='Related Valves')
+        self.steel = Label.objects.create(name='Related Steel')
+
+        self.pump = self._product('Pump A', self.user, 1000, self.pumps, [self.steel])
+        self.twin = self._product('Pump B', self.user, 1100, self.pumps, [self.steel])
+        self.cousin = self._product('Pump C', self.other_vendor, 5000, self.pumps, [])
+        self.valve = self._product('Valve', self.other_vendor, 20, self.valves, [])
+
+    def _product(self, name, vendor, price, subcategory, labels):
+        product = Product.objects.create(
+            name=name, description='Related', price=price, vendor=vendor,
+            primary_category=self.category, approval_status=Product.APPROVAL_STATUS_APPROVED,
+        )
+        product.subcategories.add(subcategory)
+        product.labels.add(*labels)
+        return product
+
+    def test_build_ranks_by_shared_features_and_action_serves_them(self):
+        from .models import RelatedProductSet
+        from .related import build
+
+        counts = build()
+        self.assertEqual(counts, {'products': 4, 'updated': 4, 'removed': 0})
+        related = RelatedProductSet.objects.get(product=self.pump)
+        self.assertEqual(related.related_ids[:2], [self.twin.pk, self.cousin.pk])
+        self.assertEqual(related.scores, sorted(related.scores, reverse=True))
+
+        response = self.client.get(f'/api/products/{self.pump.pk}/related/', {'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()], [self.twin.pk, self.cousin.pk])
+
+        # Hidden neighbours are dropped when serving
+        Product.objects.filter(pk=self.twin.pk).update(is_marketplace_hidden=True)
+        from .cache import bump_generation, SCOPE_PRODUCTS
+        bump_generation(SCOPE_PRODUCTS)
+        response = self.client.get(f'/api/products/{self.pump.pk}/related/')
+        self.assertNotIn(self.twin.pk, [row['id'] for row in response.json()])
+        self.assertEqual(self.client.get('/api/products/none/related/').status_code, 404)
+
+    def test_incremental_build_matches_full_build(self):
+        from .models import RelatedProductSet
+        from .related import build
+
+        build()
+        self.assertEqual(build()['updated'], 0)
+
+        # The valve gains the pumps' subcategory and label: it now enters their lists
+        self.valve.subcategories.add(self.pumps)
+        self.valve.labels.add(self.steel)
+        newcomer = self._product('Pump D', self.user, 1000, self.pumps, [self.steel])
+        counts = build()
+        self.assertGreater(counts['updated'], 2)
+        incremental = dict(RelatedProductSet.objects.values_list('product_id', 'related_ids'))
+
+        build(full=True)
+        self.assertEqual(dict(RelatedProductSet.objects.values_list('product_id', 'related_ids')), incremental)
+        self.assertIn(newcomer.pk, incremental[self.pump.pk])
+
+        Product.objects.filter(pk=newcomer.pk).update(is_active=False)
+        self.assertEqual(build()['removed'], 1)
+        self.assertFalse(RelatedProductSet.objects.filter(product=newcomer).exists())
+        self.assertNotIn(newcomer.pk, RelatedProductSet.objects.get(product=self.pump).related_ids)
+
+
+class ProductViewCountTest(TestCase):
+    """Buffered product view counting and the seller dashboard series"""
+
+    def setUp(self):
+        from .view_counts import take_pending
+        take_pending()  # Views counted by earlier tests in this process
+        self.client = Client()
+        self.user = User.objects.create_user(username='viewsvendor', password='testpass123')
+        self.category = Category.objects.create(name='Views Category')
+        self.product = Product.objects.create(
+            name='Viewed Product',
+            description='Counted',
+            price=1000,
+            vendor=self.user,
+            primary_category=self.category,
+            approval_status=Product.APPROVAL_STATUS_APPROVED,
+        )
+
+    def test_views_are_buffered_and_flushed_as_one_upsert(self):
+        from django.utils import timezone
+        from .models import ProductViewStat
+        from .view_counts import flush, record_view
+
+        url = f'/api/products/slug/{self.product.slug}/'
+        etag = self.client.get(url)['ETag']
+        self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.client.get(url)
+        self.client.get(f'/api/products/{self.product.pk}/')
+        self.assertFalse(ProductViewStat.objects.exists())
+
+        gone = Product.objects.create(name='Gone Product', description='Deleted', price=5, vendor=self.user)
+        record_view(gone.pk)
+        gone.delete()
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(flush(), 1)
+        self.assertEqual(len([q for q in ctx.captured_queries if 'INSERT' in q['sql']]), 1)
+        stat = ProductViewStat.objects.get()
+        self.assertEqual((stat.product_id, stat.date, stat.views), (self.product.pk, timezone.localdate(), 4))
+
+        record_view(self.product.pk)
+        record_view(self.product.pk)
+        flush()
+        stat.refresh_from_db()
+        self.assertEqual(stat.views, 6)
+        self.assertEqual(flush(), 0)
+
+    def test_counts_unwritten_at_exit_are_spooled_for_the_command(self):
+        from unittest import mock
+        from .models import ProductViewStat
+        from . import view_counts
+
+        spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, spool_dir, ignore_errors=True)
+        self.addCleanup(view_counts._stopping.clear)
+        with override_settings(PRODUCT_VIEW_SPOOL_DIR=spool_dir):
+            view_counts.record_view(self.product.pk)
+            view_counts.record_view(self.product.pk)
+            with mock.patch.object(view_counts, 'write', side_effect=RuntimeError('database is down')):
+                view_counts._flush_at_exit()
+            self.assertFalse(view_counts.take_pending())
+            self.assertEqual(len(os.listdir(spool_dir)), 1)
+
+            output = io.StringIO()
+            call_command('flush_product_views', '--dry-run', stdout=output)
+            self.assertIn('1 row(s) from 1 spool file(s) would be written', output.getvalue())
+            self.assertFalse(ProductViewStat.objects.exists())
+
+            call_command('flush_product_views', stdout=io.StringIO())
+        self.assertEqual(ProductViewStat.objects.get().views, 2)
+        self.assertEqual(os.listdir(spool_dir), [])
+
+    def test_spooling_requires_a_shared_directory(self):
+        from unittest import mock
+        from django.core.management.base import CommandError
+        from . import view_counts
+
+        with override_settings(PRODUCT_VIEW_SPOOL_DIR=''):
+            with self.assertRaisesMessage(CommandError, 'PRODUCT_VIEW_SPOOL_DIR'):
+                call_command('flush_product_views', stdout=io.StringIO())
+            view_counts.record_view(self.product.pk)
+            self.addCleanup(view_counts._stopping.clear)
+            with mock.patch.object(view_counts, 'write', side_effect=RuntimeError('database is down')), \
+                    self.assertLogs('products.view_counts', 'ERROR') as logs:
+                view_counts._flush_at_exit()
+        self.assertIn('Spooling 1 product view counters failed', logs.output[-1])
+
+    def test_flusher_thread_flushes_without_further_requests(self):
+        import threading
+        from unittest import mock
+        from . import view_counts
+
+        flushed = threading.Event()
+        self.addCleanup(view_counts._stopping.clear)
+        with override_settings(PRODUCT_VIEW_FLUSH_INTERVAL=0.01), \
+                mock.patch.object(view_counts, 'flush', side_effect=flushed.set):
+            thread = threading.Thread(target=view_counts._run_flusher, daemon=True)
+            thread.start()
+            self.assertTrue(flushed.wait(5))
+            view_counts._stopping.set()
+            thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+    def test_seller_dashboard_reports_views(self):
+        import datetime
+        from django.utils import timezone
+        from users.models import UserProfile
+        from .models import ProductViewStat
+
+        UserProfile.objects.update_or_create(user=self.user, defaults={'role': 'seller'})
+        today = timezone.localdate()
+        ProductViewStat.objects.create(product=self.product, date=today, views=4)
+        ProductViewStat.objects.create(product=self.product, date=today - datetime.timedelta(days=1), views=2)
+
+        self.client.force_login(self.user)
+        data = self.client.get('/api/auth/seller/dashboard/').json()
+        self.assertEqual(data['product_views'], 6)
+        self.assertEqual([row['views'] for row in data['product_views_by_day']], [2, 4])
+        self.assertEqual(data['product_views_by_product'][0]['product_id'], self.product.pk)
+        self.assertEqual(data['product_views_by_product'][0]['views'], 6)
+
+
+class LabelGroupBatchingTest(TestCase):
+    """Label groups resolve their labels in one query and revalidate per subcategory"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from .models import LabelGroup
+        cache.clear()
+        self.client = Client()
+        self.pumps = Subcategory.objects.create(name='Batch Pumps')
+        self.valves = Subcategory.objects.create(name='Batch Valves')
+        for index in range(4):
+            group = LabelGroup.objects.create(name=f'Batch Group {index}', display_order=index)
+            Label.objects.create(name=f'Batch Global {index}', label_group=group)
+            scoped = Label.objects.create(name=f'Batch Valve Only {index}', label_group=group)
+            scoped.subcategories.add(self.valves)
+            Label.objects.create(name=f'Batch Inactive {index}', label_group=group, is_active=False)
+
+    def _groups(self, response):
+        return {group['name']: group for group in response.json()['results']}
+
+    def test_queries_do_not_grow_with_groups(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/label-groups/', {'subcategory': self.pumps.pk})
+        self.assertEqual(response.status_code, 200)
+        # count + page + subcategories prefetch + labels
+        self.assertLessEqual(len(ctx.captured_queries), 4)
+
+        groups = self._groups(response)
+        self.assertEqual(len(groups), 4)
+        self.assertEqual(groups['Batch Group 0']['label_count'], 1)
+        self.assertEqual([label['name'] for label in groups['Batch Group 0']['labels']], ['Batch Global 0'])
+
+        groups = self._groups(self.client.get('/api/label-groups/', {'subcategory': self.valves.pk}))
+        self.assertEqual(groups['Batch Group 2']['label_count'], 2)
+        groups = self._groups(self.client.get('/api/label-groups/'))
+        self.assertEqual(groups['Batch Group 3']['label_count'], 2)
+
+        detail = self.client.get(f'/api/label-groups/{Label.objects.first().label_group_id}/').json()
+        self.assertEqual(detail['label_count'], 2)
+
+    def test_list_revalidates_per_subcategory(self):
+        response = self.client.get('/api/label-groups/', {'subcategory': self.pumps.pk})
+        etag = response['ETag']
+        revalidated = self.client.get('/api/label-groups/', {'subcategory': self.pumps.pk}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(revalidated.status_code, 304)
+        other = self.client.get('/api/label-groups/', {'subcategory': self.valves.pk}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(other.status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Label.objects.create(name='Batch Late', label_group=Label.objects.first().label_group)
+        changed = self.client.get('/api/label-groups/', {'subcategory': self.pumps.pk}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+
+    def test_labels_are_loaded_for_the_page_only(self):
+        from .models import LabelGroup
+        for index in range(4, 12):
+            Label.objects.create(name=f'Batch Late {index}', label_group=LabelGroup.objects.create(
+                name=f'Batch Group {index}', display_order=index,
+            ))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/label-groups/')
+        self.assertEqual(len(response.json()['results']), 10)
+        labels_query = [query['sql'] for query in ctx.captured_queries if 'FROM "products_label"' in query['sql']][-1]
+        # The ids of the page, not a subquery over every matching group
+        self.assertNotIn('products_labelgroup', labels_query)
+
+    def test_admin_deactivation_invalidates_the_list(self):
+        from django.contrib.admin.sites import site
+        from django.contrib.messages.storage.fallback import FallbackStorage
+        from django.test import RequestFactory
+        from .models import LabelGroup
+
+        etag = self.client.get('/api/label-groups/')['ETag']
+        request = RequestFactory().post('/admin/')
+        request.user = User.objects.create_superuser(username='groupadmin', password='testpass123')
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        site._registry[LabelGroup].deactivate_groups(request, LabelGroup.objects.filter(name='Batch Group 0'))
+        response = self.client.get('/api/label-groups/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Batch Group 0', self._groups(response))
@@ -6,11 +6,14 @@ from .views import (
     MyProductsView, ProductCommentViewSet, global_search,
     LabelGroupViewSet, LabelViewSet, LabelComboSeoPageViewSet,
     CategoryRequestViewSet, ProductUploadRequestViewSet,
-    admin_product_upload_requests_view
+    admin_product_upload_requests_view, response_cache_stats_view, search_suggest_view,
+    taxonomy_tree_view
 )
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from .cache import SCOPE_LABELS, SCOPE_TAXONOMY
+from .conditional import conditional_response, make_etag, version_parts
 from .models import Label
 from .serializers import LabelSerializer
 from django.shortcuts import get_object_or_404
@@ -31,18 +34,33 @@ router.register(r'product-upload-requests', ProductUploadRequestViewSet, basenam
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def label_seo_content_view(request, slug):
-    """Retrieve label SEO content by slug"""
-    label = get_object_or_404(Label.objects.all(), slug=slug)
-    serializer = LabelSerializer(label, context={'request': request})
-    return Response(serializer.data)
+    """Retrieve label SEO content by slug, with ETag / Last-Modified (see products/conditional.py)"""
+    versions = get_object_or_404(Label.objects.values('pk', 'updated_at', 'product_count'), slug=slug)
+
+    def build():
+        label = get_object_or_404(Label.objects.all(), pk=versions['pk'])
+        serializer = LabelSerializer(label, context={'request': request})
+        return Response(serializer.data)
+
+    # Label relations and the taxonomy they render bump these generations (signals.py)
+    return conditional_response(
+        request,
+        build,
+        etag=make_etag(*version_parts(versions, (SCOPE_LABELS, SCOPE_TAXONOMY))),
+        last_modified=versions['updated_at'],
+    )
 
 urlpatterns = [
     # Put specific routes FIRST before router
     path('products/my_products/', MyProductsView.as_view({'get': 'list'}), name='my-products'),
+    path('products/my_products/export/', MyProductsView.as_view({'get': 'export'}), name='my-products-export'),
+    path('search/suggest/', search_suggest_view, name='search-suggest'),
     path('search/', global_search, name='global-search'),
+    path('taxonomy/tree/', taxonomy_tree_view, name='taxonomy-tree'),
     
     # Admin endpoints
     path('admin/product-upload-requests/', admin_product_upload_requests_view, name='admin-product-upload-requests'),
+    path('admin/response-cache-stats/', response_cache_stats_view, name='admin-response-cache-stats'),
     
     # Label SEO content by slug (custom route before router)
     # Using a more specific path to avoid router conflicts
@@ -0,0 +1,177 @@
+# products/view_counts.py
+"""
+Buffered product view counting.
+
+Incrementing a counter column per product page view would turn every hit on a
+popular product into a write on the same row. Instead `record_view()` adds to an
+in-process counter keyed by (product, day), and `flush()` writes the accumulated
+deltas to ProductViewStat:
+
+    INSERT ... VALUES (...), (...) ON CONFLICT (product_id, date)
+    DO UPDATE SET views = views + EXCLUDED.views
+
+one statement per PRODUCT_VIEW_FLUSH_BATCH rows, on PostgreSQL and SQLite alike.
+Server processes call `start_flusher()` (asgi.py, wsgi.py): a daemon thread then
+flushes every PRODUCT_VIEW_FLUSH_INTERVAL seconds, and the process flushes once more
+when it exits (worker recycling, deploys). Deltas that fail to write are kept for
+the next flush; at exit they are spooled to PRODUCT_VIEW_SPOOL_DIR instead, and the
+`flush_product_views` command (run from cron, e.g. every 5 minutes) writes them.
+The directory must be shared by the server containers and the one running cron
+(docker-compose mounts the product_view_spool volume there), so it has no default:
+
+
+    */5 * * * * cd /app && python manage.py flush_product_views
+
+Only views counted since the last flush of a process that is killed outright are
+lost; that is the price of not writing per view.
+"""
+import atexit
+import datetime
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_pending = Counter()
+_lock = threading.Lock()
+
+_flusher_enabled = False
+_flusher_pid = None
+_stopping = threading.Event()
+
+
+def record_view(product_id):
+    """Count one view of `product_id` today."""
+    key = (int(product_id), timezone.localdate())
+    with _lock:
+        _pending[key] += 1
+    if _flusher_enabled and _flusher_pid != os.getpid():
+        # A process forked after start_flusher() does not inherit the thread
+        start_flusher()
+
+
+def take_pending():
+    """Remove and return the buffered {(product id, day): views}."""
+    global _pending
+    with _lock:
+        pending, _pending = _pending, Counter()
+    return pending
+
+
+def _restore(deltas):
+    with _lock:
+        _pending.update(deltas)
+
+
+def write(deltas):
+    """Add `deltas` ({(product id, day): views}) to ProductViewStat; returns rows written."""
+    from .models import Product, ProductViewStat
+
+    # Views of products deleted since they were counted are dropped
+    existing = set(Product.objects.filter(pk__in={product_id for product_id, _day in deltas}).values_list('pk', flat=True))
+    rows = [(product_id, day, views) for (product_id, day), views in sorted(deltas.items()) if product_id in existing]
+    table = connection.ops.quote_name(ProductViewStat._meta.db_table)
+    batch_size = getattr(settings, 'PRODUCT_VIEW_FLUSH_BATCH', 500)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            cursor.execute(
+                f'INSERT INTO {table} (product_id, date, views) VALUES '
+                + ', '.join(['(%s, %s, %s)'] * len(batch))
+                + f' ON CONFLICT (product_id, date) DO UPDATE SET views = {table}.views + EXCLUDED.views',
+                [value for row in batch for value in row],
+            )
+    return len(rows)
+
+
+def flush():
+    """Write the buffered views; returns the number of (product, day) rows written."""
+    deltas = take_pending()
+    if not deltas:
+        return 0
+    try:
+        return write(deltas)
+    except Exception:
+        logger.exception('Flushing %s product view counters failed', len(deltas))
+        _restore(deltas)
+        return 0
+
+
+def spool_root():
+    root = getattr(settings, 'PRODUCT_VIEW_SPOOL_DIR', '')
+    if not root:
+        raise ImproperlyConfigured(
+            'PRODUCT_VIEW_SPOOL_DIR must name a directory shared with the container that runs flush_product_views'
+        )
+    return root
+
+
+def spool(deltas):
+    """Write `deltas` to a file in the spool directory for `flush_spooled()`."""
+    os.makedirs(spool_root(), exist_ok=True)
+    path = os.path.join(spool_root(), f'{uuid.uuid4().hex}.json')
+    with open(path + '.tmp', 'w') as handle:
+        json.dump([[product_id, day.isoformat(), views] for (product_id, day), views in deltas.items()], handle)
+    # Renamed into place so flush_spooled() never reads a partial file
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def flush_spooled(dry_run=False):
+    """Write the spooled deltas and remove their files; returns {'files', 'rows'} counts."""
+    counts = {'files': 0, 'rows': 0}
+    for path in sorted(glob.glob(os.path.join(spool_root(), '*.json'))):
+        with open(path) as handle:
+            deltas = Counter({
+                (product_id, datetime.date.fromisoformat(day)): views for product_id, day, views in json.load(handle)
+            })
+        counts['files'] += 1
+        if dry_run:
+            counts['rows'] += len(deltas)
+            continue
+        counts['rows'] += write(deltas)
+        os.remove(path)
+    return counts
+
+
+def _run_flusher():
+    interval = getattr(settings, 'PRODUCT_VIEW_FLUSH_INTERVAL', 60)
+    while not _stopping.wait(interval):
+        try:
+            flush()
+        finally:
+            connections.close_all()
+
+
+def _flush_at_exit():
+    _stopping.set()
+    flush()
+    deltas = take_pending()
+    if deltas:
+        try:
+            spool(deltas)
+        except (OSError, ImproperlyConfigured):
+            logger.exception('Spooling %s product view counters failed', len(deltas))
+
+
+def start_flusher():
+    """Flush this process's views periodically and at exit."""
+    global _flusher_enabled, _flusher_pid
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        if _flusher_pid is None:
+            atexit.register(_flush_at_exit)
+        _flusher_enabled = True
+        _flusher_pid = os.getpid()
+    threading.Thread(target=_run_flusher, name='product-view-flusher', daemon=True).start()
@@ -4,14 +4,22 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import CreateView, ListView, TemplateView
 from django.urls import reverse_lazy
-from django.db import models, connection
+from django.db import models, connections
 from django.db.models import Case, When, Value, IntegerField, FloatField, BooleanField, F, Prefetch, Count, Q
 from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.cache import patch_cache_control
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.contrib.sitemaps.views import sitemap as django_sitemap_view
+from django.core.files.storage import default_storage
+from django.views.decorators.http import condition, require_GET
+import base64
+import binascii
 import json
 import os
-import time
+import re
 
 # REST Framework imports
 from rest_framework import viewsets, status, filters
@@ -19,7 +27,9 @@ from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny
 from rest_framework import serializers
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
 from django_filters.rest_framework import DjangoFilterBackend
 
 # Local imports
@@ -36,10 +46,36 @@ from .models import (
     LabelComboSeoPage,
     CategoryRequest,
     ProductUploadRequest,
+    RelatedProductSet,
 )
 from gamification.models import EarnedBadge
 from .forms import ProductForm
-from .utils import log_debug
+from .label_index import label_index
+from .search import search_documents, blend_product_ranking, highlight, highlight_matches
+from .suggest import suggest_index
+from .taxonomy import taxonomy_graph
+from .ratings import rating_average_expression
+from .image_uploads import MAX_IMAGES_PER_PRODUCT, enqueue as enqueue_image_upload, reserved_image_count
+from .exporting import export_options, export_response
+from .sitemap_files import (
+    INDEX_NAME as SITEMAP_INDEX_NAME,
+    SITEMAP_ROOT,
+    read_manifest as read_sitemap_manifest,
+    refresh_if_stale as refresh_sitemaps_if_stale,
+)
+from .view_counts import record_view as record_product_view
+from .slugs import category_slugs, department_slugs, product_slugs, subcategory_slugs
+from .conditional import annotate_relation_versions, conditional_response, latest, make_etag, version_parts
+from .cache import (
+    AnonymousResponseCacheMixin,
+    get_cache_stats,
+    get_generations,
+    normalize_query_params,
+    SCOPE_PRODUCTS,
+    SCOPE_LABELS,
+    SCOPE_TAXONOMY,
+    SCOPE_VENDORS,
+)
 from .serializers import (
     ProductSerializer,
     CategorySerializer,
@@ -95,6 +131,76 @@ class ProductCreateView(LoginRequiredMixin, TemplateView):
 
 # --- DRF API VIEWSETS ---
 
+# Marketplace sort over the persisted VendorRanking columns (gamification.VendorRanking).
+# Vendors without a ranking row sort last, same as the 'inactive' tier.
+MARKETPLACE_ORDERING = (
+    F('vendor__vendor_ranking__premium_order').asc(nulls_last=True),
+    F('vendor__vendor_ranking__tier_rank').asc(nulls_last=True),
+    F('vendor__vendor_ranking__reputation_score').desc(nulls_last=True),
+    F('vendor__vendor_ranking__total_points').desc(nulls_last=True),
+    F('created_at').desc(),
+)
+
+
+def annotate_vendor_ranking(queryset):
+    """
+    Expose the persisted vendor ranking under the names the product serializers read
+    (vendor_tier, vendor_total_points, vendor_reputation_score, vendor_is_premium,
+    tier_rank, premium_order).
+    """
+    return queryset.annotate(
+        vendor_total_points=Coalesce(F('vendor__vendor_ranking__total_points'), Value(0)),
+        vendor_reputation_score=Coalesce(
+            F('vendor__vendor_ranking__reputation_score'),
+            Value(0.0),
+            output_field=FloatField(),
+        ),
+        vendor_is_premium=Coalesce(
+            F('vendor__vendor_ranking__is_premium'),
+            Value(False),
+            output_field=BooleanField(),
+        ),
+        vendor_tier=Coalesce(
+            F('vendor__vendor_ranking__tier'),
+            Value('inactive'),
+            output_field=models.CharField(),
+        ),
+        tier_rank=Coalesce(F('vendor__vendor_ranking__tier_rank'), Value(4), output_field=IntegerField()),
+        premium_order=Coalesce(F('vendor__vendor_ranking__premium_order'), Value(1), output_field=IntegerField()),
+    )
+
+# Choice fields counted by the facets endpoint
+FACET_CHOICE_FIELDS = {
+    'availability_status': Product.AVAILABILITY_CHOICES,
+    'condition': Product.CONDITION_CHOICES,
+    'origin': Product.ORIGIN_CHOICES,
+}
+
+# Default price bucket boundaries (smallest currency unit); override with ?price_bounds=
+DEFAULT_PRICE_FACET_BOUNDARIES = (10_000_000, 50_000_000, 100_000_000, 500_000_000, 1_000_000_000)
+MAX_PRICE_FACET_BOUNDARIES = 20
+
+
+def parse_price_boundaries(raw):
+    """Parse a comma-separated boundary list; raises ValueError on bad input."""
+    if not raw:
+        return DEFAULT_PRICE_FACET_BOUNDARIES
+    boundaries = sorted({int(part) for part in raw.split(',') if part.strip()})
+    if not boundaries or boundaries[0] < 0 or len(boundaries) > MAX_PRICE_FACET_BOUNDARIES:
+        raise ValueError(raw)
+    return tuple(boundaries)
+
+
+def price_buckets(boundaries):
+    """[(0, b0), (b0, b1), ..., (bn, None)] half-open price ranges."""
+    lows = (0,) + tuple(boundaries)
+    highs = tuple(boundaries) + (None,)
+    return [(low, high) for low, high in zip(lows, highs) if low != high]
+
+# global_search ranks this many candidates per requested result before blending
+SEARCH_CANDIDATE_FACTOR = 5
+SEARCH_MIN_CANDIDATES = 50
+
 class ProductPagination(PageNumberPagination):
     """
     Custom pagination class for products that allows client to specify page size
@@ -103,17 +209,151 @@ class ProductPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductCursorPagination(BasePagination):
+    """
+    Opt-in keyset pagination for the marketplace listing (?cursor= or ?pagination=cursor).
+    Pages are selected with a WHERE on the composite sort key instead of OFFSET, and no
+    COUNT query runs. Pass include_count=1 for an approximate total. The order is
+    fixed, so ?ordering= is rejected with a 400 instead of being silently ignored.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    # (annotation/field, descending) - mirrors MARKETPLACE_ORDERING with an id tiebreaker
+    ordering = (
+        ('premium_order', False),
+        ('tier_rank', False),
+        ('vendor_reputation_score', True),
+        ('vendor_total_points', True),
+        ('created_at', True),
+        ('id', False),
+    )
+    approximate_count_cap = 10000
+
+    @classmethod
+    def is_requested(cls, request):
+        params = request.query_params
+        return cls.cursor_query_param in params or params.get('pagination') == 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get('ordering'):
+            raise serializers.ValidationError({
+                'ordering': 'Cursor pagination uses the marketplace order; use page pagination to sort.'
+            })
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_queryset = queryset
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['d'] == 'prev')
+
+        order_by = []
+        for field, descending in self.ordering:
+            descending = descending != reverse
+            order_by.append(F(field).desc() if descending else F(field).asc())
+        queryset = queryset.order_by(*order_by)
+        if cursor:
+            queryset = queryset.filter(self._keyset_filter(cursor['v'], reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = True if reverse else has_more
+        self.has_previous = has_more if reverse else cursor is not None
+        return rows
+
+    def _keyset_filter(self, values, reverse):
+        """Lexicographic "row comes after the cursor" predicate over the composite sort."""
+        condition = Q(pk__in=[])
+        equal_prefix = Q()
+        for (field, descending), value in zip(self.ordering, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal_prefix & Q(**{f'{field}__{lookup}': value})
+            equal_prefix &= Q(**{field: value})
+        return condition
+
+    def _row_key(self, row):
+        values = []
+        for field, _ in self.ordering:
+            value = getattr(row, field)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return values
+
+    def encode_cursor(self, row, direction):
+        payload = json.dumps({'d': direction, 'v': self._row_key(row)}, separators=(',', ':'))
+        token = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+            values = list(payload['v'])
+            if payload['d'] not in ('next', 'prev') or len(values) != len(self.ordering):
+                raise ValueError
+            created_index = [field for field, _ in self.ordering].index('created_at')
+            values[created_index] = parse_datetime(values[created_index])
+            if values[created_index] is None:
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error):
+            raise NotFound('Invalid cursor')
+        return {'d': payload['d'], 'v': values}
+
+    def get_approximate_count(self):
+        """
+        Planner row estimate on PostgreSQL; elsewhere a count capped at
+        approximate_count_cap so the cost stays bounded.
+        """
+        queryset = self.base_queryset.order_by()
+        db_connection = connections[queryset.db]
+        if db_connection.vendor == 'postgresql':
+            sql, params = queryset.query.sql_with_params()
+            with db_connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+        return queryset[:self.approximate_count_cap].count()
+
+    def get_paginated_response(self, data):
+        response = {
+            'next': self.encode_cursor(self.page[-1], 'next') if self.has_next and self.page else None,
+            'previous': self.encode_cursor(self.page[0], 'prev') if self.has_previous and self.page else None,
+            'results': data,
+        }
+        if self.request.query_params.get('include_count') in ('1', 'true'):
+            response['count'] = self.get_approximate_count()
+            response['count_is_approximate'] = True
+        return Response(response)
+
+class ProductViewSet(AnonymousResponseCacheMixin, viewsets.ModelViewSet):
     """
     A simple ViewSet for viewing and editing products.
     """
+    response_cache_scopes = (SCOPE_PRODUCTS, SCOPE_LABELS, SCOPE_TAXONOMY, SCOPE_VENDORS)
+    response_cache_actions = ('list', 'facets', 'related')
     queryset = Product.objects.all().order_by('-created_at')
     serializer_class = ProductSerializer
     pagination_class = ProductPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
     filterset_fields = ['vendor', 'is_active', 'primary_category', 'approval_status', 'is_marketplace_hidden']
-    ordering_fields = ['created_at', 'price', 'name']
+    # rating_average / approved_comment_count come from the stored rating aggregates
+    ordering_fields = ['created_at', 'price', 'name', 'rating_average', 'approved_comment_count']
     
     def get_permissions(self):
         """
@@ -124,79 +364,81 @@ class ProductViewSet(viewsets.ModelViewSet):
         else:
             permission_classes = [AllowAny]
         return [permission() for permission in permission_classes]
-    
-    def get_queryset(self):
+
+    @property
+    def paginator(self):
+        """Use keyset pagination for the list action when the client opts in."""
+        if not hasattr(self, '_paginator'):
+            if self.action == 'list' and ProductCursorPagination.is_requested(self.request):
+                self._paginator = ProductCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    # Actions rendered with ProductDetailSerializer, which also needs the comment tree
+    detail_actions = ('retrieve', 'retrieve_by_slug')
+
+    # Relations ProductSerializer renders (list cards, search results, write responses)
+    # Categories/departments of the subcategories come from the taxonomy graph (taxonomy.py)
+    list_prefetch_lookups = (
+        'subcategories',
+        'labels',
+        'images',
+        'features',
+    )
+    detail_prefetch_lookups = list_prefetch_lookups + (
+        'comments',
+        'comments__author',
+        'comments__replies',
+        'comments__replies__author',
+    )
+
+    def get_prefetch_lookups(self):
         """
-        Optionally restricts the returned products to a given category or subcategory,
-        by filtering against query parameters in the URL.
+        Prefetches for the current action: the list only loads what ProductSerializer
+        renders, detail views additionally load the comment graph.
         """
-        # #region agent log
-        initial_query_count = len(connection.queries)
-        queryset_start = time.time()
-        # #endregion agent log
-        
         # Prefetch vendor badges to avoid N+1 queries in serializer
         vendor_badges_prefetch = Prefetch(
             'vendor__vendor_profile__earned_badges',
             queryset=EarnedBadge.objects.select_related('badge').order_by('-achieved_at')
         )
-        
+        if self.action in self.detail_actions:
+            return (vendor_badges_prefetch,) + self.detail_prefetch_lookups
+        return (vendor_badges_prefetch,) + self.list_prefetch_lookups
+
+    def get_queryset(self):
+        """
+        Optionally restricts the returned products to a given category or subcategory,
+        by filtering against query parameters in the URL.
+        """
         queryset = (
             Product.objects.all()
             .select_related(
                 'vendor__profile', 
-                'vendor__vendor_profile__engagement', 
+                'vendor__vendor_profile',
                 'primary_category',
                 'supplier',
                 'category_request'
             )
-            .prefetch_related(
-                vendor_badges_prefetch,
-                'subcategories',
-                'subcategories__categories',
-                'subcategories__categories__departments',
-                'labels',
-                'images',
-                'features',
-                'comments',
-                'comments__author',
-                'comments__replies',
-                'comments__replies__author'
-            )
-            .annotate(
-                vendor_total_points=Coalesce(
-                    F('vendor__vendor_profile__engagement__total_points'),
-                    Value(0),
-                ),
-                vendor_reputation_score=Coalesce(
-                    F('vendor__vendor_profile__engagement__reputation_score'),
-                    Value(0.0),
-                    output_field=FloatField(),
-                ),
-                vendor_is_premium=Coalesce(
-                    F('vendor__profile__is_verified'),
-                    Value(False),
-                    output_field=BooleanField(),
-                ),
-            )
+            .prefetch_related(*self.get_prefetch_lookups())
         )
-        
-        # #region agent log
-        queryset_build_time = time.time() - queryset_start
-        log_debug(
-            'debug-session',
-            'post-fix',
-            'A',
-            'products/views.py:get_queryset:queryset_build',
-            'Queryset built',
-            {
-                'queries_so_far': len(connection.queries) - initial_query_count,
-                'time_ms': round(queryset_build_time * 1000, 2)
-            }
-        )
-    
-        # #endregion agent log
 
+        queryset = self.filter_catalog_selection(queryset)
+        queryset = annotate_vendor_ranking(queryset).annotate(rating_average=rating_average_expression())
+
+        # Default ordering: premium first, then tier, then reputation/points, then recency
+        queryset = queryset.order_by(*MARKETPLACE_ORDERING)
+
+        queryset = queryset.distinct()  # Use distinct to avoid duplicates from M2M
+        return queryset
+    
+    def filter_catalog_selection(self, queryset):
+        """
+        Apply marketplace visibility and the sidebar selection (category, subcategory,
+        labels). Shared by the listing and the facets endpoint so counts always match
+        what the list would return.
+        """
         user = self.request.user
         if not getattr(user, 'is_staff', False):
             visibility_filter = models.Q(
@@ -208,43 +450,6 @@ class ProductViewSet(viewsets.ModelViewSet):
                 visibility_filter = visibility_filter | models.Q(vendor=user)
             queryset = queryset.filter(visibility_filter)
 
-        # Annotate tier values for ordering/display (mirrors GamificationService.calculate_tier)
-        queryset = queryset.annotate(
-            vendor_tier=Case(
-                When(
-                    models.Q(vendor_total_points__gte=1000) & models.Q(vendor_reputation_score__gte=80),
-                    then=Value('diamond'),
-                ),
-                When(
-                    models.Q(vendor_total_points__gte=500) & models.Q(vendor_reputation_score__gte=60),
-                    then=Value('gold'),
-                ),
-                When(models.Q(vendor_total_points__gte=200), then=Value('silver')),
-                When(models.Q(vendor_total_points__gte=50), then=Value('bronze')),
-                default=Value('inactive'),
-                output_field=models.CharField(),
-            ),
-            tier_rank=Case(
-                When(
-                    models.Q(vendor_total_points__gte=1000) & models.Q(vendor_reputation_score__gte=80),
-                    then=Value(0),
-                ),
-                When(
-                    models.Q(vendor_total_points__gte=500) & models.Q(vendor_reputation_score__gte=60),
-                    then=Value(1),
-                ),
-                When(models.Q(vendor_total_points__gte=200), then=Value(2)),
-                When(models.Q(vendor_total_points__gte=50), then=Value(3)),
-                default=Value(4),
-                output_field=IntegerField(),
-            ),
-            premium_order=Case(
-                When(vendor_is_premium=True, then=Value(0)),
-                default=Value(1),
-                output_field=IntegerField(),
-            ),
-        )
-        
         # Filter by category
         category_id = self.request.query_params.get('category', None)
         if category_id is not None:
@@ -257,180 +462,201 @@ class ProductViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(subcategories__id=subcategory_id)
 
         # Filter by labels (AND logic, accepts comma-separated slugs)
+        # Resolved against the in-process label index instead of one join per label
         label_slugs = self.request.query_params.get('labels')
         if label_slugs:
             slugs = [slug.strip() for slug in label_slugs.split(',') if slug.strip()]
-            for slug in slugs:
-                queryset = queryset.filter(labels__slug=slug)
+            if slugs:
+                queryset = label_index.filter_queryset_by_slugs(queryset, slugs)
 
-        # Default ordering: premium first, then tier, then reputation/points, then recency
-        queryset = queryset.order_by(
-            'premium_order',
-            'tier_rank',
-            '-vendor_reputation_score',
-            '-vendor_total_points',
-            '-created_at',
-        )
+        # Filter by minimum average rating (products without approved comments are excluded)
+        min_rating = self.request.query_params.get('min_rating')
+        if min_rating:
+            try:
+                min_rating = float(min_rating)
+            except ValueError:
+                min_rating = None
+            if min_rating is not None:
+                queryset = queryset.filter(
+                    approved_comment_count__gt=0,
+                    rating_sum__gte=F('approved_comment_count') * min_rating,
+                )
 
-        queryset = queryset.distinct()  # Use distinct to avoid duplicates from M2M
-        
-        # #region agent log
-        final_query_count = len(connection.queries) - initial_query_count
-        total_time = time.time() - queryset_start
-        try:
-            log_debug(
-                'debug-session',
-                'post-fix',
-                'A',
-                'products/views.py:get_queryset:final',
-                'Queryset finalized',
-                {
-                    'total_queries': final_query_count,
-                    'total_time_ms': round(total_time * 1000, 2),
-                    'has_prefetch_related': False
-                }
-            )
-        except Exception:
-            pass  # Silently fail in production
-        # #endregion agent log
-        
         return queryset
-    
+
     def get_serializer_class(self):
         """Return appropriate serializer based on action"""
         if self.action == 'retrieve':
             return ProductDetailSerializer
         return ProductSerializer
     
-    def list(self, request, *args, **kwargs):
-        """Override list to add instrumentation"""
-        # #region agent log
-        initial_queries = len(connection.queries)
-        start_time = time.time()
-        # #endregion agent log
-        
-        response = super().list(request, *args, **kwargs)
-        
-        # #region agent log
-        total_queries = len(connection.queries) - initial_queries
-        total_time = time.time() - start_time
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def facets(self, request):
+        """
+        Counts for the filter sidebar under the current category/subcategory/labels
+        selection: per label, per subcategory, per availability/condition/origin and
+        per price bucket. Three grouped queries regardless of how many labels exist.
+        """
+        return self._cached_response(self._facets, request)
+
+    def _facets(self, request):
         try:
-            log_debug(
-                'debug-session',
-                'post-fix',
-                'F',
-                'products/views.py:list',
-                'Product list endpoint completed',
+            boundaries = parse_price_boundaries(request.query_params.get('price_bounds'))
+        except ValueError:
+            return Response(
+                {'error': 'price_bounds must be a comma-separated list of non-negative integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        selection = self.filter_catalog_selection(Product.objects.all())
+        products = Product.objects.filter(id__in=selection.values('id'))
+
+        # Scalar facets and price buckets: a single aggregate with filtered counts
+        aggregates = {'total': Count('id')}
+        for field, choices in FACET_CHOICE_FIELDS.items():
+            for value, _label in choices:
+                aggregates[f'{field}__{value}'] = Count('id', filter=Q(**{field: value}))
+        buckets = price_buckets(boundaries)
+        for index, (low, high) in enumerate(buckets):
+            price_filter = Q(price__gte=low)
+            if high is not None:
+                price_filter &= Q(price__lt=high)
+            aggregates[f'price__{index}'] = Count('id', filter=price_filter)
+        totals = products.aggregate(**aggregates)
+
+        # Label and subcategory facets: one GROUP BY over each through table
+        selected_slugs = {
+            slug.strip() for slug in (request.query_params.get('labels') or '').split(',') if slug.strip()
+        }
+        label_rows = (
+            Product.labels.through.objects
+            .filter(product__in=products.values('id'), label__is_active=True)
+            .values('label_id', 'label__slug', 'label__name', 'label__label_group_id')
+            .annotate(count=Count('product_id'))
+            .order_by('-count', 'label__name')
+        )
+        subcategory_rows = (
+            Product.subcategories.through.objects
+            .filter(product__in=products.values('id'), subcategory__is_active=True)
+            .values('subcategory_id', 'subcategory__slug', 'subcategory__name')
+            .annotate(count=Count('product_id'))
+            .order_by('-count', 'subcategory__name')
+        )
+
+        return Response({
+            'total': totals['total'],
+            'labels': [
                 {
-                    'total_queries': total_queries,
-                    'total_time_ms': round(total_time * 1000, 2),
-                    'results_count': len(response.data.get('results', [])) if hasattr(response, 'data') else 0
+                    'id': row['label_id'],
+                    'slug': row['label__slug'],
+                    'name': row['label__name'],
+                    'label_group': row['label__label_group_id'],
+                    'count': row['count'],
+                    'selected': row['label__slug'] in selected_slugs,
                 }
-            )
-        except Exception:
-            pass  # Silently fail in production
-        # #endregion agent log
-        
-        return response
-    
-    def retrieve(self, request, *args, **kwargs):
-        """Override retrieve to add instrumentation"""
-        # #region agent log
-        initial_queries = len(connection.queries)
-        start_time = time.time()
-        # #endregion agent log
-        
-        response = super().retrieve(request, *args, **kwargs)
-        
-        # #region agent log
-        total_queries = len(connection.queries) - initial_queries
-        total_time = time.time() - start_time
-        try:
-            log_debug(
-                'debug-session',
-                'post-fix',
-                'F',
-                'products/views.py:retrieve',
-                'Product retrieve endpoint completed',
+                for row in label_rows
+            ],
+            'subcategories': [
                 {
-                    'total_queries': total_queries,
-                    'total_time_ms': round(total_time * 1000, 2)
+                    'id': row['subcategory_id'],
+                    'slug': row['subcategory__slug'],
+                    'name': row['subcategory__name'],
+                    'count': row['count'],
                 }
-            )
-        except Exception:
-            pass  # Silently fail in production
-        # #endregion agent log
-        
+                for row in subcategory_rows
+            ],
+            **{
+                field: [
+                    {'value': value, 'label': label, 'count': totals[f'{field}__{value}']}
+                    for value, label in choices
+                ]
+                for field, choices in FACET_CHOICE_FIELDS.items()
+            },
+            'price': [
+                {'min': low, 'max': high, 'count': totals[f'price__{index}']}
+                for index, (low, high) in enumerate(buckets)
+            ],
+        })
+
+    def retrieve(self, request, *args, **kwargs):
+        """Product detail by primary key; counted like `retrieve_by_slug`."""
+        response = super().retrieve(request, *args, **kwargs)
+        record_product_view(response.data['id'])
         return response
-    
+
     @action(detail=False, methods=['get'], url_path='slug/(?P<slug>[^/.]+)', permission_classes=[AllowAny])
     def retrieve_by_slug(self, request, slug=None):
         """
         Retrieve product detail using slug or numeric ID.
         If slug parameter is numeric, treat it as an ID; otherwise treat it as a slug.
+        Answers with ETag / Last-Modified; matching revalidations get a 304 before the
+        product is loaded or serialized (see products/conditional.py).
         """
-        # #region agent log
-        initial_queries = len(connection.queries)
-        start_time = time.time()
-        # #endregion agent log
-        
-        queryset = self.get_queryset()
-        
-        # Check if slug parameter is numeric (ID) or a string slug
+        versions = self._detail_versions(slug)
+        product_id = versions.pop('pk')
+        # Revalidated views count too (see products/view_counts.py)
+        record_product_view(product_id)
+
+        def build():
+            product = get_object_or_404(self.get_queryset(), pk=product_id)
+            serializer = ProductDetailSerializer(product, context={'request': request})
+            return Response(serializer.data)
+
+        return conditional_response(
+            request,
+            build,
+            etag=make_etag(*version_parts(versions, self.detail_version_scopes)),
+            last_modified=latest(*(versions[name] for name in self.detail_timestamps)),
+        )
+
+    # Relations ProductDetailSerializer renders: (model, foreign key, version field)
+    detail_version_relations = {
+        'images': (ProductImage, 'product', 'updated_at'),
+        'features': (ProductFeature, 'product', 'updated_at'),
+        'comments': (ProductComment, 'product', 'updated_at'),
+        'approved_comments': (ProductComment, 'product', 'pk', {'is_approved': True}),
+        'subcategory_links': (Product.subcategories.through, 'product', 'pk'),
+        'label_links': (Product.labels.through, 'product', 'pk'),
+    }
+    # Shared data embedded in the detail payload (labels, taxonomy, vendor badges/tier)
+    detail_version_scopes = (SCOPE_LABELS, SCOPE_TAXONOMY, SCOPE_VENDORS)
+    detail_timestamps = ('updated_at', 'supplier__updated_at', 'images_updated', 'features_updated', 'comments_updated')
+
+    def _detail_versions(self, slug):
+        """
+        Version columns of the product `slug` (an ID or a slug) visible to the
+        request, in one query; raises Http404 if there is none.
+        """
+        candidates = annotate_relation_versions(
+            self.filter_catalog_selection(Product.objects.all()).order_by(),
+            self.detail_version_relations,
+        ).values(
+            'pk', 'updated_at', 'vendor__first_name', 'vendor__last_name', 'supplier__updated_at',
+            # Written with update(), which leaves updated_at alone
+            *Product.RATING_COLUMNS, *Product.PRIMARY_IMAGE_COLUMNS,
+            *(f'{name}_{part}' for name in self.detail_version_relations for part in ('count', 'updated')),
+        )
+        versions = None
         try:
-            # Try to convert to integer - if successful, it might be an ID
-            product_id = int(slug)
             # Try to get by ID first
-            try:
-                product = queryset.get(id=product_id)
-            except Product.DoesNotExist:
-                # ID doesn't exist, try as slug (in case product has numeric slug)
-                product = get_object_or_404(queryset, slug=slug)
+            versions = candidates.filter(pk=int(slug)).first()
         except (ValueError, TypeError):
-            # Not numeric, treat as slug
-            product = get_object_or_404(queryset, slug=slug)
-        
-        # #region agent log
-        queries_after_get = len(connection.queries) - initial_queries
-        try:
-            log_debug(
-                'debug-session',
-                'post-fix',
-                'B',
-                'products/views.py:retrieve_by_slug:after_get',
-                'Product retrieved from DB',
-                {
-                    'queries_count': queries_after_get,
-                    'time_ms': round((time.time() - start_time) * 1000, 2)
-                }
-            )
-        except Exception:
-            pass  # Silently fail in production
-        # #endregion agent log
-        
-        serializer = ProductDetailSerializer(product, context={'request': request})
-        
-        # #region agent log
-        queries_after_serialize = len(connection.queries) - initial_queries
-        serialize_time = time.time() - start_time
-        try:
-            log_debug(
-                'debug-session',
-                'post-fix',
-                'B',
-                'products/views.py:retrieve_by_slug:after_serialize',
-                'Product serialized',
-                {
-                    'queries_count': queries_after_serialize,
-                    'queries_during_serialize': queries_after_serialize - queries_after_get,
-                    'total_time_ms': round(serialize_time * 1000, 2)
-                }
-            )
-        except Exception:
-            pass  # Silently fail in production
-        # #endregion agent log
-        
-        return Response(serializer.data)
+            pass
+        if versions is None:
+            # Not numeric, or no such ID (in case product has numeric slug).
+            # A cached slug is read with a pk predicate; a miss reads the row by slug
+            found = {}
+
+            def lookup(slug):
+                found['versions'] = candidates.filter(slug=slug).first()
+                return found['versions'] and found['versions']['pk']
+
+            product_id = product_slugs.resolve(slug, lookup)
+            if product_id is not None:
+                versions = found['versions'] if found else candidates.filter(pk=product_id).first()
+        if versions is None:
+            raise Http404('No Product matches the given query.')
+        return versions
     
     def perform_create(self, serializer):
         try:
@@ -524,20 +750,14 @@ class ProductViewSet(viewsets.ModelViewSet):
         if hasattr(self.request, 'FILES'):
             images = self.request.FILES.getlist('images', [])
             if images:
-                # Check if adding these images would exceed the limit
-                existing_count = product.images.count()
-                if existing_count + len(images) > 20:
+                # Check if adding these images would exceed the limit (queued uploads included)
+                existing_count = reserved_image_count(product)
+                if existing_count + len(images) > MAX_IMAGES_PER_PRODUCT:
                     raise serializers.ValidationError("Maximum 20 images allowed per product.")
                 
-                # Create ProductImage objects
-                for i, image_file in enumerate(images):
-                    is_primary = (i == 0 and existing_count == 0)  # First image is primary if no existing images
-                    ProductImage.objects.create(
-                        product=product,
-                        image=image_file,
-                        is_primary=is_primary,
-                        sort_order=existing_count + i
-                    )
+                # Processed in the background (products/image_uploads.py); the first
+                # image becomes primary if the product has none
+                enqueue_image_upload(product, images, user=self.request.user)
     
     def _handle_features(self, product):
         """Handle product features from request data"""
@@ -675,11 +895,36 @@ class ProductViewSet(viewsets.ModelViewSet):
         serializer = ProductCommentSerializer(comments, many=True, context={'request': request})
         return Response(serializer.data)
 
-class CategoryViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def related(self, request, pk=None):
+        """
+        Similar products precomputed by build_related_products (products/related.py),
+        best first. ?limit= caps the number returned.
+        """
+        return self._cached_response(self._related, request, pk=pk)
+
+    def _related(self, request, pk=None):
+        if not str(pk).isdigit():
+            raise NotFound()
+        related_ids = (
+            RelatedProductSet.objects.filter(product_id=pk).values_list('related_ids', flat=True).first() or []
+        )
+        try:
+            limit = int(request.query_params.get('limit', len(related_ids)))
+        except ValueError:
+            limit = len(related_ids)
+        # Stored neighbours may have been hidden since the last run
+        products = {product.pk: product for product in self.get_queryset().filter(pk__in=related_ids)}
+        ordered = [products[product_id] for product_id in related_ids if product_id in products][:max(limit, 0)]
+        serializer = ProductSerializer(ordered, many=True, context={'request': request})
+        return Response(serializer.data)
+
+class CategoryViewSet(AnonymousResponseCacheMixin, viewsets.ModelViewSet):
     """
     A simple ViewSet for viewing and editing categories.
     Supports filtering by department and slug.
     """
+    response_cache_scopes = (SCOPE_TAXONOMY,)
     queryset = Category.objects.all().order_by('name')
     serializer_class = CategorySerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
@@ -704,10 +949,10 @@ class CategoryViewSet(viewsets.ModelViewSet):
         if department_id:
             queryset = queryset.filter(departments__id=department_id)
 
-        # Filter by slug (for detail view)
+        # Filter by slug (for detail view), resolved to a primary key (see products/slugs.py)
         slug = self.request.query_params.get('slug', None)
         if slug:
-            queryset = queryset.filter(slug=slug)
+            queryset = queryset.filter(pk=category_slugs.resolve(slug))
 
         return queryset.distinct()  # Use distinct to avoid duplicates from M2M
     
@@ -721,11 +966,12 @@ class CategoryViewSet(viewsets.ModelViewSet):
             permission_classes = [AllowAny]
         return [permission() for permission in permission_classes]
 
-class SubcategoryViewSet(viewsets.ModelViewSet):
+class SubcategoryViewSet(AnonymousResponseCacheMixin, viewsets.ModelViewSet):
     """
     A simple ViewSet for viewing and editing subcategories.
     Supports filtering by category and slug.
     """
+    response_cache_scopes = (SCOPE_TAXONOMY,)
     queryset = Subcategory.objects.all().order_by('name')
     serializer_class = SubcategorySerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
@@ -752,10 +998,10 @@ class SubcategoryViewSet(viewsets.ModelViewSet):
         if category_id:
             queryset = queryset.filter(categories__id=category_id)
 
-        # Filter by slug (for detail view)
+        # Filter by slug (for detail view), resolved to a primary key (see products/slugs.py)
         slug = self.request.query_params.get('slug', None)
         if slug:
-            queryset = queryset.filter(slug=slug)
+            queryset = queryset.filter(pk=subcategory_slugs.resolve(slug))
 
         return queryset.distinct()  # Use distinct to avoid duplicates from M2M
     
@@ -769,11 +1015,12 @@ class SubcategoryViewSet(viewsets.ModelViewSet):
             permission_classes = [AllowAny]
         return [permission() for permission in permission_classes]
 
-class DepartmentViewSet(viewsets.ModelViewSet):
+class DepartmentViewSet(AnonymousResponseCacheMixin, viewsets.ModelViewSet):
     """
     A simple ViewSet for viewing and editing departments.
     Supports filtering by slug.
     """
+    response_cache_scopes = (SCOPE_TAXONOMY,)
     queryset = Department.objects.all().order_by('name')
     serializer_class = DepartmentSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
@@ -790,10 +1037,10 @@ class DepartmentViewSet(viewsets.ModelViewSet):
         if not getattr(user, 'is_staff', False):
             queryset = queryset.filter(is_active=True)
 
-        # Filter by slug (for detail view)
+        # Filter by slug (for detail view), resolved to a primary key (see products/slugs.py)
         slug = self.request.query_params.get('slug', None)
         if slug:
-            queryset = queryset.filter(slug=slug)
+            queryset = queryset.filter(pk=department_slugs.resolve(slug))
 
         return queryset
     
@@ -817,6 +1064,21 @@ class MyProductsView(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         return Product.objects.filter(vendor=self.request.user).order_by('-created_at')
 
+    def export(self, request):
+        """
+        Stream the user's whole catalog as a download: ?output=csv|jsonl (default
+        csv), ?compress=gzip. Rows are read with a server-side cursor, see
+        products/exporting.py.
+        """
+        try:
+            fmt, compress = export_options(request.query_params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return export_response(
+            Product.objects.filter(vendor=request.user), fmt, compress,
+            filename=f'products-{request.user.username}',
+        )
+
 class ProductCommentViewSet(viewsets.ModelViewSet):
     """
     ViewSet for product comments
@@ -843,27 +1105,71 @@ class ProductCommentViewSet(viewsets.ModelViewSet):
         """
         serializer.save(author=self.request.user)
 
-class LabelGroupViewSet(viewsets.ReadOnlyModelViewSet):
+class LabelGroupViewSet(AnonymousResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     """
     Provides read-only access to label groups for filter UI.
     """
+    response_cache_scopes = (SCOPE_LABELS, SCOPE_TAXONOMY)
     serializer_class = LabelGroupSerializer
     permission_classes = [AllowAny]
 
     def get_queryset(self):
         subcategory_id = self.request.query_params.get('subcategory')
-        queryset = LabelGroup.objects.filter(is_active=True).order_by('display_order', 'name')
+        queryset = (
+            LabelGroup.objects.filter(is_active=True)
+            .prefetch_related('subcategories')
+            .order_by('display_order', 'name')
+        )
         if subcategory_id:
             queryset = queryset.filter(
                 models.Q(subcategories__id=subcategory_id) | models.Q(subcategories__isnull=True)
             )
         return queryset.distinct()
 
+    def labels_by_group(self, group_ids, subcategory_id):
+        """
+        {group id: [active labels shown for `subcategory_id`]} for the groups being
+        serialized, in one query instead of two per group.
+        """
+        labels = Label.objects.filter(is_active=True, label_group__in=group_ids)
+        if subcategory_id:
+            # Same rule as LabelGroup.get_labels_for_subcategory
+            labels = labels.filter(
+                models.Q(subcategories__id=subcategory_id) | models.Q(subcategories__isnull=True)
+            ).distinct()
+        grouped = {}
+        for label in labels:
+            grouped.setdefault(label.label_group_id, []).append(label)
+        return grouped
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['subcategory_id'] = self.request.query_params.get('subcategory')
         return context
 
+    def get_serializer(self, *args, **kwargs):
+        # Called with the page (or the single group) once pagination has run
+        if args:
+            groups = list(args[0]) if kwargs.get('many') else [args[0]]
+            context = kwargs.setdefault('context', self.get_serializer_context())
+            context['labels_by_group'] = self.labels_by_group(
+                [group.pk for group in groups], context['subcategory_id']
+            )
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        """
+        Groups for the filter sidebar. The ETag is the subcategory selection plus the
+        label and taxonomy generations, so clients revalidate per subcategory with a 304.
+        """
+        generations = get_generations(self.response_cache_scopes)
+        cached_list = super().list
+        return conditional_response(
+            request,
+            lambda: cached_list(request, *args, **kwargs),
+            etag=make_etag(normalize_query_params(request.query_params), sorted(generations.items())),
+        )
+
 class LabelViewSet(viewsets.ModelViewSet):
     """
     CRUD for labels + convenience endpoints for promotional/SEO labels.
@@ -928,7 +1234,10 @@ class LabelComboSeoPageViewSet(viewsets.ReadOnlyModelViewSet):
 def global_search(request):
     """
     Global search endpoint that searches across products and blog posts
-    Returns combined results with type indicators
+    Returns combined results with type indicators.
+    Candidates come from the full-text backend in products/search.py; products are
+    ordered by relevance blended with vendor ranking and every hit carries a
+    highlighted snippet.
     """
     from blog.models import BlogPost
     from blog.serializers import BlogPostListSerializer
@@ -942,83 +1251,29 @@ def global_search(request):
             'blogs': [],
             'total': 0
         })
-    
-    # Search products (only active ones) - Optimized with select_related and prefetch_related
+
+    # Rank a wider candidate pool than we return so vendor blending can reorder it
+    candidate_limit = max(limit * SEARCH_CANDIDATE_FACTOR, SEARCH_MIN_CANDIDATES)
+
+    product_relevance = dict(search_documents('product', query, candidate_limit))
     products = Product.objects.filter(
-        models.Q(name__icontains=query) | models.Q(description__icontains=query),
+        id__in=product_relevance,
         approval_status=Product.APPROVAL_STATUS_APPROVED,
         is_active=True,
         is_marketplace_hidden=False
     ).select_related(
         'vendor__profile',
-        'vendor__vendor_profile__engagement',
+        'vendor__vendor_profile',
         'primary_category'
     ).prefetch_related(
         'images',
         'subcategories'
     )
+    products = blend_product_ranking(annotate_vendor_ranking(products), product_relevance)[:limit]
 
-    # Annotate gamification fields for ranking
-    products = products.annotate(
-        vendor_total_points=Coalesce(
-            F('vendor__vendor_profile__engagement__total_points'),
-            Value(0),
-        ),
-        vendor_reputation_score=Coalesce(
-            F('vendor__vendor_profile__engagement__reputation_score'),
-            Value(0.0),
-            output_field=FloatField(),
-        ),
-        vendor_is_premium=Coalesce(
-            F('vendor__profile__is_verified'),
-            Value(False),
-            output_field=BooleanField(),
-        ),
-    ).annotate(
-        vendor_tier=Case(
-            When(
-                models.Q(vendor_total_points__gte=1000) & models.Q(vendor_reputation_score__gte=80),
-                then=Value('diamond'),
-            ),
-            When(
-                models.Q(vendor_total_points__gte=500) & models.Q(vendor_reputation_score__gte=60),
-                then=Value('gold'),
-            ),
-            When(models.Q(vendor_total_points__gte=200), then=Value('silver')),
-            When(models.Q(vendor_total_points__gte=50), then=Value('bronze')),
-            default=Value('inactive'),
-            output_field=models.CharField(),
-        ),
-        tier_rank=Case(
-            When(
-                models.Q(vendor_total_points__gte=1000) & models.Q(vendor_reputation_score__gte=80),
-                then=Value(0),
-            ),
-            When(
-                models.Q(vendor_total_points__gte=500) & models.Q(vendor_reputation_score__gte=60),
-                then=Value(1),
-            ),
-            When(models.Q(vendor_total_points__gte=200), then=Value(2)),
-            When(models.Q(vendor_total_points__gte=50), then=Value(3)),
-            default=Value(4),
-            output_field=IntegerField(),
-        ),
-        premium_order=Case(
-            When(vendor_is_premium=True, then=Value(0)),
-            default=Value(1),
-            output_field=IntegerField(),
-        ),
-    ).order_by(
-        'premium_order',
-        'tier_rank',
-        '-vendor_reputation_score',
-        '-vendor_total_points',
-        '-created_at',
-    )[:limit]
-    
-    # Search blog posts (only published ones) - Optimized with select_related
-    blogs = BlogPost.objects.filter(
-        models.Q(title__icontains=query) | models.Q(content__icontains=query) | models.Q(excerpt__icontains=query),
+    blog_relevance = search_documents('blog', query, limit)
+    blogs_by_id = BlogPost.objects.filter(
+        id__in=[pk for pk, _relevance in blog_relevance],
         status='published'
     ).select_related(
         'author',
@@ -1029,18 +1284,120 @@ def global_search(request):
             filter=models.Q(comments__is_approved=True),
             distinct=True
         )
-    )[:limit]
+    ).in_bulk()
+    blogs = [blogs_by_id[pk] for pk, _relevance in blog_relevance if pk in blogs_by_id]
     
     # Serialize results
     product_serializer = ProductSerializer(products, many=True, context={'request': request})
     blog_serializer = BlogPostListSerializer(blogs, many=True, context={'request': request})
+
+    product_results = product_serializer.data
+    for product, data in zip(products, product_results):
+        data['highlight'] = {
+            'name': highlight(product.name, query),
+            'snippet': highlight(product.description, query),
+        }
+    blog_results = blog_serializer.data
+    for post, data in zip(blogs, blog_results):
+        data['highlight'] = {
+            'title': highlight(post.title, query),
+            'snippet': highlight(post.excerpt if highlight_matches(post.excerpt, query) else post.content, query),
+        }
     
     return Response({
-        'products': product_serializer.data,
-        'blogs': blog_serializer.data,
+        'products': product_results,
+        'blogs': blog_results,
         'total': len(products) + len(blogs)
     })
 
+# Typeahead limits; responses are public and briefly cacheable by browsers and CDNs
+SUGGEST_MIN_QUERY_LENGTH = 2
+SUGGEST_DEFAULT_LIMIT = 8
+SUGGEST_MAX_LIMIT = 20
+SUGGEST_MAX_AGE = 60
+
+
+@require_GET
+def search_suggest_view(request):
+    """
+    Typeahead suggestions (products, subcategories, labels, suppliers) for the search box.
+    A plain Django view over the in-memory index in products/suggest.py: no DRF
+    authentication or content negotiation and no ORM access on the hot path.
+    """
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', SUGGEST_DEFAULT_LIMIT)), 1), SUGGEST_MAX_LIMIT)
+    except ValueError:
+        limit = SUGGEST_DEFAULT_LIMIT
+
+    suggestions = suggest_index.suggest(query, limit) if len(query) >= SUGGEST_MIN_QUERY_LENGTH else []
+    response = JsonResponse(
+        {'query': query, 'suggestions': suggestions},
+        json_dumps_params={'ensure_ascii': False},
+    )
+    patch_cache_control(response, public=True, max_age=SUGGEST_MAX_AGE)
+    return response
+
+# Clients revalidate the tree with If-None-Match after this many seconds
+TAXONOMY_TREE_MAX_AGE = 60
+
+
+@require_GET
+@condition(etag_func=lambda request: taxonomy_graph.etag())
+def taxonomy_tree_view(request):
+    """
+    The active Department > Category > Subcategory tree from the in-memory taxonomy
+    graph. The ETag is the taxonomy version, so unchanged trees return 304.
+    """
+    response = HttpResponse(taxonomy_graph.tree_json(), content_type='application/json')
+    patch_cache_control(response, public=True, max_age=TAXONOMY_TREE_MAX_AGE)
+    return response
+
+# Crawlers may reuse the pre-generated sitemap files for this many seconds
+SITEMAP_MAX_AGE = 3600
+SITEMAP_FILE_RE = re.compile(r'^[a-z]+-\d+\.xml\.gz$')
+
+
+def _serve_sitemap_file(request, name, content_type):
+    def last_modified(request):
+        try:
+            return default_storage.get_modified_time(name)
+        except (OSError, NotImplementedError):
+            return None
+
+    @condition(last_modified_func=last_modified)
+    def serve(request):
+        response = FileResponse(default_storage.open(name, 'rb'), content_type=content_type)
+        patch_cache_control(response, public=True, max_age=SITEMAP_MAX_AGE)
+        return response
+
+    return serve(request)
+
+
+@require_GET
+def sitemap_index_view(request, sitemaps):
+    """
+    The pre-generated sitemap index (products/sitemap_files.py), with Last-Modified.
+    Changed data schedules a background refresh; until the first generation the
+    index is rendered live from `sitemaps`.
+    """
+    manifest = read_sitemap_manifest()
+    refresh_sitemaps_if_stale(manifest)
+    if manifest is None or not default_storage.exists(SITEMAP_INDEX_NAME):
+        return django_sitemap_view(request, sitemaps)
+    return _serve_sitemap_file(request, SITEMAP_INDEX_NAME, 'application/xml')
+
+
+@require_GET
+def sitemap_file_view(request, file_name):
+    """One gzipped sitemap shard listed in the index."""
+    if not SITEMAP_FILE_RE.match(file_name):
+        raise Http404
+    name = f'{SITEMAP_ROOT}/{file_name}'
+    if not default_storage.exists(name):
+        raise Http404
+    return _serve_sitemap_file(request, name, 'application/gzip')
+
 class CategoryRequestViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing category requests.
@@ -1251,3 +1608,17 @@ def admin_product_upload_requests_view(request):
         'count': pending_requests.count(),
         'results': serializer.data
     })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def response_cache_stats_view(request):
+    """
+    Hit/miss counters of the anonymous catalog response cache (admin only)
+    """
+    if not request.user.is_staff:
+        return Response(
+            {'error': 'Only admins can access this endpoint'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    return Response(get_cache_stats())
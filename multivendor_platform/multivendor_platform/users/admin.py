@@ -1,4 +1,6 @@
 from django.contrib import admin
+from django.utils import timezone
+from products.admin_mixins import NormalizedSearchMixin
 from .models import (
     UserProfile, BuyerProfile, VendorProfile, Supplier, SellerAd, SellerAdImage, 
     ProductReview, SupplierComment, UserActivity, SupplierPortfolioItem, 
@@ -13,7 +15,13 @@ class UserProfileAdmin(admin.ModelAdmin):
     actions = ['verify_users', 'block_users', 'unblock_users', 'delete_selected']
     
     def verify_users(self, request, queryset):
+        from gamification.services import refresh_vendor_ranking
+
+        user_ids = list(queryset.values_list('user_id', flat=True))
         updated = queryset.update(is_verified=True)
+        # update() sends no post_save, which would refresh the premium ranking
+        for user_id in user_ids:
+            refresh_vendor_ranking(user_id)
         self.message_user(request, f'{updated} user(s) verified successfully.')
     verify_users.short_description = "✅ Verify selected users"
     
@@ -58,10 +66,11 @@ class SupplierTeamMemberInline(admin.TabularInline):
     verbose_name = "Team Member"
     verbose_name_plural = "Team Members"
 
-class VendorProfileAdmin(admin.ModelAdmin):
+class VendorProfileAdmin(NormalizedSearchMixin, admin.ModelAdmin):
     list_display = ['store_name', 'user', 'is_approved', 'contact_email', 'created_at']
     list_filter = ['is_approved']
     search_fields = ['store_name', 'user__username', 'contact_email']
+    normalized_search_fields = ['search_name']
     actions = ['approve_vendors', 'delete_selected']  # Include delete action
     inlines = [SupplierPortfolioItemInline, SupplierTeamMemberInline]
     
@@ -157,11 +166,12 @@ class SupplierCommentAdmin(admin.ModelAdmin):
     actions = ['approve_comments', 'disapprove_comments', 'delete_selected']  # Include delete action
     
     def approve_comments(self, request, queryset):
-        queryset.update(is_approved=True)
+        # Stamped so the supplier detail ETag / Last-Modified move (update() skips auto_now)
+        queryset.update(is_approved=True, updated_at=timezone.now())
     approve_comments.short_description = "Approve selected comments"
     
     def disapprove_comments(self, request, queryset):
-        queryset.update(is_approved=False)
+        queryset.update(is_approved=False, updated_at=timezone.now())
     disapprove_comments.short_description = "Disapprove selected comments"
     
     class Media:
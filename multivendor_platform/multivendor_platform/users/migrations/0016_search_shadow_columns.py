@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:16
+# Adds the normalized store name column and backfills it.
+
+from django.db import migrations, models
+
+from products.normalization import refresh_search_columns
+
+
+def backfill_search_columns(apps, schema_editor):
+    VendorProfile = apps.get_model('users', 'VendorProfile')
+    refresh_search_columns(VendorProfile.objects.all(), {'search_name': ('store_name',)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0015_change_supplier_to_onetoone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendorprofile',
+            name='search_name',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_columns, migrations.RunPython.noop),
+    ]
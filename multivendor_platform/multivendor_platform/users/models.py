@@ -4,6 +4,7 @@ from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.utils import timezone
+from products.normalization import apply_search_columns
 
 class UserProfile(models.Model):
     """Extended user profile with roles"""
@@ -88,6 +89,10 @@ class VendorProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Normalized shadow column (products/normalization.py), filled on save
+    search_name = models.TextField(blank=True, default='', editable=False)
+    SEARCH_COLUMNS = {'search_name': ('store_name',)}
+
     class Meta:
         verbose_name = "Supplier Profile"
         verbose_name_plural = "Supplier Profiles"
@@ -95,6 +100,10 @@ class VendorProfile(models.Model):
     def __str__(self):
         return self.store_name
     
+    def save(self, *args, **kwargs):
+        apply_search_columns(self, kwargs)
+        super().save(*args, **kwargs)
+    
     def get_product_count(self):
         """Get total number of products from this supplier"""
         return self.user.products.filter(is_active=True).count()
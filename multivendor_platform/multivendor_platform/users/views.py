@@ -26,7 +26,8 @@ from .serializers import (
 )
 from orders.models import Order, OrderItem
 from orders.serializers import OrderSerializer
-from products.models import ProductComment
+from products.conditional import annotate_relation_versions, conditional_response, latest, make_etag, version_parts
+from products.models import Product, ProductComment
 from products.serializers import ProductCommentSerializer
 from .services.otp_service import OTPService
 
@@ -1126,9 +1127,22 @@ def seller_dashboard_view(request):
     # Get reviews count - use count() instead of loading all
     total_reviews = ProductComment.objects.filter(product__vendor=user).count()
     
-    # Get product views (we'll need to implement view tracking separately)
-    # For now, just return 0
-    product_views = 0
+    # Product views from the daily counters (products/view_counts.py)
+    from datetime import timedelta
+    from django.utils import timezone
+    from products.models import ProductViewStat
+    view_stats = ProductViewStat.objects.filter(product__vendor=user)
+    product_views = view_stats.aggregate(total=Sum('views'))['total'] or 0
+    series_start = timezone.localdate() - timedelta(days=getattr(settings, 'PRODUCT_VIEW_SERIES_DAYS', 30) - 1)
+    views_by_day = (
+        view_stats.filter(date__gte=series_start).values('date').annotate(views=Sum('views')).order_by('date')
+    )
+    views_by_product = (
+        view_stats.filter(date__gte=series_start)
+        .values('product_id', 'product__name')
+        .annotate(views=Sum('views'))
+        .order_by('-views', 'product_id')[:10]
+    )
     
     dashboard_data = {
         'total_products': total_products,
@@ -1137,6 +1151,11 @@ def seller_dashboard_view(request):
         'total_sales': float(total_sales),
         'total_orders': total_orders,
         'product_views': product_views,
+        'product_views_by_day': [{'date': row['date'], 'views': row['views']} for row in views_by_day],
+        'product_views_by_product': [
+            {'product_id': row['product_id'], 'name': row['product__name'], 'views': row['views']}
+            for row in views_by_product
+        ],
         'total_reviews': total_reviews,
         'recent_orders': OrderSerializer(recent_orders, many=True, context={'request': request}).data,
     }
@@ -1978,9 +1997,28 @@ def admin_update_order_status_view(request, order_id):
 @permission_classes([IsAdminUser])
 def admin_products_view(request):
     """Get all products with filtering for admin"""
-    from products.models import Product
     from products.serializers import ProductSerializer
     
+    products = _admin_products_queryset(request)
+    serializer = ProductSerializer(products, many=True, context={'request': request})
+    return Response(serializer.data)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def admin_products_export_view(request):
+    """Stream all products matching the admin filters as CSV/JSONL (?output=csv|jsonl, ?compress=gzip)"""
+    from products.exporting import export_options, export_response
+    
+    try:
+        fmt, compress = export_options(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return export_response(_admin_products_queryset(request), fmt, compress, filename='products')
+
+def _admin_products_queryset(request):
+    """Products filtered by the admin product list query parameters"""
+    from products.models import Product
+    
     products = Product.objects.all()
     
     # Filter by category
@@ -2014,8 +2052,7 @@ def admin_products_view(request):
             Q(description__icontains=search)
         )
     
-    serializer = ProductSerializer(products, many=True, context={'request': request})
-    return Response(serializer.data)
+    return products
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
@@ -2075,11 +2112,12 @@ def admin_product_bulk_action_view(request):
     products = Product.objects.filter(id__in=product_ids)
     
     if action == 'activate':
-        products.update(is_active=True)
+        # set_active also moves label counts and refreshes caches, search and typeahead
+        Product.set_active(products, True)
         log_activity(request.user, 'other', f'Admin activated {products.count()} products', request)
         return Response({'message': f'{products.count()} products activated'})
     elif action == 'deactivate':
-        products.update(is_active=False)
+        Product.set_active(products, False)
         log_activity(request.user, 'other', f'Admin deactivated {products.count()} products', request)
         return Response({'message': f'{products.count()} products deactivated'})
     elif action == 'delete':
@@ -2492,6 +2530,43 @@ class SupplierViewSet(viewsets.ReadOnlyModelViewSet):
             raise NotFound("Supplier not found or not approved")
         
         return obj
+
+    # Relations VendorProfileSerializer renders or aggregates: (model, foreign key, version
+    # field[, filter]). The filtered counts follow approvals and (de)activations written
+    # with update(), which leave updated_at alone.
+    detail_version_relations = {
+        'comments': (SupplierComment, 'supplier', 'updated_at'),
+        'approved_comments': (SupplierComment, 'supplier', 'updated_at', {'is_approved': True}),
+        'products': (Product, 'vendor__vendor_profile', 'updated_at'),
+        'active_products': (Product, 'vendor__vendor_profile', 'updated_at', {'is_active': True}),
+    }
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Supplier detail with ETag / Last-Modified (see products/conditional.py).
+        The validators come from one query; revalidations that still match get a 304
+        before the profile, its aggregates and comments are loaded.
+        """
+        from rest_framework.exceptions import NotFound
+
+        versions = annotate_relation_versions(
+            VendorProfile.objects.order_by(), self.detail_version_relations
+        ).values(
+            'pk', 'user_id', 'is_approved', 'updated_at',
+            'user__username', 'user__email', 'user__first_name', 'user__last_name',
+            *(f'{name}_{part}' for name in self.detail_version_relations for part in ('count', 'updated')),
+        ).filter(pk=self.kwargs.get('pk')).first()
+        # Same visibility as get_object: owners also see their unapproved profile
+        if versions is None or not (versions['is_approved'] or versions['user_id'] == request.user.pk):
+            raise NotFound("Supplier not found")
+
+        retrieve = super().retrieve
+        return conditional_response(
+            request,
+            lambda: retrieve(request, *args, **kwargs),
+            etag=make_etag(*version_parts(versions)),
+            last_modified=latest(versions['updated_at'], versions['comments_updated'], versions['products_updated']),
+        )
     
     @action(detail=True, methods=['get'])
     def products(self, request, pk=None):